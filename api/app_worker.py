@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Proceso de aplicación precalentado para el servidor CLI
+
+Uso: python3 -u app_worker.py <ruta de la aplicación> [módulo ...]
+
+Importa de antemano los módulos pesados (networkx, matplotlib, psycopg2,
+bcrypt, jwt) y los indicados en la línea de comandos, escribe READY_LINE en la
+salida estándar y espera a que el servidor le asigne una sesión escribiendo
+ATTACH_LINE en su entrada. Entonces ejecuta la aplicación como si se hubiera
+lanzado con python3 <ruta>, con la entrada y la salida ya conectadas al
+cliente. Si la entrada se cierra antes, el proceso termina sin ejecutarla.
+"""
+
+import importlib
+import os
+import runpy
+import sys
+
+READY_LINE = "__app_worker_ready__"
+ATTACH_LINE = "__app_worker_attach__"
+
+# Módulos que tardan en importarse y que usan las aplicaciones
+PRELOAD_MODULES = ("networkx", "matplotlib", "matplotlib.pyplot", "psycopg2", "bcrypt", "jwt")
+
+
+def preload(modules):
+    """Importa los módulos sin mostrar su salida (los que faltan se ignoran)"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: app_worker.py <aplicación> [módulo ...]", file=sys.stderr)
+        sys.exit(2)
+    app_path = os.path.abspath(sys.argv[1])
+
+    # Mismo sys.path que al ejecutar la aplicación directamente
+    sys.path.insert(0, os.path.dirname(app_path))
+    preload(PRELOAD_MODULES + tuple(sys.argv[2:]))
+
+    print(READY_LINE, flush=True)
+    if sys.stdin.readline().strip() != ATTACH_LINE:
+        return
+
+    sys.argv = [app_path]
+    runpy.run_path(app_path, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,45 @@
 Servidor CLI para Cloud Orchestrator usando netcat
 Este script gestiona las conexiones entrantes y proporciona una interfaz CLI
 para interactuar con la aplicación.
+
+El servidor usa asyncio: cada sesión es una corrutina (no un hilo) que lee
+líneas completas con StreamReader.readline y se comunica con las aplicaciones
+hijas mediante pipes asíncronos. Las escrituras esperan a que el cliente
+consuma los datos (drain), de modo que un cliente lento frena la salida de su
+aplicación en lugar de acumularla en memoria, y el número de sesiones
+simultáneas está limitado por max_sessions.
+
+Las aplicaciones se lanzan desde un pool de procesos precalentados
+(AppWorkerPool, ver app_worker.py) que ya importaron sus módulos, de modo que
+una sesión se conecta a su aplicación al instante y el pool se rellena en
+segundo plano. Con in_process=True el Administrador de Topologías no usa un
+proceso: su interfaz se ejecuta en un hilo del servidor leyendo y escribiendo
+directamente en la conexión (SessionStreams). Está desactivado por defecto
+porque los procesos que lanza la interfaz (ssh a las VMs, clear) heredarían
+la entrada y salida del servidor en lugar de la de la sesión.
+
+Las tareas largas (desplegar o eliminar topologías) se ejecutan en el motor
+de tareas (task_engine.py), que persiste su estado en TASK_DB.
+
+Con AUTHENTICATE activado, las credenciales se verifican con
+AuthenticationModule en un pool de hilos (auth_executor), de modo que las
+consultas y bcrypt no bloquean el bucle de eventos; el módulo limita los
+intentos por usuario y por IP del cliente. Por defecto está desactivado y se
+acepta cualquier credencial no vacía, como hasta ahora.
 """
 
-import socket
-import threading
-import subprocess
+import asyncio
 import os
 import signal
 import sys
-import time
 import logging
-import queue
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from app_worker import READY_LINE, ATTACH_LINE
+from task_engine import (TaskStore, TaskEngine, STATUS_LABELS, PRIORITY_HIGH, PRIORITY_NORMAL,
+                         PRIORITY_LOW, DEFAULT_WORKERS, format_task)
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,176 +53,309 @@ logging.basicConfig(
 )
 logger = logging.getLogger("cli_server")
 
-# Cola de tareas (implementación simple)
-task_queue = queue.Queue()
+APP_DIR = "/opt/cloud-orchestrator"
+MAX_SESSIONS = 200             # Sesiones simultáneas
+LINE_LIMIT = 4096              # Longitud máxima de una línea del cliente
+WRITE_BUFFER_LIMIT = 64 * 1024  # Datos pendientes de enviar antes de frenar al emisor
+READ_CHUNK = 4096              # Bytes leídos de la salida de una aplicación por vez
+TERMINATE_TIMEOUT = 5          # Segundos de espera antes de matar una aplicación
+EXIT_COMMANDS = ('exit', 'quit', 'salir')
+APP_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_worker.py")
+APP_POOL_SIZE = 2              # Procesos precalentados por aplicación
+APP_WARMUP_TIMEOUT = 60        # Segundos máximos para que un proceso quede listo
+IN_PROCESS_TOPOLOGY = False    # Ejecutar el Administrador de Topologías dentro del servidor
+# Aplicaciones y módulos que cada una importa de antemano
+APPS = {
+    "topologia_app.py": ("topology_manager",),
+    "app.py": ("core.app",),
+}
+TASK_DB = "/opt/cloud-orchestrator/data/tasks.db"
+TASKS_SHOWN = 10               # Tareas listadas en el estado de tareas
+PRIORITIES = {'alta': PRIORITY_HIGH, 'normal': PRIORITY_NORMAL, 'baja': PRIORITY_LOW}
+AUTHENTICATE = False           # Verificar credenciales contra la base de datos
+AUTH_WORKERS = 8               # Inicios de sesión atendidos a la vez
+DB_METRICS_FILE = "/opt/cloud-orchestrator/data/db_pool.prom"  # Métricas del pool (textfile de Prometheus)
+DB_METRICS_INTERVAL = 15       # Segundos entre escrituras de las métricas
+
+# Motor de tareas, se crea al iniciar el servidor
+task_engine = None
 active_sessions = {}
 session_counter = 0
-session_lock = threading.Lock()
-
-class TaskWorker(threading.Thread):
-    """Procesa tareas de la cola"""
-    
-    def __init__(self, task_queue):
-        threading.Thread.__init__(self, daemon=True)
-        self.task_queue = task_queue
-        self.running = True
-    
-    def run(self):
-        while self.running:
-            try:
-                # Obtener una tarea de la cola con timeout
-                task = self.task_queue.get(timeout=1.0)
-                logger.info(f"Procesando tarea: {task['type']}")
-                
-                if task['type'] == 'create_topology':
-                    self.execute_task(task)
-                elif task['type'] == 'delete_topology':
-                    self.execute_task(task)
-                    
-                # Marcar tarea como completada
-                self.task_queue.task_done()
-                
-            except queue.Empty:
-                # Sin tareas, continuar esperando
-                pass
-            except Exception as e:
-                logger.error(f"Error procesando tarea: {e}")
-    
-    def execute_task(self, task):
-        """Ejecuta una tarea basada en su tipo"""
+
+class AppWorkerPool:
+    """
+    Procesos de una aplicación ya iniciados y con sus módulos importados
+
+    Cada proceso ejecuta app_worker.py, que importa los módulos y espera a que
+    se le asigne una sesión. acquire() entrega uno listo (o lanza uno nuevo si
+    no queda ninguno) y repone el pool en segundo plano.
+    """
+
+    def __init__(self, app, size=APP_POOL_SIZE, preload=()):
+        self.app = app
+        self.size = size
+        self.preload = tuple(preload)
+        self.ready = asyncio.Queue()
+        self.starting = 0
+        self.closed = False
+        self.refills = set()
+
+    async def start(self):
+        """Llena el pool en segundo plano"""
+        self.refill()
+
+    def refill(self):
+        """Lanza procesos hasta completar el tamaño del pool"""
+        while not self.closed and self.ready.qsize() + self.starting < self.size:
+            self.starting += 1
+            task = asyncio.create_task(self._add())
+            self.refills.add(task)
+            task.add_done_callback(self.refills.discard)
+
+    async def _add(self):
         try:
-            # Registrar inicio
-            task['start_time'] = datetime.now().isoformat()
-            task['status'] = 'running'
-            
-            # Ejecutar el comando apropiado basado en el tipo de tarea
-            if task['type'] == 'create_topology':
-                # Simular tiempo de ejecución (reemplazar por código real)
-                time.sleep(2)
-                logger.info(f"Topología {task['params']['topology_type']} creada exitosamente")
-                task['status'] = 'completed'
-                task['result'] = {'success': True}
-                
-            elif task['type'] == 'delete_topology':
-                # Simular tiempo de ejecución (reemplazar por código real)
-                time.sleep(1)
-                logger.info(f"Topología {task['params']['topology_id']} eliminada exitosamente")
-                task['status'] = 'completed'
-                task['result'] = {'success': True}
-            
-            # Registrar finalización
-            task['end_time'] = datetime.now().isoformat()
-            
-            # Notificar al cliente si hay un socket asociado
-            if 'client_socket' in task and task['client_socket'] is not None:
-                try:
-                    message = f"\n[Tarea completada] {task['type']}: {task['result']}\n"
-                    task['client_socket'].send(message.encode())
-                except:
-                    logger.error("No se pudo notificar al cliente de la finalización")
-            
-        except Exception as e:
-            logger.error(f"Error ejecutando tarea {task['type']}: {e}")
-            task['status'] = 'failed'
-            task['error'] = str(e)
-            task['end_time'] = datetime.now().isoformat()
+            process = await self._spawn()
+        finally:
+            self.starting -= 1
+        if process is None:
+            return
+        if self.closed:
+            await self._discard(process)
+        else:
+            self.ready.put_nowait(process)
+
+    async def _spawn(self):
+        """Lanza un proceso y espera a que termine de importar sus módulos"""
+        process = await asyncio.create_subprocess_exec(
+            "python3", "-u", APP_WORKER, os.path.join(APP_DIR, self.app), *self.preload,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), APP_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            line = b""
+        if line.strip() != READY_LINE.encode():
+            logger.error(f"El proceso precalentado de {self.app} no quedó listo: {line!r}")
+            await self._discard(process)
+            return None
+        return process
+
+    async def acquire(self):
+        """
+        Entrega un proceso listo, conectado a la aplicación
+
+        Returns:
+            Proceso asyncio cuya entrada y salida son las de la aplicación
+        """
+        process = None
+        while not self.ready.empty():
+            candidate = self.ready.get_nowait()
+            if candidate.returncode is None:
+                process = candidate
+                break
+        self.refill()
+        if process is None:
+            # Pool vacío: se lanza uno en el momento
+            process = await self._spawn()
+            if process is None:
+                raise RuntimeError(f"No se pudo iniciar {self.app}")
+        process.stdin.write((ATTACH_LINE + "\n").encode())
+        await process.stdin.drain()
+        return process
+
+    async def _discard(self, process):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    async def close(self):
+        """Termina los procesos que no se llegaron a usar"""
+        self.closed = True
+        for task in list(self.refills):
+            task.cancel()
+        await asyncio.gather(*self.refills, return_exceptions=True)
+        while not self.ready.empty():
+            await self._discard(self.ready.get_nowait())
+
+class SessionStreams:
+    """
+    Entrada y salida de una sesión para una interfaz que se ejecuta en un hilo
+
+    write() pasa el texto al bucle de asyncio y readline() espera la siguiente
+    línea del cliente. Los comandos de salida, la desconexión del cliente o la
+    parada del servidor terminan la interfaz con SystemExit.
+
+    El transporte de asyncio solo puede consultarse desde el hilo del bucle,
+    así que write() no lee su búfer: cuenta los bytes enviados desde el
+    último flush() y, al pasar de WRITE_BUFFER_LIMIT, espera a drain().
+    """
+
+    def __init__(self, handler, loop):
+        self.handler = handler
+        self.loop = loop
+        self.closed = False
+        self.exit_requested = False
+        self.pending = 0   # Bytes escritos desde el último flush()
+
+    def write(self, text):
+        if not self.closed:
+            data = text.encode()
+            self.loop.call_soon_threadsafe(self.handler.writer.write, data)
+            self.pending += len(data)
+            if self.pending > WRITE_BUFFER_LIMIT:
+                self.flush()
+        return len(text)
+
+    def flush(self):
+        """Espera a que el cliente consuma lo escrito"""
+        if self.closed:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.handler.writer.drain(), self.loop).result()
+        except (Exception, asyncio.CancelledError):
+            self.closed = True
+        self.pending = 0
+
+    def readline(self, *args):
+        self.flush()
+        if self.closed:
+            raise SystemExit
+        try:
+            line = asyncio.run_coroutine_threadsafe(self.handler.recv_line(), self.loop).result()
+        except (Exception, asyncio.CancelledError):
+            self.closed = True
+            raise SystemExit
+        if line.strip().lower() in EXIT_COMMANDS:
+            self.exit_requested = True
+            raise SystemExit
+        return line + "\n"
 
 class ClientHandler:
     """Maneja una conexión de cliente"""
-    
-    def __init__(self, client_socket, client_address, session_id):
-        self.client_socket = client_socket
-        self.client_address = client_address
+
+    def __init__(self, reader, writer, session_id, server=None):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.client_address = writer.get_extra_info('peername')
         self.session_id = session_id
         self.authenticated = False
         self.user_id = None
         self.user_name = None
         self.running = True
-        
-        # Marcador para seguir si el cliente está en el app.py o topologia_app.py
+
+        # Aplicación (app.py o topologia_app.py) en la que está el cliente
         self.in_application = False
         self.current_app = None
         self.app_process = None
-    
-    def handle(self):
+
+    async def handle(self):
         """Maneja la conexión"""
         logger.info(f"Nueva conexión de {self.client_address}, sesión {self.session_id}")
-        
+
         try:
             # Manejar autenticación
-            if not self.authenticate():
+            if not await self.authenticate():
                 return
-            
+
             # Mostrar menú principal
             while self.running:
-                self.show_menu()
-                
-        except BrokenPipeError:
+                await self.show_menu()
+
+        except (BrokenPipeError, ConnectionError):
             logger.info(f"Cliente {self.session_id} desconectado")
+        except asyncio.CancelledError:
+            logger.info(f"Sesión {self.session_id} cancelada")
         except Exception as e:
             logger.error(f"Error en sesión {self.session_id}: {e}")
         finally:
-            try:
-                if self.app_process:
-                    # Terminar proceso de aplicación si está en ejecución
-                    self.app_process.terminate()
-                    logger.info(f"Terminado proceso de aplicación para sesión {self.session_id}")
-                
-                self.client_socket.close()
+            await self.close()
+
+    async def close(self):
+        """Termina la aplicación en curso y cierra la conexión"""
+        self.running = False
+        try:
+            if self.app_process:
+                # Terminar proceso de aplicación si está en ejecución
+                await self.stop_app()
+                logger.info(f"Terminado proceso de aplicación para sesión {self.session_id}")
+
+            if not self.writer.is_closing():
+                self.writer.close()
                 logger.info(f"Conexión cerrada para sesión {self.session_id}")
-                
-                # Eliminar sesión
-                with session_lock:
-                    if self.session_id in active_sessions:
-                        del active_sessions[self.session_id]
-                        
-            except Exception as e:
-                logger.error(f"Error cerrando sesión {self.session_id}: {e}")
-    
-    def authenticate(self):
-        """Autenticación básica por ahora, mejorar según necesidades"""
+        except Exception as e:
+            logger.error(f"Error cerrando sesión {self.session_id}: {e}")
+        finally:
+            # Eliminar sesión
+            active_sessions.pop(self.session_id, None)
+
+    async def send(self, text):
+        """Envía texto al cliente esperando a que haya espacio en el buffer"""
+        await self.send_bytes(text.encode())
+
+    async def send_bytes(self, data):
+        """Envía datos al cliente esperando a que haya espacio en el buffer"""
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def recv_line(self):
+        """Recibe una línea del cliente (sin el fin de línea LF o CRLF)"""
+        try:
+            line = await self.reader.readline()
+        except ValueError:
+            # Línea más larga que LINE_LIMIT: se cierra la conexión
+            raise ConnectionError("Línea demasiado larga")
+        if not line:
+            raise BrokenPipeError("Conexión cerrada por el cliente")
+        return line.rstrip(b'\r\n').decode(errors='replace')
+
+    async def authenticate(self):
+        """Pide usuario y contraseña y los verifica con el servidor"""
         # Enviar banner de bienvenida
         welcome = "\n" + "=" * 60 + "\n"
         welcome += "         CLOUD ORCHESTRATOR - ACCESO A CONSOLA\n"
         welcome += "=" * 60 + "\n\n"
         welcome += "Por favor inicie sesión para continuar.\n"
-        
-        self.client_socket.send(welcome.encode())
-        
-        # En un sistema real, conectar con base de datos
-        # Por ahora, aceptar cualquier usuario/contraseña
-        self.client_socket.send("Usuario: ".encode())
-        username = self.recv_line().strip()
-        
+
+        await self.send(welcome)
+
+        await self.send("Usuario: ")
+        username = (await self.recv_line()).strip()
+
         if not username:
-            self.client_socket.send("Nombre de usuario requerido.\n".encode())
+            await self.send("Nombre de usuario requerido.\n")
             return False
-        
-        self.client_socket.send("Contraseña: ".encode())
-        password = self.recv_line().strip()
-        
-        # En sistema real, verificar credenciales en DB
-        # Por ahora, simplemente aceptar cualquier credencial no vacía
+
+        await self.send("Contraseña: ")
+        password = (await self.recv_line()).strip()
+
         if not password:
-            self.client_socket.send("Contraseña requerida.\n".encode())
+            await self.send("Contraseña requerida.\n")
             return False
-        
-        # Simulando verificación (reemplazar con verificación real)
-        time.sleep(1)
-        
+
+        if self.server is not None and self.server.authenticate:
+            client_ip = self.client_address[0] if self.client_address else None
+            result = await self.server.login(username, password, client_ip)
+            if 'token' not in result:
+                logger.warning(f"Inicio de sesión fallido de {username} desde {self.client_address}: "
+                               f"{result.get('error')}")
+                await self.send(f"\nNo se pudo iniciar sesión: {result.get('error')}\n")
+                return False
+            self.user_id = result['user']['id']
+        else:
+            # Sin verificación (solo para desarrollo)
+            self.user_id = 1
+
         self.authenticated = True
-        self.user_id = 1  # ID ficticio
         self.user_name = username
-        
-        self.client_socket.send(f"\nBienvenido, {username}!\n\n".encode())
+
+        await self.send(f"\nBienvenido, {username}!\n\n")
         return True
-        
-    def show_menu(self):
+
+    async def show_menu(self):
         """Muestra el menú principal y procesa la selección"""
-        if self.in_application:
-            # Si ya está en una aplicación, no mostrar menú
-            return
-            
         menu = "\nMENÚ PRINCIPAL - CLOUD ORCHESTRATOR\n"
         menu += "-" * 40 + "\n"
         menu += "1. Iniciar Administrador de Topologías\n"
@@ -206,317 +364,444 @@ class ClientHandler:
         menu += "4. Salir\n"
         menu += "-" * 40 + "\n"
         menu += "Seleccione una opción: "
-        
-        self.client_socket.send(menu.encode())
-        choice = self.recv_line().strip()
-        
+
+        await self.send(menu)
+        choice = (await self.recv_line()).strip()
+
         if choice == "1":
-            self.run_topology_app()
+            await self.run_topology_app()
         elif choice == "2":
-            self.run_main_app()
+            await self.run_main_app()
         elif choice == "3":
-            self.show_task_status()
+            await self.show_task_status()
         elif choice == "4":
             self.running = False
-            self.client_socket.send("¡Hasta pronto!\n".encode())
+            await self.send("¡Hasta pronto!\n")
         else:
-            self.client_socket.send("Opción no válida. Intente de nuevo.\n".encode())
-    
-    def run_topology_app(self):
+            await self.send("Opción no válida. Intente de nuevo.\n")
+
+    async def run_topology_app(self):
         """Ejecuta la aplicación de topología"""
+        if self.server is not None and self.server.in_process:
+            await self.run_in_process()
+        else:
+            await self.run_app("topologia_app.py")
+
+    async def run_in_process(self):
+        """Ejecuta el Administrador de Topologías en un hilo conectado a la sesión"""
+        # Se importa aquí para no cargarlo si no se usa este modo
+        from topology_manager import TopologyManager
+
+        loop = asyncio.get_running_loop()
+        streams = SessionStreams(self, loop)
         self.in_application = True
         self.current_app = "topologia_app.py"
-        
+
+        def run():
+            try:
+                TopologyManager(streams, streams).run()
+            except SystemExit:
+                pass
+            except Exception as e:
+                logger.error(f"Error en el Administrador de Topologías de la sesión {self.session_id}: {e}")
+                streams.write(f"\nError inesperado: {e}\n")
+
+        logger.info(f"Sesión {self.session_id} inició {self.current_app} en el servidor")
         try:
-            # Iniciar subproceso para la aplicación
-            cmd = ["python3", "/opt/cloud-orchestrator/topologia_app.py"]
-            
-            # Crear el proceso con redirección de entrada/salida
-            self.app_process = subprocess.Popen(
-                cmd, 
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1  # Line buffered
-            )
-            
-            # Crear hilos para manejar entrada/salida
-            threading.Thread(target=self.process_output, daemon=True).start()
-            threading.Thread(target=self.process_input, daemon=True).start()
-            
-            logger.info(f"Sesión {self.session_id} inició {self.current_app}")
-            
-        except Exception as e:
+            await loop.run_in_executor(self.server.ui_executor, run)
+        finally:
             self.in_application = False
             self.current_app = None
-            logger.error(f"Error iniciando aplicación de topología: {e}")
-            self.client_socket.send(f"Error iniciando aplicación: {e}\n".encode())
-    
-    def run_main_app(self):
+        if streams.closed:
+            raise BrokenPipeError("Conexión cerrada por el cliente")
+        if streams.exit_requested:
+            await self.send("\nSaliendo de la aplicación. Volviendo al menú principal.\n")
+        else:
+            await self.send("\nLa aplicación ha terminado. Volviendo al menú principal.\n")
+
+    async def run_main_app(self):
         """Ejecuta la aplicación principal"""
+        await self.run_app("app.py")
+
+    async def run_app(self, app):
+        """
+        Ejecuta una aplicación conectando su entrada y salida con el cliente
+
+        Vuelve cuando la aplicación termina o el cliente escribe exit/quit/salir.
+        """
         self.in_application = True
-        self.current_app = "app.py"
-        
+        self.current_app = app
+
         try:
-            # Iniciar subproceso para la aplicación
-            cmd = ["python3", "/opt/cloud-orchestrator/app.py"]
-            
-            # Crear el proceso con redirección de entrada/salida
-            self.app_process = subprocess.Popen(
-                cmd, 
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1  # Line buffered
-            )
-            
-            # Crear hilos para manejar entrada/salida
-            threading.Thread(target=self.process_output, daemon=True).start()
-            threading.Thread(target=self.process_input, daemon=True).start()
-            
-            logger.info(f"Sesión {self.session_id} inició {self.current_app}")
-            
+            pool = self.server.app_pools.get(app) if self.server is not None else None
+            if pool is not None:
+                # Proceso precalentado del pool
+                self.app_process = await pool.acquire()
+            else:
+                # Iniciar subproceso con pipes asíncronos
+                self.app_process = await asyncio.create_subprocess_exec(
+                    "python3", "-u", os.path.join(APP_DIR, app),
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
         except Exception as e:
             self.in_application = False
             self.current_app = None
-            logger.error(f"Error iniciando aplicación principal: {e}")
-            self.client_socket.send(f"Error iniciando aplicación: {e}\n".encode())
-    
-    def process_output(self):
-        """Procesa la salida de la aplicación y la envía al cliente"""
+            logger.error(f"Error iniciando {app}: {e}")
+            await self.send(f"Error iniciando aplicación: {e}\n")
+            return
+
+        logger.info(f"Sesión {self.session_id} inició {self.current_app}")
+        output = asyncio.create_task(self.process_output())
+        user_input = asyncio.create_task(self.process_input())
         try:
-            for line in iter(self.app_process.stdout.readline, ''):
-                if self.running:
-                    self.client_socket.send(line.encode())
-                else:
-                    break
-                    
-            # Si llegamos aquí, la aplicación terminó
-            if self.running:
-                self.client_socket.send("\nLa aplicación ha terminado. Volviendo al menú principal.\n".encode())
-            
+            done, _ = await asyncio.wait({output, user_input}, return_when=asyncio.FIRST_COMPLETED)
+            if user_input in done and user_input.result():
+                # El cliente pidió salir de la aplicación
+                await self.stop_app()
+                output.cancel()
+                await self.send("\nSaliendo de la aplicación. Volviendo al menú principal.\n")
+            else:
+                # La aplicación terminó
+                user_input.cancel()
+                await output
+                await self.send("\nLa aplicación ha terminado. Volviendo al menú principal.\n")
+        finally:
+            for task in (output, user_input):
+                task.cancel()
+            await asyncio.gather(output, user_input, return_exceptions=True)
+            await self.stop_app()
             self.in_application = False
             self.current_app = None
             self.app_process = None
-            
-        except BrokenPipeError:
-            logger.info(f"Cliente {self.session_id} desconectado durante ejecución de aplicación")
-            self.running = False
-        except Exception as e:
-            logger.error(f"Error procesando salida de aplicación: {e}")
-            self.running = False
-    
-    def process_input(self):
-        """Procesa la entrada del cliente y la envía a la aplicación"""
+
+    async def process_output(self):
+        """Envía la salida de la aplicación al cliente a medida que se produce"""
+        # Se lee por bloques y no por líneas para que los prompts sin salto de
+        # línea (input("...: ")) lleguen al cliente de inmediato
+        while True:
+            chunk = await self.app_process.stdout.read(READ_CHUNK)
+            if not chunk:
+                break
+            await self.send_bytes(chunk)
+        await self.app_process.wait()
+
+    async def process_input(self):
+        """
+        Envía la entrada del cliente a la aplicación
+
+        Returns:
+            True si el cliente pidió salir, False si la aplicación dejó de
+            aceptar entrada
+        """
+        while True:
+            user_input = await self.recv_line()
+
+            # Verificar si el usuario quiere salir
+            if user_input.strip().lower() in EXIT_COMMANDS:
+                return True
+
+            # Enviar a la aplicación
+            try:
+                self.app_process.stdin.write((user_input + "\n").encode())
+                await self.app_process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                return False
+
+    async def stop_app(self):
+        """Termina la aplicación en curso (la mata si no termina a tiempo)"""
+        process = self.app_process
+        if process is None or process.returncode is not None:
+            return
         try:
-            while self.running and self.in_application:
-                # Leer entrada del cliente
-                user_input = self.recv_line()
-                
-                # Verificar si el usuario quiere salir
-                if user_input.strip().lower() in ['exit', 'quit', 'salir']:
-                    # Terminar la aplicación
-                    if self.app_process:
-                        self.app_process.terminate()
-                    
-                    self.in_application = False
-                    self.current_app = None
-                    self.client_socket.send("\nSaliendo de la aplicación. Volviendo al menú principal.\n".encode())
-                    break
-                    
-                # Enviar a la aplicación
-                if self.app_process and self.app_process.poll() is None:
-                    self.app_process.stdin.write(user_input + "\n")
-                    self.app_process.stdin.flush()
-                else:
-                    self.in_application = False
-                    self.current_app = None
-                    break
-                    
-        except BrokenPipeError:
-            logger.info(f"Cliente {self.session_id} desconectado durante entrada a aplicación")
-            self.running = False
-        except Exception as e:
-            logger.error(f"Error procesando entrada a aplicación: {e}")
-            self.in_application = False
-    
-    def show_task_status(self):
-        """Muestra el estado de las tareas en cola y completadas"""
-        # Obtener estado de la cola
-        queue_size = task_queue.qsize()
-        
+            process.terminate()
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def show_task_status(self):
+        """Muestra las tareas del usuario con su avance y permite encolar o cancelar tareas"""
+        if task_engine is None:
+            await self.send("\nEl motor de tareas no está disponible.\n")
+            return
+
+        loop = asyncio.get_running_loop()
+        tasks = await loop.run_in_executor(None, task_engine.list, self.user_name, TASKS_SHOWN)
+        queue_size = await loop.run_in_executor(None, task_engine.store.count, "queued")
+
         status = "\nESTADO DE TAREAS\n"
         status += "-" * 40 + "\n"
         status += f"Tareas en cola: {queue_size}\n"
         status += f"Sesiones activas: {len(active_sessions)}\n"
         status += "-" * 40 + "\n"
-        
-        self.client_socket.send(status.encode())
-        
-        # Pedir al usuario que presione Enter para continuar
-        self.client_socket.send("\nPresione Enter para continuar...".encode())
-        self.recv_line()  # Esperar a que el usuario presione Enter
-    
-    def recv_line(self):
-        """Recibe una línea del cliente"""
-        buffer = b''
-        while self.running:
-            chunk = self.client_socket.recv(1)
-            if not chunk:
-                raise BrokenPipeError("Conexión cerrada por el cliente")
-                
-            if chunk == b'\n' or chunk == b'\r':
-                # Ignorar CR, devolver en LF
-                if chunk == b'\r':
-                    # Verificar si hay un LF siguiente (CRLF)
-                    self.client_socket.settimeout(0.01)
-                    try:
-                        next_char = self.client_socket.recv(1)
-                        if next_char != b'\n':
-                            # Si no es LF, devolver al buffer
-                            buffer += next_char
-                    except socket.timeout:
-                        pass
-                    finally:
-                        self.client_socket.settimeout(None)
-                
-                return buffer.decode()
-                
-            buffer += chunk
+        if tasks:
+            status += "\n".join(format_task(task) for task in tasks) + "\n"
+        else:
+            status += "No tiene tareas.\n"
+
+        await self.send(status)
+
+        # Acciones sobre las tareas (Enter para volver al menú)
+        await self.send("\nc <archivo> [alta|baja] = desplegar, e <archivo> = eliminar, "
+                        "x <id> = cancelar\nPresione Enter para continuar...")
+        action = (await self.recv_line()).split()
+        if action:
+            await self.send(await self.task_action(action) + "\n")
+
+    async def task_action(self, action):
+        """Ejecuta una acción del estado de tareas y devuelve el mensaje para el cliente"""
+        loop = asyncio.get_running_loop()
+        command, args = action[0].lower(), action[1:]
+
+        if command == "x" and len(args) == 1 and args[0].isdigit():
+            cancelled = await loop.run_in_executor(None, task_engine.cancel, int(args[0]), self.user_name)
+            return "Tarea cancelada." if cancelled else "No se pudo cancelar (no existe o ya empezó)."
+
+        if command in ("c", "e") and args:
+            topology_file = args[0]
+            if not os.path.exists(topology_file):
+                return f"El archivo {topology_file} no existe."
+            priority = PRIORITIES.get(args[1].lower() if len(args) > 1 else 'normal')
+            if priority is None:
+                return "Prioridad inválida (alta, normal o baja)."
+            task_type = "create_topology" if command == "c" else "delete_topology"
+            task_id = await loop.run_in_executor(
+                None, task_engine.submit, task_type, {"topology_file": os.path.abspath(topology_file)},
+                self.user_name, priority
+            )
+            self.server.task_sessions[task_id] = self.session_id
+            return f"Tarea #{task_id} encolada."
+
+        return "Acción no válida."
 
 class NetcatServer:
     """Servidor que acepta conexiones y las maneja"""
-    
-    def __init__(self, port=3080, host='0.0.0.0'):
+
+    def __init__(self, port=3080, host='0.0.0.0', max_sessions=MAX_SESSIONS,
+                 task_db=TASK_DB, task_workers=DEFAULT_WORKERS, app_pool_size=APP_POOL_SIZE,
+                 in_process=IN_PROCESS_TOPOLOGY, authenticate=AUTHENTICATE):
         self.port = port
         self.host = host
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.max_sessions = max_sessions
+        self.task_db = task_db
+        self.task_workers = task_workers
+        self.app_pool_size = app_pool_size
+        self.app_pools = {}      # aplicación -> AppWorkerPool
+        self.in_process = in_process
+        # Un hilo por sesión que ejecuta la interfaz dentro del servidor
+        self.ui_executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="ui-session")
+        # Verificación de credenciales (bcrypt usa además su propio pool acotado)
+        self.authenticate = authenticate
+        self.auth_module = None
+        self.auth_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+        self.metrics_task = None
         self.running = False
-        
-        # Iniciar worker para procesar tareas
-        self.task_worker = TaskWorker(task_queue)
-    
+        self.server = None
+        self.stopped = None
+        self.loop = None
+        self.clients = set()
+        self.task_sessions = {}  # id de tarea -> sesión que la encoló
+
     def start(self):
-        """Inicia el servidor"""
-        global session_counter
-        
+        """Inicia el servidor y bloquea hasta que se detenga"""
         try:
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            asyncio.run(self.serve())
+        except Exception as e:
+            logger.error(f"Error iniciando servidor: {e}")
+
+    async def serve(self):
+        """Acepta conexiones hasta que se llame a stop()"""
+        global task_engine
+
+        loop = self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+
+        try:
+            self.server = await asyncio.start_server(
+                self.handle_client, self.host, self.port, limit=LINE_LIMIT, reuse_address=True
+            )
             self.running = True
-            
-            # Iniciar worker
-            self.task_worker.start()
-            
-            logger.info(f"Servidor iniciado en {self.host}:{self.port}")
-            
+
+            # Iniciar el motor de tareas (reanuda las interrumpidas)
+            task_engine = TaskEngine(TaskStore(self.task_db), workers=self.task_workers,
+                                     on_finish=self.notify_task)
+            task_engine.start()
+
+            if self.authenticate:
+                self.auth_module = self._load_auth_module()
+                if self.auth_module is not None:
+                    self.metrics_task = asyncio.create_task(
+                        self.export_db_metrics(self.auth_module.db_connection.db_pool))
+
+            # Precalentar procesos de las aplicaciones
+            if self.app_pool_size > 0:
+                for app, modules in APPS.items():
+                    if app == "topologia_app.py" and self.in_process:
+                        continue
+                    self.app_pools[app] = AppWorkerPool(app, self.app_pool_size, modules)
+                    await self.app_pools[app].start()
+
+            logger.info(f"Servidor iniciado en {self.host}:{self.port} "
+                        f"(máximo {self.max_sessions} sesiones)")
+
             # Manejar señales para cierre graceful
-            signal.signal(signal.SIGINT, self.handle_signal)
-            signal.signal(signal.SIGTERM, self.handle_signal)
-            
-            while self.running:
-                try:
-                    client_socket, client_address = self.server_socket.accept()
-                    
-                    # Crear identificador de sesión único
-                    with session_lock:
-                        session_counter += 1
-                        session_id = session_counter
-                    
-                    # Crear manejador de cliente
-                    handler = ClientHandler(client_socket, client_address, session_id)
-                    
-                    # Registrar sesión activa
-                    with session_lock:
-                        active_sessions[session_id] = {
-                            'address': client_address,
-                            'started': datetime.now().isoformat(),
-                            'handler': handler
-                        }
-                    
-                    # Iniciar hilo para manejar cliente
-                    client_thread = threading.Thread(
-                        target=handler.handle,
-                        name=f"client-{session_id}"
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        logger.error(f"Error aceptando conexión: {e}")
-            
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, self.handle_signal, signum)
+
+            await self.stopped.wait()
+        finally:
+            await self.cleanup()
+
+    def _load_auth_module(self):
+        """Módulo de autenticación o None si no se puede cargar (se rechazan los inicios de sesión)"""
+        try:
+            # Se importa aquí porque requiere psycopg2, bcrypt y jwt
+            from modules.Authentication import AuthenticationModule
+            return AuthenticationModule()
         except Exception as e:
-            logger.error(f"Error iniciando servidor: {e}")
+            logger.error(f"No se pudo cargar el módulo de autenticación: {e}")
+            return None
+
+    async def export_db_metrics(self, db_pool):
+        """Escribe periódicamente las métricas del pool y avisa si faltan conexiones"""
+        loop = asyncio.get_running_loop()
+        timeouts = 0
+        while True:
+            await asyncio.sleep(DB_METRICS_INTERVAL)
+            try:
+                await loop.run_in_executor(None, db_pool.write_metrics, DB_METRICS_FILE)
+            except OSError as e:
+                logger.error(f"No se pudieron escribir las métricas de la base de datos: {e}")
+            stats = db_pool.stats()
+            if stats['timeouts'] > timeouts:
+                logger.warning(f"Pool de la base de datos agotado: {stats['timeouts'] - timeouts} esperas "
+                               f"superaron {stats['timeout']:g} s (máximo {stats['maxconn']} conexiones, "
+                               f"espera p95 {stats['wait']['p95_ms']} ms)")
+                timeouts = stats['timeouts']
+
+    async def login(self, username, password, client_ip=None):
+        """Verifica las credenciales en auth_executor sin bloquear el bucle de eventos"""
+        if self.auth_module is None:
+            return {"error": "Autenticación no disponible"}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.auth_executor, self.auth_module.login,
+                                          username, password, client_ip)
+
+    async def handle_client(self, reader, writer):
+        """Atiende una conexión nueva si no se alcanzó el máximo de sesiones"""
+        global session_counter
+
+        if not self.running or len(active_sessions) >= self.max_sessions:
+            logger.warning(f"Conexión rechazada de {writer.get_extra_info('peername')}: "
+                           f"{len(active_sessions)} sesiones activas")
+            try:
+                writer.write(f"Servidor ocupado: se alcanzó el máximo de {self.max_sessions} "
+                             "sesiones. Intente más tarde.\n".encode())
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+
+        # Limitar lo que se acumula para un cliente lento antes de frenar al emisor
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_LIMIT)
+
+        # Crear identificador de sesión único
+        session_counter += 1
+        session_id = session_counter
+        handler = ClientHandler(reader, writer, session_id, self)
+
+        # Registrar sesión activa
+        active_sessions[session_id] = {
+            'address': handler.client_address,
+            'started': datetime.now().isoformat(),
+            'handler': handler
+        }
+
+        task = asyncio.current_task()
+        self.clients.add(task)
+        try:
+            await handler.handle()
         finally:
-            self.cleanup()
-    
-    def handle_signal(self, signum, frame):
+            self.clients.discard(task)
+
+    def notify_task(self, task):
+        """Avisa a la sesión que encoló una tarea de que terminó (desde un hilo del motor)"""
+        session_id = self.task_sessions.pop(task['id'], None)
+        if session_id is None or self.loop is None:
+            return
+        message = (f"\n[Tarea #{task['id']} {STATUS_LABELS.get(task['status'], task['status'])}] "
+                   f"{task['type']}: {task['result'] or task['error']}\n")
+        self.loop.call_soon_threadsafe(self._send_to_session, session_id, message)
+
+    def _send_to_session(self, session_id, message):
+        session = active_sessions.get(session_id)
+        if session is not None:
+            asyncio.create_task(self._safe_send(session['handler'], message))
+
+    async def _safe_send(self, handler, message):
+        try:
+            await handler.send(message)
+        except (ConnectionError, OSError):
+            logger.error("No se pudo notificar al cliente de la finalización")
+
+    def handle_signal(self, signum):
         """Maneja señales para cierre graceful"""
         logger.info(f"Recibida señal {signum}, cerrando servidor")
         self.stop()
-    
+
     def stop(self):
         """Detiene el servidor"""
         self.running = False
-        
-        # Cerrar todas las sesiones activas
-        with session_lock:
-            for session_id, session in active_sessions.items():
-                try:
-                    handler = session.get('handler')
-                    if handler:
-                        handler.running = False
-                except Exception as e:
-                    logger.error(f"Error cerrando sesión {session_id}: {e}")
-        
-        # Detener worker
-        if self.task_worker:
-            self.task_worker.running = False
-        
-        # Cerrar socket del servidor
-        try:
-            self.server_socket.shutdown(socket.SHUT_RDWR)
-            self.server_socket.close()
-        except Exception as e:
-            logger.error(f"Error cerrando socket del servidor: {e}")
-    
-    def cleanup(self):
-        """Limpieza final"""
+        if self.stopped is not None:
+            self.stopped.set()
+
+    async def cleanup(self):
+        """Limpieza final: deja de aceptar conexiones y cierra las sesiones"""
         logger.info("Limpiando recursos del servidor")
-        
-        # Cerrar socket del servidor si sigue abierto
-        try:
-            self.server_socket.close()
-        except:
-            pass
-        
-        # Terminar procesos de aplicación de clientes
-        with session_lock:
-            for session_id, session in active_sessions.items():
-                try:
-                    handler = session.get('handler')
-                    if handler and handler.app_process:
-                        handler.app_process.terminate()
-                except:
-                    pass
-        
+        self.running = False
+
+        if self.server is not None:
+            self.server.close()
+
+        # Cerrar las sesiones (termina sus aplicaciones)
+        for task in list(self.clients):
+            task.cancel()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+
+        if self.metrics_task is not None:
+            self.metrics_task.cancel()
+
+        # Las interfaces en hilos terminan al cerrarse su sesión
+        self.ui_executor.shutdown(wait=False)
+        self.auth_executor.shutdown(wait=False)
+
+        # Terminar los procesos precalentados sin usar
+        for pool in self.app_pools.values():
+            await pool.close()
+
+        # Detener el motor de tareas (las tareas en curso se reanudan al reiniciar)
+        if task_engine is not None:
+            task_engine.stop()
+
+        if self.server is not None:
+            await self.server.wait_closed()
+
         logger.info("Servidor detenido")
 
 if __name__ == "__main__":
     try:
         # Verificar que el directorio de datos exista
         os.makedirs("/opt/cloud-orchestrator/data", exist_ok=True)
-        
+
         # Crear y ejecutar servidor
         server = NetcatServer(port=3080)
         server.start()
-        
+
     except KeyboardInterrupt:
         logger.info("Detenido por interrupción de teclado")
         sys.exit(0)
@@ -0,0 +1,457 @@
+"""
+Motor de tareas del servidor CLI
+
+Ejecuta en segundo plano las tareas que piden los usuarios (desplegar o
+eliminar topologías) con un pool de hilos configurable:
+
+- Prioridades: se ejecuta primero la tarea en cola de mayor prioridad y, a
+  igual prioridad, la más antigua.
+- Límites de concurrencia por usuario (tareas simultáneas de un mismo
+  usuario) y por worker (tareas simultáneas que usan el mismo nodo de
+  cómputo), además del tamaño del pool.
+- Persistencia en SQLite: el estado, el avance y el resultado de cada tarea
+  sobreviven a un reinicio. Las tareas que estaban en curso al detenerse el
+  servidor vuelven a la cola al arrancar; el diario de pasos de la topología
+  permite reanudarlas sin repetir lo ya hecho.
+
+Las tareas create_topology y delete_topology usan el ejecutor y el eliminador
+de topology_manager; pueden registrarse otros tipos con TaskEngine.register.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger("cli_server.task_engine")
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATUS_LABELS = {
+    QUEUED: "en cola",
+    RUNNING: "en curso",
+    COMPLETED: "completada",
+    FAILED: "con errores",
+    CANCELLED: "cancelada",
+}
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 0
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_USER_LIMIT = 2
+# Todas las topologías usan los mismos workers, así que este límite acota en
+# la práctica las tareas simultáneas de todos los usuarios: con 1 se
+# ejecutarían de una en una aunque el pool tenga más hilos. Por defecto es el
+# tamaño del pool; la carga de cada nodo ya la limita per_node_limit del
+# motor de aprovisionamiento. Bajarlo protege los nodos a costa de encolar.
+DEFAULT_PER_HOST_LIMIT = DEFAULT_WORKERS
+PROGRESS_INTERVAL = 1.0  # Segundos mínimos entre escrituras del avance
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    user TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    ended REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_queue ON tasks (status, priority DESC, id);
+"""
+
+
+class TaskStore:
+    """Tabla de tareas en SQLite (segura entre hilos)"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Archivo de la base de datos (":memory:" para no persistir)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _row(self, row):
+        if row is None:
+            return None
+        task = dict(row)
+        task["params"] = json.loads(task["params"])
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+    def add(self, task_type, params, user, priority=PRIORITY_NORMAL):
+        """Agrega una tarea a la cola y devuelve su id"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO tasks (type, params, user, priority, status, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task_type, json.dumps(params), user, priority, QUEUED, time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def update(self, task_id, **fields):
+        """Actualiza campos de una tarea"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE tasks SET {columns} WHERE id = ?", (*fields.values(), task_id))
+            self._db.commit()
+
+    def get(self, task_id):
+        """Tarea con el id indicado o None"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row(row)
+
+    def list(self, user=None, limit=20):
+        """Tareas más recientes (de un usuario si se indica)"""
+        query = "SELECT * FROM tasks"
+        params = ()
+        if user is not None:
+            query += " WHERE user = ?"
+            params = (user,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def queued(self):
+        """Tareas en cola en orden de ejecución (prioridad y antigüedad)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM tasks WHERE status = ? ORDER BY priority DESC, id", (QUEUED,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def count(self, status):
+        """Número de tareas en un estado"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)).fetchone()[0]
+
+    def claim(self, task_id, worker):
+        """
+        Marca una tarea en cola como en curso
+
+        Returns:
+            True si la tarea seguía en cola (no fue cancelada)
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET status = ?, worker = ?, started = ?, attempts = attempts + 1, "
+                "message = NULL WHERE id = ? AND status = ?",
+                (RUNNING, worker, time.time(), task_id, QUEUED)
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def cancel(self, task_id, user=None):
+        """
+        Cancela una tarea en cola (solo las del usuario si se indica)
+
+        Returns:
+            True si se canceló
+        """
+        query = "UPDATE tasks SET status = ?, ended = ? WHERE id = ? AND status = ?"
+        params = [CANCELLED, time.time(), task_id, QUEUED]
+        if user is not None:
+            query += " AND user = ?"
+            params.append(user)
+        with self._lock:
+            cursor = self._db.execute(query, params)
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def recover(self):
+        """
+        Devuelve a la cola las tareas que quedaron en curso tras un reinicio
+
+        Returns:
+            Número de tareas recuperadas
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET status = ?, worker = NULL, message = ? WHERE status = ?",
+                (QUEUED, "Reanudada tras reinicio del servidor", RUNNING)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def topology_hosts(topology_file):
+    """Nodos de cómputo (workers) que usa una topología"""
+    try:
+        with open(topology_file, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return list(data.get("nodes", {}).get("workers", []))
+
+
+class ProgressReporter:
+    """Convierte el avance por tarea del motor de aprovisionamiento en una fracción"""
+
+    def __init__(self, report, total=None):
+        """
+        Args:
+            report: Función (fracción, mensaje) que guarda el avance
+            total: Número de tareas del plan (o función que lo devuelve)
+        """
+        self.report = report
+        self.total = total
+        self.done = 0
+
+    def __call__(self, phase, task, failed_step, done, total):
+        self.done += 1
+        plan_total = self.total() if callable(self.total) else self.total
+        state = "" if failed_step is None else f" (ERROR en {failed_step.name})"
+        fraction = min(self.done / plan_total, 1.0) if plan_total else 0.0
+        self.report(fraction, f"{phase} {done}/{total}: {task.name}{state}")
+
+
+def create_topology(params, progress):
+    """Despliega una topología guardada (o aplica sus cambios si ya está desplegada)"""
+    from topology_manager import TopologyManager
+
+    manager = TopologyManager()
+    topology_file = params["topology_file"]
+    if not manager.load_topology(topology_file):
+        raise ValueError(f"No se pudo cargar la topología {topology_file}")
+
+    def plan_total():
+        plan = manager.executor.last_plan
+        return sum(len(phase.tasks) for phase in plan.phases) if plan else 0
+
+    manager.executor.progress = ProgressReporter(progress, plan_total)
+    try:
+        ok = manager.executor.provision_topology(confirm=False, full=params.get("full", False))
+    finally:
+        manager.close_transport()
+
+    report = manager.executor.last_report
+    result = {"success": ok}
+    if report is not None:
+        result.update(duration=round(report.duration, 1), failed=len(report.failed),
+                      steps=len(report.executed_steps()))
+    return ok, result
+
+
+def delete_topology(params, progress):
+    """Elimina una topología guardada en los nodos"""
+    from topology_manager import TopologyManager
+    from topology_manager.remover import build_teardown_plan
+
+    topology_file = params["topology_file"]
+    with open(topology_file, "r") as f:
+        topology_data = json.load(f)
+
+    manager = TopologyManager()
+    total = sum(len(phase.tasks) for phase in build_teardown_plan(topology_data).phases)
+    try:
+        ok = manager.remover.teardown(topology_data, json_file=topology_file,
+                                      progress=ProgressReporter(progress, total))
+    finally:
+        manager.close_transport()
+
+    report = manager.remover.last_report
+    result = {"success": ok}
+    if report is not None:
+        result.update(duration=round(report.duration, 1), failed=len(report.failed))
+    return ok, result
+
+
+DEFAULT_HANDLERS = {
+    "create_topology": create_topology,
+    "delete_topology": delete_topology,
+}
+
+
+class TaskEngine:
+    """Pool de hilos que ejecuta las tareas guardadas en un TaskStore"""
+
+    def __init__(self, store, workers=DEFAULT_WORKERS, per_user_limit=DEFAULT_PER_USER_LIMIT,
+                 per_host_limit=DEFAULT_PER_HOST_LIMIT, handlers=None, on_finish=None):
+        """
+        Args:
+            store: TaskStore con las tareas
+            workers: Tareas simultáneas en total (hilos del pool)
+            per_user_limit: Tareas simultáneas por usuario
+            per_host_limit: Tareas simultáneas que usan un mismo nodo de cómputo
+            handlers: Diccionario tipo -> función(params, progress) que devuelve
+                      (éxito, resultado); por defecto DEFAULT_HANDLERS
+            on_finish: Función llamada con la tarea (dict) al terminar cada una
+        """
+        self.store = store
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.per_host_limit = per_host_limit
+        self.handlers = dict(DEFAULT_HANDLERS if handlers is None else handlers)
+        self.on_finish = on_finish
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._running_users = Counter()
+        self._running_hosts = Counter()
+
+    def register(self, task_type, handler):
+        """Registra la función que ejecuta un tipo de tarea"""
+        self.handlers[task_type] = handler
+
+    def start(self):
+        """Recupera las tareas interrumpidas e inicia los hilos del pool"""
+        recovered = self.store.recover()
+        if recovered:
+            logger.info(f"Se reanudarán {recovered} tareas interrumpidas")
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"worker-{i + 1}",),
+                                      name=f"task-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, wait=False, timeout=None):
+        """
+        Detiene el pool: no se inician más tareas
+
+        Las tareas en curso terminan en segundo plano salvo que se espere por
+        ellas; si el proceso termina antes, vuelven a la cola al reiniciar.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout)
+        self._threads = []
+
+    def submit(self, task_type, params, user, priority=PRIORITY_NORMAL):
+        """
+        Encola una tarea
+
+        Returns:
+            Id de la tarea
+        """
+        if task_type not in self.handlers:
+            raise ValueError(f"Tipo de tarea desconocido: {task_type}")
+        params = dict(params)
+        if "hosts" not in params and "topology_file" in params:
+            params["hosts"] = topology_hosts(params["topology_file"])
+        task_id = self.store.add(task_type, params, user, priority)
+        with self._cond:
+            self._cond.notify()
+        return task_id
+
+    def cancel(self, task_id, user=None):
+        """Cancela una tarea que aún no empezó"""
+        return self.store.cancel(task_id, user)
+
+    def list(self, user=None, limit=20):
+        """Tareas más recientes"""
+        return self.store.list(user, limit)
+
+    def _claim(self, worker):
+        """Toma la primera tarea en cola que cumpla los límites de concurrencia"""
+        for task in self.store.queued():
+            hosts = task["params"].get("hosts", [])
+            if self._running_users[task["user"]] >= self.per_user_limit:
+                continue
+            if any(self._running_hosts[host] >= self.per_host_limit for host in hosts):
+                continue
+            if not self.store.claim(task["id"], worker):
+                continue
+            self._running_users[task["user"]] += 1
+            self._running_hosts.update(hosts)
+            return task
+        return None
+
+    def _work(self, worker):
+        while True:
+            with self._cond:
+                task = None
+                while not self._stopping:
+                    task = self._claim(worker)
+                    if task is not None:
+                        break
+                    self._cond.wait()
+                if task is None:
+                    return
+            try:
+                self._execute(task)
+            finally:
+                with self._cond:
+                    self._running_users[task["user"]] -= 1
+                    self._running_hosts.subtract(task["params"].get("hosts", []))
+                    self._cond.notify_all()
+
+    def _execute(self, task):
+        """Ejecuta una tarea y guarda su resultado"""
+        last_write = [0.0]
+
+        def progress(fraction, message):
+            now = time.time()
+            if now - last_write[0] >= PROGRESS_INTERVAL or fraction >= 1.0:
+                last_write[0] = now
+                self.store.update(task["id"], progress=round(fraction, 3), message=message)
+
+        fields = {}
+        try:
+            ok, result = self.handlers[task["type"]](task["params"], progress)
+            fields = {"status": COMPLETED if ok else FAILED, "result": result}
+            if ok:
+                fields["progress"] = 1.0
+        except Exception as e:
+            fields = {"status": FAILED, "error": str(e)}
+        fields["ended"] = time.time()
+        self.store.update(task["id"], **fields)
+
+        if self.on_finish is not None:
+            try:
+                self.on_finish(self.store.get(task["id"]))
+            except Exception:
+                logger.exception(f"Error notificando el fin de la tarea {task['id']}")
+
+
+def format_task(task):
+    """Línea de estado de una tarea con su avance"""
+    name = os.path.basename(task["params"].get("topology_file", "")) or "-"
+    line = f"#{task['id']:<4} {task['type']:<16} {name:<20} {STATUS_LABELS.get(task['status'], task['status']):<11}"
+    if task["status"] == RUNNING:
+        filled = int(task["progress"] * 20)
+        line += f" [{'#' * filled}{'.' * (20 - filled)}] {task['progress'] * 100:3.0f}%"
+    if task["message"] and task["status"] in (QUEUED, RUNNING):
+        line += f" {task['message']}"
+    if task["status"] == FAILED and task["error"]:
+        line += f" {task['error']}"
+    return line
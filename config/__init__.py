@@ -1,14 +1,23 @@
-from config.conexion import Conexion, DatabasePool
-
-__all__ = ['Conexion', 'DatabasePool']
+import os
 
+# Conexión a PostgreSQL (se puede sobrescribir con variables de entorno)
 DB_CONFIG = {
-    'host': '10.88.0.6',
-    'port': '5432',
-    'database': 'db_cloud_g1',
-    'user': 'admin@pucp.edu.pe',
-    'password': 'grupo1'
+    'host': os.environ.get('DB_HOST', '10.88.0.6'),
+    'port': os.environ.get('DB_PORT', '5432'),
+    'database': os.environ.get('DB_NAME', 'db_cloud_g1'),
+    'user': os.environ.get('DB_USER', 'admin@pucp.edu.pe'),
+    'password': os.environ.get('DB_PASSWORD', 'grupo1'),
+    'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
 }
 
+# Pool de conexiones
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))         # Conexiones abiertas al crear el pool
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', '10'))        # Conexiones simultáneas como máximo
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))  # Segundos de espera por una conexión libre
+
 JWT_SECRET_KEY = 'jwt-grupo1-cloud-secret-key'
 JWT_TOKEN_EXPIRY = 24
+
+from config.conexion import Conexion, DatabasePool, DatabaseUnavailable
+
+__all__ = ['Conexion', 'DatabasePool', 'DatabaseUnavailable']
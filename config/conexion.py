@@ -1,96 +1,850 @@
+"""
+Pool de conexiones a PostgreSQL
+
+El pool se crea la primera vez que se pide una conexión, con los datos de
+config.DB_CONFIG y los tamaños DB_POOL_MIN/DB_POOL_MAX. Si la base de datos
+no responde se lanza DatabaseUnavailable y no se vuelve a intentar hasta que
+pasa un tiempo de espera que se duplica en cada fallo (hasta
+DB_RETRY_MAX_SECONDS). Las conexiones que llevan un rato sin usarse se
+comprueban antes de entregarlas y las rotas se descartan.
+
+Cuando todas las conexiones están en uso, get_connection espera hasta
+DB_POOL_TIMEOUT segundos por una libre. El pool registra el tiempo de espera
+y la latencia de cada sentencia (PoolMetrics); stats() devuelve los
+contadores, export_metrics() los da en formato de texto de Prometheus y
+add_statement_hook() permite recibir cada sentencia ejecutada.
+
+Conexion reutiliza el SQL que generan select/insert/update/delete y, cuando
+una sentencia con parámetros se repite PREPARE_THRESHOLD veces, la prepara en
+el servidor (PREPARE/EXECUTE) en cada conexión que la usa. Para operaciones
+masivas ofrece execute_many, execute_values e insert_many (varias filas por
+viaje y un solo commit), transaction() para agrupar escrituras en una misma
+conexión y select_iter para recorrer resultados grandes con un cursor del
+servidor sin cargarlos en memoria.
+"""
+
+import itertools
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import errors, extras, pool
+
+import config
+
+DB_RETRY_MIN_SECONDS = 1        # Espera tras el primer fallo de conexión
+DB_RETRY_MAX_SECONDS = 30       # Espera máxima entre intentos
+DB_VALIDATE_IDLE_SECONDS = 30   # Conexiones inactivas más tiempo se comprueban al entregarlas
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+STATEMENT_KEY_LENGTH = 120      # Caracteres de la sentencia que la identifican en las métricas
+METRICS_MAX_STATEMENTS = 200    # Sentencias distintas con histograma propio
+STATEMENT_CACHE_SIZE = 256      # Sentencias recordadas (SQL generado y preparadas)
+PREPARE_THRESHOLD = 5           # Ejecuciones antes de preparar una sentencia en el servidor
+BATCH_PAGE_SIZE = 100           # Filas por viaje en execute_many/execute_values
+SELECT_ITER_BATCH = 1000        # Filas que trae cada lectura de select_iter
+PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class DatabaseUnavailable(Exception):
+    """No se pudo obtener una conexión a la base de datos"""
+
+
+class LatencyHistogram:
+    """Histograma de latencias con cubos fijos en milisegundos"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # El último cubo es +Inf
+        self.count = 0
+        self.total = 0.0                         # Segundos
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, fraction):
+        """Límite superior (ms) del cubo que contiene el percentil"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return float("inf")
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+            "overflow": self.counts[-1]
+        }
+
+
+def statement_key(query):
+    """Texto de la sentencia sin saltos de línea ni espacios repetidos"""
+    return " ".join(query.split())[:STATEMENT_KEY_LENGTH]
+
+
+class PoolMetrics:
+    """Contadores del pool y latencias por sentencia (seguro entre hilos)"""
+
+    COUNTERS = ("checkouts", "timeouts", "connects", "connect_errors", "validation_failures",
+                "discarded", "queries", "query_errors")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.wait = LatencyHistogram()
+        self.statements = {}     # sentencia -> [histograma, errores]
+        self.in_use = 0
+        self.max_in_use = 0
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def checkout(self, wait_seconds):
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.wait.observe(wait_seconds)
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def timed_out(self, wait_seconds):
+        with self._lock:
+            self.counters["timeouts"] += 1
+            self.wait.observe(wait_seconds)
+
+    def checkin(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def statement(self, query, seconds, error=False):
+        key = statement_key(query)
+        with self._lock:
+            self.counters["queries"] += 1
+            if error:
+                self.counters["query_errors"] += 1
+            entry = self.statements.get(key)
+            if entry is None:
+                if len(self.statements) >= METRICS_MAX_STATEMENTS:
+                    key = "otras"
+                    entry = self.statements.get(key)
+                if entry is None:
+                    entry = self.statements[key] = [LatencyHistogram(), 0]
+            entry[0].observe(seconds)
+            if error:
+                entry[1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "wait": self.wait.snapshot(),
+                "statements": {
+                    key: {**histogram.snapshot(), "errors": errors}
+                    for key, (histogram, errors) in self.statements.items()
+                }
+            }
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def build_statement(kind, table, first, second=None):
+    """SQL de select/insert/update/delete (se construye una vez por combinación)"""
+    if kind == "select":
+        query = f"SELECT {first} FROM {table}"
+        return f"{query} WHERE {second}" if second else query
+    if kind == "insert":
+        return f"INSERT INTO {table} ({first}) VALUES ({second})"
+    if kind == "insert_values":
+        return f"INSERT INTO {table} ({first}) VALUES %s" + (f" RETURNING {second}" if second else "")
+    if kind == "update":
+        return f"UPDATE {table} SET {first} WHERE {second}"
+    if kind == "delete":
+        return f"DELETE FROM {table} WHERE {first}"
+    raise ValueError(f"Tipo de sentencia desconocido: {kind}")
+
+
+def to_positional(query):
+    """
+    Convierte los parámetros %s de psycopg2 en $1, $2... para PREPARE
+
+    Returns:
+        Tupla (sentencia, número de parámetros)
+    """
+    counter = itertools.count(1)
+    converted = re.sub(r"%%|%s", lambda m: "%" if m.group() == "%%" else f"${next(counter)}", query)
+    return converted, next(counter) - 1
+
+
+class StatementCache:
+    """Sentencias ejecutadas con frecuencia y el nombre con que se preparan (seguro entre hilos)"""
+
+    def __init__(self, threshold=PREPARE_THRESHOLD, max_size=STATEMENT_CACHE_SIZE):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._entries = OrderedDict()   # sentencia -> [usos, nombre, preparable]
+        self._names = itertools.count(1)
+        self._lock = threading.Lock()
+        self.prepared = 0
+        self.failed = 0
+
+    def prepared_name(self, query, params):
+        """Nombre de la sentencia preparada si ya se usó lo suficiente, o None"""
+        if params is not None and not isinstance(params, (tuple, list)):
+            return None
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None:
+                preparable = query.lstrip().split(None, 1)[0].upper() in PREPARABLE and "%(" not in query
+                entry = self._entries[query] = [0, None, preparable]
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(query)
+            entry[0] += 1
+            if not entry[2] or entry[0] < self.threshold:
+                return None
+            if entry[1] is None:
+                entry[1] = f"stmt_{next(self._names)}"
+            return entry[1]
+
+    def disable(self, query):
+        """No vuelve a intentar preparar una sentencia que el servidor rechazó"""
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None:
+                entry[2] = False
+            self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "prepared_names": sum(1 for entry in self._entries.values() if entry[1] and entry[2]),
+                "prepares": self.prepared,
+                "prepare_failures": self.failed
+            }
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _histogram_lines(name, histogram, labels=""):
+    lines = []
+    cumulative = 0
+    sep = "," if labels else ""
+    for bound, count in histogram["buckets"].items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{int(bound) / 1000}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {histogram["count"]}')
+    lines.append(f'{name}_sum{{{labels}}} {round(histogram["total_ms"] / 1000, 6)}')
+    lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+    return lines
+
 
 class DatabasePool:
     _instance = None
-    _connection_pool = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(DatabasePool, cls).__new__(cls)
-            cls._create_pool()
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(DatabasePool, cls).__new__(cls)
+                instance._setup()
+                cls._instance = instance
         return cls._instance
 
-    @classmethod
-    def _create_pool(cls):
-        try:
-            cls._connection_pool = pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=10,
-                host="10.88.0.6",
-                port="5432",
-                database="db_cloud_g1",
-                user="admin@pucp.edu.pe",
-                password="grupo1"
-            )
+    def _setup(self):
+        self.minconn = config.DB_POOL_MIN
+        self.maxconn = config.DB_POOL_MAX
+        self.timeout = config.DB_POOL_TIMEOUT
+        self.db_config = dict(config.DB_CONFIG)
+        self._connection_pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        # Indexados por la propia conexión: al cerrarla psycopg2 puede reutilizar su id()
+        self._idle_since = weakref.WeakKeyDictionary()  # conexión -> instante en que se devolvió
+        self._prepared = weakref.WeakKeyDictionary()    # conexión -> sentencias preparadas en ella
+        self.statements = StatementCache()
+        self._retry_at = 0.0
+        self._retry_delay = 0.0
+        self.last_error = None
+        self.metrics = PoolMetrics()
+        self.statement_hooks = []
+
+    def configure(self, minconn=None, maxconn=None, timeout=None, **db_config):
+        """
+        Cambia el tamaño del pool o los datos de conexión
+
+        Cierra las conexiones actuales; debe llamarse al iniciar, antes de
+        usar la base de datos.
+        """
+        self.close_all_connections()
+        with self._lock:
+            if minconn is not None:
+                self.minconn = minconn
+            if maxconn is not None:
+                self.maxconn = maxconn
+                self._slots = threading.BoundedSemaphore(maxconn)
+            if timeout is not None:
+                self.timeout = timeout
+            self.db_config.update(db_config)
+            self._retry_at = 0.0
+            self._retry_delay = 0.0
+
+    def _get_pool(self):
+        """Pool de psycopg2, creándolo si hace falta y no se está esperando para reintentar"""
+        with self._lock:
+            if self._connection_pool is not None:
+                return self._connection_pool
+
+            now = time.monotonic()
+            if now < self._retry_at:
+                raise DatabaseUnavailable(
+                    f"Base de datos no disponible (reintento en {self._retry_at - now:.0f} s): "
+                    f"{self.last_error}"
+                )
+            try:
+                self._connection_pool = pool.ThreadedConnectionPool(
+                    minconn=self.minconn,
+                    maxconn=self.maxconn,
+                    **self.db_config
+                )
+            except (Exception, psycopg2.Error) as error:
+                self._connection_failed(error)
+                raise DatabaseUnavailable(f"Base de datos no disponible: {self.last_error}") from error
+
+            self._retry_delay = 0.0
+            self.last_error = None
+            self.metrics.count("connects")
             print("PostgreSQL connection pool created successfully")
-        except (Exception, psycopg2.Error) as error:
-            print("Error while connecting to PostgreSQL:", error)
+            return self._connection_pool
+
+    def _connection_failed(self, error):
+        """Registra un fallo de conexión y programa el próximo intento (llamar con _lock)"""
+        self.last_error = str(error).strip()
+        self._retry_delay = min(max(self._retry_delay * 2, DB_RETRY_MIN_SECONDS), DB_RETRY_MAX_SECONDS)
+        self._retry_at = time.monotonic() + self._retry_delay
+        self.metrics.count("connect_errors")
+        print(f"Error while connecting to PostgreSQL (retrying in {self._retry_delay:.0f} s):", error)
+
+    def _reset(self, broken_pool, error):
+        """Descarta un pool cuyas conexiones ya no se pueden abrir"""
+        with self._lock:
+            if self._connection_pool is not broken_pool:
+                return
+            self._connection_pool = None
+            self._idle_since.clear()
+            self._prepared.clear()
+            self._connection_failed(error)
+        try:
+            broken_pool.closeall()
+        except Exception:
+            pass
+
+    def _is_usable(self, connection):
+        """Comprueba una conexión que lleva tiempo sin usarse"""
+        if connection.closed:
+            return False
+        idle_since = self._idle_since.pop(connection, None)
+        if idle_since is None or time.monotonic() - idle_since < DB_VALIDATE_IDLE_SECONDS:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
 
     def get_connection(self):
-        return self._connection_pool.getconn()
+        """
+        Conexión del pool, esperando hasta `timeout` segundos si están todas en uso
+
+        Raises:
+            DatabaseUnavailable: si la base de datos no responde o no queda
+            ninguna conexión libre a tiempo
+        """
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self.metrics.timed_out(time.monotonic() - start)
+            raise DatabaseUnavailable(
+                f"No hay conexiones libres tras esperar {self.timeout:g} s "
+                f"({self.maxconn} en uso)"
+            )
+        try:
+            connection = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        self.metrics.checkout(time.monotonic() - start)
+        return connection
+
+    def _checkout(self):
+        # Cada conexión rota se descarta; al agotarse, el pool abre otra nueva
+        for _ in range(self.maxconn + 1):
+            connection_pool = self._get_pool()
+            try:
+                connection = connection_pool.getconn()
+            except (Exception, psycopg2.Error) as error:
+                self._reset(connection_pool, error)
+                raise DatabaseUnavailable(f"Base de datos no disponible: {self.last_error}") from error
+            if self._is_usable(connection):
+                return connection
+            self.metrics.count("validation_failures")
+            self._discard(connection_pool, connection)
+        raise DatabaseUnavailable("No se pudo obtener una conexión válida")
+
+    def prepared_on(self, connection):
+        """Nombres de las sentencias ya preparadas en una conexión"""
+        return self._prepared.setdefault(connection, set())
+
+    def _forget(self, connection):
+        """Olvida el estado guardado de una conexión cerrada"""
+        self._idle_since.pop(connection, None)
+        self._prepared.pop(connection, None)
+
+    def _discard(self, connection_pool, connection):
+        self.metrics.count("discarded")
+        self._forget(connection)
+        try:
+            connection_pool.putconn(connection, close=True)
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
     def release_connection(self, connection):
-        self._connection_pool.putconn(connection)
+        try:
+            connection_pool = self._connection_pool
+            if connection_pool is None:
+                # El pool se descartó mientras se usaba la conexión
+                self._forget(connection)
+                connection.close()
+            elif connection.closed:
+                self._discard(connection_pool, connection)
+            else:
+                self._idle_since[connection] = time.monotonic()
+                connection_pool.putconn(connection)
+                if connection.closed:
+                    # putconn cierra las conexiones que sobran por encima de minconn
+                    self._forget(connection)
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        finally:
+            self.metrics.checkin()
+            self._slots.release()
 
     def close_all_connections(self):
-        if self._connection_pool:
-            self._connection_pool.closeall()
+        with self._lock:
+            connection_pool = self._connection_pool
+            self._connection_pool = None
+            self._idle_since.clear()
+            self._prepared.clear()
+        if connection_pool:
+            connection_pool.closeall()
             print("All connections closed")
 
+    def record_statement(self, query, seconds, error=False):
+        """Registra la latencia de una sentencia y avisa a los hooks"""
+        self.metrics.statement(query, seconds, error)
+        for hook in list(self.statement_hooks):
+            try:
+                hook(query, seconds, error)
+            except Exception as e:
+                print(f"Error in statement hook: {e}")
+
+    def add_statement_hook(self, hook):
+        """Registra hook(query, seconds, error), llamado tras cada sentencia"""
+        self.statement_hooks.append(hook)
+
+    def remove_statement_hook(self, hook):
+        if hook in self.statement_hooks:
+            self.statement_hooks.remove(hook)
+
+    def health_check(self):
+        """
+        Comprueba que se puede obtener una conexión y ejecutar una consulta
+
+        Returns:
+            Diccionario con ok, latency_ms y error
+        """
+        start = time.monotonic()
+        try:
+            connection = self.get_connection()
+        except DatabaseUnavailable as e:
+            return {"ok": False, "latency_ms": None, "error": str(e)}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return {"ok": True, "latency_ms": round((time.monotonic() - start) * 1000, 3), "error": None}
+        except Exception as e:
+            return {"ok": False, "latency_ms": None, "error": str(e).strip()}
+        finally:
+            self.release_connection(connection)
+
+    def stats(self):
+        """Estado del pool y métricas acumuladas"""
+        return {
+            "connected": self._connection_pool is not None,
+            "minconn": self.minconn,
+            "maxconn": self.maxconn,
+            "timeout": self.timeout,
+            "last_error": self.last_error,
+            "retry_in": max(0.0, round(self._retry_at - time.monotonic(), 1)),
+            "statement_cache": self.statements.stats(),
+            **self.metrics.snapshot()
+        }
+
+    def export_metrics(self):
+        """Métricas en formato de texto de Prometheus"""
+        stats = self.stats()
+        lines = [
+            "# TYPE db_pool_connections_in_use gauge",
+            f"db_pool_connections_in_use {stats['in_use']}",
+            "# TYPE db_pool_connections_max gauge",
+            f"db_pool_connections_max {stats['maxconn']}",
+            "# TYPE db_pool_up gauge",
+            f"db_pool_up {int(stats['connected'])}",
+        ]
+        for name in PoolMetrics.COUNTERS:
+            lines.append(f"# TYPE db_pool_{name}_total counter")
+            lines.append(f"db_pool_{name}_total {stats[name]}")
+        lines.append("# TYPE db_pool_wait_seconds histogram")
+        lines.extend(_histogram_lines("db_pool_wait_seconds", stats["wait"]))
+        lines.append("# TYPE db_statement_seconds histogram")
+        for key, histogram in stats["statements"].items():
+            lines.extend(_histogram_lines("db_statement_seconds", histogram,
+                                          f'statement="{_escape_label(key)}"'))
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path):
+        """Escribe export_metrics() en un archivo (reemplazándolo de forma atómica)"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.export_metrics())
+        os.replace(tmp_path, path)
+
+
 class Conexion:
+    """Consultas con una conexión del pool por llamada, confirmadas al terminar"""
+
+    in_transaction = False
+
     def __init__(self):
         self.db_pool = DatabasePool()
 
-    def execute_query(self, query, params=None, fetch=True):
+    def _acquire(self):
+        return self.db_pool.get_connection()
+
+    def _release(self, connection):
+        self.db_pool.release_connection(connection)
+
+    def _finish(self, connection):
+        connection.commit()
+
+    def _abort(self, connection):
+        if not connection.closed:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+
+    def _run(self, query, action, commit=True):
+        """
+        Ejecuta action(cursor, connection) con una conexión, registrando su latencia
+
+        Si action falla se deshace la transacción y se relanza el error.
+        """
         connection = None
         cursor = None
-        result = None
+        start = None
 
         try:
-            connection = self.db_pool.get_connection()
+            connection = self._acquire()
             cursor = connection.cursor()
 
-            cursor.execute(query, params)
-
-            if fetch:
-                result = cursor.fetchall()
-            else:
-                connection.commit()
-                if cursor.rowcount > 0:
-                    result = cursor.rowcount
-                if hasattr(cursor, 'lastrowid'):
-                    result = cursor.lastrowid
+            start = time.monotonic()
+            result = action(cursor, connection)
+            if commit:
+                self._finish(connection)
 
+            self.db_pool.record_statement(query, time.monotonic() - start)
             return result
 
         except Exception as e:
+            if start is not None:
+                self.db_pool.record_statement(query, time.monotonic() - start, error=True)
             if connection:
-                connection.rollback()
+                self._abort(connection)
             print(f"Database error: {e}")
             raise
         finally:
             if cursor:
-                cursor.close()
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
             if connection:
-                self.db_pool.release_connection(connection)
+                self._release(connection)
+
+    def _execute(self, cursor, connection, query, params):
+        """Ejecuta la sentencia, preparándola en el servidor si se repite a menudo"""
+        name = self.db_pool.statements.prepared_name(query, params)
+        if name is None:
+            cursor.execute(query, params)
+            return
+
+        prepared = self.db_pool.prepared_on(connection)
+        if name in prepared:
+            try:
+                self._execute_prepared(cursor, name, params)
+                return
+            except errors.InvalidSqlStatementName:
+                # La sesión ya no tiene la sentencia (p. ej. tras un DEALLOCATE)
+                prepared.discard(name)
+                if self.in_transaction:
+                    raise
+                connection.rollback()
+
+        if self.in_transaction:
+            # Un PREPARE fallido anularía la transacción en curso
+            cursor.execute(query, params)
+            return
+        positional, count = to_positional(query)
+        if count != len(params or ()):
+            self.db_pool.statements.disable(query)
+            cursor.execute(query, params)
+            return
+        try:
+            cursor.execute(f"PREPARE {name} AS {positional}")
+        except psycopg2.Error:
+            connection.rollback()
+            self.db_pool.statements.disable(query)
+            cursor.execute(query, params)
+            return
+        prepared.add(name)
+        self.db_pool.statements.prepared += 1
+        self._execute_prepared(cursor, name, params)
+
+    @staticmethod
+    def _execute_prepared(cursor, name, params):
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def execute_query(self, query, params=None, fetch=True, commit=False):
+        """
+        Ejecuta una consulta con una conexión del pool
+
+        Args:
+            fetch: Devuelve las filas resultantes
+            commit: Confirma la transacción también cuando se devuelven filas
+                    (INSERT/UPDATE/DELETE ... RETURNING)
+        """
+        def action(cursor, connection):
+            self._execute(cursor, connection, query, params)
+            if fetch:
+                return cursor.fetchall()
+            result = None
+            if cursor.rowcount > 0:
+                result = cursor.rowcount
+            if hasattr(cursor, 'lastrowid'):
+                result = cursor.lastrowid
+            return result
+
+        return self._run(query, action, commit=commit or not fetch)
+
+    def execute_many(self, query, params_list, page_size=BATCH_PAGE_SIZE):
+        """
+        Ejecuta la sentencia para cada juego de parámetros con un solo commit
+
+        Se envían page_size sentencias por viaje a la base de datos.
+
+        Returns:
+            Número de juegos de parámetros ejecutados
+        """
+        params_list = list(params_list)
+        if not params_list:
+            return 0
+
+        def action(cursor, connection):
+            extras.execute_batch(cursor, query, params_list, page_size=page_size)
+            return len(params_list)
+
+        return self._run(query, action)
+
+    def execute_values(self, query, rows, template=None, page_size=BATCH_PAGE_SIZE, fetch=False):
+        """
+        Ejecuta una sentencia con VALUES %s para muchas filas con un solo commit
+
+        Cada viaje incluye page_size filas en un único VALUES.
+
+        Args:
+            query: Sentencia con un único %s donde van las filas
+            template: Formato de cada fila, por defecto (%s, %s, ...)
+            fetch: Devuelve las filas de RETURNING de todas las páginas
+
+        Returns:
+            Filas devueltas si fetch, o el número de filas enviadas
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if fetch else 0
+
+        def action(cursor, connection):
+            result = extras.execute_values(cursor, query, rows, template=template,
+                                           page_size=page_size, fetch=fetch)
+            return result if fetch else len(rows)
+
+        return self._run(query, action)
+
+    def insert_many(self, table, columns, rows, returning=None, page_size=BATCH_PAGE_SIZE):
+        """
+        Inserta muchas filas con execute_values
+
+        Returns:
+            Filas de RETURNING si se indica `returning`, o el número de filas
+        """
+        query = build_statement("insert_values", table, columns, returning)
+        return self.execute_values(query, rows, page_size=page_size, fetch=bool(returning))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa varias sentencias en una conexión y un solo commit
+
+        Uso:
+            with db.transaction() as tx:
+                tx.execute_query(...)
+                tx.insert_many(...)
+
+        Si el bloque lanza una excepción se deshace todo.
+        """
+        connection = self.db_pool.get_connection()
+        try:
+            yield Transaction(self.db_pool, connection)
+            connection.commit()
+        except BaseException:
+            self._abort(connection)
+            raise
+        finally:
+            self.db_pool.release_connection(connection)
+
+    def select_iter(self, columns, table, condition=None, params=None, batch_size=SELECT_ITER_BATCH):
+        """
+        Recorre el resultado de un SELECT con un cursor del servidor
+
+        Las filas se traen de batch_size en batch_size, de modo que el
+        resultado completo nunca está en memoria. La conexión queda ocupada
+        hasta que se termina (o se abandona) el recorrido.
+        """
+        query = build_statement("select", table, columns, condition)
+        connection = self._acquire()
+        cursor = None
+        start = time.monotonic()
+        try:
+            cursor = connection.cursor(name=f"select_iter_{next(_cursor_ids)}")
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+            self.db_pool.record_statement(query, time.monotonic() - start)
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            self.db_pool.record_statement(query, time.monotonic() - start, error=True)
+            print(f"Database error: {e}")
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if not self.in_transaction:
+                # Solo lectura: se cierra la transacción del cursor
+                self._abort(connection)
+            self._release(connection)
 
     def select(self, columns, table, condition=None, params=None):
-        query = f"SELECT {columns} FROM {table}"
-        if condition:
-            query += f" WHERE {condition}"
+        query = build_statement("select", table, columns, condition)
         return self.execute_query(query, params)
 
     def insert(self, table, columns, values, params=None, return_id=True):
-        query = f"INSERT INTO {table} ({columns}) VALUES ({values})"
+        query = build_statement("insert", table, columns, values)
         if return_id:
             query += " RETURNING id"
-        return self.execute_query(query, params, fetch=return_id)
+        return self.execute_query(query, params, fetch=return_id, commit=True)
 
     def update(self, table, values, condition, params=None):
-        query = f"UPDATE {table} SET {values} WHERE {condition}"
+        query = build_statement("update", table, values, condition)
         return self.execute_query(query, params, fetch=False)
 
     def delete(self, table, condition, params=None):
-        query = f"DELETE FROM {table} WHERE {condition}"
-        return self.execute_query(query, params, fetch=False)
\ No newline at end of file
+        query = build_statement("delete", table, condition)
+        return self.execute_query(query, params, fetch=False)
+
+
+_cursor_ids = itertools.count(1)
+
+
+class Transaction(Conexion):
+    """
+    Conexion ligada a una conexión durante Conexion.transaction()
+
+    Sus sentencias no se confirman una a una: el commit o el rollback lo hace
+    el bloque with al terminar.
+    """
+
+    in_transaction = True
+
+    def __init__(self, db_pool, connection):
+        self.db_pool = db_pool
+        self.connection = connection
+
+    def _acquire(self):
+        return self.connection
+
+    def _release(self, connection):
+        pass
+
+    def _finish(self, connection):
+        pass
+
+    def _abort(self, connection):
+        # Lo deshace el bloque with al recibir la excepción
+        pass
+
+    @contextmanager
+    def transaction(self):
+        """Las transacciones anidadas forman parte de la exterior"""
+        yield self
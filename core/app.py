@@ -7,6 +7,7 @@ from modules.Authentication import AuthenticationModule
 import getpass
 import time
 import json
+import csv
 import subprocess
 
 
@@ -140,7 +141,8 @@ class CloudOrchestrator:
             print("2. Agregar usuario")
             print("3. Eliminar usuario")
             print("4. Editar usuario")
-            print("5. Volver al menú principal")
+            print("5. Importar usuarios desde CSV")
+            print("6. Volver al menú principal")
 
             option = input("\nIngrese una opción: ")
 
@@ -153,6 +155,8 @@ class CloudOrchestrator:
             elif option == "4":
                 self.edit_user()
             elif option == "5":
+                self.import_users()
+            elif option == "6":
                 break
             else:
                 print("\nOpción inválida!")
@@ -251,6 +255,59 @@ class CloudOrchestrator:
             print(f"\n❌ Error: {str(e)}")
             input("\nPresione Enter para continuar...")
 
+    def import_users(self):
+        self.print_header()
+        print("\nIMPORTAR USUARIOS DESDE CSV")
+        print("-" * 30)
+        print("Formato: usuario,contraseña,id_rol (una fila por usuario, cabecera opcional)")
+
+        try:
+            path = input("\nRuta del archivo: ").strip()
+            if not os.path.isfile(path):
+                print("\n❌ El archivo no existe.")
+                input("\nPresione Enter para continuar...")
+                return
+
+            users = []
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if not row or not any(field.strip() for field in row):
+                        continue
+                    if not users and row[0].strip().lower() in ("usuario", "username"):
+                        continue
+                    row = [field.strip() for field in row] + [""] * 3
+                    users.append({"username": row[0], "password": row[1], "rol_id": row[2]})
+
+            if not users:
+                print("\n❌ El archivo no contiene usuarios.")
+                input("\nPresione Enter para continuar...")
+                return
+
+            confirm = input(f"\nSe importarán {len(users)} usuarios. ¿Está seguro? (s/n): ").lower()
+            if confirm != 's':
+                print("\nOperación cancelada.")
+                input("\nPresione Enter para continuar...")
+                return
+
+            print("\nImportando usuarios...")
+            result = self.auth_module.register_many(users)
+
+            if result and result.get("success", False):
+                print(f"\n✅ Usuarios creados: {len(result['created'])}")
+                if result["skipped"]:
+                    print(f"⚠️  Usuarios omitidos: {len(result['skipped'])}")
+                    for username, reason in result["skipped"]:
+                        print(f"   - {username or '(vacío)'}: {reason}")
+            else:
+                error_msg = result.get("error", "Error desconocido")
+                print(f"\n❌ Error al importar usuarios: {error_msg}")
+
+            input("\nPresione Enter para continuar...")
+
+        except Exception as e:
+            print(f"\n❌ Error: {str(e)}")
+            input("\nPresione Enter para continuar...")
+
     def delete_user(self):
         self.print_header()
         print("\nELIMINAR USUARIO")
@@ -1,97 +1,89 @@
 import jwt
 from datetime import datetime, timedelta
-import bcrypt
 import json
 from config.conexion import Conexion
+from modules.UserRepository import UserRepository
+from utils.PasswordHasher import password_hasher, PasswordHasherBusy
+from utils.RateLimiter import login_limiter
+from utils.TokenCache import token_cache, load_user
 
 JWT_SECRET_KEY = 'jwt-grupo1-cloud-secret-key'
 
 class AuthenticationModule:
     def __init__(self):
         self.db_connection = Conexion()
+        self.users = UserRepository(self.db_connection)
 
-    def login(self, username, password):
+    def login(self, username, password, client_ip=None):
         try:
-            user = self.db_connection.select(
-                'id_usuario, username, password_hash, rol_id',
-                'usuario',
-                'username = %s',
-                (username,)
-            )
+            # Los intentos por encima del límite no llegan a la base de datos ni a bcrypt
+            retry_after = login_limiter.check(username, client_ip)
+            if retry_after is not None:
+                return {"error": f"Too many login attempts, try again in {int(retry_after) + 1} s"}
 
-            if not user:
+            found = self.users.find_for_login(username)
+
+            if not found:
                 return {"error": "Invalid credentials"}
 
-            stored_password = user[0][2]
-            if bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8')):
+            user, stored_password = found
+            if password_hasher.verify(password, stored_password):
+                login_limiter.succeeded(username)
+                if password_hasher.needs_rehash(stored_password):
+                    self._upgrade_hash(user["id"], password, stored_password)
+
                 token = jwt.encode(
                     {
-                        'user_id': user[0][0],
-                        'username': user[0][1],
-                        'rol_id': user[0][3],
+                        'user_id': user["id"],
+                        'username': user["username"],
+                        'rol_id': user["rol_id"],
                         'exp': datetime.utcnow() + timedelta(minutes=60)
                     },
                     JWT_SECRET_KEY,
                     algorithm="HS256"
                 )
 
-                role = self.db_connection.select(
-                    'nombre',
-                    'rol',
-                    'id_rol = %s',
-                    (user[0][3],)
-                )
-
-                role_name = role[0][0] if role else "Desconocido"
-
                 return {
                     "success": True,
                     "message": "Login successful",
                     "token": token,
-                    "user": {
-                        "id": user[0][0],
-                        "username": user[0][1],
-                        "role": role_name,
-                        "rol_id": user[0][3]
-                    }
+                    "user": user
                 }
 
             return {"error": "Invalid credentials"}
 
+        except PasswordHasherBusy:
+            return {"error": "Server busy, try again later"}
         except Exception as e:
             return {"error": f"Login error: {str(e)}"}
 
+    def _upgrade_hash(self, user_id, password, old_hash):
+        """Recalcula en segundo plano un hash con un coste menor que el configurado"""
+        def store(future):
+            try:
+                # Si la contraseña cambió mientras tanto se conserva la nueva
+                self.users.replace_password_hash(user_id, old_hash, future.result())
+            except Exception as e:
+                print(f"Error updating password hash: {str(e)}")
+
+        try:
+            password_hasher.hash_async(password).add_done_callback(store)
+        except PasswordHasherBusy:
+            # Se intentará en el próximo inicio de sesión
+            pass
+
     def verify_token(self, token):
         try:
             data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
 
-            user = self.db_connection.select(
-                'id_usuario, username, rol_id',
-                'usuario',
-                'id_usuario = %s',
-                (data['user_id'],)
-            )
+            user = load_user(data['user_id'], self.db_connection)
 
             if not user:
                 return {"error": "User not found"}
 
-            role = self.db_connection.select(
-                'nombre',
-                'rol',
-                'id_rol = %s',
-                (user[0][2],)
-            )
-
-            role_name = role[0][0] if role else "Desconocido"
-
             return {
                 "valid": True,
-                "user": {
-                    "id": user[0][0],
-                    "username": user[0][1],
-                    "role": role_name,
-                    "rol_id": user[0][2]
-                }
+                "user": user
             }
 
         except jwt.ExpiredSignatureError:
@@ -103,60 +95,83 @@ class AuthenticationModule:
 
     def register(self, username, password, rol_id):
         try:
-            existing_user = self.db_connection.select(
-                'id_usuario',
-                'usuario',
-                'username = %s',
-                (username,)
-            )
+            hashed_password = password_hasher.hash(password)
 
-            if existing_user:
-                return {"error": "User already exists"}
+            user_id, error = self.users.create(username, hashed_password, rol_id)
+            if error:
+                return {"error": error}
 
-            role = self.db_connection.select(
-                'id_rol',
-                'rol',
-                'id_rol = %s',
-                (rol_id,)
-            )
+            return {"success": True, "message": "User registered successfully"}
 
-            if not role:
-                return {"error": "Invalid role ID"}
+        except PasswordHasherBusy:
+            return {"error": "Server busy, try again later"}
+        except Exception as e:
+            return {"error": f"Registration error: {str(e)}"}
 
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    def register_many(self, users):
+        """
+        Registra varios usuarios (por ejemplo, la lista de un curso) con un solo commit
 
-            self.db_connection.execute_query(
-                "INSERT INTO usuario (username, password_hash, rol_id) VALUES (%s, %s, %s)",
-                (username, hashed_password.decode('utf-8'), rol_id),
-                fetch=False
-            )
+        Args:
+            users: Lista de diccionarios con username, password y rol_id
 
-            return {"success": True, "message": "User registered successfully"}
+        Returns:
+            Diccionario con los nombres creados y los omitidos con su motivo
+        """
+        try:
+            role_ids = {role[0] for role in self.users.list_roles()}
+            rows = []
+            skipped = []
+            seen = set()
 
+            for user in users:
+                username = (user.get("username") or "").strip()
+                if not username or not user.get("password"):
+                    skipped.append((username, "Empty username or password"))
+                    continue
+                if username in seen:
+                    skipped.append((username, "Duplicated username"))
+                    continue
+                try:
+                    rol_id = int(user.get("rol_id"))
+                except (TypeError, ValueError):
+                    skipped.append((username, "Role ID must be a number"))
+                    continue
+                if rol_id not in role_ids:
+                    skipped.append((username, "Invalid role ID"))
+                    continue
+                seen.add(username)
+                rows.append((username, user["password"], rol_id))
+
+            hashes = password_hasher.hash_many([password for _, password, _ in rows])
+            created = self.users.create_many([
+                (username, hashed, rol_id) for (username, _, rol_id), hashed in zip(rows, hashes)
+            ])
+
+            created_set = set(created)
+            skipped.extend((username, "User already exists") for username, _, _ in rows
+                           if username not in created_set)
+
+            return {"success": True, "created": created, "skipped": skipped}
+
+        except PasswordHasherBusy:
+            # No se creó ningún usuario: la lista puede reenviarse completa
+            return {"error": "Server busy, try again later"}
         except Exception as e:
             return {"error": f"Registration error: {str(e)}"}
 
     def delete_user(self, user_id):
         try:
-            existing_user = self.db_connection.select(
-                'id_usuario, username',
-                'usuario',
-                'id_usuario = %s',
-                (user_id,)
-            )
+            username = self.users.delete(user_id)
 
-            if not existing_user:
+            if username is None:
                 return {"error": "User not found"}
 
-            self.db_connection.execute_query(
-                "DELETE FROM usuario WHERE id_usuario = %s",
-                (user_id,),
-                fetch=False
-            )
+            token_cache.invalidate(user_id)
 
             return {
                 "success": True,
-                "message": f"User {existing_user[0][1]} deleted successfully"
+                "message": f"User {username} deleted successfully"
             }
 
         except Exception as e:
@@ -164,16 +179,6 @@ class AuthenticationModule:
 
     def update_user_field(self, user_id, field, value):
         try:
-            existing_user = self.db_connection.select(
-                'id_usuario',
-                'usuario',
-                'id_usuario = %s',
-                (user_id,)
-            )
-
-            if not existing_user:
-                return {"error": "User not found"}
-
             valid_fields = ["username", "rol_id"]
             if field not in valid_fields:
                 return {"error": f"Invalid field: {field}"}
@@ -181,33 +186,16 @@ class AuthenticationModule:
             if field == "rol_id":
                 try:
                     value = int(value)
-                    # Verificar que el rol existe
-                    role = self.db_connection.select(
-                        'id_rol',
-                        'rol',
-                        'id_rol = %s',
-                        (value,)
-                    )
-                    if not role:
-                        return {"error": "Invalid role ID"}
                 except ValueError:
                     return {"error": "Role ID must be a number"}
+                error = self.users.update_role(user_id, value)
+            else:
+                error = self.users.update_username(user_id, value)
 
-            if field == "username":
-                existing_username = self.db_connection.select(
-                    'id_usuario',
-                    'usuario',
-                    'username = %s AND id_usuario != %s',
-                    (value, user_id)
-                )
-                if existing_username:
-                    return {"error": "Username already in use"}
+            if error:
+                return {"error": error}
 
-            self.db_connection.execute_query(
-                f"UPDATE usuario SET {field} = %s WHERE id_usuario = %s",
-                (value, user_id),
-                fetch=False
-            )
+            token_cache.invalidate(user_id)
 
             return {
                 "success": True,
@@ -219,23 +207,12 @@ class AuthenticationModule:
 
     def update_user_password(self, user_id, new_password):
         try:
-            existing_user = self.db_connection.select(
-                'id_usuario',
-                'usuario',
-                'id_usuario = %s',
-                (user_id,)
-            )
+            hashed_password = password_hasher.hash(new_password)
 
-            if not existing_user:
+            if not self.users.update_password(user_id, hashed_password):
                 return {"error": "User not found"}
 
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
-
-            self.db_connection.execute_query(
-                "UPDATE usuario SET password_hash = %s WHERE id_usuario = %s",
-                (hashed_password.decode('utf-8'), user_id),
-                fetch=False
-            )
+            token_cache.invalidate(user_id)
 
             return {
                 "success": True,
@@ -253,26 +230,21 @@ class AuthenticationModule:
 
             user_id = token_data["user"]["id"]
 
-            user = self.db_connection.select(
-                'password_hash',
-                'usuario',
-                'id_usuario = %s',
-                (user_id,)
-            )
+            stored_password = self.users.get_password_hash(user_id)
+            if stored_password is None:
+                return {"error": "User not found"}
 
-            if not bcrypt.checkpw(current_password.encode('utf-8'), user[0][0].encode('utf-8')):
+            if not password_hasher.verify(current_password, stored_password):
                 return {"error": "Current password is incorrect"}
 
-            new_hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+            new_hashed_password = password_hasher.hash(new_password)
 
-            self.db_connection.execute_query(
-                "UPDATE usuario SET password_hash = %s WHERE id_usuario = %s",
-                (new_hashed_password.decode('utf-8'), user_id),
-                fetch=False
-            )
+            self.users.update_password(user_id, new_hashed_password)
 
             return {"success": True, "message": "Password changed successfully"}
 
+        except PasswordHasherBusy:
+            return {"error": "Server busy, try again later"}
         except Exception as e:
             return {"error": f"Password change error: {str(e)}"}
 
@@ -319,11 +291,11 @@ class AuthenticationModule:
             admin_role_id = admin_role[0][0]
 
             default_password = 'Admin123'
-            hashed_password = bcrypt.hashpw(default_password.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = password_hasher.hash(default_password)
 
             self.db_connection.execute_query(
                 "INSERT INTO usuario (username, password_hash, rol_id) VALUES (%s, %s, %s)",
-                ('admin@pucp.edu.pe', hashed_password.decode('utf-8'), admin_role_id),
+                ('admin@pucp.edu.pe', hashed_password, admin_role_id),
                 fetch=False
             )
 
@@ -340,13 +312,20 @@ class AuthenticationModule:
         except Exception as e:
             return {"error": f"Setup error: {str(e)}"}
 
+    def get_token_cache_stats(self):
+        """Contadores de la caché de tokens verificados (aciertos, fallos, tasa de acierto)"""
+        return token_cache.stats()
+
+    def get_login_stats(self):
+        """Contadores del pool de bcrypt y de los límites de inicio de sesión"""
+        return {
+            "hasher": password_hasher.stats(),
+            "rate_limit": login_limiter.stats()
+        }
+
     def get_roles(self):
         try:
-            roles = self.db_connection.select(
-                'id_rol, nombre, descripcion',
-                'rol',
-                None
-            )
+            roles = self.users.list_roles()
 
             if not roles:
                 return []
@@ -367,24 +346,10 @@ class AuthenticationModule:
 
     def get_users(self):
         try:
-            users = self.db_connection.select(
-                'u.id_usuario, u.username, r.nombre as rol_nombre',
-                'usuario u JOIN rol r ON u.rol_id = r.id_rol',
-                None
-            )
-
-            if not users:
-                return []
-
-            result = []
-            for user in users:
-                result.append({
-                    "id": user[0],
-                    "username": user[1],
-                    "role": user[2]
-                })
-
-            return result
+            return [
+                {"id": user["id"], "username": user["username"], "role": user["role"]}
+                for user in self.users.list_users()
+            ]
 
         except Exception as e:
             print(f"Error getting users: {str(e)}")
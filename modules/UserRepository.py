@@ -0,0 +1,202 @@
+"""
+Acceso a datos de usuarios y roles
+
+Cada operación del módulo de autenticación se resuelve con una sola consulta
+(un viaje a la base de datos): los datos del rol se obtienen con JOIN y las
+comprobaciones de existencia van dentro de la propia escritura
+(INSERT ... SELECT ... ON CONFLICT, UPDATE/DELETE ... RETURNING). Solo cuando
+una escritura no afecta a ninguna fila se hace una segunda consulta para
+saber qué mensaje de error devolver.
+
+Las consultas usan SQL estándar de PostgreSQL que también acepta SQLite
+(>= 3.35), lo que permite probarlas con una base local.
+"""
+
+from config.conexion import Conexion
+
+USER_COLUMNS = 'u.id_usuario, u.username, u.rol_id, r.nombre'
+USER_TABLES = 'usuario u LEFT JOIN rol r ON u.rol_id = r.id_rol'
+
+
+def _user_from_row(row):
+    """Diccionario de usuario a partir de (id, username, rol_id, rol)"""
+    return {
+        "id": row[0],
+        "username": row[1],
+        "role": row[3] or "Desconocido",
+        "rol_id": row[2]
+    }
+
+
+class UserRepository:
+    """Consultas de usuarios y roles, una por operación"""
+
+    def __init__(self, db=None):
+        self.db = db or Conexion()
+
+    def find_by_id(self, user_id):
+        """Usuario con el nombre de su rol, o None si no existe"""
+        rows = self.db.select(USER_COLUMNS, USER_TABLES, 'u.id_usuario = %s', (user_id,))
+        return _user_from_row(rows[0]) if rows else None
+
+    def find_for_login(self, username):
+        """
+        Usuario, hash de la contraseña y nombre del rol para iniciar sesión
+
+        Returns:
+            Tupla (usuario, password_hash) o None si no existe
+        """
+        rows = self.db.select(
+            USER_COLUMNS + ', u.password_hash',
+            USER_TABLES,
+            'u.username = %s',
+            (username,)
+        )
+        if not rows:
+            return None
+        return _user_from_row(rows[0]), rows[0][4]
+
+    def get_password_hash(self, user_id):
+        """Hash de la contraseña del usuario o None si no existe"""
+        rows = self.db.select('password_hash', 'usuario', 'id_usuario = %s', (user_id,))
+        return rows[0][0] if rows else None
+
+    def create(self, username, password_hash, rol_id):
+        """
+        Crea un usuario si el rol existe y el nombre está libre
+
+        Returns:
+            Tupla (id del usuario o None, error o None)
+        """
+        # ON CONFLICT cubre la carrera entre dos altas si username es UNIQUE;
+        # NOT EXISTS mantiene la comprobación aunque la restricción no exista
+        rows = self.db.execute_query(
+            "INSERT INTO usuario (username, password_hash, rol_id) "
+            "SELECT %s, %s, id_rol FROM rol "
+            "WHERE id_rol = %s "
+            "AND NOT EXISTS (SELECT 1 FROM usuario WHERE username = %s) "
+            "ON CONFLICT DO NOTHING "
+            "RETURNING id_usuario",
+            (username, password_hash, rol_id, username),
+            commit=True
+        )
+        if rows:
+            return rows[0][0], None
+        if self._username_taken(username):
+            return None, "User already exists"
+        return None, "Invalid role ID"
+
+    def create_many(self, users):
+        """
+        Crea varios usuarios en una transacción, con varias filas por consulta
+
+        Omite los nombres que ya existen. Los roles deben estar validados.
+
+        Args:
+            users: Lista de tuplas (username, password_hash, rol_id) sin nombres repetidos
+
+        Returns:
+            Lista de nombres de los usuarios creados
+        """
+        rows = self.db.execute_values(
+            "INSERT INTO usuario (username, password_hash, rol_id) "
+            "SELECT v.username, v.password_hash, v.rol_id "
+            "FROM (VALUES %s) AS v (username, password_hash, rol_id) "
+            "WHERE NOT EXISTS (SELECT 1 FROM usuario u WHERE u.username = v.username) "
+            "ON CONFLICT DO NOTHING "
+            "RETURNING username",
+            users,
+            fetch=True
+        )
+        return [row[0] for row in rows]
+
+    def delete(self, user_id):
+        """
+        Elimina un usuario
+
+        Returns:
+            Nombre del usuario eliminado o None si no existía
+        """
+        rows = self.db.execute_query(
+            "DELETE FROM usuario WHERE id_usuario = %s RETURNING username",
+            (user_id,),
+            commit=True
+        )
+        return rows[0][0] if rows else None
+
+    def update_username(self, user_id, username):
+        """
+        Cambia el nombre de un usuario si no lo usa otro
+
+        Returns:
+            Mensaje de error o None si se actualizó
+        """
+        rows = self.db.execute_query(
+            "UPDATE usuario SET username = %s "
+            "WHERE id_usuario = %s "
+            "AND NOT EXISTS (SELECT 1 FROM usuario WHERE username = %s AND id_usuario != %s) "
+            "RETURNING id_usuario",
+            (username, user_id, username, user_id),
+            commit=True
+        )
+        if rows:
+            return None
+        if not self._user_exists(user_id):
+            return "User not found"
+        return "Username already in use"
+
+    def update_role(self, user_id, rol_id):
+        """
+        Cambia el rol de un usuario si el rol existe
+
+        Returns:
+            Mensaje de error o None si se actualizó
+        """
+        rows = self.db.execute_query(
+            "UPDATE usuario SET rol_id = %s "
+            "WHERE id_usuario = %s "
+            "AND EXISTS (SELECT 1 FROM rol WHERE id_rol = %s) "
+            "RETURNING id_usuario",
+            (rol_id, user_id, rol_id),
+            commit=True
+        )
+        if rows:
+            return None
+        if not self._user_exists(user_id):
+            return "User not found"
+        return "Invalid role ID"
+
+    def update_password(self, user_id, password_hash):
+        """Cambia el hash de la contraseña; devuelve False si el usuario no existe"""
+        rows = self.db.execute_query(
+            "UPDATE usuario SET password_hash = %s WHERE id_usuario = %s RETURNING id_usuario",
+            (password_hash, user_id),
+            commit=True
+        )
+        return bool(rows)
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        """Sustituye el hash solo si no cambió desde que se leyó; devuelve False si cambió"""
+        rows = self.db.execute_query(
+            "UPDATE usuario SET password_hash = %s "
+            "WHERE id_usuario = %s AND password_hash = %s "
+            "RETURNING id_usuario",
+            (new_hash, user_id, old_hash),
+            commit=True
+        )
+        return bool(rows)
+
+    def list_users(self):
+        """Usuarios con el nombre de su rol"""
+        rows = self.db.select(USER_COLUMNS, USER_TABLES) or []
+        return [_user_from_row(row) for row in rows]
+
+    def list_roles(self):
+        """Roles como tuplas (id, nombre, descripción)"""
+        return self.db.select('id_rol, nombre, descripcion', 'rol') or []
+
+    def _user_exists(self, user_id):
+        return bool(self.db.select('1', 'usuario', 'id_usuario = %s', (user_id,)))
+
+    def _username_taken(self, username):
+        return bool(self.db.select('1', 'usuario', 'username = %s', (username,)))
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Consultas por operación del módulo de autenticación, antes y después de
+UserRepository
+
+Uso: python3 scripts/misc/bench_auth_queries.py [--iteraciones N] [--latencia MS]
+
+Usa una base SQLite en memoria con las tablas usuario y rol en lugar de
+PostgreSQL. --latencia añade una espera por consulta para simular el viaje de
+red hasta la base de datos. Las secuencias "antes" reproducen las consultas
+que hacía AuthenticationModule antes de usar el repositorio; bcrypt y jwt no
+intervienen, solo se mide el acceso a datos.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from modules.UserRepository import UserRepository
+
+SCHEMA = """
+CREATE TABLE rol (
+    id_rol INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    descripcion TEXT
+);
+CREATE TABLE usuario (
+    id_usuario INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    rol_id INTEGER REFERENCES rol (id_rol)
+);
+INSERT INTO rol (id_rol, nombre, descripcion) VALUES
+    (1, 'Administrador', ''), (2, 'Operador', ''), (3, 'Usuario', '');
+"""
+
+PASSWORD_HASH = "$2b$12$" + "x" * 53
+
+
+class SQLiteConexion:
+    """Sustituto de Conexion sobre SQLite que cuenta las consultas"""
+
+    def __init__(self, latency=0.0):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(SCHEMA)
+        self.latency = latency
+        self.queries = 0
+
+    def execute_query(self, query, params=None, fetch=True, commit=False):
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        cursor = self.connection.execute(query.replace("%s", "?"), params or ())
+        result = cursor.fetchall() if fetch else cursor.rowcount
+        self.connection.commit()
+        return result
+
+    def select(self, columns, table, condition=None, params=None):
+        query = f"SELECT {columns} FROM {table}"
+        if condition:
+            query += f" WHERE {condition}"
+        return self.execute_query(query, params)
+
+
+class LegacyQueries:
+    """Consultas de AuthenticationModule antes del repositorio"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def login(self, username):
+        user = self.db.select('id_usuario, username, password_hash, rol_id', 'usuario', 'username = %s', (username,))
+        self.db.select('nombre', 'rol', 'id_rol = %s', (user[0][3],))
+
+    def verify_token(self, user_id):
+        user = self.db.select('id_usuario, username, rol_id', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.select('nombre', 'rol', 'id_rol = %s', (user[0][2],))
+
+    def register(self, username, rol_id):
+        if self.db.select('id_usuario', 'usuario', 'username = %s', (username,)):
+            return
+        if not self.db.select('id_rol', 'rol', 'id_rol = %s', (rol_id,)):
+            return
+        self.db.execute_query(
+            "INSERT INTO usuario (username, password_hash, rol_id) VALUES (%s, %s, %s)",
+            (username, PASSWORD_HASH, rol_id), fetch=False)
+
+    def update_username(self, user_id, username):
+        self.db.select('id_usuario', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.select('id_usuario', 'usuario', 'username = %s AND id_usuario != %s', (username, user_id))
+        self.db.execute_query("UPDATE usuario SET username = %s WHERE id_usuario = %s", (username, user_id), fetch=False)
+
+    def update_role(self, user_id, rol_id):
+        self.db.select('id_usuario', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.select('id_rol', 'rol', 'id_rol = %s', (rol_id,))
+        self.db.execute_query("UPDATE usuario SET rol_id = %s WHERE id_usuario = %s", (rol_id, user_id), fetch=False)
+
+    def update_password(self, user_id):
+        self.db.select('id_usuario', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.execute_query("UPDATE usuario SET password_hash = %s WHERE id_usuario = %s",
+                              (PASSWORD_HASH, user_id), fetch=False)
+
+    def change_password(self, user_id):
+        self.verify_token(user_id)
+        self.db.select('password_hash', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.execute_query("UPDATE usuario SET password_hash = %s WHERE id_usuario = %s",
+                              (PASSWORD_HASH, user_id), fetch=False)
+
+    def delete_user(self, user_id):
+        self.db.select('id_usuario, username', 'usuario', 'id_usuario = %s', (user_id,))
+        self.db.execute_query("DELETE FROM usuario WHERE id_usuario = %s", (user_id,), fetch=False)
+
+
+class RepositoryQueries:
+    """Las mismas operaciones con UserRepository"""
+
+    def __init__(self, db):
+        self.users = UserRepository(db)
+
+    def login(self, username):
+        self.users.find_for_login(username)
+
+    def verify_token(self, user_id):
+        self.users.find_by_id(user_id)
+
+    def register(self, username, rol_id):
+        self.users.create(username, PASSWORD_HASH, rol_id)
+
+    def update_username(self, user_id, username):
+        self.users.update_username(user_id, username)
+
+    def update_role(self, user_id, rol_id):
+        self.users.update_role(user_id, rol_id)
+
+    def update_password(self, user_id):
+        self.users.update_password(user_id, PASSWORD_HASH)
+
+    def change_password(self, user_id):
+        self.users.find_by_id(user_id)
+        self.users.get_password_hash(user_id)
+        self.users.update_password(user_id, PASSWORD_HASH)
+
+    def delete_user(self, user_id):
+        self.users.delete(user_id)
+
+
+OPERATIONS = ("register", "login", "verify_token", "update_username", "update_role",
+              "update_password", "change_password", "delete_user")
+
+
+def run(queries_class, iterations, latency):
+    """
+    Ejecuta cada operación sobre usuarios distintos
+
+    Returns:
+        Diccionario operación -> (consultas por operación, ms por operación)
+    """
+    db = SQLiteConexion(latency)
+    queries = queries_class(db)
+    results = {}
+    for operation in OPERATIONS:
+        before = db.queries
+        start = time.perf_counter()
+        for i in range(1, iterations + 1):
+            if operation == "register":
+                queries.register(f"user{i}@pucp.edu.pe", 3)
+            elif operation == "login":
+                queries.login(f"user{i}@pucp.edu.pe")
+            elif operation == "update_username":
+                queries.update_username(i, f"usuario{i}@pucp.edu.pe")
+            elif operation == "update_role":
+                queries.update_role(i, 2)
+            else:
+                getattr(queries, operation)(i)
+        elapsed = time.perf_counter() - start
+        results[operation] = ((db.queries - before) / iterations, elapsed * 1000 / iterations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas por operación de autenticación")
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.5, help="ms por consulta")
+    args = parser.parse_args()
+
+    latency = args.latencia / 1000
+    before = run(LegacyQueries, args.iteraciones, latency)
+    after = run(RepositoryQueries, args.iteraciones, latency)
+
+    print(f"{args.iteraciones} iteraciones, {args.latencia} ms por consulta (SQLite en memoria)\n")
+    print(f"{'Operación':<18}{'Consultas antes':>17}{'Consultas después':>19}{'ms antes':>11}{'ms después':>12}")
+    for operation in OPERATIONS:
+        q_before, ms_before = before[operation]
+        q_after, ms_after = after[operation]
+        print(f"{operation:<18}{q_before:>17.1f}{q_after:>19.1f}{ms_before:>11.2f}{ms_after:>12.2f}")
+    print("\nverify_token no consulta la base de datos mientras el usuario siga en la caché de tokens.")
+
+
+if __name__ == "__main__":
+    main()
@@ -255,20 +255,16 @@ done
 # Paso 8: Configurar reglas de flujo en OFS basadas en las conexiones definidas
 echo "Paso 8: Configurando reglas de flujo en OFS basadas en conexiones..."
 
-# Crear un script temporal con las reglas de flujo
+# Crear un archivo de flujos temporal (una regla por línea) que se aplica de una vez
 TMP_FLOW_SCRIPT=$(mktemp)
 
 cat > $TMP_FLOW_SCRIPT << 'EOF'
-#!/bin/bash
-# Limpiar reglas existentes
-ovs-ofctl del-flows br-int
-
 # Permitir tráfico DHCP (alta prioridad)
-ovs-ofctl add-flow br-int "priority=1000,udp,tp_dst=67,actions=normal"
-ovs-ofctl add-flow br-int "priority=1000,udp,tp_dst=68,actions=normal"
+priority=1000,udp,tp_dst=67,actions=normal
+priority=1000,udp,tp_dst=68,actions=normal
 
 # Permitir ARP (media-alta prioridad pero solo broadcasts)
-ovs-ofctl add-flow br-int "priority=900,dl_dst=ff:ff:ff:ff:ff:ff,arp,actions=normal"
+priority=900,dl_dst=ff:ff:ff:ff:ff:ff,arp,actions=normal
 
 # Reglas específicas para las conexiones
 EOF
@@ -290,7 +286,7 @@ for ((i=0; i<$CONNECTION_COUNT; i++)); do
     if [[ "$FROM_MAC" =~ ^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$ ]] && 
        [[ "$TO_MAC" =~ ^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$ ]]; then
         # Reglas de flujo para permitir comunicación en la VLAN específica
-        echo "ovs-ofctl add-flow br-int \"table=0,priority=500,dl_vlan=$CONN_VLAN,dl_src=$FROM_MAC,dl_dst=$TO_MAC,actions=normal\"" >> $TMP_FLOW_SCRIPT
+        echo "table=0,priority=500,dl_vlan=$CONN_VLAN,dl_src=$FROM_MAC,dl_dst=$TO_MAC,actions=normal" >> $TMP_FLOW_SCRIPT
     else
         echo "# ADVERTENCIA: Dirección MAC inválida para $FROM_VM o $TO_VM - Regla omitida" >> $TMP_FLOW_SCRIPT
     fi
@@ -314,7 +310,7 @@ if [ "$ENABLE_INTERNET" = "true" ]; then
                 if [[ "$VM_MAC" =~ ^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$ ]]; then
                     for VM_VLAN in ${VM_VLANS[$vm]}; do
                         echo "# Permitir acceso a Internet para $vm en VLAN $VM_VLAN" >> $TMP_FLOW_SCRIPT
-                        echo "ovs-ofctl add-flow br-int \"table=0,priority=300,dl_vlan=$VM_VLAN,dl_src=$VM_MAC,actions=normal\"" >> $TMP_FLOW_SCRIPT
+                        echo "table=0,priority=300,dl_vlan=$VM_VLAN,dl_src=$VM_MAC,actions=normal" >> $TMP_FLOW_SCRIPT
                     done
                 else
                     echo "# ADVERTENCIA: Dirección MAC inválida para $vm - Regla de Internet omitida" >> $TMP_FLOW_SCRIPT
@@ -326,16 +322,11 @@ fi
 
 # Regla por defecto para descartar el resto del tráfico no explícitamente permitido
 echo "# Descartar el resto del tráfico" >> $TMP_FLOW_SCRIPT
-echo "ovs-ofctl add-flow br-int \"priority=1,actions=drop\"" >> $TMP_FLOW_SCRIPT
-
-# Mostrar las reglas que se van a aplicar
-echo "# Reglas de flujo configuradas:" >> $TMP_FLOW_SCRIPT
-echo "ovs-ofctl dump-flows br-int" >> $TMP_FLOW_SCRIPT
+echo "priority=1,actions=drop" >> $TMP_FLOW_SCRIPT
 
-# Ejecutar el script de configuración de flujos en el nodo OFS
-chmod +x $TMP_FLOW_SCRIPT
-scp $TMP_FLOW_SCRIPT ubuntu@$OFS_NODE:/tmp/flow_rules.sh
-ssh ubuntu@$OFS_NODE "sudo bash /tmp/flow_rules.sh"
+# Sustituir la tabla de flujos del nodo OFS de forma atómica con un solo ovs-ofctl
+# (los bundles requieren OpenFlow 1.4) y mostrar las reglas configuradas
+ssh ubuntu@$OFS_NODE "sudo ovs-vsctl set bridge br-int protocols=OpenFlow10,OpenFlow13,OpenFlow14 && sudo ovs-ofctl --bundle replace-flows br-int - && sudo ovs-ofctl dump-flows br-int" < $TMP_FLOW_SCRIPT
 
 # Limpiar archivos temporales
 rm $TMP_FLOW_SCRIPT
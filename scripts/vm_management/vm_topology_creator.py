@@ -11,6 +11,10 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from typing import List, Dict, Set, Tuple
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from topology_manager.allocators import MacAllocator
+from topology_manager.flows import ADD, flow_command
+
 class VMTopologyCreator:
     def __init__(self):
         self.vlan_id = 110  # Default VLAN ID
@@ -22,6 +26,7 @@ class VMTopologyCreator:
         self.base_vnc_port = 1  # Starting VNC port
         self.vm_ips = {}  # To track assigned IPs
         self.vm_tap_interfaces = {}  # Track tap interfaces for each VM
+        self.mac_allocator = MacAllocator("52:54:00:11")  # Shared collision-free MAC allocator
         
         # Network configuration
         self.network_cidr = "192.168.110.0/24"  # VLAN 110 subnet
@@ -51,8 +56,11 @@ class VMTopologyCreator:
         return 1 <= vm_id <= self.vm_count
     
     def _generate_mac_address(self, vm_id: int) -> str:
-        """Generate a unique MAC address for a VM"""
-        return f"52:54:00:11:10:{vm_id:02x}"
+        """Generate a unique MAC address for a VM (stable for the same vm_id)"""
+        mac = self.mac_allocator.allocate(key=vm_id, hint=vm_id)
+        if mac is None:
+            raise ValueError("No more MAC addresses available!")
+        return mac
     
     def _assign_ip_to_vm(self, vm_id: int) -> str:
         """Assign an IP address to a VM"""
@@ -136,21 +144,20 @@ class VMTopologyCreator:
         cmd = f"sudo ovs-ofctl del-flows {self.ovs_bridge} 'table=0,priority=1'"
         os.system(cmd)
         
-        # Allow ARP and DHCP traffic
-        cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=100,arp,actions=normal'"
-        os.system(cmd)
-        cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=100,udp,tp_dst=67,actions=normal'"
-        os.system(cmd)
-        cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=100,udp,tp_dst=68,actions=normal'"
-        os.system(cmd)
+        # Build all the rules as a single flow file
+        flows = [
+            # Allow ARP and DHCP traffic
+            "table=0,priority=100,arp,actions=normal",
+            "table=0,priority=100,udp,tp_dst=67,actions=normal",
+            "table=0,priority=100,udp,tp_dst=68,actions=normal",
+        ]
         
         # Allow VM to gateway traffic
         for vm_id in range(1, self.vm_count + 1):
             tap_interface = self.vm_tap_interfaces.get(vm_id)
             if tap_interface:
                 # VM to gateway
-                cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=50,dl_src={self._generate_mac_address(vm_id)},dl_dst=ff:ff:ff:ff:ff:ff,actions=normal'"
-                os.system(cmd)
+                flows.append(f"table=0,priority=50,dl_src={self._generate_mac_address(vm_id)},dl_dst=ff:ff:ff:ff:ff:ff,actions=normal")
         
         # Allow traffic between connected VMs
         for vm_id, connected_vms in self.connections.items():
@@ -160,22 +167,27 @@ class VMTopologyCreator:
                 dst_mac = self._generate_mac_address(dst_vm_id)
                 
                 # Allow traffic from source to destination
-                cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=50,dl_src={src_mac},dl_dst={dst_mac},actions=normal'"
-                print(f"Allowing traffic from VM{vm_id} to VM{dst_vm_id}: {cmd}")
-                os.system(cmd)
+                print(f"Allowing traffic from VM{vm_id} to VM{dst_vm_id}")
+                flows.append(f"table=0,priority=50,dl_src={src_mac},dl_dst={dst_mac},actions=normal")
         
         # Allow internet access for designated VMs
         for vm_id in self.internet_vms:
             src_mac = self._generate_mac_address(vm_id)
             
             # VM to internet (gateway)
-            cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=40,dl_src={src_mac},actions=normal'"
-            print(f"Allowing internet access for VM{vm_id}: {cmd}")
-            os.system(cmd)
+            print(f"Allowing internet access for VM{vm_id}")
+            flows.append(f"table=0,priority=40,dl_src={src_mac},actions=normal")
         
         # Set default rule to drop other traffic
-        cmd = f"sudo ovs-ofctl add-flow {self.ovs_bridge} 'table=0,priority=1,actions=drop'"
-        os.system(cmd)
+        flows.append("table=0,priority=1,actions=drop")
+        
+        # Install every rule atomically with one ovs-ofctl call
+        cmd = flow_command(ADD, self.ovs_bridge)
+        print(f"Installing {len(flows)} flows: {cmd}")
+        result = subprocess.run(cmd, shell=True, input="\n".join(flows) + "\n", text=True)
+        if result.returncode != 0:
+            print("Failed to install flow rules!")
+            return False
         
         return True
     
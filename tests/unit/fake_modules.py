@@ -0,0 +1,48 @@
+"""
+Importación de módulos cuyas dependencias pueden no estar instaladas
+
+config.conexion importa psycopg2 y utils.PasswordHasher importa bcrypt al
+cargarse. Si no están instalados se importan con módulos mínimos en su lugar;
+las pruebas que los usan sustituyen lo que necesitan (el pool de psycopg2,
+las funciones de hash) por objetos falsos.
+"""
+
+import importlib
+import sys
+import types
+from unittest import mock
+
+
+def _fake_psycopg2():
+    psycopg2 = types.ModuleType("psycopg2")
+    psycopg2.Error = type("Error", (Exception,), {})
+    errors = types.ModuleType("psycopg2.errors")
+    errors.InvalidSqlStatementName = type("InvalidSqlStatementName", (psycopg2.Error,), {})
+    extras = types.ModuleType("psycopg2.extras")
+    pool = types.ModuleType("psycopg2.pool")
+    pool.ThreadedConnectionPool = None
+    psycopg2.errors, psycopg2.extras, psycopg2.pool = errors, extras, pool
+    return {"psycopg2": psycopg2, "psycopg2.errors": errors,
+            "psycopg2.extras": extras, "psycopg2.pool": pool}
+
+
+def _fake_bcrypt():
+    return {"bcrypt": types.ModuleType("bcrypt")}
+
+
+FAKES = {"psycopg2": _fake_psycopg2, "bcrypt": _fake_bcrypt}
+
+
+def import_module(name):
+    """Importa un módulo sustituyendo psycopg2 y bcrypt si no están instalados"""
+    fakes = {}
+    for dependency, build in FAKES.items():
+        try:
+            importlib.import_module(dependency)
+        except ImportError:
+            fakes.update(build())
+    if not fakes:
+        return importlib.import_module(name)
+    # Los módulos importados con sustitutos no quedan en sys.modules
+    with mock.patch.dict(sys.modules, fakes):
+        return importlib.import_module(name)
@@ -0,0 +1,32 @@
+import unittest
+
+from topology_manager.allocators import VncPortAllocator
+from topology_manager.builder import TopologyBuilder
+from topology_manager.models import Topology
+
+
+class AllocateAddressesTest(unittest.TestCase):
+
+    def test_releases_reserved_addresses_when_vnc_ports_run_out(self):
+        topology = Topology()
+        topology.vnc_allocator = VncPortAllocator(first=1, last=2)
+
+        addresses = TopologyBuilder._allocate_addresses(["vm1", "vm2", "vm3"], [1, 1, 1], topology)
+
+        self.assertIsNone(addresses)
+        self.assertEqual(topology.vms, [])
+        self.assertEqual(topology.vnc_allocator.used_count(1), 0)
+        self.assertEqual(topology.mac_allocator._used, set())
+        self.assertEqual(topology.mac_allocator._by_key, {})
+
+    def test_reserves_one_address_per_vm(self):
+        topology = Topology()
+
+        addresses = TopologyBuilder._allocate_addresses(["vm1", "vm2"], [1, 2], topology)
+
+        self.assertEqual(len(addresses), 2)
+        self.assertEqual(len({mac for mac, _ in addresses}), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
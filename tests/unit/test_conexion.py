@@ -0,0 +1,118 @@
+import unittest
+
+try:
+    import psycopg2
+    from psycopg2 import errors
+except ImportError:
+    psycopg2 = None
+
+if psycopg2 is not None:
+    from config.conexion import Conexion, DatabasePool
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeConnectionPool:
+    """Como ThreadedConnectionPool: cierra lo que sobra por encima de minconn"""
+
+    def __init__(self, minconn=0):
+        self.minconn = minconn
+        self.idle = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, connection, close=False):
+        if close or len(self.idle) >= self.minconn:
+            connection.close()
+        else:
+            self.idle.append(connection)
+
+
+class FakeCursor:
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        name = query.split()[1] if query.startswith("EXECUTE") else None
+        if name in self.missing:
+            self.missing.discard(name)
+            raise errors.InvalidSqlStatementName(f'prepared statement "{name}" does not exist')
+
+
+def new_pool(connection_pool):
+    db_pool = object.__new__(DatabasePool)
+    db_pool._setup()
+    db_pool._connection_pool = connection_pool
+    return db_pool
+
+
+def new_conexion(db_pool):
+    conexion = object.__new__(Conexion)
+    conexion.db_pool = db_pool
+    return conexion
+
+
+QUERY = "SELECT username FROM usuario WHERE id_usuario = %s"
+
+
+@unittest.skipIf(psycopg2 is None, "psycopg2 no está instalado")
+class PreparedStatementsTest(unittest.TestCase):
+
+    def test_closed_connection_forgets_prepared_statements(self):
+        db_pool = new_pool(FakeConnectionPool(minconn=0))
+        connection = db_pool.get_connection()
+        db_pool.prepared_on(connection).add("stmt_1")
+
+        db_pool.release_connection(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertNotIn(connection, db_pool._prepared)
+        self.assertNotIn(connection, db_pool._idle_since)
+        self.assertEqual(db_pool.prepared_on(db_pool.get_connection()), set())
+
+    def test_reused_connection_keeps_prepared_statements(self):
+        db_pool = new_pool(FakeConnectionPool(minconn=1))
+        connection = db_pool.get_connection()
+        db_pool.prepared_on(connection).add("stmt_1")
+        db_pool.release_connection(connection)
+
+        self.assertIs(db_pool.get_connection(), connection)
+        self.assertEqual(db_pool.prepared_on(connection), {"stmt_1"})
+
+    def test_missing_prepared_statement_is_prepared_again(self):
+        db_pool = new_pool(FakeConnectionPool())
+        db_pool.statements.threshold = 1
+        conexion = new_conexion(db_pool)
+        connection = FakeConnection()
+        name = db_pool.statements.prepared_name(QUERY, (1,))
+        db_pool.prepared_on(connection).add(name)
+        cursor = FakeCursor(missing=[name])
+
+        conexion._execute(cursor, connection, QUERY, (1,))
+
+        self.assertEqual(cursor.executed, [
+            f"EXECUTE {name} (%s)",
+            f"PREPARE {name} AS SELECT username FROM usuario WHERE id_usuario = $1",
+            f"EXECUTE {name} (%s)",
+        ])
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertIn(name, db_pool.prepared_on(connection))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import io
+import unittest
+from contextlib import ExitStack, redirect_stdout
+from unittest import mock
+
+from tests.unit.fake_modules import import_module
+
+conexion = import_module("config.conexion")
+DatabasePool = conexion.DatabasePool
+DatabaseUnavailable = conexion.DatabaseUnavailable
+
+
+class FakeClock:
+    """Sustituto del módulo time con un reloj que avanza a mano"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeThreadedPool:
+    """Como psycopg2.pool.ThreadedConnectionPool, sin base de datos"""
+
+    def __init__(self, minconn, maxconn, **db_config):
+        self.idle = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, connection, close=False):
+        if close:
+            connection.close()
+        else:
+            self.idle.append(connection)
+
+    def closeall(self):
+        for connection in self.idle:
+            connection.close()
+
+
+class FakePoolModule:
+    """Sustituto de psycopg2.pool: falla las primeras `failures` conexiones"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = 0
+
+    def ThreadedConnectionPool(self, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise Exception("could not connect to server")
+        return FakeThreadedPool(**kwargs)
+
+
+class DatabasePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(mock.patch.object(conexion, "time", self.clock))
+        stack.enter_context(redirect_stdout(io.StringIO()))
+
+    def new_pool(self, failures=0, **config):
+        self.pool_module = FakePoolModule(failures)
+        patcher = mock.patch.object(conexion, "pool", self.pool_module)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_pool = object.__new__(DatabasePool)
+        db_pool._setup()
+        db_pool.configure(**config)
+        return db_pool
+
+    def test_pool_is_created_on_first_use(self):
+        db_pool = self.new_pool()
+
+        self.assertEqual(self.pool_module.attempts, 0)
+        self.assertFalse(db_pool.stats()["connected"])
+        db_pool.release_connection(db_pool.get_connection())
+
+        self.assertEqual(self.pool_module.attempts, 1)
+        self.assertTrue(db_pool.stats()["connected"])
+
+    def test_failed_connects_back_off_exponentially(self):
+        db_pool = self.new_pool(failures=7)
+        delays = []
+        for _ in range(7):
+            with self.assertRaises(DatabaseUnavailable):
+                db_pool.get_connection()
+            delays.append(db_pool.stats()["retry_in"])
+            # Antes de que venza la espera no se vuelve a intentar
+            with self.assertRaises(DatabaseUnavailable):
+                db_pool.get_connection()
+            self.clock.now += delays[-1]
+
+        self.assertEqual(delays, [1, 2, 4, 8, 16, 30, 30])
+        self.assertEqual(self.pool_module.attempts, 7)
+
+        connection = db_pool.get_connection()
+        db_pool.release_connection(connection)
+        stats = db_pool.stats()
+        self.assertEqual((stats["connect_errors"], stats["connects"]), (7, 1))
+        self.assertIsNone(stats["last_error"])
+
+        # Tras conectar, el siguiente fallo vuelve a empezar por la espera mínima
+        db_pool.close_all_connections()
+        self.pool_module.failures = self.pool_module.attempts + 1
+        with self.assertRaises(DatabaseUnavailable):
+            db_pool.get_connection()
+        self.assertEqual(db_pool.stats()["retry_in"], conexion.DB_RETRY_MIN_SECONDS)
+
+    def test_checkout_metrics(self):
+        db_pool = self.new_pool(maxconn=2, timeout=0.01)
+        first = db_pool.get_connection()
+        second = db_pool.get_connection()
+
+        with self.assertRaises(DatabaseUnavailable):
+            db_pool.get_connection()
+        stats = db_pool.stats()
+        self.assertEqual((stats["checkouts"], stats["timeouts"]), (2, 1))
+        self.assertEqual((stats["in_use"], stats["max_in_use"]), (2, 2))
+        self.assertEqual(stats["wait"]["count"], 3)
+
+        db_pool.release_connection(first)
+        db_pool.release_connection(second)
+        self.assertEqual(db_pool.stats()["in_use"], 0)
+
+    def test_statement_metrics_are_exported(self):
+        db_pool = self.new_pool()
+        db_pool.record_statement("SELECT 1", 0.003)
+        db_pool.record_statement("SELECT  1", 0.2, error=True)
+
+        stats = db_pool.stats()
+        self.assertEqual((stats["queries"], stats["query_errors"]), (2, 1))
+        self.assertEqual(stats["statements"]["SELECT 1"]["errors"], 1)
+        text = db_pool.export_metrics()
+        self.assertIn("db_pool_queries_total 2", text)
+        self.assertIn('db_statement_seconds_count{statement="SELECT 1"} 2', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import json
+import os
+import unittest
+
+from topology_manager.flows import build_flow_file, count_flows, flow_command
+from topology_manager.models import Topology
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def load_topology():
+    with open(os.path.join(DATA_DIR, "topology.json")) as f:
+        return Topology.from_dict(json.load(f))
+
+
+class FlowFileTest(unittest.TestCase):
+
+    def test_flow_file_matches_golden(self):
+        with open(os.path.join(DATA_DIR, "flows.golden")) as f:
+            expected = f.read()
+
+        self.assertEqual(build_flow_file(load_topology()), expected)
+
+    def test_count_flows_ignores_comments(self):
+        self.assertEqual(count_flows(build_flow_file(load_topology())), 9)
+
+    def test_flow_command_uses_a_bundle(self):
+        self.assertEqual(
+            flow_command("replace", sudo=False),
+            "ovs-vsctl set bridge br-int protocols=OpenFlow10,OpenFlow13,OpenFlow14 && "
+            "ovs-ofctl --bundle replace-flows br-int -"
+        )
+        with self.assertRaises(ValueError):
+            flow_command("delete")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gc
+import threading
+import unittest
+from unittest import mock
+
+from topology_manager import models
+from topology_manager.models import Topology, _gc_paused, intern_flavor
+
+
+class RemoveVmTest(unittest.TestCase):
+
+    def _topology_with_duplicates(self):
+        return Topology.from_dict({
+            "vms": [
+                {"name": "vm1", "mac": "52:54:00:00:00:01", "worker": 1, "vnc_port": 1},
+                {"name": "vm2", "mac": "52:54:00:00:00:01", "worker": 1, "vnc_port": 1},
+            ],
+            "connections": []
+        })
+
+    def test_duplicate_mac_stays_used_after_removing_owner(self):
+        topology = self._topology_with_duplicates()
+        self.assertEqual(topology.mac_conflicts, ["vm2"])
+
+        topology.remove_vm("vm1")
+
+        self.assertEqual(topology.mac_conflicts, [])
+        self.assertTrue(topology.mac_allocator.is_used("52:54:00:00:00:01"))
+        self.assertNotEqual(topology.mac_allocator.allocate(key="vm3", hint=1), "52:54:00:00:00:01")
+
+    def test_duplicate_vnc_port_stays_used_after_removing_owner(self):
+        topology = self._topology_with_duplicates()
+
+        topology.remove_vm("vm1")
+
+        self.assertEqual(topology.vnc_conflicts, [])
+        self.assertNotEqual(topology.vnc_allocator.allocate(1, key="vm3"), 1)
+
+    def test_mac_released_when_last_user_removed(self):
+        topology = self._topology_with_duplicates()
+
+        topology.remove_vm("vm1")
+        topology.remove_vm("vm2")
+
+        self.assertFalse(topology.mac_allocator.is_used("52:54:00:00:00:01"))
+
+
+class GcPauseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(gc.enable if gc.isenabled() else gc.disable)
+        gc.enable()
+
+    def test_nested_pauses_enable_gc_only_at_the_end(self):
+        with _gc_paused():
+            with _gc_paused():
+                self.assertFalse(gc.isenabled())
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+
+    def test_overlapping_loads_in_threads(self):
+        entered = threading.Event()
+        leave = threading.Event()
+
+        def other_load():
+            with _gc_paused():
+                entered.set()
+                leave.wait(5)
+
+        thread = threading.Thread(target=other_load)
+        with _gc_paused():
+            thread.start()
+            self.assertTrue(entered.wait(5))
+        # La otra carga sigue en curso: el GC no debe volver a encenderse
+        self.assertFalse(gc.isenabled())
+        leave.set()
+        thread.join(5)
+        self.assertTrue(gc.isenabled())
+
+    def test_gc_stays_disabled_if_it_was_disabled(self):
+        gc.disable()
+        with _gc_paused():
+            pass
+        self.assertFalse(gc.isenabled())
+
+
+class InternFlavorTest(unittest.TestCase):
+
+    def test_equal_flavors_are_shared(self):
+        first = intern_flavor({"cpu": 1, "ram": 512})
+        self.assertIs(intern_flavor({"cpu": 1, "ram": 512}), first)
+
+    def test_table_stops_growing_at_the_limit(self):
+        with mock.patch.object(models, "MAX_INTERNED", 2), \
+             mock.patch.object(models, "_interned_flavors", {}):
+            shared = intern_flavor({"id": 0})
+            intern_flavor({"id": 1})
+            extra = {"id": 2}
+            self.assertIs(intern_flavor(extra), extra)
+            self.assertIsNot(intern_flavor({"id": 2}), extra)
+            self.assertIs(intern_flavor({"id": 0}), shared)
+            self.assertEqual(len(models._interned_flavors), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
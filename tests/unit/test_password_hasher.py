@@ -0,0 +1,97 @@
+import threading
+import unittest
+
+from tests.unit.fake_modules import import_module
+
+hasher_module = import_module("utils.PasswordHasher")
+PasswordHasher = hasher_module.PasswordHasher
+PasswordHasherBusy = hasher_module.PasswordHasherBusy
+
+
+class BlockingHash:
+    """Sustituto de bcrypt: registra las contraseñas y espera a release()"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self._release = threading.Event()
+
+    def __call__(self, password, rounds=None):
+        self.calls.append(password)
+        self.started.release()
+        self._release.wait(5)
+        return f"hash:{password}"
+
+    def release(self):
+        self._release.set()
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    def hasher(self, workers, queue_limit):
+        hasher = PasswordHasher(rounds=4, workers=workers, queue_limit=queue_limit)
+        self.addCleanup(hasher.shutdown)
+        self.block = BlockingHash()
+        self.addCleanup(self.block.release)
+        hasher._hash = self.block
+        return hasher
+
+    def test_rejects_when_workers_and_queue_are_full(self):
+        hasher = self.hasher(workers=1, queue_limit=1)
+        running = hasher.hash_async("a")
+        queued = hasher.hash_async("b")
+
+        with self.assertRaises(PasswordHasherBusy):
+            hasher.hash_async("c")
+        self.assertEqual(hasher.stats()["pending"], 2)
+        self.assertEqual(hasher.stats()["rejected"], 1)
+
+        self.block.release()
+        self.assertEqual([running.result(5), queued.result(5)], ["hash:a", "hash:b"])
+        self.assertEqual(self.block.calls, ["a", "b"])
+
+    def test_slots_are_freed_when_work_finishes(self):
+        hasher = self.hasher(workers=1, queue_limit=0)
+        self.block.release()
+
+        self.assertEqual(hasher.hash("a"), "hash:a")
+        self.assertEqual(hasher.hash("b"), "hash:b")
+
+        stats = hasher.stats()
+        self.assertEqual((stats["pending"], stats["completed"], stats["rejected"]), (0, 2, 0))
+
+    def test_hash_many_cancels_its_queued_work_when_busy(self):
+        hasher = self.hasher(workers=2, queue_limit=1)
+        busy = [hasher.hash_async("x"), hasher.hash_async("y")]
+        for _ in busy:
+            self.assertTrue(self.block.started.acquire(timeout=5))
+
+        # El lote encola "a" en el único hueco libre y "b" ya no cabe
+        with self.assertRaises(PasswordHasherBusy):
+            hasher.hash_many(["a", "b", "c"])
+
+        self.assertEqual(hasher.stats()["pending"], 2)
+        self.block.release()
+        for future in busy:
+            future.result(5)
+        stats = hasher.stats()
+        self.assertEqual((stats["pending"], stats["completed"]), (0, 2))
+        self.assertNotIn("a", self.block.calls)
+
+    def test_hash_many_keeps_order(self):
+        hasher = self.hasher(workers=2, queue_limit=0)
+        self.block.release()
+
+        self.assertEqual(hasher.hash_many(["a", "b", "c"]), ["hash:a", "hash:b", "hash:c"])
+
+    def test_needs_rehash_compares_cost(self):
+        hasher = PasswordHasher(rounds=12, workers=1)
+        self.addCleanup(hasher.shutdown)
+
+        self.assertTrue(hasher.needs_rehash("$2b$10$abcdefghijklmnopqrstuv"))
+        self.assertFalse(hasher.needs_rehash("$2b$12$abcdefghijklmnopqrstuv"))
+        self.assertFalse(hasher.needs_rehash("texto-plano"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from topology_manager.models import Topology
+from topology_manager.placement import VmPlacer
+
+SMALL = {"cpu": 1, "ram": 1024, "disk": 10}
+LARGE = {"cpu": 4, "ram": 4096, "disk": 10}
+
+
+def topology_with_capacity():
+    topology = Topology()
+    topology.nodes["worker_capacity"] = {"cpu": 4, "ram": 4096, "disk": 100}
+    return topology
+
+
+class FixedPlacementTest(unittest.TestCase):
+
+    def test_fixed_vm_to_unknown_worker_raises(self):
+        placer = VmPlacer(topology_with_capacity())
+
+        with self.assertRaises(ValueError):
+            placer.place([("vm1", SMALL)], fixed={"vm1": 7})
+
+    def test_fixed_vm_outside_allowed_workers_raises(self):
+        placer = VmPlacer(topology_with_capacity(), workers=[1, 2])
+
+        with self.assertRaises(ValueError):
+            placer.place([("vm1", SMALL)], fixed={"vm1": 3})
+
+    def test_fixed_vm_over_capacity_is_unplaced(self):
+        placer = VmPlacer(topology_with_capacity())
+
+        result = placer.place([("vm1", LARGE), ("vm2", SMALL), ("vm3", SMALL)],
+                              fixed={"vm1": 1, "vm2": 1})
+
+        self.assertEqual(result["unplaced"], ["vm2"])
+        self.assertEqual(result["placements"]["vm1"], 1)
+        self.assertNotIn("vm2", result["placements"])
+        self.assertNotEqual(result["placements"]["vm3"], 1)
+        self.assertEqual(result["headroom"][1]["cpu"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+import unittest
+
+from topology_manager.models import Topology
+from topology_manager.planner import export_plan, summarize_plan
+from topology_manager.provisioning import SCRIPTS_DIR, build_provisioning_plan
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+GOLDEN_PLAN = os.path.join(DATA_DIR, "plan.golden.json")
+
+
+def export_golden_topology():
+    """JSON exportado del plan de la topología de prueba, sin rutas locales"""
+    with open(os.path.join(DATA_DIR, "topology.json")) as f:
+        topology = Topology.from_dict(json.load(f))
+    plan = build_provisioning_plan(topology)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plan.json")
+        if not export_plan(plan, summarize_plan(plan), path):
+            raise AssertionError("No se pudo exportar el plan")
+        with open(path) as f:
+            return f.read().replace(SCRIPTS_DIR, "<scripts>")
+
+
+class ExportPlanTest(unittest.TestCase):
+
+    def test_exported_plan_matches_golden(self):
+        with open(GOLDEN_PLAN) as f:
+            expected = f.read()
+
+        self.assertEqual(export_golden_topology(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
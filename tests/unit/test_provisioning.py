@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+from topology_manager.journal import StepJournal, step_key
+from topology_manager.provisioning import ProvisioningEngine, ProvisioningPlan, Step
+from topology_manager.transport import FakeTransport
+
+
+def build_plan():
+    """
+    init:  a, b
+    apply: c (depende de a), d (depende de b), e (barrera: todo init)
+    """
+    plan = ProvisioningPlan("test")
+    init = plan.add_phase("init")
+    a = init.add("a", Step("a1", "n1", "cmd a1"), Step("a2", "n1", "cmd a2"))
+    b = init.add("b", Step("b1", "n2", "cmd b1", check="check b1"))
+    apply = plan.add_phase("apply")
+    apply.add("c", Step("c1", "n1", "cmd c1"), deps=[a])
+    apply.add("d", Step("d1", "n2", "cmd d1"), deps=[b])
+    apply.add("e", Step("e1", "n3", "cmd e1"))
+    return plan
+
+
+class ProvisioningEngineTest(unittest.TestCase):
+
+    def run_plan(self, transport, plan=None, journal=None):
+        engine = ProvisioningEngine(transport, max_parallel=4, verbose=False)
+        plan = plan or build_plan()
+        return plan, engine.run(plan, journal)
+
+    def commands(self, transport):
+        return [call[2] for call in transport.calls]
+
+    def test_tasks_run_after_their_dependencies(self):
+        transport = FakeTransport(delay=0.01)
+
+        _, report = self.run_plan(transport)
+
+        self.assertTrue(report.success)
+        commands = self.commands(transport)
+        self.assertEqual(len(commands), 6)
+        self.assertLess(commands.index("cmd a1"), commands.index("cmd a2"))
+        self.assertLess(commands.index("cmd a2"), commands.index("cmd c1"))
+        self.assertLess(commands.index("cmd b1"), commands.index("cmd d1"))
+        for command in ("cmd a2", "cmd b1"):
+            self.assertLess(commands.index(command), commands.index("cmd e1"))
+
+    def test_failure_cancels_only_dependent_tasks(self):
+        transport = FakeTransport(fail_on=["cmd a1"])
+
+        plan, report = self.run_plan(transport)
+
+        self.assertFalse(report.success)
+        self.assertEqual([(phase, task, step.name) for phase, task, step in report.failed],
+                         [("init", "a", "a1")])
+        self.assertEqual(sorted(report.cancelled), [("apply", "c"), ("apply", "e")])
+        commands = self.commands(transport)
+        self.assertNotIn("cmd a2", commands)
+        self.assertIn("cmd d1", commands)
+
+    def test_checks_run_only_when_resuming(self):
+        transport = FakeTransport(done=["check b1"])
+
+        plan, report = self.run_plan(transport)
+
+        self.assertTrue(report.success)
+        self.assertNotIn("check", [call[0] for call in transport.calls])
+        self.assertIsNone(plan.phases[0].tasks[1].steps[0].skipped)
+
+    def test_resumed_run_skips_completed_and_checked_steps(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.journal.jsonl")
+            journal = StepJournal(path, sync=False)
+            self.run_plan(FakeTransport(fail_on=["cmd d1"]), journal=journal)
+            journal.close()
+
+            transport = FakeTransport(done=["check b1"])
+            journal = StepJournal(path, sync=False)
+            plan, report = self.run_plan(transport, journal=journal)
+            journal.close()
+
+        self.assertTrue(report.success)
+        self.assertEqual(self.commands(transport), ["cmd d1"])
+        self.assertEqual(plan.phases[0].tasks[1].steps[0].skipped, "journal")
+
+    def test_unconfirmed_step_is_checked_before_running(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.journal.jsonl")
+            plan = build_plan()
+            journal = StepJournal(path, sync=False)
+            # Ejecución interrumpida mientras se ejecutaba b1
+            step = plan.phases[0].tasks[1].steps[0]
+            journal.start(step_key("init", "b", step), "init", "b", step)
+            journal.close()
+
+            transport = FakeTransport(done=["check b1"])
+            journal = StepJournal(path, sync=False)
+            plan, report = self.run_plan(transport, plan=plan, journal=journal)
+            journal.close()
+
+        self.assertTrue(report.success)
+        self.assertIn(("check", "n2", "check b1"), transport.calls)
+        self.assertNotIn("cmd b1", self.commands(transport))
+        self.assertEqual(step.skipped, "check")
+
+
+if __name__ == "__main__":
+    unittest.main()
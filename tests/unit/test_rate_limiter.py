@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+
+from utils import RateLimiter as limiter_module
+from utils.RateLimiter import LoginRateLimiter, RateLimiter
+
+
+class FakeClock:
+    """Sustituto del módulo time con un reloj que avanza a mano"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(limiter_module, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rejection(self):
+        limiter = RateLimiter(capacity=3, refill_rate=1.0)
+
+        self.assertEqual([limiter.allow("ana") for _ in range(4)], [True, True, True, False])
+        self.assertEqual((limiter.allowed, limiter.rejected), (3, 1))
+        self.assertEqual(limiter.retry_after("ana"), 1.0)
+
+    def test_tokens_refill_over_time(self):
+        limiter = RateLimiter(capacity=3, refill_rate=0.5)
+        for _ in range(3):
+            limiter.allow("ana")
+
+        self.clock.now += 1
+        self.assertFalse(limiter.allow("ana"))
+        self.assertEqual(limiter.retry_after("ana"), 1.0)
+        self.clock.now += 1
+        self.assertTrue(limiter.allow("ana"))
+
+    def test_refill_is_capped_at_capacity(self):
+        limiter = RateLimiter(capacity=2, refill_rate=1.0)
+        limiter.allow("ana")
+
+        self.clock.now += 100
+
+        self.assertEqual([limiter.allow("ana") for _ in range(3)], [True, True, False])
+
+    def test_keys_are_independent_and_bounded(self):
+        limiter = RateLimiter(capacity=1, refill_rate=0.1, max_keys=2)
+        self.assertTrue(limiter.allow("a"))
+        self.assertTrue(limiter.allow("b"))
+        self.assertFalse(limiter.allow("a"))
+
+        limiter.allow("c")
+
+        # "b" era la clave usada hace más tiempo: se olvida y vuelve a tener fichas
+        self.assertTrue(limiter.allow("b"))
+
+    def test_reset_restores_all_tokens(self):
+        limiter = RateLimiter(capacity=1, refill_rate=0.1)
+        limiter.allow("ana")
+
+        limiter.reset("ana")
+
+        self.assertTrue(limiter.allow("ana"))
+
+
+class LoginRateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(limiter_module, "time", FakeClock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_user_limit_ignores_case_and_resets_on_success(self):
+        limiter = LoginRateLimiter()
+        for _ in range(limiter_module.LOGIN_USER_BURST):
+            self.assertIsNone(limiter.check("Ana"))
+
+        self.assertGreater(limiter.check(" ana "), 0)
+        limiter.succeeded("ANA")
+        self.assertIsNone(limiter.check("ana"))
+
+    def test_ip_limit_applies_across_users(self):
+        limiter = LoginRateLimiter()
+        for i in range(limiter_module.LOGIN_IP_BURST):
+            self.assertIsNone(limiter.check(f"user{i}", "10.0.0.1"))
+
+        self.assertGreater(limiter.check("otro", "10.0.0.1"), 0)
+        self.assertIsNone(limiter.check("otro", "10.0.0.2"))
+        self.assertEqual(limiter.stats()["ip"]["rejected"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from topology_manager import TopologyManager
+from topology_manager.remover import TopologyRemover
+from topology_manager.transport import FakeTransport
+
+
+def topology_data():
+    """Dos workers con una VM cada uno y un nodo OFS: 2 tareas en vms y 2 en networks"""
+    return {
+        "name": "test",
+        "nodes": {"workers": ["10.0.0.1", "10.0.0.2"], "ofs_node": "10.0.0.3"},
+        "vms": [
+            {"name": "vm1", "worker": 1},
+            {"name": "vm2", "worker": 2},
+        ],
+        "connections": [{"from": "vm1", "to": "vm2", "vlan_id": 100}]
+    }
+
+
+class TeardownTaskTest(unittest.TestCase):
+
+    def test_progress_counts_tasks_across_all_phases(self):
+        remover = TopologyRemover(manager=None)
+
+        task = remover.teardown_async(topology_data(), transport=FakeTransport())
+        self.assertEqual(task.total, 4)
+        self.assertTrue(task.wait(5))
+
+        self.assertEqual(task.status, "completada")
+        self.assertEqual(task.done, 4)
+        self.assertTrue(task.log[-1].startswith("[4/4] networks 2/2 "))
+
+
+class ClosingTransport(FakeTransport):
+    """FakeTransport que falla si se usa después de cerrarse"""
+
+    def __init__(self, delay):
+        super().__init__(delay=delay)
+        self.closed = False
+
+    def run(self, node, command, stdin=None, timeout=None):
+        if self.closed:
+            raise RuntimeError("transporte cerrado")
+        return super().run(node, command, stdin, timeout)
+
+    def close(self):
+        self.closed = True
+
+
+class ExitWithTeardownTest(unittest.TestCase):
+
+    def start_teardown(self):
+        manager = TopologyManager()
+        manager.transport = ClosingTransport(delay=0.05)
+        task = manager.remover.teardown_async(topology_data())
+        self.assertTrue(task.running)
+        return manager, task
+
+    def test_exit_waits_for_background_teardown(self):
+        manager, task = self.start_teardown()
+
+        with redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+            manager.ui.exit()
+
+        self.assertFalse(task.running)
+        self.assertEqual(task.status, "completada")
+
+    def test_close_transport_waits_for_background_teardown(self):
+        manager, task = self.start_teardown()
+
+        manager.close_transport()
+
+        self.assertFalse(task.running)
+        self.assertEqual(task.status, "completada")
+        self.assertIsNone(manager.transport)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from collections import Counter
+
+from topology_manager.shapes import (fat_tree_edges, fat_tree_size, random_edges,
+                                     torus_edges, tree_edges)
+
+
+def normalized(edges):
+    """Enlaces como pares ordenados (i < j)"""
+    return [tuple(sorted(edge)) for edge in edges]
+
+
+def degrees(edges):
+    counter = Counter()
+    for i, j in edges:
+        counter[i] += 1
+        counter[j] += 1
+    return counter
+
+
+class TorusEdgesTest(unittest.TestCase):
+
+    def test_wraparound_links_close_each_dimension(self):
+        edges = set(normalized(torus_edges(9, (3, 3))))
+
+        self.assertEqual(len(edges), 18)
+        # Última columna con la primera y última fila con la primera
+        self.assertIn((0, 2), edges)
+        self.assertIn((0, 6), edges)
+        self.assertTrue(all(degree == 4 for degree in degrees(edges).values()))
+
+    def test_3d_torus_every_node_has_six_neighbours(self):
+        edges = normalized(torus_edges(27, (3, 3, 3)))
+
+        self.assertEqual(len(edges), len(set(edges)))
+        self.assertEqual(len(edges), 81)
+        self.assertTrue(all(degree == 6 for degree in degrees(edges).values()))
+
+    def test_size_two_dimension_has_one_link_per_pair(self):
+        edges = normalized(torus_edges(6, (2, 3)))
+
+        self.assertEqual(len(edges), len(set(edges)))
+        # 2 anillos de 3 enlaces y 3 enlaces entre las dos filas
+        self.assertEqual(len(edges), 9)
+
+    def test_size_one_dimension_adds_no_links(self):
+        edges = normalized(torus_edges(4, (1, 4)))
+
+        self.assertEqual(sorted(edges), [(0, 1), (0, 3), (1, 2), (2, 3)])
+        self.assertEqual(torus_edges(1, (1, 1)), [])
+
+    def test_dims_must_match_num_vms(self):
+        with self.assertRaises(ValueError):
+            torus_edges(10, (3, 3))
+        with self.assertRaises(ValueError):
+            torus_edges(4, (4,))
+
+
+class FatTreeEdgesTest(unittest.TestCase):
+
+    def test_node_count(self):
+        for k in (2, 4, 6, 8):
+            self.assertEqual(fat_tree_size(k), 5 * k * k // 4 + k ** 3 // 4)
+            nodes = {node for edge in fat_tree_edges(fat_tree_size(k), k) for node in edge}
+            self.assertEqual(nodes, set(range(fat_tree_size(k))))
+
+    def test_degrees_per_layer(self):
+        k = 4
+        half = k // 2
+        edges = fat_tree_edges(fat_tree_size(k), k)
+        degree = degrees(edges)
+        switches = half * half + 2 * k * half
+
+        self.assertEqual(len(edges), len(set(normalized(edges))))
+        # Núcleo, agregación y acceso usan sus k puertos; cada host tiene un enlace
+        self.assertTrue(all(degree[node] == k for node in range(switches)))
+        self.assertTrue(all(degree[node] == 1 for node in range(switches, fat_tree_size(k))))
+
+    def test_odd_k_is_rejected(self):
+        with self.assertRaises(ValueError):
+            fat_tree_edges(fat_tree_size(3), 3)
+        with self.assertRaises(ValueError):
+            fat_tree_edges(20, 4)
+
+
+class TreeEdgesTest(unittest.TestCase):
+
+    def test_children_of_node_i_for_arity_three(self):
+        edges = tree_edges(13, arity=3)
+
+        children = {}
+        for parent, child in edges:
+            children.setdefault(parent, []).append(child)
+        self.assertEqual(children[0], [1, 2, 3])
+        self.assertEqual(children[1], [4, 5, 6])
+        self.assertEqual(children[3], [10, 11, 12])
+        self.assertEqual(len(edges), 12)
+
+    def test_invalid_arity(self):
+        with self.assertRaises(ValueError):
+            tree_edges(5, arity=0)
+
+
+class RandomEdgesTest(unittest.TestCase):
+
+    def test_same_seed_gives_same_graph(self):
+        self.assertEqual(random_edges(200, 0.05, seed=7), random_edges(200, 0.05, seed=7))
+        self.assertNotEqual(random_edges(200, 0.05, seed=7), random_edges(200, 0.05, seed=8))
+
+    def test_probability_zero_and_one(self):
+        self.assertEqual(random_edges(10, 0.0, seed=1), [])
+        edges = random_edges(10, 1.0, seed=1)
+        self.assertEqual(len(edges), 45)
+        self.assertEqual(len(set(normalized(edges))), 45)
+
+    def test_no_self_loops_or_duplicates(self):
+        for seed in range(20):
+            edges = random_edges(100, 0.2, seed=seed)
+            self.assertTrue(all(i != j for i, j in edges))
+            self.assertTrue(all(0 <= i < 100 and 0 <= j < 100 for i, j in edges))
+            self.assertEqual(len(edges), len(set(normalized(edges))))
+
+    def test_invalid_probability(self):
+        with self.assertRaises(ValueError):
+            random_edges(10, 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+
+from topology_manager.ssh_pool import SSHConnectionPool
+
+
+class FakeChannel:
+
+    def __init__(self):
+        self.output = []
+
+    def exec_command(self, command):
+        self.output = [f"ok: {command}".encode()]
+
+    def sendall(self, data):
+        pass
+
+    def shutdown_write(self):
+        pass
+
+    def recv_ready(self):
+        return bool(self.output)
+
+    def recv(self, size):
+        return self.output.pop(0) if self.output else b""
+
+    def recv_stderr_ready(self):
+        return False
+
+    def recv_stderr(self, size):
+        return b""
+
+    def exit_status_ready(self):
+        return True
+
+    def recv_exit_status(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class FakeSSHTransport:
+
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def send_ignore(self):
+        pass
+
+    def open_session(self, timeout=None):
+        return FakeChannel()
+
+
+class FakeSFTP:
+
+    def __init__(self):
+        self.puts = []
+
+    def put(self, local_path, remote_path):
+        self.puts.append(remote_path)
+
+    def chmod(self, path, mode):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+
+    def __init__(self, node):
+        self.node = node
+        self.transport = FakeSSHTransport()
+        self.sftp = FakeSFTP()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def open_sftp(self):
+        return self.sftp
+
+    def close(self):
+        self.closed = True
+
+
+class SSHConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clients = []
+        self.pool = SSHConnectionPool(connect=self.connect)
+
+    def connect(self, node):
+        client = FakeClient(node)
+        self.clients.append(client)
+        return client
+
+    def test_commands_reuse_one_connection_per_node(self):
+        for _ in range(3):
+            self.assertTrue(self.pool.run("10.0.10.2", "hostname").ok)
+        result = self.pool.run("10.0.10.3", "hostname")
+
+        self.assertEqual(result.stdout, "ok: hostname")
+        self.assertEqual(self.pool.opened, 2)
+        self.assertEqual(self.pool.stats()["connections"], {"10.0.10.2": 3, "10.0.10.3": 1})
+
+    def test_dead_connection_is_replaced(self):
+        self.pool.run("10.0.10.2", "hostname")
+        self.clients[0].transport.active = False
+
+        self.assertTrue(self.pool.run("10.0.10.2", "hostname").ok)
+
+        self.assertEqual(self.pool.opened, 2)
+        self.assertTrue(self.clients[0].closed)
+
+    def test_unchanged_file_is_uploaded_once_per_connection(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".sh", delete=False) as f:
+            f.write("echo hola\n")
+        try:
+            for _ in range(2):
+                self.assertTrue(self.pool.upload("10.0.10.2", f.name, "/tmp/script.sh").ok)
+            os.utime(f.name, ns=(0, 0))
+            self.assertTrue(self.pool.upload("10.0.10.2", f.name, "/tmp/script.sh").ok)
+        finally:
+            os.remove(f.name)
+
+        self.assertEqual(self.pool.opened, 1)
+        self.assertEqual(self.pool.uploads_skipped, 1)
+        self.assertEqual(self.clients[0].sftp.puts, ["/tmp/script.sh", "/tmp/script.sh"])
+
+    def test_idle_connections_are_closed(self):
+        self.pool.idle_timeout = 0
+        self.pool.run("10.0.10.2", "hostname")
+        self.pool._connections["10.0.10.2"].last_used -= 1
+
+        self.assertEqual(self.pool.evict_idle(), 1)
+        self.assertTrue(self.clients[0].closed)
+        self.assertEqual(self.pool.stats()["connections"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import threading
+import time
+import unittest
+
+from api.task_engine import (CANCELLED, COMPLETED, FAILED, PRIORITY_HIGH, PRIORITY_LOW,
+                             PRIORITY_NORMAL, QUEUED, RUNNING, TaskEngine, TaskStore)
+
+
+def wait_until(condition, timeout=5.0):
+    """Espera a que se cumpla la condición; devuelve su último valor"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class BlockingHandler:
+    """Handler que registra las tareas ejecutadas y espera a release() para terminar"""
+
+    def __init__(self, block=True):
+        self.calls = []
+        self._lock = threading.Lock()
+        self._release = threading.Event()
+        if not block:
+            self._release.set()
+
+    def __call__(self, params, progress):
+        with self._lock:
+            self.calls.append(params["name"])
+        self._release.wait(5)
+        if params.get("fail"):
+            raise RuntimeError("fallo simulado")
+        return True, {"name": params["name"]}
+
+    def release(self):
+        self._release.set()
+
+
+class TaskEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TaskStore(":memory:")
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.stop(wait=True, timeout=5)
+        self.store.close()
+
+    def engine(self, handler, **kwargs):
+        engine = TaskEngine(self.store, handlers={"job": handler}, **kwargs)
+        self.engines.append(engine)
+        return engine
+
+    def submit(self, engine, name, user="ana", priority=PRIORITY_NORMAL, hosts=(), **params):
+        return engine.submit("job", dict(params, name=name, hosts=list(hosts)), user, priority)
+
+    def status(self, task_id):
+        return self.store.get(task_id)["status"]
+
+    def finished(self, *task_ids):
+        return all(self.status(task_id) not in (QUEUED, RUNNING) for task_id in task_ids)
+
+    def test_higher_priority_runs_first_then_oldest(self):
+        handler = BlockingHandler(block=False)
+        engine = self.engine(handler, workers=1)
+        ids = [
+            self.submit(engine, "low", priority=PRIORITY_LOW),
+            self.submit(engine, "normal-1"),
+            self.submit(engine, "high", priority=PRIORITY_HIGH),
+            self.submit(engine, "normal-2"),
+        ]
+
+        engine.start()
+
+        self.assertTrue(wait_until(lambda: self.finished(*ids)))
+        self.assertEqual(handler.calls, ["high", "normal-1", "normal-2", "low"])
+        self.assertTrue(all(self.status(task_id) == COMPLETED for task_id in ids))
+
+    def test_per_user_limit(self):
+        handler = BlockingHandler()
+        engine = self.engine(handler, workers=4, per_user_limit=1)
+        first = self.submit(engine, "ana-1")
+        second = self.submit(engine, "ana-2")
+        other = self.submit(engine, "luis-1", user="luis")
+
+        engine.start()
+
+        self.assertTrue(wait_until(lambda: len(handler.calls) == 2))
+        time.sleep(0.05)
+        self.assertEqual(sorted(handler.calls), ["ana-1", "luis-1"])
+        self.assertEqual(self.status(second), QUEUED)
+
+        handler.release()
+        self.assertTrue(wait_until(lambda: self.finished(first, second, other)))
+        self.assertEqual(handler.calls[-1], "ana-2")
+
+    def test_per_host_limit(self):
+        handler = BlockingHandler()
+        engine = self.engine(handler, workers=4, per_user_limit=4, per_host_limit=1)
+        first = self.submit(engine, "a", hosts=["10.0.0.1", "10.0.0.2"])
+        blocked = self.submit(engine, "b", user="luis", hosts=["10.0.0.2"])
+        free = self.submit(engine, "c", user="luis", hosts=["10.0.0.3"])
+
+        engine.start()
+
+        self.assertTrue(wait_until(lambda: len(handler.calls) == 2))
+        time.sleep(0.05)
+        self.assertEqual(sorted(handler.calls), ["a", "c"])
+        self.assertEqual(self.status(blocked), QUEUED)
+
+        handler.release()
+        self.assertTrue(wait_until(lambda: self.finished(first, blocked, free)))
+
+    def test_recover_requeues_tasks_left_running_by_a_crash(self):
+        handler = BlockingHandler(block=False)
+        engine = self.engine(handler)
+        task_id = self.submit(engine, "interrumpida")
+        # Simula una caída: la tarea quedó en curso sin ningún hilo que la ejecute
+        self.assertTrue(self.store.claim(task_id, "worker-1"))
+
+        engine.start()
+
+        self.assertTrue(wait_until(lambda: self.finished(task_id)))
+        task = self.store.get(task_id)
+        self.assertEqual(task["status"], COMPLETED)
+        self.assertEqual(task["attempts"], 2)
+        self.assertEqual(handler.calls, ["interrumpida"])
+
+    def test_cancel_only_queued_tasks_of_the_user(self):
+        handler = BlockingHandler()
+        engine = self.engine(handler, workers=1)
+        running = self.submit(engine, "en-curso")
+        queued = self.submit(engine, "en-cola")
+        engine.start()
+        self.assertTrue(wait_until(lambda: self.status(running) == RUNNING))
+
+        self.assertFalse(engine.cancel(queued, user="luis"))
+        self.assertTrue(engine.cancel(queued, user="ana"))
+        self.assertFalse(engine.cancel(running))
+
+        handler.release()
+        self.assertTrue(wait_until(lambda: self.finished(running)))
+        self.assertEqual(self.status(queued), CANCELLED)
+        self.assertEqual(handler.calls, ["en-curso"])
+
+    def test_handler_errors_mark_the_task_failed(self):
+        engine = self.engine(BlockingHandler(block=False))
+        task_id = self.submit(engine, "mala", fail=True)
+
+        engine.start()
+
+        self.assertTrue(wait_until(lambda: self.finished(task_id)))
+        task = self.store.get(task_id)
+        self.assertEqual(task["status"], FAILED)
+        self.assertEqual(task["error"], "fallo simulado")
+
+    def test_on_finish_errors_are_logged(self):
+        def on_finish(task):
+            raise RuntimeError("notificación fallida")
+
+        engine = self.engine(BlockingHandler(block=False), on_finish=on_finish)
+        with self.assertLogs("cli_server.task_engine", level="ERROR") as logs:
+            task_id = self.submit(engine, "tarea")
+            engine.start()
+            self.assertTrue(wait_until(lambda: self.finished(task_id)))
+            self.assertTrue(wait_until(lambda: logs.records))
+
+        self.assertEqual(self.status(task_id), COMPLETED)
+        self.assertIn(f"tarea {task_id}", logs.records[0].getMessage())
+
+    def test_unknown_task_type_is_rejected(self):
+        engine = self.engine(BlockingHandler(block=False))
+        with self.assertRaises(ValueError):
+            engine.submit("otro", {}, "ana")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+
+from tests.unit.fake_modules import import_module
+
+token_module = import_module("utils.TokenCache")
+TokenCache = token_module.TokenCache
+
+
+class FakeClock:
+    """Sustituto del módulo time con un reloj que avanza a mano"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeDb:
+    """Base de datos con una tabla de usuarios en memoria"""
+
+    def __init__(self, users):
+        self.users = users   # id -> (username, rol_id, rol)
+        self.queries = 0
+
+    def select(self, columns, tables, condition=None, params=None):
+        self.queries += 1
+        user = self.users.get(params[0])
+        return [(params[0], *user)] if user else []
+
+
+class TokenCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(token_module, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TokenCache(ttl=60)
+        cache.put(1, {"username": "ana"})
+
+        self.clock.now += 59
+        self.assertEqual(cache.get(1), {"username": "ana"})
+        self.clock.now += 2
+        self.assertIsNone(cache.get(1))
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TokenCache(max_size=2)
+        cache.put(1, {"username": "ana"})
+        cache.put(2, {"username": "luis"})
+        cache.get(1)
+
+        cache.put(3, {"username": "eva"})
+
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNotNone(cache.get(3))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_get_returns_a_copy(self):
+        cache = TokenCache()
+        cache.put(1, {"role": "usuario"})
+
+        cache.get(1)["role"] = "admin"
+
+        self.assertEqual(cache.get(1), {"role": "usuario"})
+
+    def test_invalidate_accepts_ids_as_text(self):
+        cache = TokenCache()
+        cache.put(7, {"username": "ana"})
+
+        cache.invalidate("7")
+
+        self.assertIsNone(cache.get(7))
+
+
+class LoadUserTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TokenCache()
+        patcher = mock.patch.object(token_module, "token_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = FakeDb({1: ("ana", 2, "admin")})
+
+    def test_cached_user_does_not_query_the_database(self):
+        first = token_module.load_user(1, self.db)
+        second = token_module.load_user(1, self.db)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["role"], "admin")
+        self.assertEqual(self.db.queries, 1)
+
+    def test_use_cache_false_always_queries(self):
+        token_module.load_user(1, self.db)
+        self.db.users[1] = ("ana", 3, "usuario")
+
+        user = token_module.load_user(1, self.db, use_cache=False)
+
+        self.assertEqual(user["role"], "usuario")
+        self.assertEqual(self.db.queries, 2)
+        self.assertEqual(token_module.load_user(1, self.db)["role"], "usuario")
+
+    def test_missing_user_is_dropped_from_the_cache(self):
+        token_module.load_user(1, self.db)
+        del self.db.users[1]
+
+        self.assertIsNone(token_module.load_user(1, self.db, use_cache=False))
+        self.assertIsNone(self.cache.get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,28 +11,63 @@ from .models import Topology
 from .ui import TopologyUI
 from .io import TopologyIO
 from .generators import TopologyGenerator
+from .builder import TopologyBuilder
 from .executor import TopologyExecutor
 from .connections import manage_connections
 from .remover import TopologyRemover
+from .ssh_pool import create_transport
+from .streams import bind_streams
 
 class TopologyManager:
     """Clase principal que coordina la aplicación"""
     
-    def __init__(self):
-        """Inicializa el administrador de topologías"""
+    def __init__(self, input_stream=None, output_stream=None):
+        """
+        Inicializa el administrador de topologías
+        
+        Args:
+            input_stream: Flujo de entrada de la interfaz (None: entrada estándar)
+            output_stream: Flujo de salida de la interfaz (None: salida estándar)
+        """
         # Crear una topología vacía
         self.topology = Topology()
         
         # Inicializar componentes
         self.io = TopologyIO(self)
-        self.ui = TopologyUI(self)
+        self.ui = TopologyUI(self, input_stream, output_stream)
         self.generator = TopologyGenerator(self)
+        self.builder = TopologyBuilder(self)
         self.executor = TopologyExecutor(self)
         self.remover = TopologyRemover(self)
+        
+        # Transporte compartido (conexiones SSH persistentes), se crea al usarlo
+        self.transport = None
     
     def run(self):
-        """Inicia la aplicación"""
-        self.ui.main_menu()
+        """Inicia la aplicación (con los flujos de la interfaz, si se indicaron)"""
+        try:
+            with bind_streams(self.ui.input_stream, self.ui.output_stream):
+                self.ui.main_menu()
+        finally:
+            self.close_transport()
+    
+    def get_transport(self):
+        """Transporte compartido por el ejecutor y el eliminador de topologías"""
+        if self.transport is None:
+            self.transport = create_transport()
+        return self.transport
+    
+    def close_transport(self):
+        """
+        Cierra las conexiones abiertas con los nodos
+        
+        Antes espera a las eliminaciones en segundo plano, que usan este
+        mismo transporte.
+        """
+        if self.transport is not None:
+            self.remover.wait_tasks()
+            self.transport.close()
+            self.transport = None
     
     def load_topology(self, file_path):
         """Carga una topología desde un archivo"""
@@ -46,14 +81,22 @@ class TopologyManager:
         """Ejecuta la topología actual"""
         return self.executor.execute_topology()
     
-    def remove_topology(self, json_file=None):
+    def plan_topology(self, output=None, full=False):
+        """Muestra (y exporta a JSON) lo que haría la ejecución sin tocar ningún nodo"""
+        return self.executor.plan_topology(full=full, output=output)
+    
+    def remove_topology(self, json_file=None, background=False):
         """Elimina una topología definida en un archivo JSON"""
-        return self.remover.remove_topology(json_file)
+        return self.remover.remove_topology(json_file, background=background)
     
     def manage_connections(self):
         """Inicia el menú de gestión de conexiones"""
         manage_connections(self.topology)
     
+    def build_topology(self, spec):
+        """Construye una topología completa a partir de una especificación"""
+        return self.builder.build(spec)
+    
     def create_ring_topology(self, num_vms, start_vm_id=None, default_flavor=None):
         """Crea una topología en anillo"""
         return self.generator.create_ring_topology(num_vms, start_vm_id, default_flavor)
@@ -66,6 +109,26 @@ class TopologyManager:
         """Crea una topología lineal"""
         return self.generator.create_linear_topology(num_vms, start_vm_id, default_flavor)
     
+    def create_mesh_topology(self, num_vms, start_vm_id=None, default_flavor=None):
+        """Crea una topología en malla completa"""
+        return self.generator.create_mesh_topology(num_vms, start_vm_id, default_flavor)
+    
+    def create_tree_topology(self, num_vms, arity=2, start_vm_id=None, default_flavor=None):
+        """Crea una topología en árbol k-ario"""
+        return self.generator.create_tree_topology(num_vms, arity, start_vm_id, default_flavor)
+    
+    def create_torus_topology(self, dims, start_vm_id=None, default_flavor=None):
+        """Crea una topología en toro 2D o 3D"""
+        return self.generator.create_torus_topology(dims, start_vm_id, default_flavor)
+    
+    def create_fat_tree_topology(self, k=4, start_vm_id=None, default_flavor=None):
+        """Crea una topología fat-tree"""
+        return self.generator.create_fat_tree_topology(k, start_vm_id, default_flavor)
+    
+    def create_random_topology(self, num_vms, probability=0.1, seed=None, start_vm_id=None, default_flavor=None):
+        """Crea una topología aleatoria de Erdős–Rényi"""
+        return self.generator.create_random_topology(num_vms, probability, seed, start_vm_id, default_flavor)
+    
     def create_custom_topology(self, num_vms, default_flavor=None):
         """Crea una topología personalizada"""
         return self.generator.create_custom_topology(num_vms, default_flavor)
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+Asignadores de recursos de red para topologías
+
+Este módulo contiene los asignadores de identificadores que comparten todas
+las operaciones sobre una topología (generadores, gestión de conexiones, etc.).
+"""
+
+VLAN_MIN = 1
+VLAN_MAX = 4094
+INTERNET_VLAN = 10          # VLAN reservada para el acceso a Internet
+DEFAULT_VLAN_START = 100    # Primera VLAN que se asigna a las conexiones
+
+
+class VlanAllocator:
+    """
+    Asignador de IDs de VLAN basado en un mapa de bits
+
+    Mantiene un bytearray con una posición por VLAN (1-4094) y un cursor con la
+    menor VLAN que puede estar libre, de modo que cada asignación es O(1)
+    amortizado y la búsqueda del siguiente hueco se hace en C con find().
+    """
+
+    def __init__(self, start=DEFAULT_VLAN_START, reserved=((INTERNET_VLAN, INTERNET_VLAN),)):
+        """
+        Args:
+            start: Primera VLAN que se entrega al asignar automáticamente
+            reserved: Rangos (inicio, fin) inclusivos que nunca se asignan
+        """
+        self._used = bytearray(VLAN_MAX + 1)
+        self._used[0] = 1  # La VLAN 0 no es válida
+        self._reserved = bytearray(VLAN_MAX + 1)
+        self._start = start
+        self._cursor = start
+        self._count = 0
+
+        for first, last in reserved:
+            self.reserve_range(first, last)
+
+    @staticmethod
+    def is_valid(vlan_id):
+        """Indica si el ID está dentro del rango de VLANs válido"""
+        return isinstance(vlan_id, int) and VLAN_MIN <= vlan_id <= VLAN_MAX
+
+    def reserve_range(self, first, last=None):
+        """Reserva un rango de VLANs para que no se asigne automáticamente"""
+        last = first if last is None else last
+        for vlan_id in range(max(first, VLAN_MIN), min(last, VLAN_MAX) + 1):
+            self._reserved[vlan_id] = 1
+            self.mark_used(vlan_id)
+
+    def is_reserved(self, vlan_id):
+        """Indica si la VLAN pertenece a un rango reservado"""
+        return self.is_valid(vlan_id) and bool(self._reserved[vlan_id])
+
+    def is_used(self, vlan_id):
+        """Indica si la VLAN está en uso (o reservada)"""
+        return self.is_valid(vlan_id) and bool(self._used[vlan_id])
+
+    def mark_used(self, vlan_id):
+        """
+        Marca una VLAN concreta como usada
+
+        Returns:
+            True si el ID es válido, False en caso contrario
+        """
+        if not (isinstance(vlan_id, int) and VLAN_MIN <= vlan_id <= VLAN_MAX):
+            return False
+        if not self._used[vlan_id]:
+            self._used[vlan_id] = 1
+            self._count += 1
+        return True
+
+    def allocate(self):
+        """
+        Asigna la menor VLAN libre a partir de la VLAN inicial
+
+        Returns:
+            El ID de VLAN asignado o None si no quedan VLANs disponibles
+        """
+        vlan_id = self._used.find(0, self._cursor)
+        if vlan_id == -1:
+            self._cursor = VLAN_MAX + 1
+            return None
+
+        self._used[vlan_id] = 1
+        self._count += 1
+        self._cursor = vlan_id + 1
+        return vlan_id
+
+    def release(self, vlan_id):
+        """Libera una VLAN para que pueda volver a asignarse"""
+        if not self.is_valid(vlan_id) or self._reserved[vlan_id] or not self._used[vlan_id]:
+            return
+        self._used[vlan_id] = 0
+        self._count -= 1
+        if self._start <= vlan_id < self._cursor:
+            self._cursor = vlan_id
+
+    def free_count(self):
+        """Número de VLANs que aún pueden asignarse automáticamente"""
+        return self._used.count(0, self._start)
+
+    def used_count(self):
+        """Número de VLANs en uso (incluye las reservadas)"""
+        return self._count
+
+
+DEFAULT_MAC_PREFIX = "52:54:00"  # Prefijo OUI de QEMU/KVM
+
+
+class MacAllocator:
+    """
+    Asignador determinista de direcciones MAC sin colisiones
+
+    Las MACs se forman con un prefijo fijo y un sufijo que ocupa el resto de los
+    48 bits (24 bits con el prefijo por defecto). Se mantiene un índice (set) con
+    las MACs en uso y otro con la MAC asignada a cada clave (p. ej. el nombre de
+    la VM), por lo que asignar o validar una MAC es O(1).
+    """
+
+    def __init__(self, prefix=DEFAULT_MAC_PREFIX):
+        octets = prefix.split(":")
+        if not 1 <= len(octets) <= 5:
+            raise ValueError(f"Prefijo MAC inválido: {prefix}")
+
+        self.prefix = prefix.lower()
+        self._suffix_bits = 8 * (6 - len(octets))
+        self._suffix_space = 1 << self._suffix_bits
+        self._prefix_value = int("".join(octets), 16) << self._suffix_bits
+        self._used = set()
+        self._by_key = {}
+        self._cursor = 1
+        self._in_prefix = 0  # MACs en uso que pertenecen al prefijo
+
+    def _owns(self, value):
+        """Indica si la MAC (entero) pertenece al prefijo del asignador"""
+        return value >> self._suffix_bits == self._prefix_value >> self._suffix_bits
+
+    @staticmethod
+    def parse(mac):
+        """Convierte una MAC "aa:bb:cc:dd:ee:ff" a entero (None si es inválida)"""
+        if not isinstance(mac, str):
+            return None
+        if len(mac) == 17 and mac.count(":") == 5 and mac[2::3] == ":::::":
+            # Formato habitual "aa:bb:cc:dd:ee:ff"
+            try:
+                return int(mac.replace(":", ""), 16)
+            except ValueError:
+                return None
+        octets = mac.replace("-", ":").split(":")
+        if len(octets) != 6 or any(len(octet) != 2 for octet in octets):
+            return None
+        try:
+            return int("".join(octets), 16)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def format(value):
+        """Convierte un entero de 48 bits a una MAC "aa:bb:cc:dd:ee:ff" """
+        raw = f"{value:012x}"
+        return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+    def register(self, mac, key=None):
+        """
+        Registra una MAC ya existente (p. ej. al importar una topología)
+
+        Returns:
+            True si la MAC es válida y no la usa otra clave, False en caso contrario
+        """
+        value = self.parse(mac)
+        if value is None:
+            return False
+        if value in self._used:
+            # La MAC ya se asignó a esta misma clave con allocate()
+            return key is not None and self._by_key.get(key) == value
+        self._used.add(value)
+        self._in_prefix += self._owns(value)
+        if key is not None:
+            self._by_key[key] = value
+        return True
+
+    def is_used(self, mac):
+        """Indica si la MAC ya está asignada"""
+        return self.parse(mac) in self._used
+
+    def allocate(self, key=None, hint=None):
+        """
+        Asigna una MAC libre
+
+        Args:
+            key: Identificador del dueño; si ya tiene MAC se devuelve la misma
+            hint: Sufijo preferido (p. ej. el número de la VM); si está ocupado
+                  se usa el siguiente libre
+
+        Returns:
+            La MAC asignada o None si se agotó el espacio de sufijos
+        """
+        if key is not None and key in self._by_key:
+            return self.format(self._by_key[key])
+
+        if self._in_prefix >= self._suffix_space - 1:
+            return None
+
+        suffix = (hint if hint is not None else self._cursor) % self._suffix_space
+        for _ in range(self._suffix_space):
+            # El sufijo 0 no se usa para no generar la MAC del propio prefijo
+            if suffix and (self._prefix_value | suffix) not in self._used:
+                break
+            suffix = (suffix + 1) % self._suffix_space
+        else:
+            return None
+
+        value = self._prefix_value | suffix
+        self._used.add(value)
+        self._in_prefix += 1
+        if key is not None:
+            self._by_key[key] = value
+        if hint is None:
+            self._cursor = suffix + 1
+        return self.format(value)
+
+    def release(self, mac, key=None):
+        """Libera una MAC para que pueda volver a asignarse"""
+        value = self.parse(mac)
+        if value in self._used:
+            self._used.remove(value)
+            self._in_prefix -= self._owns(value)
+        if key is not None:
+            self._by_key.pop(key, None)
+
+
+VNC_PORT_MIN = 1
+VNC_PORT_MAX = 5899  # create_vm.sh suma 5900 a los puertos menores que 5900
+
+
+class VncPortAllocator:
+    """
+    Asignador de puertos VNC únicos por worker
+    
+    Cada worker tiene su propio índice de puertos en uso (puerto -> dueño) y un
+    cursor con el menor puerto que puede estar libre, por lo que dos VMs del
+    mismo worker nunca comparten puerto.
+    """
+
+    def __init__(self, first=VNC_PORT_MIN, last=VNC_PORT_MAX):
+        self._first = first
+        self._last = last
+        self._used = {}      # worker -> {puerto: dueño}
+        self._cursor = {}    # worker -> menor puerto que puede estar libre
+
+    def register(self, worker, port, key=None):
+        """
+        Registra un puerto ya asignado (p. ej. al importar una topología)
+        
+        Returns:
+            True si ninguna otra clave usa el puerto en ese worker, False en caso contrario
+        """
+        used = self._used.setdefault(worker, {})
+        if port in used:
+            return key is not None and used[port] == key
+        used[port] = key
+        return True
+
+    def is_used(self, worker, port):
+        """Indica si el puerto ya está asignado en el worker"""
+        return port in self._used.get(worker, ())
+
+    def allocate(self, worker, key=None):
+        """
+        Asigna el menor puerto libre del worker
+        
+        Returns:
+            El puerto asignado o None si el worker no tiene puertos libres
+        """
+        used = self._used.setdefault(worker, {})
+        port = self._cursor.get(worker, self._first)
+        while port in used:
+            port += 1
+        if port > self._last:
+            return None
+        
+        used[port] = key
+        self._cursor[worker] = port + 1
+        return port
+
+    def release(self, worker, port):
+        """Libera un puerto del worker para que pueda volver a asignarse"""
+        used = self._used.get(worker)
+        if used is None or port not in used:
+            return
+        del used[port]
+        if self._first <= port < self._cursor.get(worker, self._first):
+            self._cursor[worker] = port
+
+    def used_count(self, worker):
+        """Número de puertos en uso en el worker"""
+        return len(self._used.get(worker, ()))
@@ -0,0 +1,353 @@
+"""
+Constructor de topologías por lotes
+
+Este módulo permite crear topologías completas a partir de una especificación
+declarativa, sin solicitar datos al usuario. Los flavors se resuelven una sola
+vez por nombre, las VMs se crean en bloque y las VLANs de todos los enlaces se
+comprueban antes de modificar la topología.
+
+Ejemplo de especificación:
+
+    {
+        "name": "laboratorio",
+        "shape": "ring",                  # forma de shapes.SHAPES o custom
+        "shape_args": {},                 # parámetros de la forma (p. ej. {"k": 4})
+        "num_vms": 100,                   # opcional en torus y fat_tree
+        "flavor": "small",                # flavor por defecto
+        "flavors": {"vm1": "large"},      # flavor por VM (nombre o índice)
+        "workers": [1, 2, 3],             # workers utilizables (por defecto todos)
+        "placement": {"vm2": 3},          # worker fijo por VM (nombre o índice)
+        "strategy": "spread",             # ubicación: spread, ffd, best_fit o locality
+        "links": [(0, 5), ("vm3", "vm7")],  # enlaces (custom) o adicionales
+        "internet": "all",                # "all", lista de VMs o False
+        "start_vm_id": None,              # por defecto, el siguiente libre
+        "append": False                   # True: agregar a la topología actual
+    }
+"""
+
+from .models import Topology, Connection
+from .shapes import SHAPES, SHAPE_SIZES
+from .flavor_manager import get_flavor_data
+from .placement import VmPlacer, SPREAD
+
+
+class TopologyBuilder:
+    """Clase para construir topologías a partir de una especificación"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.last_placement = None  # Resultado de la última ubicación (headroom y cross_links)
+
+    def build(self, spec):
+        """
+        Construye una topología completa a partir de una especificación
+
+        Si spec["append"] es falso se reemplaza la topología actual del
+        administrador por una nueva.
+
+        Args:
+            spec: Diccionario con la especificación (ver la cabecera del módulo)
+
+        Returns:
+            La topología construida o None si la especificación es inválida
+        """
+        append = spec.get("append", False)
+        topology = self.manager.topology if append else Topology()
+        if not append and spec.get("name"):
+            topology.name = spec["name"]
+
+        new_vms = self.add_shape(
+            spec.get("shape", "custom"),
+            spec.get("num_vms"),
+            start_vm_id=spec.get("start_vm_id"),
+            flavor=spec.get("flavor"),
+            flavors=spec.get("flavors"),
+            links=spec.get("links"),
+            workers=spec.get("workers"),
+            placement=spec.get("placement"),
+            strategy=spec.get("strategy", SPREAD),
+            shape_args=spec.get("shape_args"),
+            topology=topology
+        )
+        if new_vms is None:
+            return None
+
+        internet_vms = self._resolve_vm_list(spec.get("internet", False), new_vms, topology)
+        if internet_vms is None:
+            return None
+
+        if internet_vms:
+            known = set(topology.vm_internet_access)
+            topology.vm_internet_access.extend(name for name in internet_vms if name not in known)
+        topology.settings["enable_internet"] = bool(topology.vm_internet_access)
+
+        if not append:
+            self.manager.topology = topology
+            self.manager.io.current_topology_file = None
+
+        return topology
+
+    def add_shape(self, shape, num_vms, start_vm_id=None, flavor=None, flavors=None,
+                  links=None, workers=None, placement=None, strategy=SPREAD, shape_args=None,
+                  topology=None):
+        """
+        Agrega un bloque de VMs conectadas según una forma de topología
+
+        Args:
+            shape: Nombre de la forma (clave de shapes.SHAPES o "custom")
+            num_vms: Número de VMs a crear (None para deducirlo de shape_args)
+            start_vm_id: ID inicial para las VMs (opcional)
+            flavor: Flavor por defecto para todas las VMs
+            flavors: Flavor por VM, indexado por nombre o por índice (opcional)
+            links: Enlaces adicionales como pares de nombres o índices (opcional)
+            workers: Índices de los workers utilizables (opcional, por defecto todos)
+            placement: Worker fijo por VM, indexado por nombre o índice (opcional)
+            strategy: Estrategia de ubicación ("spread", "ffd", "best_fit" o "locality")
+            shape_args: Parámetros de la forma, p. ej. {"dims": (4, 4)} (opcional)
+            topology: Topología destino (por defecto la del administrador)
+
+        Returns:
+            Lista de los nombres de las VMs creadas o None si hubo un error
+        """
+        topology = topology if topology is not None else self.manager.topology
+
+        if shape != "custom" and shape not in SHAPES:
+            print(f"Error: Forma de topología desconocida: {shape}")
+            return None
+
+        shape_args = shape_args or {}
+        edges_fn, min_vms = SHAPES.get(shape, (None, 1))
+        if num_vms is None and shape in SHAPE_SIZES:
+            try:
+                num_vms = SHAPE_SIZES[shape](**shape_args)
+            except (TypeError, ValueError) as e:
+                print(f"Error: Parámetros inválidos para la topología '{shape}': {e}")
+                return None
+        num_vms = num_vms or 0
+        if num_vms < min_vms:
+            print(f"Error: La topología '{shape}' requiere al menos {min_vms} VMs.")
+            return None
+
+        if start_vm_id is None:
+            start_vm_id = topology.get_next_vm_id()
+        names = [f"vm{start_vm_id + i}" for i in range(num_vms)]
+
+        duplicated = [name for name in names if topology.has_vm(name)]
+        if duplicated:
+            print(f"Error: Ya existen VMs con los nombres: {', '.join(duplicated)}")
+            return None
+
+        vm_flavors = self._resolve_flavors(names, flavor, flavors)
+        if vm_flavors is None:
+            return None
+
+        # Enlaces de la forma más los indicados explícitamente, sin duplicados
+        try:
+            edges = edges_fn(num_vms, **shape_args) if edges_fn else []
+        except (TypeError, ValueError) as e:
+            print(f"Error: Parámetros inválidos para la topología '{shape}': {e}")
+            return None
+        pairs = [(names[i], names[j]) for i, j in edges]
+        new_names = set(names)
+        for link in links or ():
+            pair = self._resolve_link(link, names, new_names, topology)
+            if pair is None:
+                return None
+            pairs.append(pair)
+        pairs = self._unique_pairs(pairs, topology)
+
+        vm_workers = self._place_vms(names, vm_flavors, workers, placement, strategy, pairs, topology)
+        if vm_workers is None:
+            return None
+
+        if topology.vlan_allocator.free_count() < len(pairs):
+            print(f"Error: Se necesitan {len(pairs)} VLANs y solo quedan "
+                  f"{topology.vlan_allocator.free_count()} disponibles.")
+            return None
+
+        # Reservar MACs y puertos VNC antes de crear ninguna VM
+        addresses = self._allocate_addresses(names, vm_workers, topology)
+        if addresses is None:
+            return None
+
+        # Crear las VMs
+        for i, name in enumerate(names):
+            mac, vnc_port = addresses[i]
+            topology.add_vm({
+                "name": name,
+                "worker": vm_workers[i],
+                "vnc_port": vnc_port,
+                "mac": mac,
+                "flavor": vm_flavors[i]
+            })
+
+        # Crear las conexiones en ambas direcciones con una VLAN por enlace
+        for vm_a, vm_b in pairs:
+            vlan_id = topology.allocate_vlan()
+            topology.add_connection(Connection(vm_a, vm_b, vlan_id))
+            topology.add_connection(Connection(vm_b, vm_a, vlan_id))
+
+        return names
+
+    @staticmethod
+    def _allocate_addresses(names, vm_workers, topology):
+        """
+        Reserva una MAC y un puerto VNC para cada VM
+
+        Si se agota alguno se liberan los ya reservados, de modo que la
+        topología queda como estaba.
+
+        Returns:
+            Lista de tuplas (mac, puerto VNC) o None si no hay suficientes
+        """
+        addresses = []
+        error = None
+        for i, name in enumerate(names):
+            mac = topology.allocate_mac(name)
+            if mac is None:
+                error = "Error: Se ha agotado el espacio de direcciones MAC."
+                break
+            vnc_port = topology.allocate_vnc_port(vm_workers[i], name)
+            if vnc_port is None:
+                topology.mac_allocator.release(mac, key=name)
+                error = f"Error: El worker {vm_workers[i]} no tiene puertos VNC libres."
+                break
+            addresses.append((mac, vnc_port))
+
+        if error is None:
+            return addresses
+
+        for (mac, vnc_port), name, worker in zip(addresses, names, vm_workers):
+            topology.mac_allocator.release(mac, key=name)
+            topology.vnc_allocator.release(worker, vnc_port)
+        print(error)
+        return None
+
+    @staticmethod
+    def _lookup(mapping, index, name):
+        """Busca un valor por nombre de VM o por índice"""
+        if name in mapping:
+            return mapping[name]
+        return mapping.get(index)
+
+    def _resolve_flavors(self, names, flavor, flavors):
+        """
+        Resuelve el flavor de cada VM leyendo cada flavor distinto una sola vez
+
+        Returns:
+            Lista con los datos del flavor de cada VM o None si falta alguno
+        """
+        flavors = flavors or {}
+        resolved = {}
+        vm_flavors = []
+        for i, name in enumerate(names):
+            flavor_name = self._lookup(flavors, i, name) or flavor
+            if not flavor_name:
+                print(f"Error: No se ha indicado un flavor para {name}.")
+                return None
+
+            if flavor_name not in resolved:
+                resolved[flavor_name] = get_flavor_data(flavor_name)
+                if resolved[flavor_name] is None:
+                    print(f"Error: El flavor '{flavor_name}' no existe.")
+                    return None
+            vm_flavors.append(resolved[flavor_name])
+
+        return vm_flavors
+
+    def _place_vms(self, names, vm_flavors, workers, placement, strategy, pairs, topology):
+        """
+        Decide el worker de cada VM según su flavor, la capacidad de los workers
+        y, con la estrategia "locality", los enlaces entre VMs
+
+        Returns:
+            Lista con el worker de cada VM o None si alguna no cabe
+        """
+        fixed = {}
+        for i, name in enumerate(names):
+            worker = self._lookup(placement or {}, i, name)
+            if worker is not None:
+                fixed[name] = worker
+
+        try:
+            placer = VmPlacer(topology, workers)
+            result = placer.place(list(zip(names, vm_flavors)), strategy, fixed, pairs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+
+        self.last_placement = result
+        if result["unplaced"]:
+            unplaced = ", ".join(result["unplaced"][:5])
+            if len(result["unplaced"]) > 5:
+                unplaced += ", ..."
+            print(f"Error: No hay capacidad suficiente en los workers para {len(result['unplaced'])} "
+                  f"VMs ({unplaced}).")
+            return None
+
+        placements = result["placements"]
+        return [placements[name] for name in names]
+
+    @staticmethod
+    def _resolve_name(ref, names, new_names, topology):
+        """Convierte un índice del bloque o un nombre de VM en el nombre de la VM"""
+        if isinstance(ref, int):
+            return names[ref] if 0 <= ref < len(names) else None
+        if ref in new_names or topology.has_vm(ref):
+            return ref
+        return None
+
+    def _resolve_link(self, link, names, new_names, topology):
+        """Convierte un enlace (índices o nombres) en un par de nombres de VM"""
+        try:
+            ref_a, ref_b = link
+        except (TypeError, ValueError):
+            print(f"Error: Enlace inválido: {link}")
+            return None
+
+        vm_a = self._resolve_name(ref_a, names, new_names, topology)
+        vm_b = self._resolve_name(ref_b, names, new_names, topology)
+        if vm_a is None or vm_b is None:
+            print(f"Error: El enlace {ref_a} <-> {ref_b} hace referencia a una VM inexistente.")
+            return None
+        return vm_a, vm_b
+
+    @staticmethod
+    def _unique_pairs(pairs, topology):
+        """Elimina bucles, enlaces repetidos y enlaces que ya existen en la topología"""
+        seen = set()
+        unique = []
+        for vm_a, vm_b in pairs:
+            key = (vm_a, vm_b) if vm_a < vm_b else (vm_b, vm_a)
+            if vm_a == vm_b or key in seen or topology.has_connection(vm_a, vm_b):
+                continue
+            seen.add(key)
+            unique.append((vm_a, vm_b))
+        return unique
+
+    def _resolve_vm_list(self, selection, names, topology):
+        """
+        Resuelve la selección de VMs con acceso a Internet
+
+        Args:
+            selection: "all"/True, False/None o lista de nombres o índices
+            names: Nombres de las VMs creadas (los índices se refieren a ellas)
+            topology: Topología en la que se buscan las VMs por nombre
+
+        Returns:
+            Lista de nombres de VM o None si alguna referencia es inválida
+        """
+        if not selection:
+            return []
+        if selection is True or selection == "all":
+            return list(names)
+
+        new_names = set(names)
+        selected = []
+        for ref in selection:
+            name = self._resolve_name(ref, names, new_names, topology)
+            if name is None:
+                print(f"Error: La VM '{ref}' no existe.")
+                return None
+            selected.append(name)
+        return selected
@@ -61,37 +61,25 @@ def add_connection(topology, from_vm=None, to_vm=None, bidirectional=True, vlan_
             to_vm = topology.vms[to_idx]['name']
         
         # Verificar que las VMs existan
-        from_vm_exists = False
-        to_vm_exists = False
-        for vm in topology.vms:
-            if vm['name'] == from_vm:
-                from_vm_exists = True
-            if vm['name'] == to_vm:
-                to_vm_exists = True
-        
-        if not from_vm_exists:
+        if not topology.has_vm(from_vm):
             print(f"Error: La VM de origen '{from_vm}' no existe.")
             return False
         
-        if not to_vm_exists:
+        if not topology.has_vm(to_vm):
             print(f"Error: La VM de destino '{to_vm}' no existe.")
             return False
         
         # Verificar que la conexión no exista ya
-        for conn in topology.connections:
-            if conn['from'] == from_vm and conn['to'] == to_vm:
-                print(f"La conexión {from_vm} -> {to_vm} ya existe.")
-                return False
+        if topology.has_connection(from_vm, to_vm):
+            print(f"La conexión {from_vm} -> {to_vm} ya existe.")
+            return False
         
         # Si no se proporcionó un ID de VLAN, generarlo automáticamente
         if vlan_id is None:
-            # Encontrar el próximo ID de VLAN disponible
-            used_vlans = [conn.get('vlan_id') for conn in topology.connections if 'vlan_id' in conn]
-            vlan_id = 100  # VLAN inicial
-            while vlan_id in used_vlans and vlan_id <= 4094:  # 4094 es el máximo ID de VLAN
-                vlan_id += 1
+            # Obtener el próximo ID de VLAN disponible del asignador de la topología
+            vlan_id = topology.allocate_vlan()
             
-            if vlan_id > 4094:
+            if vlan_id is None:
                 print("Error: Se ha alcanzado el límite de VLANs disponibles.")
                 return False
         else:
@@ -104,6 +92,10 @@ def add_connection(topology, from_vm=None, to_vm=None, bidirectional=True, vlan_
             except ValueError:
                 print("Error: El ID de VLAN debe ser un número entero.")
                 return False
+            
+            if topology.vlan_allocator.is_reserved(vlan_id):
+                print(f"Error: La VLAN {vlan_id} está reservada.")
+                return False
         
         # Agregar la conexión
         topology.add_connection({
@@ -117,10 +109,9 @@ def add_connection(topology, from_vm=None, to_vm=None, bidirectional=True, vlan_
         # Agregar la conexión inversa si se especificó
         if bidirectional:
             # Verificar que la conexión inversa no exista ya
-            for conn in topology.connections:
-                if conn['from'] == to_vm and conn['to'] == from_vm:
-                    print(f"La conexión inversa {to_vm} -> {from_vm} ya existe.")
-                    return True
+            if topology.has_connection(to_vm, from_vm):
+                print(f"La conexión inversa {to_vm} -> {from_vm} ya existe.")
+                return True
             
             # Agregar la conexión inversa con la misma VLAN
             topology.add_connection({
@@ -173,22 +164,15 @@ def remove_connection(topology, connection_idx=None):
         to_vm = conn_to_remove['to']
         
         # Eliminar la conexión
-        topology.connections.pop(conn_idx)
+        topology.remove_connection_at(conn_idx)
         
         print(f"Conexión {from_vm} -> {to_vm} eliminada con éxito.")
         
-        # Buscar la conexión inversa
-        inverse_idx = None
-        for i, conn in enumerate(topology.connections):
-            if conn['from'] == to_vm and conn['to'] == from_vm:
-                inverse_idx = i
-                break
-        
         # Preguntar si se quiere eliminar también la conexión inversa
-        if inverse_idx is not None:
+        if topology.has_connection(to_vm, from_vm):
             remove_inverse = input("¿Desea eliminar también la conexión inversa? (s/n): ").lower()
             if remove_inverse in ['s', 'si', 'sí', 'y', 'yes']:
-                topology.connections.pop(inverse_idx)
+                topology.remove_connection(to_vm, from_vm)
                 print(f"Conexión inversa {to_vm} -> {from_vm} eliminada con éxito.")
         
         return True
@@ -7,21 +7,44 @@ Este módulo maneja la ejecución de topologías a través de scripts externos.
 import subprocess
 import os
 import time
+from .provisioning import (build_provisioning_plan, ProvisioningEngine,
+                           DEFAULT_MAX_PARALLEL, DEFAULT_PER_NODE_LIMIT)
+from .flows import REPLACE, apply_flows, count_flows
+from .journal import StepJournal, journal_path
+from .reconciler import (deployed_state_path, load_deployed_state, save_deployed_state,
+                         diff_topologies, build_reconcile_plan)
+from .planner import (history_files, load_step_timings, summarize_plan, print_plan_summary,
+                      export_plan, format_seconds)
 
 class TopologyExecutor:
     """Clase para ejecutar topologías"""
     
     def __init__(self, manager):
         self.manager = manager
+        # Parámetros del motor de aprovisionamiento
+        self.transport = None  # None: transporte compartido del administrador
+        self.max_parallel = DEFAULT_MAX_PARALLEL
+        self.per_node_limit = DEFAULT_PER_NODE_LIMIT
+        self.progress = None   # Función llamada al terminar cada tarea (ver ProvisioningEngine)
+        self.last_plan = None
+        self.last_report = None
     
-    def execute_topology(self):
-        """Ejecuta la topología usando el script create_flexible_topology.sh"""
+    def execute_topology(self, use_script=False):
+        """
+        Ejecuta la topología actual
+        
+        Por defecto se usa el motor de aprovisionamiento en paralelo; con
+        use_script=True se ejecuta el script create_flexible_topology.sh.
+        """
         # Verificar que la topología esté guardada
         current_file = self.manager.io.get_current_file()
         if current_file is None:
             print("Debe guardar la topología antes de ejecutarla.")
             return False
         
+        if not use_script:
+            return self.provision_topology()
+        
         # Verificar que el script existe
         script_path = "../scripts/topology/create_flexible_topology.sh"
         if not os.path.exists(script_path):
@@ -64,6 +87,176 @@ class TopologyExecutor:
             print(f"Error al ejecutar la topología: {e}")
             return False
     
+    def build_plan(self, full=False):
+        """
+        Construye el plan que desplegaría la topología actual
+        
+        Si existe el estado desplegado de la topología el plan solo contiene
+        los cambios respecto a ese estado (sin fases si no hay cambios).
+        
+        Args:
+            full: Desplegar la topología completa aunque exista un estado desplegado
+        
+        Returns:
+            ProvisioningPlan o None si no se pudo construir
+        """
+        topology = self.manager.topology
+        current_file = self.manager.io.get_current_file()
+        state_path = deployed_state_path(current_file) if current_file else None
+        deployed = None if full or state_path is None else load_deployed_state(state_path)
+        
+        try:
+            if deployed is not None:
+                changes = diff_topologies(deployed, topology)
+                if changes.requires_full:
+                    print(f"\n{changes.full_reason} Se desplegará la topología completa.")
+                    deployed = None
+            
+            if deployed is None:
+                return build_provisioning_plan(topology)
+            changes.print_summary()
+            return build_reconcile_plan(deployed, topology, changes)
+        except ValueError as e:
+            print(f"Error al construir el plan de aprovisionamiento: {e}")
+            return None
+    
+    def plan_topology(self, full=False, output=None):
+        """
+        Muestra lo que haría la ejecución de la topología actual sin ejecutarla
+        
+        Compila la topología en la lista de operaciones remotas, imprime un
+        resumen con la estimación de tiempo (según el historial de ejecuciones
+        anteriores) y opcionalmente exporta el plan a JSON. No se conecta a
+        ningún nodo.
+        
+        Args:
+            full: Planificar el despliegue completo aunque exista un estado desplegado
+            output: Ruta del archivo JSON donde exportar el plan (opcional)
+        
+        Returns:
+            Diccionario con el resumen del plan o None si no se pudo construir
+        """
+        plan = self.build_plan(full)
+        if plan is None:
+            return None
+        
+        timings = load_step_timings(history_files(self.manager.io.get_current_file()))
+        summary = summarize_plan(plan, timings, self.max_parallel, self.per_node_limit)
+        print_plan_summary(summary)
+        
+        if output:
+            if not export_plan(plan, summary, output, timings):
+                return None
+            print(f"Plan exportado a {output}")
+        return summary
+    
+    def provision_topology(self, confirm=True, full=False, resume=True):
+        """
+        Despliega la topología actual con el motor de aprovisionamiento
+        
+        Si la topología ya se desplegó antes (existe su estado desplegado) solo
+        se aplican los cambios respecto a ese estado.
+        
+        Args:
+            confirm: Pedir confirmación al usuario antes de ejecutar
+            full: Desplegar la topología completa aunque exista un estado desplegado
+            resume: Si la aplicación anterior falló, omitir los pasos que ya
+                    terminaron (según el diario de pasos)
+        
+        Returns:
+            True si todos los pasos terminaron con éxito, False en caso contrario
+        """
+        topology = self.manager.topology
+        current_file = self.manager.io.get_current_file()
+        state_path = deployed_state_path(current_file) if current_file else None
+        plan = self.build_plan(full)
+        if plan is None:
+            return False
+        if not plan.phases:
+            print("\nLa topología desplegada ya está actualizada.")
+            return True
+        
+        steps = plan.steps()
+        summary = summarize_plan(plan, load_step_timings(history_files(current_file)),
+                                 self.max_parallel, self.per_node_limit)
+        print(f"\nPlan de aprovisionamiento: {len(plan.phases)} fases, {len(steps)} pasos "
+              f"({self.max_parallel} en paralelo, máximo {self.per_node_limit} por nodo)")
+        print(f"Tiempo estimado: {format_seconds(summary['estimate']['wall_time'])}")
+        
+        if confirm:
+            result = input("¿Desea ejecutar ahora la topología? (s/n): ")
+            if result.lower() != 's':
+                print("\nEjecución cancelada.")
+                return False
+        
+        journal = None
+        if current_file:
+            journal = StepJournal(journal_path(current_file))
+            if journal.pending_resume():
+                if resume:
+                    print(f"Reanudando la ejecución anterior: {len(journal.completed_keys())} pasos "
+                          "ya completados se omitirán.")
+                else:
+                    journal.complete()
+        
+        engine = ProvisioningEngine(
+            self.transport or self.manager.get_transport(),
+            max_parallel=self.max_parallel,
+            per_node_limit=self.per_node_limit,
+            progress=self.progress
+        )
+        self.last_plan = plan
+        try:
+            self.last_report = engine.run(plan, journal)
+        finally:
+            if journal is not None:
+                journal.close()
+        self.last_report.print_summary()
+        
+        if not self.last_report.success:
+            print("\nError al ejecutar la topología.")
+            return False
+        
+        if state_path is not None:
+            save_deployed_state(topology, state_path)
+        print("\nTopología ejecutada con éxito.")
+        if confirm:
+            # Ofrecer conexión SSH a las VMs con acceso a internet
+            self.offer_ssh_connection()
+        return True
+    
+    def apply_flows(self, mode=REPLACE, dry_run=False, output=None):
+        """
+        Instala solo las reglas de flujo de la topología actual en el nodo OFS
+        
+        Args:
+            mode: "replace" para sustituir la tabla actual o "add" para agregar
+            dry_run: Generar el archivo de flujos sin aplicarlo
+            output: Ruta donde guardar el archivo de flujos (opcional)
+        
+        Returns:
+            True si las reglas se aplicaron (o generaron) con éxito
+        """
+        ofs_node = self.manager.topology.nodes.get("ofs_node")
+        try:
+            result = apply_flows(self.manager.topology, self.transport or self.manager.get_transport(),
+                                 ofs_node, mode=mode, dry_run=dry_run, output=output)
+        except (ValueError, OSError) as e:
+            print(f"Error al aplicar las reglas de flujo: {e}")
+            return False
+        
+        if dry_run:
+            print(f"Archivo de flujos generado: {count_flows(result.stdout)} reglas")
+            print(result.stderr)
+            if output:
+                print(f"Guardado en {output}")
+            return True
+        if not result.ok:
+            print(f"Error al aplicar las reglas de flujo en {ofs_node}: {result.stderr.strip()}")
+            return False
+        print(f"Reglas de flujo aplicadas en {ofs_node}.")
+        return True
+    
     def offer_ssh_connection(self):
         """Ofrece opciones para conectarse por SSH a las VMs con acceso a internet"""
         # Verificar si hay VMs con acceso a internet
@@ -77,11 +270,7 @@ class TopologyExecutor:
         
         for i, vm_name in enumerate(vms_with_internet):
             # Buscar la VM en la topología
-            vm = None
-            for v in self.manager.topology.vms:
-                if v["name"] == vm_name:
-                    vm = v
-                    break
+            vm = self.manager.topology.get_vm_by_name(vm_name)
             
             if vm:
                 worker_id = vm.get("worker", "N/A")
@@ -113,11 +302,7 @@ class TopologyExecutor:
     def connect_ssh_to_vm(self, vm_name):
         """Intenta establecer una conexión SSH a una VM específica"""
         # Buscar la información de la VM
-        vm = None
-        for v in self.manager.topology.vms:
-            if v["name"] == vm_name:
-                vm = v
-                break
+        vm = self.manager.topology.get_vm_by_name(vm_name)
         
         if not vm:
             print(f"Error: No se encontró la VM {vm_name}")
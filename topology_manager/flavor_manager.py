@@ -3,6 +3,7 @@ import json
 import urllib.request
 from pathlib import Path
 from .utils import print_header
+from .models import intern_flavor
 
 FLAVORS_DIR = "flavors"
 IMAGES_DIR = "images"
@@ -10,6 +11,9 @@ DEFAULT_IMAGE_NAME = "cirros.img"
 DEFAULT_IMAGE_PATH = os.path.join(IMAGES_DIR, DEFAULT_IMAGE_NAME)
 IMAGE_URL = "https://download.cirros-cloud.net/0.5.1/cirros-0.5.1-x86_64-disk.img"
 
+# Caché de flavors leídos: nombre -> (mtime del archivo, datos compartidos)
+_flavor_cache = {}
+
 def ensure_flavors_dir():
     os.makedirs(FLAVORS_DIR, exist_ok=True)
 
@@ -34,16 +38,33 @@ def list_flavors():
     return [f.stem for f in flavor_files]
 
 def get_flavor_data(flavor_name):
+    """
+    Obtiene los datos de un flavor
+    
+    Devuelve una instancia compartida (no modificar en el lugar); el archivo
+    solo se vuelve a leer si cambió desde la última lectura.
+    """
     ensure_flavors_dir()
     flavor_path = os.path.join(FLAVORS_DIR, f"{flavor_name}.json")
-    if not os.path.exists(flavor_path):
+    try:
+        mtime = os.stat(flavor_path).st_mtime_ns
+    except OSError:
+        _flavor_cache.pop(flavor_name, None)
         return None
+    
+    cached = _flavor_cache.get(flavor_name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
     try:
         with open(flavor_path, 'r') as f:
-            return json.load(f)
+            flavor_data = intern_flavor(json.load(f))
     except Exception as e:
         print(f"Error al cargar el flavor {flavor_name}: {e}")
         return None
+    
+    _flavor_cache[flavor_name] = (mtime, flavor_data)
+    return flavor_data
 
 def save_flavor(flavor_data):
     ensure_flavors_dir()
@@ -55,6 +76,7 @@ def save_flavor(flavor_data):
     try:
         with open(flavor_path, 'w') as f:
             json.dump(flavor_data, f, indent=2)
+        _flavor_cache.pop(flavor_name, None)
         return True
     except Exception as e:
         print(f"Error al guardar el flavor {flavor_name}: {e}")
@@ -68,6 +90,7 @@ def delete_flavor(flavor_name):
         return False
     try:
         os.remove(flavor_path)
+        _flavor_cache.pop(flavor_name, None)
         return True
     except Exception as e:
         print(f"Error al eliminar el flavor {flavor_name}: {e}")
@@ -292,6 +315,7 @@ def modify_flavor():
         # Rename the file if name changed
         if name != selected_flavor:
             os.remove(os.path.join(FLAVORS_DIR, f"{selected_flavor}.json"))
+            _flavor_cache.pop(selected_flavor, None)
 
         if save_flavor(new_data):
             print(f"Flavor '{name}' modificado con éxito.")
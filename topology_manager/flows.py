@@ -0,0 +1,159 @@
+"""
+Compilador de reglas de flujo OpenFlow
+
+Este módulo convierte una topología en un único archivo de flujos para el
+bridge del nodo OFS, con las mismas reglas que el paso 8 de
+create_flexible_topology.sh. El archivo se aplica con un solo comando
+ovs-ofctl (add-flows o replace-flows) dentro de un bundle OpenFlow, de modo
+que todas las reglas se instalan de forma atómica en una única sesión en lugar
+de lanzar un ovs-ofctl add-flow por conexión.
+
+Modos:
+- "replace": replace-flows sustituye la tabla actual por la del archivo (solo
+  modifica las reglas que cambian).
+- "add": add-flows agrega las reglas del archivo a las existentes.
+
+Con dry_run el archivo se genera sin aplicarlo, para revisarlo o probarlo sin
+acceso al nodo OFS.
+"""
+
+from .allocators import MacAllocator
+from .transport import CommandResult
+
+BRIDGE = "br-int"
+ADD = "add"
+REPLACE = "replace"
+FLOW_MODES = (ADD, REPLACE)
+# Los bundles requieren OpenFlow 1.4; las reglas usan campos válidos en todas las versiones
+OPENFLOW_PROTOCOLS = "OpenFlow10,OpenFlow13,OpenFlow14"
+
+
+def vm_vlans(topology):
+    """VLANs de cada VM según sus conexiones (ordenadas y sin duplicados)"""
+    vlans = {vm["name"]: set() for vm in topology.vms}
+    for conn in topology.connections:
+        vlan_id = conn.get("vlan_id")
+        if vlan_id is None:
+            continue
+        for name in (conn["from"], conn["to"]):
+            vlans.setdefault(name, set()).add(vlan_id)
+    return {name: sorted(ids) for name, ids in vlans.items()}
+
+
+def compile_flows(topology, vlans=None):
+    """
+    Genera las líneas del archivo de flujos de una topología
+
+    Las reglas repetidas se emiten una sola vez (replace-flows rechaza los
+    duplicados) y las VMs con MAC inválida se anotan como comentario.
+
+    Args:
+        topology: Topología con las VMs, conexiones y acceso a Internet
+        vlans: VLANs de cada VM (opcional, se calculan si no se indican)
+
+    Returns:
+        Lista de líneas (reglas y comentarios)
+    """
+    vlans = vlans if vlans is not None else vm_vlans(topology)
+    macs = {vm["name"]: vm.get("mac") for vm in topology.vms}
+    seen = set()
+
+    def valid(mac):
+        return MacAllocator.parse(mac) is not None
+
+    lines = [
+        "# Permitir tráfico DHCP (alta prioridad)",
+        "priority=1000,udp,tp_dst=67,actions=normal",
+        "priority=1000,udp,tp_dst=68,actions=normal",
+        "# Permitir ARP (media-alta prioridad pero solo broadcasts)",
+        "priority=900,dl_dst=ff:ff:ff:ff:ff:ff,arp,actions=normal",
+        "# Reglas específicas para las conexiones",
+    ]
+
+    def add(flow):
+        if flow not in seen:
+            seen.add(flow)
+            lines.append(flow)
+
+    for conn in topology.connections:
+        from_vm, to_vm, vlan_id = conn["from"], conn["to"], conn.get("vlan_id")
+        from_mac, to_mac = macs.get(from_vm), macs.get(to_vm)
+        if valid(from_mac) and valid(to_mac):
+            add(f"table=0,priority=500,dl_vlan={vlan_id},dl_src={from_mac},dl_dst={to_mac},actions=normal")
+        else:
+            lines.append(f"# ADVERTENCIA: Dirección MAC inválida para {from_vm} o {to_vm} - Regla omitida")
+
+    if topology.settings.get("enable_internet", False) and topology.vm_internet_access:
+        lines.append("# Acceso a Internet para VMs específicas")
+        for name in topology.vm_internet_access:
+            mac = macs.get(name)
+            if not mac:
+                continue
+            if not valid(mac):
+                lines.append(f"# ADVERTENCIA: Dirección MAC inválida para {name} - Regla de Internet omitida")
+                continue
+            for vlan_id in vlans.get(name, ()):
+                add(f"table=0,priority=300,dl_vlan={vlan_id},dl_src={mac},actions=normal")
+
+    lines.append("# Descartar el resto del tráfico")
+    lines.append("priority=1,actions=drop")
+    return lines
+
+
+def build_flow_file(topology, vlans=None):
+    """Contenido del archivo de flujos de una topología"""
+    return "\n".join(compile_flows(topology, vlans)) + "\n"
+
+
+def count_flows(flow_file):
+    """Número de reglas (líneas que no son comentarios) de un archivo de flujos"""
+    return sum(1 for line in flow_file.splitlines() if line.strip() and not line.lstrip().startswith("#"))
+
+
+def flow_command(mode=REPLACE, bridge=BRIDGE, path="-", sudo=True):
+    """
+    Comando que aplica un archivo de flujos en un bridge
+
+    Args:
+        mode: "replace" (replace-flows) o "add" (add-flows)
+        bridge: Bridge OVS destino
+        path: Ruta del archivo en el nodo ("-" para leerlo de la entrada estándar)
+        sudo: Anteponer sudo a los comandos
+
+    Returns:
+        Cadena de shell con el comando
+    """
+    if mode not in FLOW_MODES:
+        raise ValueError(f"Modo de reglas de flujo desconocido: {mode}")
+    prefix = "sudo " if sudo else ""
+    return (f"{prefix}ovs-vsctl set bridge {bridge} protocols={OPENFLOW_PROTOCOLS} && "
+            f"{prefix}ovs-ofctl --bundle {mode}-flows {bridge} {path}")
+
+
+def apply_flows(topology, transport, node, mode=REPLACE, bridge=BRIDGE, dry_run=False,
+                output=None, timeout=None):
+    """
+    Instala las reglas de flujo de una topología en un nodo con un solo comando
+
+    Args:
+        topology: Topología de la que se generan las reglas
+        transport: Transporte para ejecutar el comando (no se usa con dry_run)
+        node: Nodo OFS
+        mode: "replace" o "add"
+        bridge: Bridge OVS destino
+        dry_run: Solo generar el archivo, sin aplicarlo
+        output: Ruta donde guardar una copia del archivo (opcional)
+        timeout: Tiempo máximo del comando en segundos (opcional)
+
+    Returns:
+        CommandResult del comando; con dry_run, un resultado correcto cuya
+        salida es el contenido del archivo
+    """
+    flow_file = build_flow_file(topology)
+    command = flow_command(mode, bridge)
+    if output:
+        with open(output, "w") as f:
+            f.write(flow_file)
+    if dry_run:
+        return CommandResult(0, flow_file, f"# {command} < archivo de {count_flows(flow_file)} reglas")
+    return transport.run(node, command, stdin=flow_file, timeout=timeout)
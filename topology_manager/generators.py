@@ -2,12 +2,11 @@
 Generadores de topologías
 
 Este módulo contiene las implementaciones para generar diferentes tipos
-de topologías de red (anillo, estrella, lineal, personalizada).
+de topologías de red (anillo, estrella, lineal, malla, árbol, toro, fat-tree,
+aleatoria y personalizada).
 """
 
-from .utils import generate_mac
-from .models import VM, Connection
-from .flavor_manager import select_flavor, get_flavor_data
+from .shapes import SHAPE_SIZES
 
 class TopologyGenerator:
     """Clase para generar diferentes tipos de topologías"""
@@ -15,74 +14,75 @@ class TopologyGenerator:
     def __init__(self, manager):
         self.manager = manager
     
-    def create_ring_topology(self, num_vms, start_vm_id=None, default_flavor=None):
+    def _connect_vms(self, vm_a, vm_b):
         """
-        Crea una topología en anillo con el número especificado de VMs
-        Retorna una lista de los nombres de las VMs creadas
+        Conecta dos VMs en ambas direcciones con una VLAN nueva del asignador
+        
+        Returns:
+            El ID de VLAN asignado o None si no quedan VLANs disponibles
+        """
+        topology = self.manager.topology
+        vlan_id = topology.allocate_vlan()
+        if vlan_id is None:
+            print("Error: Se ha alcanzado el límite de VLANs disponibles.")
+            return None
+        
+        topology.add_connection({
+            "from": vm_a,
+            "to": vm_b,
+            "vlan_id": vlan_id
+        })
+        
+        topology.add_connection({
+            "from": vm_b,
+            "to": vm_a,
+            "vlan_id": vlan_id
+        })
+        
+        return vlan_id
+    
+    def _create_shape(self, shape, num_vms, start_vm_id=None, default_flavor=None, **shape_args):
+        """
+        Crea un bloque de VMs con la forma indicada mediante el constructor por lotes
+        
+        Si no se proporciona un flavor por defecto se solicita uno por VM antes
+        de crear nada.
+        
+        Returns:
+            Lista de los nombres de las VMs creadas
         """
+        from .ui import ask_vm_flavors
+        
+        if num_vms is None:
+            try:
+                num_vms = SHAPE_SIZES[shape](**shape_args)
+            except (TypeError, ValueError) as e:
+                print(f"Error: Parámetros inválidos para la topología '{shape}': {e}")
+                return []
+        
         if start_vm_id is None:
             start_vm_id = self.manager.topology.get_next_vm_id()
         
-        # Crear las VMs
-        new_vms = []
-        for i in range(num_vms):
-            vm_id = start_vm_id + i
-            vm_name = f"vm{vm_id}"
-            worker_id = (i % 3) + 1  # Distribuir entre los 3 workers
-            vnc_port = (i % 5) + 1   # Máximo 5 puertos VNC por worker
-            mac = generate_mac(worker_id, vm_id)
-            
-            # Seleccionar flavor para esta VM si no se proporcionó uno por defecto
-            vm_flavor = default_flavor
-            if not vm_flavor:
-                print(f"\nSeleccionar flavor para {vm_name}:")
-                vm_flavor = select_flavor()
-
-            # Añadir la VM a la topología
-            vm = {
-                "name": vm_name,
-                "worker": worker_id,
-                "vnc_port": vnc_port,
-                "mac": mac,
-                "flavor": get_flavor_data(vm_flavor)
-            }
-            self.manager.topology.add_vm(vm)
-            new_vms.append(vm_name)
-        
-        # Crear las conexiones del anillo con VLANs únicas
-        vlan_id_base = 100  # VLAN inicial
-        connections_made = set()  # Registro de conexiones (para evitar duplicados)
-        
-        for i in range(num_vms):
-            current_vm = new_vms[i]
-            next_vm = new_vms[(i + 1) % num_vms]
-            
-            # Definir un identificador único para esta conexión (ordenado para bidireccionalidad)
-            conn_pair = tuple(sorted([current_vm, next_vm]))
-            
-            # Si esta conexión ya se ha creado, omitirla
-            if conn_pair in connections_made:
-                continue
-            
-            # Asignar una VLAN única para esta conexión
-            vlan_id = vlan_id_base + len(connections_made)
-            
-            # Conexión en ambas direcciones con la misma VLAN
-            self.manager.topology.add_connection({
-                "from": current_vm,
-                "to": next_vm,
-                "vlan_id": vlan_id
-            })
-            
-            self.manager.topology.add_connection({
-                "from": next_vm,
-                "to": current_vm,
-                "vlan_id": vlan_id
-            })
-            
-            connections_made.add(conn_pair)
+        # Seleccionar flavor para cada VM si no se proporcionó uno por defecto
+        flavors = None
+        if not default_flavor:
+            flavors = ask_vm_flavors([f"vm{start_vm_id + i}" for i in range(num_vms)])
+            if flavors is None:
+                print("Operación cancelada.")
+                return []
         
-        return new_vms
+        new_vms = self.manager.builder.add_shape(
+            shape, num_vms, start_vm_id, flavor=default_flavor, flavors=flavors,
+            shape_args=shape_args
+        )
+        return new_vms or []
+    
+    def create_ring_topology(self, num_vms, start_vm_id=None, default_flavor=None):
+        """
+        Crea una topología en anillo con el número especificado de VMs
+        Retorna una lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("ring", num_vms, start_vm_id, default_flavor)
     
     def create_star_topology(self, num_vms, start_vm_id=None, default_flavor=None):
         """
@@ -100,58 +100,7 @@ class TopologyGenerator:
             print("Una topología en estrella requiere al menos 2 VMs (centro + 1 extremo)")
             return []
         
-        if start_vm_id is None:
-            start_vm_id = self.manager.topology.get_next_vm_id()
-        
-        # Crear las VMs
-        new_vms = []
-        for i in range(num_vms):
-            vm_id = start_vm_id + i
-            vm_name = f"vm{vm_id}"
-            worker_id = (i % 3) + 1  # Distribuir entre los 3 workers
-            vnc_port = (i % 5) + 1   # Máximo 5 puertos VNC por worker
-            mac = generate_mac(worker_id, vm_id)
-         
-            # Seleccionar flavor para esta VM si no se proporcionó uno por defecto
-            vm_flavor = default_flavor
-            if not vm_flavor:
-                print(f"\nSeleccionar flavor para {vm_name}:")
-                vm_flavor = select_flavor()
-            
-            # Añadir la VM a la topología
-            vm = {
-                "name": vm_name,
-                "worker": worker_id,
-                "vnc_port": vnc_port,
-                "mac": mac,
-                "flavor": get_flavor_data(vm_flavor)
-            }
-            self.manager.topology.add_vm(vm)
-            new_vms.append(vm_name)
-        
-        # Crear las conexiones de la estrella con VLANs únicas
-        center_vm = new_vms[0]  # El primer nodo es el centro
-        vlan_id_base = 100  # VLAN inicial
-        
-        # Conexiones desde el centro a cada extremo
-        for i in range(1, num_vms):
-            edge_vm = new_vms[i]
-            vlan_id = vlan_id_base + (i - 1)
-            
-            # Conexión bidireccional entre el centro y el extremo
-            self.manager.topology.add_connection({
-                "from": center_vm,
-                "to": edge_vm,
-                "vlan_id": vlan_id
-            })
-            
-            self.manager.topology.add_connection({
-                "from": edge_vm,
-                "to": center_vm,
-                "vlan_id": vlan_id
-            })
-        
-        return new_vms
+        return self._create_shape("star", num_vms, start_vm_id, default_flavor)
     
     def create_linear_topology(self, num_vms, start_vm_id=None, default_flavor=None):
         """
@@ -165,196 +114,107 @@ class TopologyGenerator:
         Returns:
             Lista de los nombres de las VMs creadas
         """
-        if start_vm_id is None:
-            start_vm_id = self.manager.topology.get_next_vm_id()
+        return self._create_shape("linear", num_vms, start_vm_id, default_flavor)
+
+    def create_mesh_topology(self, num_vms, start_vm_id=None, default_flavor=None):
+        """
+        Crea una malla completa (todas las VMs conectadas entre sí)
+        
+        Returns:
+            Lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("mesh", num_vms, start_vm_id, default_flavor)
+    
+    def create_tree_topology(self, num_vms, arity=2, start_vm_id=None, default_flavor=None):
+        """
+        Crea un árbol k-ario completo con la primera VM como raíz
         
-        # Crear las VMs
-        new_vms = []
-        for i in range(num_vms):
-            vm_id = start_vm_id + i
-            vm_name = f"vm{vm_id}"
-            worker_id = (i % 3) + 1  # Distribuir entre los 3 workers
-            vnc_port = (i % 5) + 1   # Máximo 5 puertos VNC por worker
-            mac = generate_mac(worker_id, vm_id)
-                    
-            # Seleccionar flavor para esta VM si no se proporcionó uno por defecto
-            vm_flavor = default_flavor
-            if not vm_flavor:
-                print(f"\nSeleccionar flavor para {vm_name}:")
-                vm_flavor = select_flavor()
+        Args:
+            num_vms: Número de VMs a crear
+            arity: Número de hijos de cada nodo
+            start_vm_id: ID inicial para las VMs (opcional)
+            default_flavor: Flavor para asignar a todas las VMs (opcional)
             
-            # Añadir la VM a la topología
-            vm = {
-                "name": vm_name,
-                "worker": worker_id,
-                "vnc_port": vnc_port,
-                "mac": mac,
-                "flavor": get_flavor_data(vm_flavor)
-            }
-            self.manager.topology.add_vm(vm)
-            new_vms.append(vm_name)
-        
-        # Crear las conexiones lineales con VLANs únicas
-        vlan_id_base = 100  # VLAN inicial
-        
-        for i in range(num_vms - 1):
-            vlan_id = vlan_id_base + i
+        Returns:
+            Lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("tree", num_vms, start_vm_id, default_flavor, arity=arity)
+    
+    def create_torus_topology(self, dims, start_vm_id=None, default_flavor=None):
+        """
+        Crea un toro 2D o 3D
+        
+        Args:
+            dims: Tamaño de cada dimensión, p. ej. (4, 4) o (3, 3, 3)
+            start_vm_id: ID inicial para las VMs (opcional)
+            default_flavor: Flavor para asignar a todas las VMs (opcional)
             
-            # Conexión bidireccional con el siguiente nodo
-            self.manager.topology.add_connection({
-                "from": new_vms[i],
-                "to": new_vms[i+1],
-                "vlan_id": vlan_id
-            })
+        Returns:
+            Lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("torus", None, start_vm_id, default_flavor, dims=tuple(dims))
+    
+    def create_fat_tree_topology(self, k=4, start_vm_id=None, default_flavor=None):
+        """
+        Crea un fat-tree de k puertos (switches de núcleo, agregación, acceso y hosts)
+        
+        Args:
+            k: Número de puertos de cada switch (par)
+            start_vm_id: ID inicial para las VMs (opcional)
+            default_flavor: Flavor para asignar a todas las VMs (opcional)
             
-            self.manager.topology.add_connection({
-                "from": new_vms[i+1],
-                "to": new_vms[i],
-                "vlan_id": vlan_id
-            })
+        Returns:
+            Lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("fat_tree", None, start_vm_id, default_flavor, k=k)
+    
+    def create_random_topology(self, num_vms, probability=0.1, seed=None, start_vm_id=None, default_flavor=None):
+        """
+        Crea un grafo aleatorio de Erdős–Rényi G(n, p)
         
-        return new_vms
+        Args:
+            num_vms: Número de VMs a crear
+            probability: Probabilidad de que exista cada enlace
+            seed: Semilla para obtener siempre el mismo grafo (opcional)
+            start_vm_id: ID inicial para las VMs (opcional)
+            default_flavor: Flavor para asignar a todas las VMs (opcional)
+            
+        Returns:
+            Lista de los nombres de las VMs creadas
+        """
+        return self._create_shape("random", num_vms, start_vm_id, default_flavor,
+                                  probability=probability, seed=seed)
 
     def create_custom_topology(self, num_vms, default_flavor=None):
         """
         Crea una topología personalizada con conexiones definidas por el usuario
         Retorna una lista de los nombres de las VMs creadas
         """
-        from .utils import get_user_input        
+        from .ui import ask_vm_flavors, ask_custom_links
         
         start_vm_id = self.manager.topology.get_next_vm_id()
-
-        new_vms = []
-        
-        # Crear las VMs
-        for i in range(num_vms):
-            vm_id = start_vm_id + i
-            vm_name = f"vm{vm_id}"
-            worker_id = (i % 3) + 1  # Distribuir entre los 3 workers
-            vnc_port = (i % 5) + 1   # Máximo 5 puertos VNC por worker
-            mac = generate_mac(worker_id, vm_id)
-                    
-            # Seleccionar flavor para esta VM si no se proporcionó uno por defecto
-            vm_flavor = default_flavor
-            if not vm_flavor:
-                print(f"\nSeleccionar flavor para {vm_name}:")
-                vm_flavor = select_flavor()
-            
-            # Añadir la VM a la topología
-            vm = {
-                "name": vm_name,
-                "worker": worker_id,
-                "vnc_port": vnc_port,
-                "mac": mac,
-                "flavor": get_flavor_data(vm_flavor)
-            }
-            self.manager.topology.add_vm(vm)
-            new_vms.append(vm_name)
-            
-            print(f"VM {vm_name} creada con éxito en Worker {worker_id}, VNC Port {vnc_port}.")
+        vm_names = [f"vm{start_vm_id + i}" for i in range(num_vms)]
         
-        # Solicitar conexiones para cada VM
-        for vm in new_vms:
-            print(f"\nDefinir conexiones para {vm}:")
-            
-            # Mostrar VMs disponibles para conectar
-            print("\nVMs disponibles para conectar:")
-            available_vms = [v["name"] for v in self.manager.topology.vms if v["name"] != vm]
-            for i, available_vm in enumerate(available_vms):
-                print(f"{i+1}. {available_vm}")
-            
-            # Solicitar conexiones
-            connections_input = input("\nIngrese los números de las VMs a conectar (separados por coma) o 'todos' para conectar con todas: ")
-            
-            # Mapeo para evitar crear conexiones duplicadas
-            connection_pairs = set()
-            
-            if connections_input.lower() == 'todos':
-                # Conectar con todas las VMs
-                for available_vm in available_vms:
-                    # Verificar si esta conexión ya existe (en cualquier dirección)
-                    conn_pair = tuple(sorted([vm, available_vm]))
-                    if conn_pair in connection_pairs:
-                        continue
-                    
-                    # Encontrar el próximo ID de VLAN disponible
-                    used_vlans = [conn.get('vlan_id') for conn in self.manager.topology.connections if 'vlan_id' in conn]
-                    vlan_id = 100  # VLAN inicial
-                    while vlan_id in used_vlans and vlan_id <= 4094:
-                        vlan_id += 1
-                    
-                    if vlan_id > 4094:
-                        print("Error: Se ha alcanzado el límite de VLANs disponibles.")
-                        break
-                    
-                    # Crear conexión bidireccional con VLAN asignada
-                    self.manager.topology.add_connection({
-                        "from": vm,
-                        "to": available_vm,
-                        "vlan_id": vlan_id
-                    })
-                    
-                    self.manager.topology.add_connection({
-                        "from": available_vm,
-                        "to": vm,
-                        "vlan_id": vlan_id
-                    })
-                    
-                    print(f"Conexión establecida: {vm} <-> {available_vm} (VLAN {vlan_id})")
-                    
-                    # Registrar esta conexión como procesada
-                    connection_pairs.add(conn_pair)
-            else:
-                # Conectar con las VMs seleccionadas
-                try:
-                    selected_indices = [int(idx.strip()) - 1 for idx in connections_input.split(',') if idx.strip()]
-                    for idx in selected_indices:
-                        if 0 <= idx < len(available_vms):
-                            target_vm = available_vms[idx]
-                            
-                            # Verificar si esta conexión ya existe (en cualquier dirección)
-                            conn_pair = tuple(sorted([vm, target_vm]))
-                            if conn_pair in connection_pairs:
-                                continue
-                            
-                            # Encontrar el próximo ID de VLAN disponible
-                            used_vlans = [conn.get('vlan_id') for conn in self.manager.topology.connections if 'vlan_id' in conn]
-                            vlan_id = 100  # VLAN inicial
-                            while vlan_id in used_vlans and vlan_id <= 4094:
-                                vlan_id += 1
-                            
-                            if vlan_id > 4094:
-                                print("Error: Se ha alcanzado el límite de VLANs disponibles.")
-                                break
-                            
-                            # Crear conexión bidireccional con VLAN asignada
-                            self.manager.topology.add_connection({
-                                "from": vm,
-                                "to": target_vm,
-                                "vlan_id": vlan_id
-                            })
-                            
-                            self.manager.topology.add_connection({
-                                "from": target_vm,
-                                "to": vm,
-                                "vlan_id": vlan_id
-                            })
-                            
-                            print(f"Conexión establecida: {vm} <-> {target_vm} (VLAN {vlan_id})")
-                            
-                            # Registrar esta conexión como procesada
-                            connection_pairs.add(conn_pair)
-                        else:
-                            print(f"Índice fuera de rango: {idx+1}")
-                except ValueError:
-                    print("Entrada inválida. Se esperaban números separados por comas.")
+        # Seleccionar flavor para cada VM si no se proporcionó uno por defecto
+        flavors = None
+        if not default_flavor:
+            flavors = ask_vm_flavors(vm_names)
+            if flavors is None:
+                print("Operación cancelada.")
+                return []
+        
+        # Solicitar conexiones para cada VM (con las nuevas y las existentes)
+        available_names = [vm.name for vm in self.manager.topology.vms] + vm_names
+        links = ask_custom_links(vm_names, available_names)
         
-        return new_vms
+        new_vms = self.manager.builder.add_shape(
+            "custom", num_vms, start_vm_id, flavor=default_flavor, flavors=flavors, links=links
+        )
+        return new_vms or []
     
     def add_vm_to_topology(self, default_flavor=None):
         """Agrega VMs individuales a la topología existente"""
-        from .ui import print_vms
-        from .utils import validate_vlan_id
+        from .ui import print_vms, ask_vm_flavors
         
         if not self.manager.topology.vms:
             print("No hay topología existente. Cree una nueva topología primero.")
@@ -377,55 +237,24 @@ class TopologyGenerator:
             for i in range(num_vms):
                 print(f"vm{start_vm_id + i}")
             
-            # Determinar el último worker y vnc_port utilizados para continuar la secuencia
-            last_vm_id = start_vm_id - 1
-            last_worker = 3  # Por defecto, para que el siguiente sea 1 ((3 % 3) + 1 = 1)
-            last_vnc_port = 5  # Por defecto, para que el siguiente sea 1 ((5 % 5) + 1 = 1)
-            
-            # Si hay VMs existentes, obtener el último worker y vnc_port
-            if self.manager.topology.vms:
-                # Intentar encontrar la VM con el mayor ID
-                for vm in self.manager.topology.vms:
-                    if vm["name"].startswith("vm"):
-                        try:
-                            vm_id = int(vm["name"][2:])
-                            if vm_id == last_vm_id:
-                                last_worker = vm["worker"]
-                                last_vnc_port = vm["vnc_port"]
-                        except ValueError:
-                            continue
+            # Seleccionar flavor para cada VM si no se proporcionó uno por defecto
+            flavors = None
+            if not default_flavor:
+                flavors = ask_vm_flavors([f"vm{start_vm_id + i}" for i in range(num_vms)])
+                if flavors is None:
+                    print("Operación cancelada.")
+                    return
+            
+            # Crear las VMs; el worker y el puerto VNC los decide el planificador
+            new_vms = self.manager.builder.add_shape(
+                "custom", num_vms, start_vm_id, flavor=default_flavor, flavors=flavors
+            )
+            if new_vms is None:
+                return
             
-            # Crear las VMs usando round-robin
-            new_vms = []
-            for i in range(num_vms):
-                vm_id = start_vm_id + i
-                vm_name = f"vm{vm_id}"
-                
-                # Usar round-robin para worker y vnc_port, continuando la secuencia desde la última VM
-                worker_id = ((last_worker + i) % 3) + 1
-                vnc_port = ((last_vnc_port + i) % 5) + 1
-                
-                mac = generate_mac(worker_id, vm_id)
-                    
-                # Seleccionar flavor para esta VM si no se proporcionó uno por defecto
-                vm_flavor = default_flavor
-                if not vm_flavor:
-                    print(f"\nSeleccionar flavor para {vm_name}:")
-                    vm_flavor = select_flavor()
-                
-                # Añadir la VM a la topología
-                vm = {
-                    "name": vm_name,
-                    "worker": worker_id,
-                    "vnc_port": vnc_port,
-                    "mac": mac,
-                    "flavor": get_flavor_data(vm_flavor)
-                }
-                
-                self.manager.topology.add_vm(vm)
-                new_vms.append(vm_name)
-                
-                print(f"VM {vm_name} creada con éxito en Worker {worker_id}, VNC Port {vnc_port}.")
+            for vm_name in new_vms:
+                vm = self.manager.topology.get_vm_by_name(vm_name)
+                print(f"VM {vm_name} creada con éxito en Worker {vm['worker']}, VNC Port {vm['vnc_port']}.")
             
             # Solicitar conexiones para cada VM
             print_vms(self.manager.topology)
@@ -449,29 +278,16 @@ class TopologyGenerator:
                         if 0 <= idx < len(available_vms):
                             target_vm = available_vms[idx]
                             
-                            # Encontrar el próximo ID de VLAN disponible
-                            used_vlans = [conn.get('vlan_id') for conn in self.manager.topology.connections if 'vlan_id' in conn]
-                            vlan_id = 100  # VLAN inicial
-                            while vlan_id in used_vlans and vlan_id <= 4094:
-                                vlan_id += 1
+                            # Omitir conexiones que ya existen
+                            if self.manager.topology.has_connection(vm, target_vm):
+                                print(f"La conexión {vm} <-> {target_vm} ya existe.")
+                                continue
                             
-                            if vlan_id > 4094:
-                                print("Error: Se ha alcanzado el límite de VLANs disponibles.")
+                            # Crear conexión bidireccional con una VLAN del asignador
+                            vlan_id = self._connect_vms(vm, target_vm)
+                            if vlan_id is None:
                                 break
                             
-                            # Crear conexión bidireccional con VLAN asignada
-                            self.manager.topology.add_connection({
-                                "from": vm,
-                                "to": target_vm,
-                                "vlan_id": vlan_id
-                            })
-                            
-                            self.manager.topology.add_connection({
-                                "from": target_vm,
-                                "to": vm,
-                                "vlan_id": vlan_id
-                            })
-                            
                             print(f"Conexión establecida: {vm} <-> {target_vm} (VLAN {vlan_id})")
                         else:
                             print(f"Índice fuera de rango: {idx+1}")
@@ -484,9 +300,8 @@ class TopologyGenerator:
             print("Entrada inválida. Se espera un número entero.")
 
     def add_predefined_topology(self, default_flavor=None):
-        """Agrega una topología predefinida a la existente usando round-robin para worker y vnc_port"""
+        """Agrega una topología predefinida a la existente"""
         from .ui import print_vms, print_header
-        from .utils import validate_vlan_id
         
         if not self.manager.topology.vms:
             print("No hay topología existente. Cree una nueva topología primero.")
@@ -550,7 +365,8 @@ class TopologyGenerator:
                 selected_new_vms = [new_vms[idx] for idx in selected_new_indices if 0 <= idx < len(new_vms)]
                 
                 # Mostrar VMs existentes (excluyendo las nuevas)
-                existing_vms = [v["name"] for v in self.manager.topology.vms if v["name"] not in new_vms]
+                new_vm_set = set(new_vms)
+                existing_vms = [v["name"] for v in self.manager.topology.vms if v["name"] not in new_vm_set]
                 print("\nVMs de la topología existente:")
                 for i, vm in enumerate(existing_vms):
                     print(f"{i+1}. {vm}")
@@ -562,29 +378,15 @@ class TopologyGenerator:
                 # Crear conexiones entre las VMs seleccionadas
                 for new_vm in selected_new_vms:
                     for existing_vm in selected_existing_vms:
-                        # Encontrar el próximo ID de VLAN disponible
-                        used_vlans = [conn.get('vlan_id') for conn in self.manager.topology.connections if 'vlan_id' in conn]
-                        vlan_id = 100  # VLAN inicial
-                        while vlan_id in used_vlans and vlan_id <= 4094:
-                            vlan_id += 1
+                        # Omitir conexiones que ya existen
+                        if self.manager.topology.has_connection(new_vm, existing_vm):
+                            continue
                         
-                        if vlan_id > 4094:
-                            print("Error: Se ha alcanzado el límite de VLANs disponibles.")
+                        # Crear conexión bidireccional con una VLAN del asignador
+                        vlan_id = self._connect_vms(new_vm, existing_vm)
+                        if vlan_id is None:
                             break
                         
-                        # Crear conexión bidireccional con VLAN asignada
-                        self.manager.topology.add_connection({
-                            "from": new_vm,
-                            "to": existing_vm,
-                            "vlan_id": vlan_id
-                        })
-                        
-                        self.manager.topology.add_connection({
-                            "from": existing_vm,
-                            "to": new_vm,
-                            "vlan_id": vlan_id
-                        })
-                        
                         print(f"Conexión establecida: {new_vm} <-> {existing_vm} (VLAN {vlan_id})")
                 
             except (ValueError, IndexError):
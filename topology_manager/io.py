@@ -19,12 +19,13 @@ class TopologyIO:
     def load_topology(self, file_path):
         """Carga una topología desde un archivo JSON"""
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
             # Crear una nueva topología a partir de los datos
-            self.manager.topology = Topology.from_dict(data)
+            with open(file_path, 'r') as f:
+                self.manager.topology = Topology.load(f)
             self.current_topology_file = file_path
+            
+            for warning in self.manager.topology.load_warnings:
+                print(f"Advertencia: {warning}")
             return True
         except Exception as e:
             print(f"Error al cargar el archivo: {e}")
@@ -0,0 +1,162 @@
+"""
+Diario de pasos de aprovisionamiento
+
+Mientras se aplica una topología, cada paso terminado se anota en un archivo
+JSONL de solo anexado junto al archivo de la topología
+(<topología>.journal.jsonl). Si la aplicación falla a mitad, la siguiente
+ejecución del mismo plan omite los pasos que ya terminaron con éxito y
+continúa desde el primero pendiente. Antes de ejecutar un paso se anota su
+inicio: los que empezaron sin que conste su resultado (p. ej. por una
+interrupción) se comprueban antes de repetirlos. Al completar una aplicación se anota un
+registro "complete" y la siguiente empieza de cero.
+
+Cada paso se identifica por su fase, tarea, nombre, nodo y comando, de modo
+que si el comando cambia el paso vuelve a ejecutarse.
+
+Ejemplo de registros:
+
+    {"event": "begin", "plan": "lab", "steps": 120, "time": 1700000000.0}
+    {"event": "start", "key": "...", "phase": "vms", "task": "vm1", "step": "create_vm", "time": ...}
+    {"event": "step", "key": "...", "phase": "vms", "task": "vm1", "step": "create_vm",
+     "node": "10.0.10.2", "status": "ok", "returncode": 0, "duration": 4.2, "time": ...}
+    {"event": "complete", "time": ...}
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+def journal_path(topology_file):
+    """Ruta del diario asociado a un archivo de topología"""
+    return os.path.splitext(topology_file)[0] + JOURNAL_SUFFIX
+
+
+def step_key(phase, task, step):
+    """Identificador estable de un paso dentro de un plan"""
+    content = "\0".join(str(part) for part in (
+        phase, task, step.name, step.node, step.command, step.stdin, step.stdin_path,
+        step.local_path, step.remote_path
+    ))
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class StepJournal:
+    """Diario JSONL de los pasos de una aplicación (seguro entre hilos)"""
+
+    def __init__(self, path, sync=True):
+        """
+        Args:
+            path: Ruta del archivo JSONL
+            sync: Forzar la escritura a disco tras cada registro
+        """
+        self.path = path
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._file = None
+        self._completed, self._unconfirmed = self._load()
+
+    def _load(self):
+        """
+        Lee los pasos desde el último registro de fin de aplicación
+
+        Returns:
+            Tupla (pasos completados, pasos que empezaron sin resultado anotado)
+        """
+        completed = set()
+        unconfirmed = set()
+        if not os.path.exists(self.path):
+            return completed, unconfirmed
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Línea incompleta por una interrupción durante la escritura
+                    continue
+                event = record.get("event")
+                if event == "complete":
+                    completed.clear()
+                    unconfirmed.clear()
+                elif event == "start":
+                    unconfirmed.add(record.get("key"))
+                elif event == "step":
+                    unconfirmed.discard(record.get("key"))
+                    if record.get("status") == "ok":
+                        completed.add(record.get("key"))
+        return completed, unconfirmed
+
+    def completed_keys(self):
+        """Identificadores de los pasos que ya terminaron con éxito"""
+        with self._lock:
+            return set(self._completed)
+
+    def unconfirmed_keys(self):
+        """Identificadores de los pasos que empezaron sin que conste su resultado"""
+        with self._lock:
+            return set(self._unconfirmed)
+
+    def pending_resume(self):
+        """Indica si hay una aplicación anterior sin completar"""
+        return bool(self._completed)
+
+    def _write(self, record):
+        record["time"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            if record["event"] == "complete":
+                self._completed.clear()
+                self._unconfirmed.clear()
+            elif record["event"] == "start":
+                self._unconfirmed.add(record["key"])
+            elif record["event"] == "step":
+                self._unconfirmed.discard(record["key"])
+                if record["status"] == "ok":
+                    self._completed.add(record["key"])
+
+    def begin(self, plan):
+        """Anota el inicio de la aplicación de un plan"""
+        self._write({"event": "begin", "plan": plan.name, "steps": len(plan.steps()),
+                     "resumed": len(self._completed)})
+
+    def start(self, key, phase, task, step):
+        """Anota que un paso va a ejecutarse"""
+        self._write({"event": "start", "key": key, "phase": phase, "task": task, "step": step.name})
+
+    def record(self, key, phase, task, step):
+        """Anota el resultado de un paso"""
+        result = step.result
+        status = "ok" if result is not None and result.ok else "failed"
+        self._write({
+            "event": "step",
+            "key": key,
+            "phase": phase,
+            "task": task,
+            "step": step.name,
+            "node": step.node,
+            "status": status,
+            "skipped": step.skipped,
+            "returncode": result.returncode if result is not None else None,
+            "duration": round(step.duration or 0.0, 3)
+        })
+
+    def complete(self):
+        """Anota que la aplicación terminó: la siguiente empieza de cero"""
+        self._write({"event": "complete"})
+
+    def close(self):
+        """Cierra el archivo del diario"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
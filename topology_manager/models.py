@@ -5,65 +5,237 @@ Este módulo contiene las clases de datos principales que representan
 los componentes de una topología de red.
 """
 
-class VM:
+import gc
+import json
+import threading
+from contextlib import contextmanager
+
+from .allocators import VlanAllocator, MacAllocator, VncPortAllocator
+
+_MISSING = object()
+
+# Flavors y disposiciones de claves compartidos entre todos los registros. Los
+# flavors distintos son pocos (los del catálogo); si se supera el límite los
+# nuevos ya no se comparten, para que un JSON con flavors arbitrarios no haga
+# crecer la tabla sin fin
+MAX_INTERNED = 4096
+_interned_flavors = {}
+_interned_layouts = {}
+
+# Cargas con el GC en pausa (el GC es del proceso, no del hilo)
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+def intern_flavor(flavor):
+    """
+    Devuelve una instancia compartida del flavor
+    
+    Los flavors con el mismo contenido se comparten entre todas las VMs, por lo
+    que no deben modificarse en el lugar (asignar un flavor nuevo a la VM).
+    """
+    if not isinstance(flavor, dict):
+        return flavor
+    try:
+        key = tuple(flavor.items())
+        shared = _interned_flavors.get(key)
+        if shared is not None:
+            return shared
+        if len(_interned_flavors) < MAX_INTERNED:
+            _interned_flavors[key] = flavor
+        return flavor
+    except TypeError:
+        # Valores no hashables: no se puede compartir
+        return flavor
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pausa el recolector de ciclos mientras se crean muchos registros
+
+    Cada pocos cientos de objetos nuevos el GC recorre los que siguen vivos
+    (incluido el JSON recién leído); los registros no forman ciclos, así que
+    no hay nada que recolectar hasta terminar la carga.
+
+    gc.disable() afecta a todo el proceso. Con varias cargas a la vez (p. ej.
+    en el servidor CLI) se lleva la cuenta de las pausas: la primera apaga el
+    GC y la última lo vuelve a encender, solo si estaba encendido.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def _intern_layout(keys):
+    """Devuelve una tupla compartida con el orden de claves de un registro"""
+    keys = tuple(keys)
+    if len(_interned_layouts) >= MAX_INTERNED:
+        return _interned_layouts.get(keys, keys)
+    return _interned_layouts.setdefault(keys, keys)
+
+
+class _Record:
+    """
+    Base para registros compactos con acceso tipo diccionario
+    
+    Las subclases definen __slots__ y _KEYS (clave JSON -> atributo). Se guarda
+    el orden de las claves del JSON original para que la serialización sea
+    idéntica a la entrada.
+    """
+    __slots__ = ("_layout", "extra")
+    _KEYS = {}
+    _LAYOUTS = {}  # Cada subclase tiene el suyo: claves del JSON -> (disposición, tiene extra)
+    
+    def __getitem__(self, key):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        value = getattr(self, attr)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        else:
+            setattr(self, attr, value)
+        if key not in self._layout:
+            self._layout = _intern_layout(self._layout + (key,))
+    
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        return [key for key in self._layout if key in self]
+    
+    def to_dict(self):
+        """Convierte el registro a un diccionario para serialización"""
+        return {key: self[key] for key in self._layout if key in self}
+    
+    @classmethod
+    def _new_layout(cls, data):
+        """Registra la disposición de claves de un JSON: (disposición, tiene claves extra)"""
+        keys = tuple(data)
+        info = (_intern_layout(keys), not cls._KEYS.keys() >= data.keys())
+        if len(cls._LAYOUTS) < MAX_INTERNED:
+            cls._LAYOUTS[keys] = info
+        return info
+    
+    @classmethod
+    def _extra(cls, data):
+        """Claves del JSON que no tienen atributo propio"""
+        return {key: value for key, value in data.items() if key not in cls._KEYS}
+
+
+class VM(_Record):
     """Representa una máquina virtual en la topología"""
     
+    __slots__ = ("name", "worker", "vnc_port", "mac", "vlan", "flavor")
+    _KEYS = {
+        "name": "name",
+        "worker": "worker",
+        "vlan": "vlan",
+        "vnc_port": "vnc_port",
+        "mac": "mac",
+        "flavor": "flavor"
+    }
+    _LAYOUTS = {}
+    
     def __init__(self, name, worker, vnc_port, mac, vlan=None, flavor=None):
         self.name = name
         self.worker = worker
         self.vnc_port = vnc_port
         self.mac = mac
         self.vlan = vlan
-        self.flavor = flavor
+        self.flavor = intern_flavor(flavor)
+        self._layout = _intern_layout(self._KEYS)
+        self.extra = None
     
-    def to_dict(self):
-        """Convierte la VM a un diccionario para serialización"""
-        return {
-            "name": self.name,
-            "worker": self.worker,
-            "vlan": self.vlan,
-            "vnc_port": self.vnc_port,
-            "mac": self.mac,
-            "flavor": self.flavor
-        }
+    def __setitem__(self, key, value):
+        if key == "flavor":
+            value = intern_flavor(value)
+        super().__setitem__(key, value)
+    
+    def __repr__(self):
+        return f"VM({self.name!r}, worker={self.worker!r})"
     
     @classmethod
     def from_dict(cls, data):
         """Crea una VM a partir de un diccionario"""
-        return cls(
-            name=data["name"],
-            worker=data["worker"],
-            vlan=data["vlan"],
-            vnc_port=data["vnc_port"],
-            mac=data["mac"],
-            flavor=data.get("flavor")  # Usar get para compatibilidad con formatos antiguos
-        )
+        layout, has_extra = cls._LAYOUTS.get(tuple(data)) or cls._new_layout(data)
+        get = data.get
+        vm = cls.__new__(cls)
+        vm.name = data["name"]
+        vm.worker = get("worker", _MISSING)
+        vm.vlan = get("vlan", _MISSING)  # Formatos antiguos no tienen "vlan"
+        vm.vnc_port = get("vnc_port", _MISSING)
+        vm.mac = get("mac", _MISSING)
+        vm.flavor = intern_flavor(get("flavor", _MISSING))  # Formatos antiguos no tienen "flavor"
+        vm._layout = layout
+        vm.extra = cls._extra(data) if has_extra else None
+        return vm
 
 
-class Connection:
+class Connection(_Record):
     """Representa una conexión entre dos VMs"""
     
+    __slots__ = ("from_vm", "to_vm", "vlan_id")
+    _KEYS = {
+        "from": "from_vm",
+        "to": "to_vm",
+        "vlan_id": "vlan_id"
+    }
+    _LAYOUTS = {}
+    
     def __init__(self, from_vm, to_vm, vlan_id=None):
         self.from_vm = from_vm
         self.to_vm = to_vm
         self.vlan_id = vlan_id
+        self._layout = _intern_layout(self._KEYS)
+        self.extra = None
     
-    def to_dict(self):
-        """Convierte la conexión a un diccionario para serialización"""
-        return {
-            "from": self.from_vm,
-            "to": self.to_vm,
-            "vlan_id": self.vlan_id
-        }
+    def __repr__(self):
+        return f"Connection({self.from_vm!r}, {self.to_vm!r}, vlan_id={self.vlan_id!r})"
     
     @classmethod
     def from_dict(cls, data):
         """Crea una conexión a partir de un diccionario"""
-        return cls(
-            from_vm=data["from"], 
-            to_vm=data["to"],
-            vlan_id=data.get("vlan_id") # Usar get para compatibilidad con formatos antiguos
-        )
+        layout, has_extra = cls._LAYOUTS.get(tuple(data)) or cls._new_layout(data)
+        conn = cls.__new__(cls)
+        conn.from_vm = data["from"]
+        conn.to_vm = data["to"]
+        conn.vlan_id = data.get("vlan_id", _MISSING)  # Formatos antiguos no tienen "vlan_id"
+        conn._layout = layout
+        conn.extra = cls._extra(data) if has_extra else None
+        return conn
 
 
 class Topology:
@@ -91,46 +263,263 @@ class Topology:
             "enable_vlan_communication": False
         }
         self.vm_internet_access = []
+        
+        # Índices para búsquedas O(1); se mantienen sincronizados con las listas
+        # de registros VM y Connection
+        self._vm_index = {}            # nombre -> VM
+        self._connection_index = {}    # (origen, destino) -> conexión
+        self._vm_connections = None    # nombre -> {(origen, destino), ...} (se construye bajo demanda)
+        self._max_vm_id = 0
+        self._max_vm_id_dirty = False
+        
+        # Asignador de VLANs y número de conexiones que usan cada VLAN
+        self.vlan_allocator = VlanAllocator()
+        self._vlan_refs = {}
+        
+        # Asignador de MACs y VMs cuya MAC es inválida o está repetida
+        self.mac_allocator = MacAllocator()
+        self.mac_conflicts = []
+        
+        # Asignador de puertos VNC por worker y VMs cuyo puerto está repetido
+        self.vnc_allocator = VncPortAllocator()
+        self.vnc_conflicts = []
+        
+        # Advertencias generadas al cargar la topología (duplicados, etc.)
+        self.load_warnings = []
+    
+    @staticmethod
+    def _vm_number(name):
+        """Extrae el número de una VM con formato "vmX" (None si no aplica)"""
+        try:
+            return int(name[2:])
+        except (ValueError, TypeError):
+            return None
+    
+    def _index_vm(self, vm):
+        """Registra una VM en los índices"""
+        name = vm.name
+        self._vm_index[name] = vm
+        if vm.mac is not _MISSING and not self.mac_allocator.register(vm.mac, key=name):
+            self.mac_conflicts.append(name)
+        if vm.vnc_port is not _MISSING and not self.vnc_allocator.register(vm.worker, vm.vnc_port, key=name):
+            self.vnc_conflicts.append(name)
+        vm_id = self._vm_number(name)
+        if vm_id is not None and vm_id > self._max_vm_id:
+            self._max_vm_id = vm_id
+    
+    def _index_connection(self, connection):
+        """Registra una conexión en los índices"""
+        key = (connection.from_vm, connection.to_vm)
+        self._connection_index[key] = connection
+        vlan_id = connection.vlan_id
+        if self.vlan_allocator.mark_used(vlan_id):
+            self._vlan_refs[vlan_id] = self._vlan_refs.get(vlan_id, 0) + 1
+        if self._vm_connections is not None:
+            self._vm_connections.setdefault(key[0], set()).add(key)
+            self._vm_connections.setdefault(key[1], set()).add(key)
+    
+    def _unindex_connection(self, key):
+        """Elimina una conexión de los índices"""
+        connection = self._connection_index.pop(key)
+        vlan_id = connection.vlan_id
+        if vlan_id in self._vlan_refs:
+            self._vlan_refs[vlan_id] -= 1
+            if not self._vlan_refs[vlan_id]:
+                del self._vlan_refs[vlan_id]
+                self.vlan_allocator.release(vlan_id)
+        if self._vm_connections is not None:
+            for name in key:
+                keys = self._vm_connections.get(name)
+                if keys is not None:
+                    keys.discard(key)
+        return connection
+    
+    def _connections_by_vm(self):
+        """Índice nombre -> conexiones; se construye la primera vez que se necesita"""
+        if self._vm_connections is None:
+            self._vm_connections = {}
+            for key in self._connection_index:
+                self._vm_connections.setdefault(key[0], set()).add(key)
+                self._vm_connections.setdefault(key[1], set()).add(key)
+        return self._vm_connections
     
     def add_vm(self, vm):
-        """Añade una VM a la topología"""
-        if isinstance(vm, dict):
-            self.vms.append(vm)
+        """
+        Añade una VM a la topología (acepta un diccionario o un VM)
+        
+        Returns:
+            True si la VM se añadió, False si ya existe una VM con ese nombre
+        """
+        if not isinstance(vm, VM):
+            vm = VM.from_dict(vm)
+        
+        if vm.name in self._vm_index:
+            return False
+        
+        self.vms.append(vm)
+        self._index_vm(vm)
+        return True
+    
+    def remove_vm(self, name):
+        """
+        Elimina una VM y todas sus conexiones de la topología
+        
+        Returns:
+            La VM eliminada o None si no existe
+        """
+        vm = self._vm_index.pop(name, None)
+        if vm is None:
+            return None
+        
+        by_vm = self._connections_by_vm()
+        for key in list(by_vm.get(name, ())):
+            self.remove_connection(*key)
+        by_vm.pop(name, None)
+        
+        self.vms.remove(vm)
+        if name in self.mac_conflicts:
+            self.mac_conflicts.remove(name)
         else:
-            self.vms.append(vm.to_dict())
+            self.mac_allocator.release(vm.get("mac"), key=name)
+            self._reassign_mac(vm.get("mac"))
+        if name in self.vnc_conflicts:
+            self.vnc_conflicts.remove(name)
+        else:
+            self.vnc_allocator.release(vm.get("worker"), vm.get("vnc_port"))
+            self._reassign_vnc_port(vm.get("worker"), vm.get("vnc_port"))
+        if name in self.vm_internet_access:
+            self.vm_internet_access.remove(name)
+        
+        if self._vm_number(name) == self._max_vm_id:
+            self._max_vm_id_dirty = True
+        return vm
+    
+    def _reassign_mac(self, mac):
+        """Si otra VM repite la MAC liberada, pasa a ser su dueña en lugar de dejarla libre"""
+        value = MacAllocator.parse(mac)
+        if value is None:
+            return
+        for other in self.mac_conflicts:
+            other_mac = self._vm_index[other].get("mac")
+            if MacAllocator.parse(other_mac) == value:
+                self.mac_conflicts.remove(other)
+                self.mac_allocator.register(other_mac, key=other)
+                return
+    
+    def _reassign_vnc_port(self, worker, port):
+        """Si otra VM del worker repite el puerto VNC liberado, pasa a ser su dueña"""
+        for other in self.vnc_conflicts:
+            other_vm = self._vm_index[other]
+            if other_vm.get("worker") == worker and other_vm.get("vnc_port") == port:
+                self.vnc_conflicts.remove(other)
+                self.vnc_allocator.register(worker, port, key=other)
+                return
     
     def add_connection(self, connection):
-        """Añade una conexión a la topología"""
-        if isinstance(connection, dict):
-            self.connections.append(connection)
-        else:
-            self.connections.append(connection.to_dict())
+        """
+        Añade una conexión a la topología (acepta un diccionario o un Connection)
+        
+        Returns:
+            True si la conexión se añadió, False si la conexión ya existe
+        """
+        if not isinstance(connection, Connection):
+            connection = Connection.from_dict(connection)
+        
+        if (connection.from_vm, connection.to_vm) in self._connection_index:
+            return False
+        
+        self.connections.append(connection)
+        self._index_connection(connection)
+        return True
+    
+    def remove_connection(self, from_vm, to_vm):
+        """
+        Elimina la conexión from_vm -> to_vm
+        
+        Returns:
+            La conexión eliminada o None si no existe
+        """
+        key = (from_vm, to_vm)
+        if key not in self._connection_index:
+            return None
+        
+        connection = self._unindex_connection(key)
+        self.connections.remove(connection)
+        return connection
+    
+    def remove_connection_at(self, index):
+        """Elimina la conexión en la posición indicada de la lista"""
+        connection = self.connections[index]
+        return self.remove_connection(connection.from_vm, connection.to_vm)
     
     def get_vm_by_name(self, name):
         """Busca una VM por su nombre"""
-        for vm in self.vms:
-            if vm["name"] == name:
-                return vm
-        return None
+        return self._vm_index.get(name)
+    
+    def has_vm(self, name):
+        """Indica si existe una VM con el nombre dado"""
+        return name in self._vm_index
+    
+    def get_connection(self, from_vm, to_vm):
+        """Busca la conexión from_vm -> to_vm"""
+        return self._connection_index.get((from_vm, to_vm))
+    
+    def has_connection(self, from_vm, to_vm):
+        """Indica si existe la conexión from_vm -> to_vm"""
+        return (from_vm, to_vm) in self._connection_index
+    
+    def get_vm_connections(self, name):
+        """Obtiene las conexiones (en cualquier sentido) de una VM"""
+        return [self._connection_index[key] for key in self._connections_by_vm().get(name, ())]
+    
+    def allocate_vlan(self):
+        """
+        Asigna una VLAN libre para una nueva conexión
+        
+        La VLAN queda marcada como usada; si finalmente no se usa en ninguna
+        conexión debe devolverse con release_vlan().
+        
+        Returns:
+            El ID de VLAN o None si se alcanzó el límite de VLANs
+        """
+        return self.vlan_allocator.allocate()
+    
+    def release_vlan(self, vlan_id):
+        """Libera una VLAN asignada que ninguna conexión está usando"""
+        if vlan_id not in self._vlan_refs:
+            self.vlan_allocator.release(vlan_id)
+    
+    def allocate_mac(self, vm_name):
+        """
+        Asigna una MAC única y determinista para una VM
+        
+        El sufijo preferido es el número de la VM ("vmX" -> X), de modo que la
+        misma topología siempre genera las mismas MACs.
+        
+        Returns:
+            La MAC asignada o None si se agotó el espacio de direcciones
+        """
+        return self.mac_allocator.allocate(key=vm_name, hint=self._vm_number(vm_name))
+    
+    def allocate_vnc_port(self, worker, vm_name):
+        """
+        Asigna un puerto VNC que no usa ninguna otra VM del worker
+        
+        Returns:
+            El puerto asignado o None si el worker no tiene puertos libres
+        """
+        return self.vnc_allocator.allocate(worker, key=vm_name)
     
     def get_next_vm_id(self):
         """Obtiene el siguiente ID disponible para una VM"""
-        if not self.vms:
-            return 1
-        
-        vm_ids = []
-        for vm in self.vms:
-            # Extraer el número de la VM del nombre (asumiendo formato "vmX")
-            try:
-                vm_id = int(vm["name"][2:])
-                vm_ids.append(vm_id)
-            except ValueError:
-                continue
-        
-        if not vm_ids:
-            return 1
+        if self._max_vm_id_dirty:
+            self._max_vm_id = max(
+                (vm_id for vm_id in map(self._vm_number, self._vm_index) if vm_id is not None),
+                default=0
+            )
+            self._max_vm_id_dirty = False
         
-        return max(vm_ids) + 1
+        return self._max_vm_id + 1
     
     def to_dict(self):
         """Convierte la topología a un diccionario para serialización"""
@@ -139,12 +528,20 @@ class Topology:
             "nodes": self.nodes,
             "interfaces": self.interfaces,
             "vlans": self.vlans,
-            "vms": self.vms,
-            "connections": self.connections,
+            "vms": [vm.to_dict() for vm in self.vms],
+            "connections": [conn.to_dict() for conn in self.connections],
             "settings": self.settings,
             "vm_internet_access": self.vm_internet_access
         }
     
+    @classmethod
+    def load(cls, f):
+        """Crea una topología a partir de un archivo JSON abierto"""
+        # Leer el JSON también con el GC en pausa: cada recolección recorrería
+        # los diccionarios ya leídos
+        with _gc_paused():
+            return cls.from_dict(json.load(f))
+    
     @classmethod
     def from_dict(cls, data):
         """Crea una topología a partir de un diccionario"""
@@ -153,8 +550,59 @@ class Topology:
         topology.nodes = data.get("nodes", topology.nodes)
         topology.interfaces = data.get("interfaces", topology.interfaces)
         topology.vlans = data.get("vlans", topology.vlans)
-        topology.vms = data.get("vms", [])
-        topology.connections = data.get("connections", [])
+        for vlan in topology.vlans:
+            topology.vlan_allocator.mark_used(vlan.get("id"))
         topology.settings = data.get("settings", topology.settings)
         topology.vm_internet_access = data.get("vm_internet_access", [])
+        
+        with _gc_paused():
+            topology._load_vms(data.get("vms", []))
+        
+        for name in topology.mac_conflicts:
+            vm = topology.get_vm_by_name(name)
+            topology.load_warnings.append(
+                f"La MAC '{vm.get('mac')}' de {name} es inválida o está repetida."
+            )
+        
+        if topology.vnc_conflicts:
+            names = ", ".join(topology.vnc_conflicts[:5])
+            if len(topology.vnc_conflicts) > 5:
+                names += ", ..."
+            topology.load_warnings.append(
+                f"{len(topology.vnc_conflicts)} VMs repiten un puerto VNC ya usado en su worker ({names})."
+            )
+        
+        with _gc_paused():
+            topology._load_connections(data.get("connections", []))
+        
         return topology
+    
+    def _load_vms(self, items):
+        """Igual que add_vm para cada VM de un JSON, sin comprobar tipos"""
+        vms = self.vms
+        vm_index = self._vm_index
+        index_vm = self._index_vm
+        vm_from_dict = VM.from_dict
+        for data in items:
+            vm = vm_from_dict(data)
+            if vm.name in vm_index:
+                self.load_warnings.append(f"VM duplicada '{vm.name}' omitida.")
+                continue
+            vms.append(vm)
+            index_vm(vm)
+    
+    def _load_connections(self, items):
+        """Igual que add_connection para cada conexión de un JSON, sin comprobar tipos"""
+        connections = self.connections
+        connection_index = self._connection_index
+        index_connection = self._index_connection
+        connection_from_dict = Connection.from_dict
+        for data in items:
+            conn = connection_from_dict(data)
+            if (conn.from_vm, conn.to_vm) in connection_index:
+                self.load_warnings.append(
+                    f"Conexión duplicada {conn.from_vm} -> {conn.to_vm} omitida."
+                )
+                continue
+            connections.append(conn)
+            index_connection(conn)
@@ -0,0 +1,347 @@
+"""
+Ubicación de VMs en los workers
+
+Este módulo decide en qué worker se crea cada VM teniendo en cuenta los
+recursos del flavor (CPU, RAM y disco), la capacidad de cada worker y las VMs
+que ya están ubicadas en él.
+
+Las capacidades se leen de topology.nodes["worker_capacity"], que puede ser un
+único diccionario para todos los workers o una lista con uno por worker:
+
+    "worker_capacity": {"cpu": 16, "ram": 32768, "disk": 500}
+
+Si no se define capacidad (o falta algún recurso) ese recurso se considera
+ilimitado.
+
+La estrategia "locality" además tiene en cuenta los enlaces entre VMs: agrupa
+en el mismo worker las VMs muy conectadas para que menos VLANs tengan que
+atravesar el nodo OFS.
+"""
+
+import math
+
+RESOURCES = ("cpu", "ram", "disk")
+
+# Estrategias disponibles
+SPREAD = "spread"       # Peor ajuste: reparte la carga entre los workers
+FFD = "ffd"             # Primer ajuste decreciente: llena los workers en orden
+BEST_FIT = "best_fit"   # Mejor ajuste decreciente: el worker que queda más justo
+LOCALITY = "locality"   # Particionado del grafo de conexiones entre workers
+STRATEGIES = (SPREAD, FFD, BEST_FIT, LOCALITY)
+
+# Margen sobre el reparto equitativo de VMs nuevas por worker en "locality"
+LOCALITY_IMBALANCE = 0.1
+# Número máximo de pasadas de refinamiento en "locality"
+LOCALITY_PASSES = 10
+
+
+def get_worker_capacities(topology):
+    """
+    Obtiene la capacidad de cada worker de la topología
+
+    Returns:
+        Diccionario índice de worker (1..N) -> {recurso: capacidad o None}
+    """
+    workers = topology.nodes.get("workers", [])
+    capacity = topology.nodes.get("worker_capacity") or {}
+
+    capacities = {}
+    for i in range(len(workers)):
+        worker_capacity = capacity[i] if isinstance(capacity, list) and i < len(capacity) else capacity
+        if not isinstance(worker_capacity, dict):
+            worker_capacity = {}
+        capacities[i + 1] = {resource: worker_capacity.get(resource) for resource in RESOURCES}
+    return capacities
+
+
+def flavor_demand(flavor):
+    """Recursos que consume una VM con el flavor dado"""
+    if not isinstance(flavor, dict):
+        return (0, 0, 0)
+    return tuple(flavor.get(resource) or 0 for resource in RESOURCES)
+
+
+class VmPlacer:
+    """Clase que ubica VMs en los workers según su capacidad"""
+
+    def __init__(self, topology, workers=None):
+        """
+        Args:
+            topology: Topología con los workers y las VMs ya ubicadas
+            workers: Índices de los workers que pueden usarse (opcional, por
+                     defecto todos los de topology.nodes["workers"])
+        """
+        capacities = get_worker_capacities(topology)
+        if workers is not None:
+            capacities = {worker: capacities.get(worker, dict.fromkeys(RESOURCES)) for worker in workers}
+
+        self.workers = sorted(capacities)
+        self._capacity = {
+            worker: tuple(float("inf") if capacities[worker][r] is None else capacities[worker][r]
+                          for r in RESOURCES)
+            for worker in self.workers
+        }
+        self._used = {worker: [0, 0, 0] for worker in self.workers}
+        self._count = {worker: 0 for worker in self.workers}
+        self._existing = {}  # nombre -> worker de las VMs ya ubicadas
+
+        # Contabilizar las VMs que ya están en la topología
+        for vm in topology.vms:
+            self._existing[vm["name"]] = vm.get("worker")
+            self._add_load(vm.get("worker"), flavor_demand(vm.get("flavor")))
+
+    def _add_load(self, worker, demand):
+        """Suma la demanda de una VM a la carga del worker"""
+        used = self._used.get(worker)
+        if used is None:
+            return
+        for r in range(len(RESOURCES)):
+            used[r] += demand[r]
+        self._count[worker] += 1
+
+    def _remove_load(self, worker, demand):
+        """Resta la demanda de una VM de la carga del worker"""
+        used = self._used[worker]
+        for r in range(len(RESOURCES)):
+            used[r] -= demand[r]
+        self._count[worker] -= 1
+
+    def _fits(self, worker, demand):
+        """Indica si la VM cabe en el worker"""
+        used = self._used[worker]
+        capacity = self._capacity[worker]
+        return all(used[r] + demand[r] <= capacity[r] for r in range(len(RESOURCES)))
+
+    def _utilization(self, worker, demand):
+        """
+        Uso del recurso más cargado del worker tras ubicar la VM (0-1)
+
+        Si ningún recurso tiene capacidad definida se usa el número de VMs,
+        de modo que la estrategia de reparto sigue equilibrando los workers.
+        """
+        used = self._used[worker]
+        capacity = self._capacity[worker]
+        ratios = [(used[r] + demand[r]) / capacity[r]
+                  for r in range(len(RESOURCES)) if capacity[r] != float("inf") and capacity[r] > 0]
+        return max(ratios) if ratios else None
+
+    def _size(self, demand):
+        """Tamaño relativo de una VM para ordenarlas de mayor a menor"""
+        largest = [max((self._capacity[w][r] for w in self.workers
+                        if self._capacity[w][r] != float("inf")), default=0)
+                   for r in range(len(RESOURCES))]
+        return max((demand[r] / largest[r] for r in range(len(RESOURCES)) if largest[r]),
+                   default=sum(demand))
+
+    def place(self, vms, strategy=SPREAD, fixed=None, links=None):
+        """
+        Ubica un conjunto de VMs en los workers
+
+        Args:
+            vms: Lista de pares (nombre de VM, flavor)
+            strategy: "spread", "ffd", "best_fit" o "locality"
+            fixed: Worker ya decidido para algunas VMs (nombre -> worker); si
+                   la VM no cabe en ese worker queda en "unplaced"
+            links: Enlaces entre VMs como pares de nombres (necesarios para
+                   "locality"; pueden incluir VMs ya ubicadas)
+
+        Returns:
+            Diccionario con "placements" (nombre -> worker), "unplaced"
+            (VMs que no caben en ningún worker), "headroom" (recursos libres
+            por worker, None si son ilimitados) y, si se indicaron enlaces,
+            "cross_links" (enlaces cuyos extremos quedan en workers distintos)
+
+        Raises:
+            ValueError: si la estrategia es desconocida o una VM está fijada a
+            un worker que no existe (o no está entre los utilizables)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estrategia de ubicación desconocida: {strategy}")
+
+        fixed = fixed or {}
+        placements = {}
+        unplaced = []
+        pending = []
+
+        # Las VMs fijadas se ubican primero para que su carga cuente
+        for name, flavor in vms:
+            demand = flavor_demand(flavor)
+            if name in fixed:
+                worker = fixed[name]
+                if worker not in self._capacity:
+                    raise ValueError(f"La VM {name} está fijada al worker {worker}, que no existe")
+                if not self._fits(worker, demand):
+                    unplaced.append(name)
+                    continue
+                placements[name] = worker
+                self._add_load(worker, demand)
+            else:
+                pending.append((name, demand))
+
+        if strategy == LOCALITY:
+            unplaced = self._place_by_locality(pending, placements, links or ())
+        else:
+            # Las estrategias decrecientes ubican primero las VMs más grandes: O(n log n)
+            if strategy != SPREAD:
+                sizes = {demand: self._size(demand) for _, demand in pending}
+                pending.sort(key=lambda item: sizes[item[1]], reverse=True)
+
+            for name, demand in pending:
+                worker = self._choose(demand, strategy)
+                if worker is None:
+                    unplaced.append(name)
+                    continue
+                placements[name] = worker
+                self._add_load(worker, demand)
+
+        result = {
+            "placements": placements,
+            "unplaced": unplaced,
+            "headroom": self.headroom()
+        }
+        if links is not None:
+            result["cross_links"] = self.count_cross_links(links, placements)
+        return result
+
+    def count_cross_links(self, links, placements):
+        """
+        Cuenta los enlaces cuyos extremos están en workers distintos
+
+        Cada uno de estos enlaces obliga a que su VLAN atraviese el nodo OFS.
+        """
+        cross = 0
+        for vm_a, vm_b in links:
+            worker_a = placements.get(vm_a, self._existing.get(vm_a))
+            worker_b = placements.get(vm_b, self._existing.get(vm_b))
+            if worker_a is not None and worker_b is not None and worker_a != worker_b:
+                cross += 1
+        return cross
+
+    def _place_by_locality(self, pending, placements, links):
+        """
+        Ubica las VMs agrupando en el mismo worker las que están conectadas
+
+        Primero se hace un particionado voraz: las VMs se recorren en
+        profundidad por el grafo de enlaces (los subárboles quedan juntos) y cada una va al worker donde ya están más
+        vecinos suyos (o al menos cargado si no tiene ninguno). Después se
+        aplican pasadas de refinamiento al estilo Kernighan–Lin/Fiduccia–
+        Mattheyses moviendo VMs con ganancia positiva (más vecinos en el
+        worker destino que en el actual). Cada pasada cuesta O(n + E) y el
+        número de VMs nuevas por worker se limita al reparto equitativo más
+        un margen, para no concentrar toda la topología en un solo worker.
+
+        Returns:
+            Lista de las VMs que no caben en ningún worker
+        """
+        unplaced = []
+        if not self.workers:
+            return [name for name, _ in pending]
+
+        neighbors = {}
+        for vm_a, vm_b in links:
+            neighbors.setdefault(vm_a, []).append(vm_b)
+            neighbors.setdefault(vm_b, []).append(vm_a)
+
+        demands = dict(pending)
+        limit = math.ceil(len(pending) / len(self.workers) * (1 + LOCALITY_IMBALANCE))
+        new_count = {worker: 0 for worker in self.workers}
+        where = dict(self._existing)
+        where.update(placements)
+
+        def neighbor_counts(name):
+            counts = {}
+            for other in neighbors.get(name, ()):
+                worker = where.get(other)
+                if worker is not None:
+                    counts[worker] = counts.get(worker, 0) + 1
+            return counts
+
+        def load(worker, demand):
+            utilization = self._utilization(worker, demand)
+            return self._count[worker] if utilization is None else utilization
+
+        # Particionado voraz recorriendo el grafo en profundidad
+        visited = set()
+        for start, _ in pending:
+            if start in visited:
+                continue
+            visited.add(start)
+            stack = [start]
+            while stack:
+                name = stack.pop()
+                demand = demands[name]
+                counts = neighbor_counts(name)
+                candidates = [worker for worker in self.workers
+                              if new_count[worker] < limit and self._fits(worker, demand)]
+                if not candidates:
+                    # Sin hueco en el reparto equitativo: basta con que quepa
+                    candidates = [worker for worker in self.workers if self._fits(worker, demand)]
+                if candidates:
+                    worker = max(candidates, key=lambda w: (counts.get(w, 0), -load(w, demand), -w))
+                    where[name] = worker
+                    placements[name] = worker
+                    new_count[worker] += 1
+                    self._add_load(worker, demand)
+                else:
+                    unplaced.append(name)
+
+                for other in neighbors.get(name, ()):
+                    if other in demands and other not in visited:
+                        visited.add(other)
+                        stack.append(other)
+
+        # Refinamiento: mover VMs a workers con más vecinos mientras haya ganancia
+        for _ in range(LOCALITY_PASSES):
+            moved = 0
+            for name, demand in pending:
+                current = placements.get(name)
+                if current is None:
+                    continue
+                counts = neighbor_counts(name)
+                best, best_gain = None, 0
+                for worker, count in counts.items():
+                    gain = count - counts.get(current, 0)
+                    if (gain > best_gain and worker in new_count and worker != current
+                            and new_count[worker] < limit and self._fits(worker, demand)):
+                        best, best_gain = worker, gain
+                if best is not None:
+                    self._remove_load(current, demand)
+                    self._add_load(best, demand)
+                    new_count[current] -= 1
+                    new_count[best] += 1
+                    where[name] = placements[name] = best
+                    moved += 1
+            if not moved:
+                break
+
+        return unplaced
+
+    def _choose(self, demand, strategy):
+        """Elige el worker para una VM según la estrategia (None si no cabe)"""
+        candidates = [worker for worker in self.workers if self._fits(worker, demand)]
+        if not candidates:
+            return None
+
+        if strategy == FFD:
+            return candidates[0]
+
+        def load(worker):
+            utilization = self._utilization(worker, demand)
+            if utilization is None:
+                return (self._count[worker], worker)
+            return (utilization, worker)
+
+        if strategy == BEST_FIT:
+            return max(candidates, key=lambda worker: (load(worker)[0], -worker))
+        return min(candidates, key=load)
+
+    def headroom(self):
+        """Recursos libres de cada worker (None si el recurso es ilimitado)"""
+        return {
+            worker: {
+                resource: None if self._capacity[worker][r] == float("inf")
+                else self._capacity[worker][r] - self._used[worker][r]
+                for r, resource in enumerate(RESOURCES)
+            }
+            for worker in self.workers
+        }
@@ -0,0 +1,295 @@
+"""
+Planificación en seco de despliegues
+
+Compila una topología en la lista completa de operaciones remotas que
+ejecutaría TopologyExecutor, sin tocar ningún nodo, y estima su coste:
+
+- Viajes de ida y vuelta por SSH (comandos y copias; las comprobaciones de
+  los pasos solo se hacen al reanudar y se cuentan aparte)
+- VMs por worker, redes de VLAN y reglas de flujo
+- Tiempo total estimado
+
+La duración de cada paso es la mediana de las duraciones anotadas en los
+diarios de ejecuciones anteriores (<topología>.journal.jsonl) para ese tipo de
+paso; los tipos sin historial usan DEFAULT_STEP_SECONDS. El tiempo total se
+obtiene simulando el orden del motor de aprovisionamiento (dependencias entre
+tareas y límites de concurrencia total y por nodo).
+
+El plan puede exportarse a JSON para revisarlo o compararlo con una salida de
+referencia.
+"""
+
+import glob
+import heapq
+import json
+import os
+import re
+from collections import Counter, deque
+from statistics import median
+
+from .flows import count_flows
+from .journal import JOURNAL_SUFFIX
+from .provisioning import DEFAULT_MAX_PARALLEL, DEFAULT_PER_NODE_LIMIT, task_graph
+from .transport import LOCAL_NODE
+
+# Duración típica (segundos) de cada tipo de paso cuando no hay historial
+DEFAULT_STEP_SECONDS = {
+    "initialize_headnode": 20.0,
+    "initialize_ofs": 15.0,
+    "initialize_worker": 15.0,
+    "create_network": 3.0,
+    "internet_access": 3.0,
+    "connect_vlans": 1.0,
+    "upload_create_vm": 0.5,
+    "upload_add_interface": 0.5,
+    "create_vm": 10.0,
+    "add_interface": 1.5,
+    "start_vm": 3.0,
+    "flow_rules": 1.0,
+    "destroy_vm": 3.0,
+    "remove_interface": 1.0,
+    "delete_network": 2.0,
+}
+FALLBACK_STEP_SECONDS = 2.0
+
+
+def step_kind(name):
+    """Tipo de un paso: su nombre sin la VLAN o el par de VLANs (create_network_vlan100 -> create_network)"""
+    return re.sub(r"(_vlan\d+|_\d+_\d+)$", "", name)
+
+
+def history_files(topology_file=None):
+    """Diarios de ejecuciones anteriores en el directorio de la topología"""
+    directory = os.path.dirname(os.path.abspath(topology_file)) if topology_file else os.getcwd()
+    return sorted(glob.glob(os.path.join(directory, "*" + JOURNAL_SUFFIX)))
+
+
+def load_step_timings(paths):
+    """
+    Duración histórica de cada tipo de paso
+
+    Args:
+        paths: Diarios de pasos (JSONL) a leer
+
+    Returns:
+        Diccionario tipo de paso -> (mediana en segundos, número de muestras)
+    """
+    samples = {}
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if (record.get("event") != "step" or record.get("status") != "ok"
+                            or record.get("skipped") or not record.get("duration")):
+                        continue
+                    samples.setdefault(step_kind(record.get("step", "")), []).append(record["duration"])
+        except OSError as e:
+            print(f"Advertencia: No se pudo leer el historial {path}: {e}")
+    return {kind: (median(values), len(values)) for kind, values in samples.items()}
+
+
+def estimate_step(step, timings=None):
+    """Duración estimada de un paso en una ejecución nueva (sin su comprobación)"""
+    kind = step_kind(step.name)
+    if timings and kind in timings:
+        return timings[kind][0]
+    return DEFAULT_STEP_SECONDS.get(kind, FALLBACK_STEP_SECONDS)
+
+
+def simulate_plan(plan, timings=None, max_parallel=DEFAULT_MAX_PARALLEL,
+                  per_node_limit=DEFAULT_PER_NODE_LIMIT):
+    """
+    Simula la ejecución de un plan con las duraciones estimadas
+
+    Cada tarea empieza cuando terminan sus dependencias y hay hueco en el
+    pool (max_parallel) y en su nodo (per_node_limit), como en
+    ProvisioningEngine.
+
+    Returns:
+        Tupla (tiempo total, diccionario tarea -> (inicio, fin))
+    """
+    nodes, pending, dependents = task_graph(plan)
+    pending = list(pending)
+    waiting = deque(node for node in range(len(nodes)) if pending[node] == 0)
+    events = []
+    busy = Counter()
+    times = {}
+    running = 0
+    now = 0.0
+
+    def release(node):
+        for dependent in dependents[node]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                waiting.append(dependent)
+
+    while waiting or events:
+        blocked = []
+        while waiting:
+            node = waiting.popleft()
+            task = nodes[node][1]
+            if task is None:
+                release(node)
+                continue
+            host = task.steps[0].node if task.steps else LOCAL_NODE
+            if running >= max_parallel or busy[host] >= per_node_limit:
+                blocked.append(node)
+                continue
+            running += 1
+            busy[host] += 1
+            duration = sum(estimate_step(step, timings) for step in task.steps)
+            times[task] = (now, now + duration)
+            heapq.heappush(events, (now + duration, node, host))
+        waiting.extend(blocked)
+
+        if not events:
+            break
+        now, node, host = heapq.heappop(events)
+        running -= 1
+        busy[host] -= 1
+        release(node)
+
+    return now, times
+
+
+def plan_to_dict(plan, timings=None):
+    """
+    Representación JSON de todas las operaciones de un plan
+
+    Returns:
+        Diccionario con las fases, sus tareas (con dependencias como
+        "fase/tarea") y los pasos de cada tarea con su duración estimada
+    """
+    phase_of = {task: phase.name for phase in plan.phases for task in phase.tasks}
+    phases = []
+    for phase in plan.phases:
+        tasks = []
+        for task in phase.tasks:
+            steps = []
+            for step in task.steps:
+                entry = {"name": step.name, "node": step.node, "action": step.action}
+                if step.action == "upload":
+                    entry["local_path"] = step.local_path
+                    entry["remote_path"] = step.remote_path
+                else:
+                    entry["command"] = step.command
+                    if step.stdin is not None:
+                        entry["stdin"] = step.stdin
+                    if step.stdin_path:
+                        entry["stdin_path"] = step.stdin_path
+                if step.check:
+                    entry["check"] = step.check
+                entry["estimate"] = round(estimate_step(step, timings), 2)
+                steps.append(entry)
+            deps = None if task.deps is None else [f"{phase_of[dep]}/{dep.name}" for dep in task.deps]
+            tasks.append({"name": task.name, "deps": deps, "steps": steps})
+        phases.append({"name": phase.name, "tasks": tasks})
+    return {"name": plan.name, "phases": phases}
+
+
+def summarize_plan(plan, timings=None, max_parallel=DEFAULT_MAX_PARALLEL,
+                   per_node_limit=DEFAULT_PER_NODE_LIMIT):
+    """
+    Cuenta las operaciones de un plan y estima su duración
+
+    Returns:
+        Diccionario con los totales (pasos, viajes SSH, comprobaciones al
+        reanudar, VMs por worker, redes, reglas de flujo) y la estimación de
+        tiempo
+    """
+    steps = plan.steps()
+    round_trips = local = uploads = checks = 0
+    vms_per_worker = Counter()
+    networks = flows = 0
+    for step in steps:
+        if step.node == LOCAL_NODE:
+            local += 1
+        else:
+            round_trips += 1
+        if step.check:
+            checks += 1
+        if step.action == "upload":
+            uploads += 1
+        kind = step_kind(step.name)
+        if kind == "create_vm":
+            vms_per_worker[step.node] += 1
+        elif kind == "create_network":
+            networks += 1
+        elif kind == "flow_rules" and step.stdin:
+            flows = count_flows(step.stdin)
+
+    wall_time, _ = simulate_plan(plan, timings, max_parallel, per_node_limit)
+    return {
+        "topology": plan.name,
+        "phases": len(plan.phases),
+        "tasks": sum(len(phase.tasks) for phase in plan.phases),
+        "steps": len(steps),
+        "ssh_round_trips": round_trips,
+        "local_commands": local,
+        "resume_checks": checks,
+        "uploads": uploads,
+        "vms": sum(vms_per_worker.values()),
+        "vms_per_worker": dict(sorted(vms_per_worker.items())),
+        "vlan_networks": networks,
+        "flows": flows,
+        "estimate": {
+            "wall_time": round(wall_time, 1),
+            "serial_time": round(sum(estimate_step(step, timings) for step in steps), 1),
+            "max_parallel": max_parallel,
+            "per_node_limit": per_node_limit,
+            "history_kinds": sorted(timings or ())
+        }
+    }
+
+
+def print_plan_summary(summary):
+    """Imprime el resumen de un plan"""
+    estimate = summary["estimate"]
+    print(f"\nPlan de {summary['topology']}: {summary['phases']} fases, {summary['tasks']} tareas, "
+          f"{summary['steps']} pasos")
+    print(f"- Viajes SSH: {summary['ssh_round_trips']} ({summary['uploads']} copias de archivos)")
+    print(f"- Comandos locales: {summary['local_commands']}")
+    print(f"- Comprobaciones al reanudar: {summary['resume_checks']}")
+    print(f"- VMs: {summary['vms']}")
+    for worker, count in summary["vms_per_worker"].items():
+        print(f"  {worker}: {count}")
+    print(f"- Redes de VLAN: {summary['vlan_networks']}")
+    print(f"- Reglas de flujo: {summary['flows']}")
+    source = (f"historial de {len(estimate['history_kinds'])} tipos de paso"
+              if estimate["history_kinds"] else "valores por defecto")
+    print(f"- Tiempo estimado: {format_seconds(estimate['wall_time'])} "
+          f"(en serie: {format_seconds(estimate['serial_time'])}; {estimate['max_parallel']} en paralelo, "
+          f"máximo {estimate['per_node_limit']} por nodo; {source})")
+
+
+def format_seconds(seconds):
+    """Formatea una duración como 1h 02m 03s"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def export_plan(plan, summary, path, timings=None):
+    """
+    Guarda el plan y su resumen en un archivo JSON
+
+    Returns:
+        True si se guardó correctamente
+    """
+    try:
+        with open(path, "w") as f:
+            json.dump({"summary": summary, "plan": plan_to_dict(plan, timings)}, f,
+                      indent=2, ensure_ascii=False)
+        return True
+    except OSError as e:
+        print(f"Error al guardar el plan en {path}: {e}")
+        return False
@@ -0,0 +1,728 @@
+"""
+Motor de aprovisionamiento de topologías
+
+Este módulo construye, a partir de un objeto Topology, el mismo plan que
+ejecuta create_flexible_topology.sh (inicializar nodos, crear redes, crear y
+arrancar las VMs y cargar las reglas de flujo en el nodo OFS) y lo ejecuta en
+paralelo con un límite de operaciones simultáneas por nodo.
+
+El plan se divide en fases que se ejecutan en orden. Cada fase contiene tareas
+independientes que se ejecutan en paralelo, y cada tarea es una secuencia de
+pasos (comandos o copias de archivos) sobre un mismo nodo. Los comandos se
+envían a través de un Transport, de modo que en pruebas puede usarse
+FakeTransport en lugar de SSH.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .allocators import INTERNET_VLAN
+from .flows import BRIDGE, REPLACE, vm_vlans, build_flow_file, flow_command
+from .transport import LOCAL_NODE, SubprocessTransport, CommandResult
+from .journal import step_key
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+REMOTE_DIR = "/tmp"
+OFS_PORTS = ("ens5", "ens6", "ens7", "ens8")
+
+DEFAULT_MAX_PARALLEL = 16      # Pasos simultáneos en total
+DEFAULT_PER_NODE_LIMIT = 4     # Pasos simultáneos por nodo
+DEFAULT_STEP_TIMEOUT = 600     # Segundos
+
+
+def script_path(*parts):
+    """Ruta absoluta de un script del directorio scripts/"""
+    return os.path.join(SCRIPTS_DIR, *parts)
+
+
+def vnc_real_port(vnc_port):
+    """Puerto VNC real (create_vm.sh suma 5900 a los puertos menores que 5900)"""
+    return vnc_port + 5900 if vnc_port < 5900 else vnc_port
+
+
+class Step:
+    """Un comando o una copia de archivo sobre un nodo"""
+
+    __slots__ = ("name", "node", "action", "command", "stdin", "stdin_path",
+                 "local_path", "remote_path", "check", "result", "duration", "skipped")
+
+    def __init__(self, name, node, command=None, stdin=None, stdin_path=None,
+                 local_path=None, remote_path=None, check=None):
+        """
+        Args:
+            check: Comando que termina con éxito si el paso ya está hecho
+                   (opcional); al reanudar una ejecución, o si el diario no
+                   confirma un paso que empezó, se comprueba antes y el paso
+                   no se ejecuta si ya está hecho
+        """
+        self.name = name
+        self.node = node
+        self.action = "upload" if local_path else "run"
+        self.command = command
+        self.stdin = stdin
+        self.stdin_path = stdin_path
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.check = check
+        self.result = None
+        self.duration = None
+        self.skipped = None  # "journal" o "check" si el paso no se ejecutó por estar hecho
+
+    @classmethod
+    def upload(cls, name, node, local_path, remote_path):
+        """Crea un paso que copia un archivo al nodo"""
+        return cls(name, node, local_path=local_path, remote_path=remote_path)
+
+    def __repr__(self):
+        return f"Step({self.name!r}, node={self.node!r})"
+
+
+class Task:
+    """
+    Secuencia de pasos que se ejecutan en orden
+
+    deps indica las tareas de las que depende. Si es None la tarea depende de
+    todas las tareas de las fases anteriores (barrera de fase); una lista,
+    aunque esté vacía, sustituye a la barrera por esas dependencias.
+    """
+
+    __slots__ = ("name", "steps", "deps", "start", "end")
+
+    def __init__(self, name, steps=None, deps=None):
+        self.name = name
+        self.steps = steps or []
+        self.deps = deps
+        self.start = None   # Segundos desde el inicio de la ejecución
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"Task({self.name!r})"
+
+
+class Phase:
+    """Conjunto de tareas independientes que pueden ejecutarse en paralelo"""
+
+    __slots__ = ("name", "tasks")
+
+    def __init__(self, name, tasks=None):
+        self.name = name
+        self.tasks = tasks or []
+
+    def add(self, name, *steps, deps=None):
+        """Agrega una tarea con los pasos indicados y sus dependencias (opcional)"""
+        task = Task(name, list(steps), None if deps is None else list(deps))
+        self.tasks.append(task)
+        return task
+
+
+class ProvisioningPlan:
+    """Plan de aprovisionamiento: lista ordenada de fases"""
+
+    def __init__(self, name=""):
+        self.name = name
+        self.phases = []
+
+    def add_phase(self, name):
+        phase = Phase(name)
+        self.phases.append(phase)
+        return phase
+
+    def steps(self):
+        """Todos los pasos del plan en orden"""
+        return [step for phase in self.phases for task in phase.tasks for step in task.steps]
+
+
+def worker_address(topology, worker):
+    """Dirección del worker a partir de su índice (1..N)"""
+    workers = topology.nodes.get("workers", [])
+    if not isinstance(worker, int) or not 1 <= worker <= len(workers):
+        raise ValueError(f"Índice de worker inválido: {worker}")
+    return workers[worker - 1]
+
+
+def network_steps(vlan_id):
+    """Pasos que crean en el head node la red de una VLAN"""
+    return [Step(
+        f"create_network_vlan{vlan_id}", LOCAL_NODE,
+        f"{script_path('network', 'create_network.sh')} vlan{vlan_id} {vlan_id} 192.168.{vlan_id}.0/24 "
+        f"192.168.{vlan_id}.10,192.168.{vlan_id}.200"
+    )]
+
+
+def internet_network_steps(interfaces):
+    """Pasos que crean la red de Internet (VLAN 10) y su salida NAT"""
+    return network_steps(INTERNET_VLAN) + [Step(
+        "internet_access", LOCAL_NODE,
+        f"sudo {script_path('network', 'internet_access.sh')} {INTERNET_VLAN} "
+        f"{interfaces.get('head_internet')}"
+    )]
+
+
+def upload_steps(address):
+    """Pasos que copian a un worker los scripts de gestión de VMs"""
+    return [
+        Step.upload("upload_create_vm", address,
+                    script_path("vm_management", "create_vm.sh"), f"{REMOTE_DIR}/create_vm.sh"),
+        Step.upload("upload_add_interface", address,
+                    script_path("vm_management", "add_interface.sh"), f"{REMOTE_DIR}/add_interface.sh")
+    ]
+
+
+def interface_step(name, address, vlan_id, mac=None):
+    """Paso que agrega a una VM una interfaz en la VLAN indicada"""
+    mac_arg = f' "{mac}"' if mac else ""
+    vlan_arg = INTERNET_VLAN if vlan_id == INTERNET_VLAN else f'"{vlan_id}"'
+    return Step(
+        f"add_interface_vlan{vlan_id}", address,
+        f'sudo bash {REMOTE_DIR}/add_interface.sh "{name}" {BRIDGE} {vlan_arg}{mac_arg}',
+        check=f'ip link show "tap-{name}-vlan{vlan_id}" >/dev/null 2>&1'
+    )
+
+
+def start_step(name, address):
+    """Paso que arranca una VM (se omite si ya está en ejecución)"""
+    return Step("start_vm", address, f'sudo virsh start "{name}"',
+                check=f'sudo virsh domstate "{name}" 2>/dev/null | grep -q running')
+
+
+def vm_steps(vm, address, vlans, internet=False, start=True):
+    """
+    Pasos que crean una VM, le agregan sus interfaces y la arrancan
+
+    Args:
+        vm: Registro de la VM
+        address: Dirección del worker
+        vlans: VLANs de la VM (ordenadas)
+        internet: Agregar la interfaz de la VLAN de Internet
+        start: Incluir el paso que arranca la VM
+    """
+    name = vm["name"]
+    flavor = vm.get("flavor") or {}
+    mac = vm.get("mac")
+
+    steps = [Step(
+        "create_vm", address,
+        f'sudo bash {REMOTE_DIR}/create_vm.sh "{name}" "{vnc_real_port(vm["vnc_port"])}" "{mac}" '
+        f'"{flavor.get("cpu")}" "{flavor.get("ram")}" "{flavor.get("disk")}" '
+        f'"{flavor.get("image", "ubuntu.img")}"',
+        check=f'sudo virsh dominfo "{name}" >/dev/null 2>&1'
+    )]
+    if internet:
+        steps.append(interface_step(name, address, INTERNET_VLAN))
+    for i, vlan_id in enumerate(vlans):
+        # La primera VLAN usa la MAC principal de la VM
+        steps.append(interface_step(name, address, vlan_id, mac if i == 0 else None))
+    if start:
+        steps.append(start_step(name, address))
+    return steps
+
+
+def flow_step(topology, vlans=None):
+    """Paso que sustituye la tabla de flujos del nodo OFS"""
+    return Step("flow_rules", topology.nodes.get("ofs_node"), flow_command(REPLACE),
+                stdin=build_flow_file(topology, vlans))
+
+
+def interface_mac(name, vlan_id):
+    """MAC que add_interface.sh genera para las interfaces sin MAC explícita"""
+    digest = hashlib.md5(f"{name}{vlan_id}".encode()).hexdigest()[:6]
+    return "52:54:00:" + ":".join(digest[i:i + 2] for i in range(0, 6, 2))
+
+
+def destroy_vm_command(name):
+    """Comando que detiene y elimina una VM y su disco (no falla si no existe)"""
+    return (f'sudo virsh dominfo "{name}" >/dev/null 2>&1 || exit 0; '
+            f'sudo virsh destroy "{name}" 2>/dev/null || true; '
+            f'sudo virsh undefine "{name}" --remove-all-storage 2>/dev/null || true')
+
+
+def detach_interface_command(name, vlan_id):
+    """Comando que quita de una VM la interfaz de una VLAN y su puerto TAP"""
+    tap = f"tap-{name}-vlan{vlan_id}"
+    mac = interface_mac(name, vlan_id)
+    return (f'sudo virsh detach-interface "{name}" bridge --mac {mac} --persistent --live 2>/dev/null || '
+            f'sudo virsh detach-interface "{name}" bridge --mac {mac} --config 2>/dev/null || true; '
+            f'sudo ovs-vsctl --if-exists del-port {BRIDGE} "{tap}"; '
+            f'sudo ip link delete "{tap}" 2>/dev/null || true')
+
+
+def delete_network_command(vlan_id):
+    """
+    Comando que elimina del head node la red de una VLAN
+
+    Deshace lo que crea create_network.sh, igual que cleanup_topology.sh para
+    cada VLAN: dnsmasq, namespace DHCP, par veth, puerto interno del OVS y
+    configuración de dnsmasq. No falla si algo ya no existe.
+    """
+    pid_file = f"/var/run/dnsmasq_vlan{vlan_id}.pid"
+    return (f'[ -f {pid_file} ] && sudo kill "$(sudo cat {pid_file})" 2>/dev/null; '
+            f"sudo ip netns delete dhcp_vlan{vlan_id} 2>/dev/null; "
+            f"sudo ovs-vsctl --if-exists del-port {BRIDGE} veth_ovs_{vlan_id}; "
+            f"sudo ip link delete dev veth_ovs_{vlan_id} 2>/dev/null; "
+            f"sudo rm -f /etc/dnsmasq.d/vlan{vlan_id}.conf {pid_file}; "
+            f"sudo ovs-vsctl --if-exists del-port {BRIDGE} vlan{vlan_id}; "
+            f"sudo ovs-vsctl del-br br-vlan{vlan_id} 2>/dev/null; "
+            f"sudo ip link delete dev vlan{vlan_id} 2>/dev/null || true")
+
+
+def build_provisioning_plan(topology):
+    """
+    Construye el plan de aprovisionamiento de una topología
+
+    Args:
+        topology: Topología a desplegar
+
+    Las tareas declaran sus dependencias para que cada una empiece en cuanto
+    está lista: las redes dependen del head node, las VMs de la
+    inicialización de su worker y de la copia de scripts, el arranque de cada
+    VM de sus redes y las reglas de flujo solo del nodo OFS.
+
+    Returns:
+        ProvisioningPlan con las fases init, networks, vlan_communication,
+        upload, vms, start y flows
+    """
+    nodes = topology.nodes
+    interfaces = topology.interfaces
+    settings = topology.settings
+    ofs_node = nodes.get("ofs_node")
+    workers = nodes.get("workers", [])
+    vlans = vm_vlans(topology)
+    unique_vlans = sorted({vlan_id for ids in vlans.values() for vlan_id in ids})
+    enable_internet = settings.get("enable_internet", False)
+    internet_vms = set(topology.vm_internet_access)
+
+    plan = ProvisioningPlan(topology.name)
+
+    # Fase 1: inicializar head node, nodo OFS y workers
+    phase = plan.add_phase("init")
+    head = phase.add("head_node", Step(
+        "initialize_headnode", LOCAL_NODE,
+        f"sudo {script_path('setup', 'initialize_headnode.sh')} {BRIDGE} {interfaces.get('head_ofs')}"
+    ))
+    ofs = phase.add(f"ofs:{ofs_node}", Step(
+        "initialize_ofs", ofs_node,
+        f"sudo bash -s {BRIDGE} {' '.join(OFS_PORTS)}",
+        stdin_path=script_path("setup", "initialize_worker.sh")
+    ), deps=[])
+    worker_init = {}
+    for worker in workers:
+        worker_init[worker] = phase.add(f"worker:{worker}", Step(
+            "initialize_worker", worker,
+            f"sudo bash -s {BRIDGE} {interfaces.get('worker_ofs')}",
+            stdin_path=script_path("setup", "initialize_worker.sh")
+        ), deps=[])
+
+    # Fase 2: redes (VLAN 10 para Internet y una red por VLAN de conexión)
+    phase = plan.add_phase("networks")
+    networks = {}
+    if enable_internet:
+        networks[INTERNET_VLAN] = phase.add(f"vlan{INTERNET_VLAN}", *internet_network_steps(interfaces),
+                                            deps=[head])
+    for vlan_id in unique_vlans:
+        networks[vlan_id] = phase.add(f"vlan{vlan_id}", *network_steps(vlan_id), deps=[head])
+
+    # Fase 3: comunicación entre VLANs (si está habilitada)
+    if settings.get("enable_vlan_communication", False):
+        phase = plan.add_phase("vlan_communication")
+        connect_vlans = script_path("network", "connect_vlans.sh")
+        for i, vlan_a in enumerate(unique_vlans):
+            for vlan_b in unique_vlans[i + 1:]:
+                phase.add(f"vlan{vlan_a}-vlan{vlan_b}", Step(
+                    f"connect_vlans_{vlan_a}_{vlan_b}", LOCAL_NODE,
+                    f"sudo {connect_vlans} {vlan_a} {vlan_b}"
+                ), deps=[networks[vlan_a], networks[vlan_b]])
+
+    # Fase 4: copiar los scripts de VMs una sola vez por worker
+    phase = plan.add_phase("upload")
+    used_workers = sorted({vm["worker"] for vm in topology.vms})
+    uploads = {}
+    for worker in used_workers:
+        address = worker_address(topology, worker)
+        uploads[address] = phase.add(f"worker:{address}", *upload_steps(address), deps=[])
+
+    # Fase 5: crear cada VM y conectar sus interfaces
+    phase = plan.add_phase("vms")
+    created = {}
+    for vm in topology.vms:
+        name = vm["name"]
+        address = worker_address(topology, vm["worker"])
+        deps = [uploads[address]] + ([worker_init[address]] if address in worker_init else [])
+        created[name] = phase.add(name, *vm_steps(vm, address, vlans.get(name, ()),
+                                                  name in internet_vms, start=False), deps=deps)
+
+    # Fase 6: arrancar cada VM cuando existen sus redes (para que obtenga IP por DHCP)
+    phase = plan.add_phase("start")
+    for vm in topology.vms:
+        name = vm["name"]
+        vm_networks = [networks[vlan_id] for vlan_id in vlans.get(name, ())]
+        if enable_internet and name in internet_vms:
+            vm_networks.append(networks[INTERNET_VLAN])
+        phase.add(name, start_step(name, worker_address(topology, vm["worker"])),
+                  deps=[created[name]] + vm_networks)
+
+    # Fase 7: reglas de flujo en el nodo OFS
+    phase = plan.add_phase("flows")
+    phase.add(f"ofs:{ofs_node}", flow_step(topology, vlans), deps=[ofs])
+
+    return plan
+
+
+class ProvisioningReport:
+    """Resultado de ejecutar un plan: pasos ejecutados, tiempos y fallos"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.phase_durations = {}
+        self.failed = []          # (fase, tarea, paso)
+        self.cancelled = []       # (fase, tarea) no ejecutadas por fallar una dependencia
+        self.aborted_phases = []  # Fases en las que no se ejecutó ninguna tarea
+        self.duration = 0.0
+        self.waited_on = {}       # tarea -> última tarea de la que tuvo que esperar
+
+    @property
+    def success(self):
+        return not self.failed and not self.cancelled
+
+    def executed_steps(self):
+        """Pasos que llegaron a ejecutarse"""
+        return [step for step in self.plan.steps() if step.result is not None and not step.skipped]
+
+    def skipped_steps(self):
+        """Pasos omitidos por estar ya hechos (según el diario o su comprobación)"""
+        return [step for step in self.plan.steps() if step.skipped]
+
+    def slowest_steps(self, count=5):
+        """Pasos que más tardaron"""
+        return sorted(self.executed_steps(), key=lambda step: step.duration, reverse=True)[:count]
+
+    def critical_path(self):
+        """
+        Cadena de tareas que determinó la duración total
+
+        Parte de la tarea que terminó más tarde y retrocede por la dependencia
+        que terminó en último lugar antes de que pudiera empezar.
+
+        Returns:
+            Lista de pares (fase, tarea) en orden de ejecución
+        """
+        phases = {task: phase for phase in self.plan.phases for task in phase.tasks}
+        finished = [task for task in phases if task.end is not None]
+        if not finished:
+            return []
+        task = max(finished, key=lambda t: t.end)
+        path = []
+        while task is not None:
+            path.append((phases[task].name, task))
+            task = self.waited_on.get(task)
+        return path[::-1]
+
+    def step_timings(self):
+        """Duración de cada paso ejecutado como lista de diccionarios"""
+        return [
+            {
+                "phase": phase.name,
+                "task": task.name,
+                "step": step.name,
+                "node": step.node,
+                "duration": round(step.duration, 3),
+                "skipped": step.skipped
+            }
+            for phase in self.plan.phases for task in phase.tasks for step in task.steps
+            if step.duration is not None
+        ]
+
+    def print_summary(self):
+        """Imprime un resumen de la ejecución"""
+        print(f"\nAprovisionamiento {'completado' if self.success else 'con errores'} "
+              f"en {self.duration:.1f}s ({len(self.executed_steps())} pasos)")
+        skipped = self.skipped_steps()
+        if skipped:
+            print(f"Pasos omitidos por estar ya hechos: {len(skipped)}")
+        for name, duration in self.phase_durations.items():
+            print(f"- Fase {name}: {duration:.1f}s")
+
+        path = self.critical_path()
+        if len(path) > 1:
+            print("Ruta crítica:")
+            for phase, task in path:
+                print(f"  {phase}/{task.name}: {task.duration:.1f}s (empieza en {task.start:.1f}s)")
+        slowest = [step for step in self.slowest_steps() if step.duration]
+        if slowest:
+            print("Pasos más lentos:")
+            for step in slowest:
+                print(f"  {step.name} ({step.node}): {step.duration:.1f}s")
+
+        for phase, task, step in self.failed:
+            stderr = step.result.stderr.strip().splitlines()[-1:] if step.result else []
+            print(f"  Error en {phase}/{task}/{step.name} ({step.node}): {' '.join(stderr)}")
+        if self.cancelled:
+            print(f"Tareas no ejecutadas por fallos en sus dependencias: {len(self.cancelled)}")
+        if self.aborted_phases:
+            print(f"Fases no ejecutadas: {', '.join(self.aborted_phases)}")
+
+
+def task_graph(plan):
+    """
+    Grafo de dependencias entre las tareas de un plan
+
+    Además de las tareas, el grafo tiene una barrera al final de cada fase que
+    depende de todas sus tareas y de la barrera anterior; las tareas sin
+    dependencias explícitas dependen de la barrera de la fase previa.
+
+    Returns:
+        Tupla (nodos, pendientes, dependientes): los nodos son pares
+        (fase, tarea), con tarea None en las barreras; pendientes es el
+        número de dependencias de cada nodo y dependientes la lista de nodos
+        que dependen de cada uno
+    """
+    nodes = []
+    index = {}
+    for phase in plan.phases:
+        for task in phase.tasks:
+            index[task] = len(nodes)
+            nodes.append((phase, task))
+        nodes.append((phase, None))
+
+    pending = [0] * len(nodes)
+    dependents = [[] for _ in nodes]
+
+    def depend(node, dep):
+        pending[node] += 1
+        dependents[dep].append(node)
+
+    position = 0
+    barrier = None
+    for phase in plan.phases:
+        for task in phase.tasks:
+            node = index[task]
+            if task.deps is None:
+                if barrier is not None:
+                    depend(node, barrier)
+            else:
+                for dep in task.deps:
+                    depend(node, index[dep])
+        position += len(phase.tasks)
+        for task in phase.tasks:
+            depend(position, index[task])
+        if barrier is not None:
+            depend(position, barrier)
+        barrier = position
+        position += 1
+
+    return nodes, pending, dependents
+
+
+class ProvisioningEngine:
+    """
+    Ejecuta planes de aprovisionamiento en paralelo
+
+    Las tareas se reparten en un pool de hilos en cuanto terminan sus
+    dependencias; cada paso toma un semáforo de su nodo, de modo que nunca hay más de per_node_limit
+    pasos simultáneos en el mismo nodo.
+    """
+
+    def __init__(self, transport=None, max_parallel=DEFAULT_MAX_PARALLEL,
+                 per_node_limit=DEFAULT_PER_NODE_LIMIT, step_timeout=DEFAULT_STEP_TIMEOUT,
+                 verbose=True, progress=None):
+        """
+        Args:
+            transport: Transporte para ejecutar los pasos (por defecto ssh/scp)
+            max_parallel: Número máximo de pasos simultáneos en total
+            per_node_limit: Número máximo de pasos simultáneos por nodo
+            step_timeout: Tiempo máximo de cada paso en segundos
+            verbose: Mostrar el progreso de cada tarea
+            progress: Función (fase, tarea, paso fallido o None, tareas
+                      terminadas, total de tareas) que se llama al terminar
+                      cada tarea, en orden de finalización (opcional)
+        """
+        self.transport = transport or SubprocessTransport()
+        self.max_parallel = max(1, max_parallel)
+        self.per_node_limit = max(1, per_node_limit)
+        self.step_timeout = step_timeout
+        self.verbose = verbose
+        self.progress = progress
+        self._node_locks = {}
+        self._lock = threading.Lock()
+        self._stdin_cache = {}
+
+    def _node_semaphore(self, node):
+        with self._lock:
+            semaphore = self._node_locks.get(node)
+            if semaphore is None:
+                semaphore = self._node_locks[node] = threading.BoundedSemaphore(self.per_node_limit)
+            return semaphore
+
+    def _read_stdin(self, path):
+        """Lee (una sola vez) un script que se envía por la entrada estándar"""
+        with self._lock:
+            if path not in self._stdin_cache:
+                with open(path, "r") as f:
+                    self._stdin_cache[path] = f.read()
+            return self._stdin_cache[path]
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def run_step(self, step, verify=False):
+        """
+        Ejecuta un paso y registra su resultado y su duración
+
+        Args:
+            verify: Comprobar antes con step.check si el paso ya está hecho
+        """
+        start = time.perf_counter()
+        try:
+            with self._node_semaphore(step.node):
+                if verify and step.check and self.transport.check(step.node, step.check, timeout=self.step_timeout).ok:
+                    step.skipped = "check"
+                    step.result = CommandResult(0, "", "Ya realizado")
+                elif step.action == "upload":
+                    step.result = self.transport.upload(step.node, step.local_path, step.remote_path)
+                else:
+                    stdin = step.stdin
+                    if stdin is None and step.stdin_path:
+                        stdin = self._read_stdin(step.stdin_path)
+                    step.result = self.transport.run(step.node, step.command, stdin=stdin,
+                                                     timeout=self.step_timeout)
+        except Exception as e:
+            step.result = CommandResult(1, "", str(e))
+        step.duration = time.perf_counter() - start
+        return step.result.ok
+
+    def _run_task(self, phase, task, journal=None, completed=(), verify=()):
+        """
+        Ejecuta los pasos de una tarea en orden; se detiene en el primer fallo
+
+        Los pasos que el diario registra como completados no se ejecutan.
+
+        Args:
+            verify: True para comprobar todos los pasos antes de ejecutarlos,
+                    o identificadores de los pasos que hay que comprobar
+        """
+        for step in task.steps:
+            key = step_key(phase.name, task.name, step) if journal is not None else None
+            if key in completed:
+                step.skipped = "journal"
+                step.result = CommandResult(0, "", "Completado en una ejecución anterior")
+                step.duration = 0.0
+                continue
+            if journal is not None:
+                journal.start(key, phase.name, task.name, step)
+            ok = self.run_step(step, verify=verify is True or key in verify)
+            if journal is not None:
+                journal.record(key, phase.name, task.name, step)
+            if not ok:
+                return step
+        return None
+
+    def run(self, plan, journal=None):
+        """
+        Ejecuta un plan como un grafo de dependencias
+
+        Cada tarea empieza en cuanto terminan las tareas de las que depende
+        (ver Task.deps), respetando los límites de concurrencia total y por
+        nodo. Si una tarea falla, las que dependen de ella (directa o
+        indirectamente) no se ejecutan; el resto continúa.
+
+        Args:
+            plan: Plan a ejecutar
+            journal: StepJournal donde anotar cada paso (opcional); los pasos
+                     que ya figuran como completados se omiten y, si se
+                     reanuda una ejecución o un paso empezó sin terminar,
+                     se comprueba (Step.check) si ya está hecho
+
+        Returns:
+            ProvisioningReport con los tiempos, la ruta crítica y los fallos
+        """
+        report = ProvisioningReport(plan)
+        start = time.perf_counter()
+        completed = set()
+        verify = ()
+        if journal is not None:
+            completed = journal.completed_keys()
+            verify = True if journal.pending_resume() else journal.unconfirmed_keys()
+            journal.begin(plan)
+
+        nodes, pending, dependents = task_graph(plan)
+        blocked = [False] * len(nodes)
+        last = [None] * len(nodes)     # Tarea que terminó en último lugar entre las dependencias
+        finished_by = [None] * len(nodes)
+        phase_done = {phase.name: 0 for phase in plan.phases}
+        ready = deque(node for node in range(len(nodes)) if pending[node] == 0)
+        self._log(f"Plan {plan.name}: {len(nodes) - len(plan.phases)} tareas en {len(plan.phases)} fases")
+
+        def finish(node, ok):
+            for dependent in dependents[node]:
+                if not ok:
+                    blocked[dependent] = True
+                cause = finished_by[node]
+                if cause is not None and (last[dependent] is None or cause.end >= last[dependent].end):
+                    last[dependent] = cause
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            running = {}
+            while ready or running:
+                while ready:
+                    node = ready.popleft()
+                    phase, task = nodes[node]
+                    if task is None:
+                        # Barrera: la fase ha terminado
+                        finished_by[node] = last[node]
+                        self._log_phase(report, phase)
+                        finish(node, not blocked[node])
+                    elif blocked[node]:
+                        report.cancelled.append((phase.name, task.name))
+                        finish(node, False)
+                    else:
+                        report.waited_on[task] = last[node]
+                        task.start = time.perf_counter() - start
+                        future = pool.submit(self._run_task, phase, task, journal, completed, verify)
+                        running[future] = node
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    phase, task = nodes[node]
+                    task.end = time.perf_counter() - start
+                    failed_step = future.result()
+                    phase_done[phase.name] += 1
+                    if failed_step is not None:
+                        report.failed.append((phase.name, task.name, failed_step))
+                        self._log(f"  {task.name}: ERROR en {failed_step.name}")
+                    if self.progress is not None:
+                        self.progress(phase.name, task, failed_step, phase_done[phase.name],
+                                      len(phase.tasks))
+                    finished_by[node] = task
+                    finish(node, failed_step is None)
+
+        report.aborted_phases = [phase.name for phase in plan.phases
+                                 if phase.tasks and all(task.start is None for task in phase.tasks)]
+        report.duration = time.perf_counter() - start
+        if journal is not None and report.success:
+            journal.complete()
+        return report
+
+    def _log_phase(self, report, phase):
+        """Registra la duración de una fase (desde su primera tarea hasta la última)"""
+        starts = [task.start for task in phase.tasks if task.start is not None]
+        ends = [task.end for task in phase.tasks if task.end is not None]
+        if not starts:
+            return
+        report.phase_durations[phase.name] = max(ends) - min(starts)
+        self._log(f"Fase {phase.name} terminada en {report.phase_durations[phase.name]:.1f}s")
@@ -0,0 +1,288 @@
+"""
+Aplicación incremental de cambios en topologías
+
+Tras cada despliegue correcto se guarda, junto al archivo de la topología, una
+copia del estado desplegado (<topología>.deployed.json). Al volver a ejecutar
+una topología modificada se compara ese estado con la topología editada y se
+calcula el conjunto mínimo de cambios:
+
+- VMs agregadas, eliminadas o que deben recrearse (cambio de worker, flavor,
+  MAC, puerto VNC o de la VLAN que usa la MAC principal)
+- Interfaces agregadas o quitadas en las VMs que se conservan
+- Redes de VLAN (y la red de Internet) creadas o eliminadas
+- Reglas de flujo, que se sustituyen con replace-flows solo si cambian
+
+Con esos cambios se construye un ProvisioningPlan que ejecuta el mismo motor
+en paralelo que el despliegue completo.
+"""
+
+import json
+import os
+
+from .allocators import INTERNET_VLAN
+from .flows import vm_vlans, build_flow_file
+from .models import Topology
+from .transport import LOCAL_NODE
+from .provisioning import (ProvisioningPlan, Step, script_path, worker_address, network_steps,
+                           internet_network_steps, upload_steps, interface_step, vm_steps,
+                           flow_step, destroy_vm_command, detach_interface_command,
+                           delete_network_command)
+
+DEPLOYED_SUFFIX = ".deployed.json"
+
+# Campos de una VM cuyo cambio obliga a recrearla
+VM_IDENTITY = ("worker", "mac", "vnc_port")
+FLAVOR_FIELDS = ("cpu", "ram", "disk", "image")
+
+
+def deployed_state_path(topology_file):
+    """Ruta del estado desplegado asociado a un archivo de topología"""
+    return os.path.splitext(topology_file)[0] + DEPLOYED_SUFFIX
+
+
+def load_deployed_state(path):
+    """
+    Carga el estado desplegado guardado en el último despliegue
+
+    Returns:
+        Topology con el estado desplegado o None si no existe o es inválido
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return Topology.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Advertencia: No se pudo leer el estado desplegado {path}: {e}")
+        return None
+
+
+def save_deployed_state(topology, path):
+    """Guarda la topología como estado desplegado"""
+    try:
+        with open(path, "w") as f:
+            json.dump(topology.to_dict(), f, indent=2)
+        return True
+    except OSError as e:
+        print(f"Advertencia: No se pudo guardar el estado desplegado en {path}: {e}")
+        return False
+
+
+def _internet_vms(topology):
+    """VMs con acceso a Internet efectivo (solo si está habilitado)"""
+    if not topology.settings.get("enable_internet", False):
+        return set()
+    return set(topology.vm_internet_access)
+
+
+def _vm_signature(vm):
+    """Datos de una VM que no pueden cambiarse sin recrearla"""
+    flavor = vm.get("flavor") or {}
+    if not isinstance(flavor, dict):
+        flavor = {"name": flavor}
+    return tuple(vm.get(field) for field in VM_IDENTITY) + tuple(flavor.get(field) for field in FLAVOR_FIELDS)
+
+
+class ChangeSet:
+    """Cambios necesarios para pasar del estado desplegado a la topología editada"""
+
+    def __init__(self):
+        self.vms_added = []          # VMs nuevas
+        self.vms_removed = []        # VMs que ya no existen
+        self.vms_recreated = []      # VMs que se eliminan y se vuelven a crear
+        self.interfaces_added = {}   # VM conservada -> VLANs nuevas
+        self.interfaces_removed = {}  # VM conservada -> VLANs quitadas
+        self.vlans_added = []
+        self.vlans_removed = []
+        self.internet_added = False  # Crear la red de Internet
+        self.internet_removed = False  # Eliminar la red de Internet
+        self.vlan_pairs = []         # Pares de VLANs a comunicar
+        self.flows_changed = False
+        self.full_reason = None      # Motivo por el que se requiere un despliegue completo
+
+    @property
+    def requires_full(self):
+        """Indica si los cambios no pueden aplicarse de forma incremental"""
+        return self.full_reason is not None
+
+    def is_empty(self):
+        """Indica si no hay nada que aplicar"""
+        return not (self.vms_added or self.vms_removed or self.vms_recreated
+                    or self.interfaces_added or self.interfaces_removed
+                    or self.vlans_added or self.vlans_removed or self.internet_added
+                    or self.internet_removed or self.vlan_pairs or self.flows_changed)
+
+    def print_summary(self):
+        """Muestra un resumen de los cambios"""
+        print("\nCambios respecto al estado desplegado:")
+        rows = [
+            ("VMs nuevas", self.vms_added),
+            ("VMs eliminadas", self.vms_removed),
+            ("VMs recreadas", self.vms_recreated),
+            ("VLANs nuevas", self.vlans_added),
+            ("VLANs eliminadas", self.vlans_removed),
+        ]
+        for label, items in rows:
+            if items:
+                print(f"- {label} ({len(items)}): {', '.join(map(str, items[:10]))}"
+                      f"{', ...' if len(items) > 10 else ''}")
+        added = sum(len(vlans) for vlans in self.interfaces_added.values())
+        removed = sum(len(vlans) for vlans in self.interfaces_removed.values())
+        if added or removed:
+            print(f"- Interfaces: {added} nuevas, {removed} quitadas")
+        if self.internet_added:
+            print("- Se crea la red de Internet")
+        if self.internet_removed:
+            print("- Se elimina la red de Internet")
+        if self.vlan_pairs:
+            print(f"- Pares de VLANs a comunicar: {len(self.vlan_pairs)}")
+        if self.flows_changed:
+            print("- Se actualizan las reglas de flujo")
+        if self.is_empty():
+            print("- Ninguno")
+
+
+def diff_topologies(deployed, desired):
+    """
+    Calcula los cambios entre el estado desplegado y la topología editada
+
+    Args:
+        deployed: Topología tal como se desplegó
+        desired: Topología editada
+
+    Returns:
+        ChangeSet con los cambios (full_reason indica si no es posible
+        aplicarlos de forma incremental)
+    """
+    changes = ChangeSet()
+
+    if deployed.nodes != desired.nodes or deployed.interfaces != desired.interfaces:
+        changes.full_reason = "Han cambiado los nodos o las interfaces de la infraestructura."
+        return changes
+
+    old_vms = {vm["name"]: vm for vm in deployed.vms}
+    new_vms = {vm["name"]: vm for vm in desired.vms}
+    old_vlans, new_vlans = vm_vlans(deployed), vm_vlans(desired)
+    old_internet, new_internet = _internet_vms(deployed), _internet_vms(desired)
+
+    for name, vm in new_vms.items():
+        old = old_vms.get(name)
+        if old is None:
+            changes.vms_added.append(name)
+        elif (_vm_signature(old) != _vm_signature(vm)
+              or old_vlans.get(name, [])[:1] != new_vlans.get(name, [])[:1]):
+            # La primera VLAN lleva la MAC principal: si cambia se recrea la VM
+            changes.vms_recreated.append(name)
+        else:
+            before = set(old_vlans.get(name, ()))
+            after = set(new_vlans.get(name, ()))
+            if name in old_internet:
+                before.add(INTERNET_VLAN)
+            if name in new_internet:
+                after.add(INTERNET_VLAN)
+            if after - before:
+                changes.interfaces_added[name] = sorted(after - before)
+            if before - after:
+                changes.interfaces_removed[name] = sorted(before - after)
+    changes.vms_removed = [name for name in old_vms if name not in new_vms]
+
+    old_unique = {vlan_id for ids in old_vlans.values() for vlan_id in ids}
+    new_unique = {vlan_id for ids in new_vlans.values() for vlan_id in ids}
+    changes.vlans_added = sorted(new_unique - old_unique)
+    changes.vlans_removed = sorted(old_unique - new_unique)
+
+    old_enabled = deployed.settings.get("enable_internet", False)
+    new_enabled = desired.settings.get("enable_internet", False)
+    changes.internet_added = new_enabled and not old_enabled
+    changes.internet_removed = old_enabled and not new_enabled
+
+    if desired.settings.get("enable_vlan_communication", False):
+        # Si ya estaba habilitada solo se comunican las VLANs nuevas
+        was_enabled = deployed.settings.get("enable_vlan_communication", False)
+        new_set = set(changes.vlans_added)
+        unique = sorted(new_unique)
+        changes.vlan_pairs = [(a, b) for i, a in enumerate(unique) for b in unique[i + 1:]
+                              if not was_enabled or a in new_set or b in new_set]
+
+    changes.flows_changed = build_flow_file(deployed) != build_flow_file(desired)
+    return changes
+
+
+def build_reconcile_plan(deployed, desired, changes=None):
+    """
+    Construye el plan que aplica solo los cambios entre dos topologías
+
+    Las fases se ejecutan en orden (primero se elimina y después se crea) y
+    las fases sin tareas se omiten.
+
+    Returns:
+        ProvisioningPlan con las fases remove, remove_networks, networks,
+        vlan_communication, upload, vms y flows que tengan trabajo
+    """
+    changes = changes or diff_topologies(deployed, desired)
+    if changes.requires_full:
+        raise ValueError(changes.full_reason)
+
+    old_vms = {vm["name"]: vm for vm in deployed.vms}
+    new_vlans = vm_vlans(desired)
+    new_internet = _internet_vms(desired)
+    plan = ProvisioningPlan(desired.name)
+
+    # Fase 1: eliminar VMs e interfaces
+    phase = plan.add_phase("remove")
+    for name in changes.vms_removed + changes.vms_recreated:
+        address = worker_address(deployed, old_vms[name]["worker"])
+        phase.add(name, Step("destroy_vm", address, destroy_vm_command(name)))
+    for name, vlans in changes.interfaces_removed.items():
+        address = worker_address(deployed, old_vms[name]["worker"])
+        phase.add(name, *[Step(f"remove_interface_vlan{vlan_id}", address,
+                               detach_interface_command(name, vlan_id)) for vlan_id in vlans])
+
+    # Fase 2: eliminar redes que ya no se usan
+    phase = plan.add_phase("remove_networks")
+    removed_networks = list(changes.vlans_removed)
+    if changes.internet_removed:
+        removed_networks.append(INTERNET_VLAN)
+    for vlan_id in removed_networks:
+        phase.add(f"vlan{vlan_id}", Step(f"delete_network_vlan{vlan_id}", LOCAL_NODE,
+                                         delete_network_command(vlan_id)))
+
+    # Fase 3: crear redes nuevas
+    phase = plan.add_phase("networks")
+    if changes.internet_added:
+        phase.add(f"vlan{INTERNET_VLAN}", *internet_network_steps(desired.interfaces))
+    for vlan_id in changes.vlans_added:
+        phase.add(f"vlan{vlan_id}", *network_steps(vlan_id))
+
+    # Fase 4: comunicación entre VLANs
+    phase = plan.add_phase("vlan_communication")
+    connect_vlans = script_path("network", "connect_vlans.sh")
+    for vlan_a, vlan_b in changes.vlan_pairs:
+        phase.add(f"vlan{vlan_a}-vlan{vlan_b}", Step(
+            f"connect_vlans_{vlan_a}_{vlan_b}", LOCAL_NODE, f"sudo {connect_vlans} {vlan_a} {vlan_b}"
+        ))
+
+    # Fase 5 y 6: copiar scripts a los workers afectados y crear VMs e interfaces
+    new_vms = {vm["name"]: vm for vm in desired.vms}
+    upload = plan.add_phase("upload")
+    phase = plan.add_phase("vms")
+    addresses = set()
+    for name in changes.vms_added + changes.vms_recreated:
+        vm = new_vms[name]
+        address = worker_address(desired, vm["worker"])
+        addresses.add(address)
+        phase.add(name, *vm_steps(vm, address, new_vlans.get(name, ()), name in new_internet))
+    for name, vlans in changes.interfaces_added.items():
+        address = worker_address(desired, new_vms[name]["worker"])
+        addresses.add(address)
+        phase.add(name, *[interface_step(name, address, vlan_id) for vlan_id in vlans])
+    for address in sorted(addresses):
+        upload.add(f"worker:{address}", *upload_steps(address))
+
+    # Fase 7: reglas de flujo
+    phase = plan.add_phase("flows")
+    if changes.flows_changed:
+        phase.add(f"ofs:{desired.nodes.get('ofs_node')}", flow_step(desired, new_vlans))
+
+    plan.phases = [phase for phase in plan.phases if phase.tasks]
+    return plan
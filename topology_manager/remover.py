@@ -2,27 +2,194 @@
 Módulo para eliminar topologías
 
 Este módulo contiene funciones para eliminar topologías definidas en archivos JSON.
+
+La eliminación se ejecuta con el motor de aprovisionamiento: las VMs de cada
+worker se eliminan en lotes (un único script por lote con los virsh destroy/
+undefine y una sola transacción de ovs-vsctl para sus puertos TAP) y los
+workers se procesan en paralelo. También puede ejecutarse en segundo plano
+como una tarea con seguimiento.
 """
 
+import itertools
 import os
 import json
 import subprocess
+import threading
+import time
+from .allocators import INTERNET_VLAN
+from .transport import LOCAL_NODE
+from .provisioning import (BRIDGE, ProvisioningPlan, ProvisioningEngine, Step,
+                           DEFAULT_MAX_PARALLEL, DEFAULT_PER_NODE_LIMIT)
+from .reconciler import deployed_state_path
+from .journal import journal_path
+
+TEARDOWN_BATCH_SIZE = 25   # VMs por script de eliminación
+
+
+def _vm_taps(topology_data):
+    """Puertos TAP de cada VM según sus conexiones y su acceso a Internet"""
+    taps = {vm["name"]: set() for vm in topology_data.get("vms", [])}
+    for conn in topology_data.get("connections", []):
+        vlan_id = conn.get("vlan_id")
+        if vlan_id is None:
+            continue
+        for name in (conn.get("from"), conn.get("to")):
+            taps.setdefault(name, set()).add(vlan_id)
+    if topology_data.get("settings", {}).get("enable_internet", False):
+        for name in topology_data.get("vm_internet_access", []):
+            taps.setdefault(name, set()).add(INTERNET_VLAN)
+    return {name: [f"tap-{name}-vlan{vlan_id}" for vlan_id in sorted(vlans)]
+            for name, vlans in taps.items()}
+
+
+def build_vm_teardown_script(names, taps):
+    """
+    Script que elimina un lote de VMs de un worker y sus puertos TAP
+
+    Se ejecuta con "sudo bash -s": los puertos se quitan del OvS en una sola
+    transacción de ovs-vsctl.
+    """
+    lines = [
+        "#!/bin/bash",
+        f"for VM in {' '.join(f'{chr(34)}{name}{chr(34)}' for name in names)}; do",
+        '    if virsh dominfo "$VM" >/dev/null 2>&1; then',
+        '        virsh destroy "$VM" >/dev/null 2>&1 || true',
+        '        virsh undefine "$VM" --remove-all-storage >/dev/null 2>&1 || true',
+        '        echo "VM $VM eliminada."',
+        "    else",
+        '        echo "La VM $VM no existe, omitiendo..."',
+        "    fi",
+        "done",
+    ]
+    tap_names = [tap for name in names for tap in taps.get(name, ())]
+    if tap_names:
+        lines.append("ovs-vsctl " + " -- ".join(f'--if-exists del-port {BRIDGE} "{tap}"' for tap in tap_names))
+        lines.append(f"for TAP in {' '.join(tap_names)}; do ip link delete \"$TAP\" 2>/dev/null || true; done")
+    return "\n".join(lines) + "\n"
+
+
+def build_teardown_plan(topology_data, batch_size=TEARDOWN_BATCH_SIZE):
+    """
+    Construye el plan de eliminación de una topología
+
+    Args:
+        topology_data: Diccionario con la topología (contenido del JSON)
+        batch_size: Número de VMs por script de eliminación
+
+    Returns:
+        ProvisioningPlan con las fases vms (lotes por worker) y networks
+        (redes del head node y reglas de flujo del nodo OFS)
+    """
+    nodes_info = topology_data.get("nodes", {})
+    workers = nodes_info.get("workers", [])
+    ofs_node = nodes_info.get("ofs_node")
+    taps = _vm_taps(topology_data)
+    plan = ProvisioningPlan(topology_data.get("name", ""))
+
+    # Fase 1: VMs agrupadas por worker y en lotes
+    by_worker = {}
+    for vm in topology_data.get("vms", []):
+        name, worker = vm.get("name"), vm.get("worker")
+        if not name or not isinstance(worker, int) or not 1 <= worker <= len(workers):
+            print(f"Error: No se pudo determinar el worker de la VM {name}, omitiendo...")
+            continue
+        by_worker.setdefault(workers[worker - 1], []).append(name)
+
+    phase = plan.add_phase("vms")
+    for address, names in by_worker.items():
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            phase.add(f"worker:{address}:{start // batch_size + 1}", Step(
+                f"destroy_vms_{len(batch)}", address, "sudo bash -s",
+                stdin=build_vm_teardown_script(batch, taps)
+            ))
+
+    # Fase 2: redes del head node y reglas de flujo del nodo OFS
+    phase = plan.add_phase("networks")
+    vlan_ids = sorted({conn["vlan_id"] for conn in topology_data.get("connections", [])
+                       if conn.get("vlan_id") is not None} | {INTERNET_VLAN})
+    phase.add("head_node", Step(
+        "delete_networks", LOCAL_NODE, "sudo bash -s",
+        stdin="\n".join([
+            "#!/bin/bash",
+            "ovs-vsctl " + " -- ".join(f"--if-exists del-br br-vlan{vlan_id}" for vlan_id in vlan_ids),
+            f"for VLAN in {' '.join(map(str, vlan_ids))}; do ip link delete dev vlan$VLAN 2>/dev/null || true; done",
+            f"ovs-vsctl --if-exists del-br {BRIDGE}",
+        ]) + "\n"
+    ))
+    if ofs_node:
+        phase.add(f"ofs:{ofs_node}", Step("delete_flows", ofs_node, f"sudo ovs-ofctl del-flows {BRIDGE}"))
+
+    return plan
+
+
+class TeardownTask:
+    """Eliminación de una topología que se ejecuta en segundo plano"""
+
+    def __init__(self, task_id, name):
+        self.id = task_id
+        self.name = name
+        self.status = "pendiente"   # pendiente, en curso, completada, con errores
+        self.done = 0      # Tareas terminadas de todo el plan
+        self.total = 0     # Tareas del plan (todas las fases)
+        self.log = []
+        self.report = None
+        self.started = None
+        self.finished = None
+        self.thread = None
+
+    def progress(self, phase, task, failed_step, done, total):
+        """
+        Registra el avance de la eliminación
+
+        done/total llegan por fase; el avance de la tarea se cuenta sobre
+        todas las fases del plan.
+        """
+        self.done += 1
+        state = "OK" if failed_step is None else f"ERROR en {failed_step.name}"
+        self.log.append(f"[{self.done}/{self.total}] {phase} {done}/{total} {task.name}: {state}")
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Espera a que termine la eliminación"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.running
+
+    def __repr__(self):
+        return f"TeardownTask({self.id!r}, {self.name!r}, status={self.status!r})"
 
 class TopologyRemover:
     """Clase para eliminar topologías existentes"""
     
     def __init__(self, manager):
         self.manager = manager
+        self.max_parallel = DEFAULT_MAX_PARALLEL
+        self.per_node_limit = DEFAULT_PER_NODE_LIMIT
+        self.tasks = {}   # id -> TeardownTask de las eliminaciones en segundo plano
+        self.last_report = None
+        self._task_ids = itertools.count(1)
     
-    def remove_topology(self, json_file=None):
+    def remove_topology(self, json_file=None, use_script=False, background=False):
         """
         Elimina una topología basada en un archivo JSON
         
+        Por defecto los comandos se envían en paralelo por las conexiones
+        persistentes del administrador; con use_script=True se ejecuta
+        destroy_topology.sh.
+        
         Args:
             json_file: Ruta al archivo JSON de la topología a eliminar
+            use_script: Usar el script destroy_topology.sh
+            background: Ejecutar la eliminación en segundo plano y volver
+                        enseguida (no se usa con use_script)
         
         Returns:
-            True si la eliminación se completó con éxito, False en caso contrario
+            True si la eliminación se completó con éxito (o, en segundo plano,
+            la TeardownTask creada), False en caso contrario
         """
         if json_file is None:
             # Si no se proporciona un archivo, solicitar uno
@@ -82,9 +249,29 @@ class TopologyRemover:
                 print("Operación cancelada.")
                 return False
             
-            # Ejecutar el script de eliminación
-            print("\nEliminando topología...")
+            if background and not use_script:
+                task = self.teardown_async(topology_data, json_file)
+                print(f"\nEliminación en segundo plano iniciada (tarea {task.id}).")
+                return task
             
+            print("\nEliminando topología...")
+            if use_script:
+                removed = self.run_destroy_script(json_file)
+                if removed:
+                    self._forget_deployment(json_file)
+                return removed
+            return self.teardown(topology_data, json_file=json_file)
+        
+        except json.JSONDecodeError:
+            print(f"Error: El archivo {json_file} no es un archivo JSON válido.")
+            return False
+        except Exception as e:
+            print(f"Error al eliminar la topología: {e}")
+            return False
+    
+    def run_destroy_script(self, json_file):
+        """Elimina una topología ejecutando destroy_topology.sh"""
+        try:
             # Verificar si existe un script de eliminación
             script_path = "./scripts/topology/destroy_topology.sh"
             if not os.path.exists(script_path):
@@ -123,9 +310,117 @@ class TopologyRemover:
                 print(f"\nError al eliminar la topología. Código de retorno: {process.returncode}")
                 return False
                 
-        except json.JSONDecodeError:
-            print(f"Error: El archivo {json_file} no es un archivo JSON válido.")
-            return False
         except Exception as e:
             print(f"Error al eliminar la topología: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _forget_deployment(self, json_file):
+        """Descarta el estado desplegado y el diario de una topología eliminada"""
+        for path in (deployed_state_path(json_file), journal_path(json_file)):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _run_teardown(self, topology_data, transport=None, json_file=None, progress=None,
+                      verbose=True, plan=None):
+        """
+        Ejecuta el plan de eliminación de una topología
+        
+        Args:
+            plan: Plan ya construido con build_teardown_plan (opcional)
+        
+        Returns:
+            ProvisioningReport de la eliminación
+        """
+        engine = ProvisioningEngine(
+            transport or self.manager.get_transport(),
+            max_parallel=self.max_parallel,
+            per_node_limit=self.per_node_limit,
+            verbose=verbose,
+            progress=progress
+        )
+        report = engine.run(plan or build_teardown_plan(topology_data))
+        if report.success and json_file:
+            self._forget_deployment(json_file)
+        return report
+    
+    def teardown(self, topology_data, transport=None, json_file=None, progress=None):
+        """
+        Elimina una topología con el motor de aprovisionamiento en paralelo
+        mostrando el avance de cada tarea
+        
+        Args:
+            topology_data: Diccionario con la topología (contenido del JSON)
+            transport: Transporte a usar (por defecto el del administrador)
+            json_file: Archivo de la topología (para descartar su estado desplegado)
+            progress: Función llamada al terminar cada tarea (por defecto se
+                      imprime el avance)
+        
+        Returns:
+            True si la eliminación se completó con éxito, False en caso contrario
+        """
+        def print_progress(phase, task, failed_step, done, total):
+            state = "OK" if failed_step is None else f"ERROR en {failed_step.name}"
+            print(f"  [{phase} {done}/{total}] {task.name}: {state}")
+        
+        report = self._run_teardown(topology_data, transport, json_file, progress or print_progress)
+        self.last_report = report
+        report.print_summary()
+        if not report.success:
+            print("\nError al eliminar la topología.")
+            return False
+        print(f"\nTopología {topology_data.get('name', '')} eliminada con éxito.")
+        return True
+    
+    def teardown_async(self, topology_data, json_file=None, transport=None):
+        """
+        Inicia la eliminación de una topología en segundo plano
+        
+        Returns:
+            TeardownTask con el estado y el avance de la eliminación
+        """
+        task = TeardownTask(next(self._task_ids), topology_data.get("name", ""))
+        plan = build_teardown_plan(topology_data)
+        task.total = sum(len(phase.tasks) for phase in plan.phases)
+        self.tasks[task.id] = task
+        
+        def run():
+            task.status = "en curso"
+            task.started = time.time()
+            try:
+                task.report = self._run_teardown(topology_data, transport, json_file,
+                                                 progress=task.progress, verbose=False, plan=plan)
+                task.status = "completada" if task.report.success else "con errores"
+            except Exception as e:
+                task.log.append(f"Error: {e}")
+                task.status = "con errores"
+            task.finished = time.time()
+        
+        task.thread = threading.Thread(target=run, name=f"teardown-{task.id}", daemon=True)
+        task.thread.start()
+        return task
+    
+    def running_tasks(self):
+        """Eliminaciones en segundo plano que siguen en curso"""
+        return [task for task in self.tasks.values() if task.running]
+    
+    def wait_tasks(self, timeout=None):
+        """
+        Espera a que terminen las eliminaciones en segundo plano
+        
+        Returns:
+            True si ya no queda ninguna en curso
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for task in self.running_tasks():
+            task.wait(None if deadline is None else max(0.0, deadline - time.time()))
+        return not self.running_tasks()
+    
+    def print_tasks(self):
+        """Muestra el estado de las eliminaciones en segundo plano"""
+        if not self.tasks:
+            print("No hay eliminaciones en segundo plano.")
+            return
+        print("\nEliminaciones en segundo plano:")
+        for task in self.tasks.values():
+            elapsed = (task.finished or time.time()) - (task.started or time.time())
+            print(f"{task.id}. {task.name}: {task.status} ({task.done}/{task.total} tareas, {elapsed:.1f}s)")
@@ -0,0 +1,189 @@
+"""
+Formas de topología
+
+Este módulo contiene las funciones que generan la lista de enlaces de cada
+forma de topología. Los enlaces se expresan como pares (i, j) de índices de
+VM (0..n-1), sin duplicados ni bucles, de modo que el constructor puede
+asignar las VLANs y crear las conexiones en una sola pasada. Todas las
+funciones tienen coste O(n + E).
+"""
+
+import math
+import random
+from itertools import combinations
+
+
+def ring_edges(num_vms):
+    """Enlaces de un anillo: cada VM con la siguiente y la última con la primera"""
+    if num_vms < 2:
+        return []
+    if num_vms == 2:
+        return [(0, 1)]
+    return [(i, (i + 1) % num_vms) for i in range(num_vms)]
+
+
+def star_edges(num_vms):
+    """Enlaces de una estrella: la primera VM es el centro"""
+    return [(0, i) for i in range(1, num_vms)]
+
+
+def linear_edges(num_vms):
+    """Enlaces de una topología lineal: cada VM con la siguiente"""
+    return [(i, i + 1) for i in range(num_vms - 1)]
+
+
+def mesh_edges(num_vms):
+    """Enlaces de una malla completa: cada VM con todas las demás"""
+    return list(combinations(range(num_vms), 2))
+
+
+def tree_edges(num_vms, arity=2):
+    """
+    Enlaces de un árbol k-ario completo
+    
+    La VM 0 es la raíz y los hijos de la VM i son las VMs arity*i+1 .. arity*i+arity.
+    """
+    if arity < 1:
+        raise ValueError("La aridad del árbol debe ser al menos 1")
+    return [((i - 1) // arity, i) for i in range(1, num_vms)]
+
+
+def torus_size(dims):
+    """Número de VMs de un toro con las dimensiones indicadas"""
+    return math.prod(dims)
+
+
+def torus_edges(num_vms, dims):
+    """
+    Enlaces de un toro 2D o 3D
+    
+    Cada VM se conecta con su vecina siguiente en cada dimensión, cerrando la
+    vuelta. Las dimensiones de tamaño 1 no generan enlaces y las de tamaño 2
+    generan un solo enlace por par.
+    
+    Args:
+        num_vms: Número de VMs (debe coincidir con el producto de dims)
+        dims: Tamaño de cada dimensión, p. ej. (4, 4) o (4, 4, 4)
+    """
+    if not 2 <= len(dims) <= 3 or any(size < 1 for size in dims):
+        raise ValueError("El toro debe tener 2 o 3 dimensiones de tamaño positivo")
+    if torus_size(dims) != num_vms:
+        raise ValueError(f"Un toro de {'x'.join(map(str, dims))} tiene {torus_size(dims)} VMs")
+
+    edges = []
+    stride = 1
+    for size in reversed(dims):
+        # En una dimensión de tamaño 2 la vuelta repite el mismo enlace
+        wrap = size > 2
+        block = stride * size
+        if size > 1:
+            for node in range(num_vms):
+                position = (node // stride) % size
+                if position + 1 < size:
+                    edges.append((node, node + stride))
+                elif wrap:
+                    edges.append((node, node - (size - 1) * stride))
+        stride = block
+    return edges
+
+
+def fat_tree_size(k):
+    """Número de VMs (switches y hosts) de un fat-tree de k puertos"""
+    return 5 * k * k // 4 + k ** 3 // 4
+
+
+def fat_tree_edges(num_vms, k=4):
+    """
+    Enlaces de un fat-tree de k puertos (k par)
+    
+    Las VMs se ordenan como: (k/2)^2 switches de núcleo, k*k/2 de agregación,
+    k*k/2 de acceso y k^3/4 hosts. En cada pod los switches de agregación y de
+    acceso forman un bipartito completo, cada switch de acceso tiene k/2 hosts
+    y el switch de agregación j del pod se conecta a los núcleos j*k/2 .. j*k/2+k/2-1.
+    """
+    if k < 2 or k % 2:
+        raise ValueError("El fat-tree requiere un número de puertos k par")
+    if fat_tree_size(k) != num_vms:
+        raise ValueError(f"Un fat-tree de k={k} tiene {fat_tree_size(k)} VMs")
+
+    half = k // 2
+    core_base = 0
+    agg_base = core_base + half * half
+    edge_base = agg_base + k * half
+    host_base = edge_base + k * half
+
+    edges = []
+    for pod in range(k):
+        for j in range(half):
+            agg = agg_base + pod * half + j
+            for c in range(half):
+                edges.append((core_base + j * half + c, agg))
+            for e in range(half):
+                edges.append((agg, edge_base + pod * half + e))
+        for e in range(half):
+            edge = edge_base + pod * half + e
+            for h in range(half):
+                edges.append((edge, host_base + (pod * half + e) * half + h))
+    return edges
+
+
+def random_edges(num_vms, probability=0.1, seed=None):
+    """
+    Enlaces de un grafo aleatorio de Erdős–Rényi G(n, p)
+    
+    Se usa el salto geométrico de Batagelj y Brandes: en lugar de sortear
+    cada uno de los n(n-1)/2 pares se sortea la distancia hasta el siguiente
+    enlace, por lo que el coste es O(n + E). Con la misma semilla siempre se
+    obtiene el mismo grafo.
+    """
+    if not 0 <= probability <= 1:
+        raise ValueError("La probabilidad debe estar entre 0 y 1")
+    if probability == 0 or num_vms < 2:
+        return []
+    if probability == 1:
+        return mesh_edges(num_vms)
+
+    rng = random.Random(seed)
+    log_q = math.log(1.0 - probability)
+    edges = []
+    v, w = 1, -1
+    while v < num_vms:
+        w += 1 + int(math.log(1.0 - rng.random()) / log_q)
+        while w >= v and v < num_vms:
+            w -= v
+            v += 1
+        if v < num_vms:
+            edges.append((w, v))
+    return edges
+
+
+# Formas disponibles: nombre -> (función de enlaces, mínimo de VMs)
+SHAPES = {
+    "ring": (ring_edges, 1),
+    "star": (star_edges, 2),
+    "linear": (linear_edges, 1),
+    "mesh": (mesh_edges, 1),
+    "tree": (tree_edges, 1),
+    "torus": (torus_edges, 1),
+    "fat_tree": (fat_tree_edges, 1),
+    "random": (random_edges, 1),
+}
+
+# Formas cuyo número de VMs queda fijado por sus parámetros
+SHAPE_SIZES = {
+    "torus": lambda dims, **_: torus_size(dims),
+    "fat_tree": lambda k=4, **_: fat_tree_size(k),
+}
+
+# Nombres en español usados por los menús
+SHAPE_NAMES = {
+    "ring": "anillo",
+    "star": "estrella",
+    "linear": "lineal",
+    "mesh": "malla completa",
+    "tree": "árbol",
+    "torus": "toro",
+    "fat_tree": "fat-tree",
+    "random": "aleatoria",
+    "custom": "personalizada",
+}
@@ -0,0 +1,389 @@
+"""
+Pool de conexiones SSH persistentes
+
+Este módulo mantiene una conexión SSH autenticada por nodo (head node, nodo
+OFS y workers) y la reutiliza para todos los comandos y copias de archivos que
+se envían a ese nodo. Cada comando abre un canal nuevo sobre la misma conexión,
+de modo que varios comandos pueden ejecutarse a la vez en un nodo sin repetir
+el handshake TCP ni la autenticación.
+
+Además:
+- Los scripts auxiliares se suben una sola vez por sesión: si el archivo local
+  no ha cambiado y ya se copió por la conexión actual, la copia se omite.
+- Antes de reutilizar una conexión se comprueba que sigue activa y, si lleva
+  tiempo sin usarse, se le envía un paquete de prueba.
+- Las conexiones que llevan más de idle_timeout segundos sin usarse se cierran.
+
+paramiko es opcional: si no está instalado create_transport() devuelve un
+SubprocessTransport que usa los comandos ssh/scp del sistema.
+"""
+
+import os
+import select
+import threading
+import time
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+from .transport import LOCAL_NODE, SSH_USER, Transport, SubprocessTransport, CommandResult
+
+SSH_PORT = 22
+CONNECT_TIMEOUT = 10       # Segundos para establecer la conexión
+IDLE_TIMEOUT = 300         # Segundos sin uso tras los que se cierra una conexión
+HEALTH_CHECK_AFTER = 30    # Segundos sin uso tras los que se prueba la conexión
+KEEPALIVE_INTERVAL = 30    # Segundos entre paquetes keepalive
+BUFFER_SIZE = 32768
+POLL_INTERVAL = 0.1
+
+
+def _connect_paramiko(node, user, port, key_filename, timeout, accept_unknown_hosts):
+    """Abre una conexión SSH con paramiko"""
+    client = paramiko.SSHClient()
+    client.load_system_host_keys()
+    if accept_unknown_hosts:
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    else:
+        client.set_missing_host_key_policy(paramiko.RejectPolicy())
+    client.connect(node, port=port, username=user, key_filename=key_filename,
+                   timeout=timeout, banner_timeout=timeout, auth_timeout=timeout)
+    return client
+
+
+class PooledConnection:
+    """Una conexión SSH abierta a un nodo y su estado en el pool"""
+
+    def __init__(self, node, client):
+        self.node = node
+        self.client = client
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.active = 0             # Operaciones en curso sobre la conexión
+        self.commands = 0           # Comandos ejecutados por esta conexión
+        self.uploaded = {}          # ruta remota -> (ruta local, mtime, tamaño)
+        self._sftp = None
+        self._sftp_lock = threading.Lock()
+
+    def is_alive(self, probe=False):
+        """
+        Indica si la conexión sigue activa
+
+        Args:
+            probe: Enviar además un paquete de prueba al nodo
+        """
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        if probe:
+            try:
+                transport.send_ignore()
+            except Exception:
+                return False
+        return True
+
+    def sftp(self):
+        """Canal SFTP de la conexión (se abre una sola vez)"""
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def close(self):
+        """Cierra la conexión y su canal SFTP"""
+        try:
+            if self._sftp is not None:
+                self._sftp.close()
+        except Exception:
+            pass
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """
+    Pool de conexiones SSH indexado por dirección de nodo
+
+    Es seguro usarlo desde varios hilos: la conexión a cada nodo se abre una
+    sola vez aunque varios hilos la pidan a la vez.
+    """
+
+    def __init__(self, user=SSH_USER, port=SSH_PORT, key_filename=None,
+                 connect_timeout=CONNECT_TIMEOUT, idle_timeout=IDLE_TIMEOUT,
+                 keepalive=KEEPALIVE_INTERVAL, accept_unknown_hosts=False, connect=None):
+        """
+        Args:
+            user: Usuario SSH
+            port: Puerto SSH de los nodos (p. ej. el de un sshd local de pruebas)
+            key_filename: Clave privada a usar (opcional, por defecto las del agente)
+            connect_timeout: Tiempo máximo para conectar en segundos
+            idle_timeout: Segundos sin uso tras los que se cierra una conexión
+            keepalive: Intervalo de keepalive en segundos (0 para desactivarlo)
+            accept_unknown_hosts: Aceptar claves de host desconocidas
+            connect: Función node -> cliente con la interfaz de
+                     paramiko.SSHClient (opcional, para pruebas)
+        """
+        if connect is None and paramiko is None:
+            raise RuntimeError("Se requiere paramiko para usar el pool de conexiones SSH")
+
+        self.user = user
+        self.port = port
+        self.key_filename = key_filename
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.accept_unknown_hosts = accept_unknown_hosts
+        self._connect = connect
+        self._connections = {}
+        self._node_locks = {}
+        self._lock = threading.Lock()
+        self.opened = 0          # Conexiones abiertas desde la creación del pool
+        self.uploads_skipped = 0
+
+    def _node_lock(self, node):
+        with self._lock:
+            lock = self._node_locks.get(node)
+            if lock is None:
+                lock = self._node_locks[node] = threading.Lock()
+            return lock
+
+    def _open(self, node):
+        """Abre una conexión nueva a un nodo"""
+        if self._connect is not None:
+            client = self._connect(node)
+        else:
+            client = _connect_paramiko(node, self.user, self.port, self.key_filename,
+                                       self.connect_timeout, self.accept_unknown_hosts)
+        transport = client.get_transport()
+        if self.keepalive and transport is not None:
+            transport.set_keepalive(self.keepalive)
+        self.opened += 1
+        return PooledConnection(node, client)
+
+    def acquire(self, node):
+        """
+        Obtiene una conexión activa al nodo, abriéndola si es necesario
+
+        Debe devolverse con release() al terminar de usarla.
+        """
+        self.evict_idle()
+        with self._node_lock(node):
+            connection = self._connections.get(node)
+            if connection is not None:
+                idle = time.monotonic() - connection.last_used
+                if not connection.is_alive(probe=idle > HEALTH_CHECK_AFTER):
+                    with self._lock:
+                        self._connections.pop(node, None)
+                    connection.close()
+                    connection = None
+            if connection is None:
+                connection = self._open(node)
+                with self._lock:
+                    self._connections[node] = connection
+            with self._lock:
+                connection.active += 1
+            return connection
+
+    def release(self, connection):
+        """Devuelve una conexión al pool"""
+        with self._lock:
+            connection.active -= 1
+            connection.last_used = time.monotonic()
+
+    def discard(self, connection):
+        """Cierra una conexión que ha fallado para que se abra otra la próxima vez"""
+        with self._lock:
+            if self._connections.get(connection.node) is connection:
+                del self._connections[connection.node]
+        connection.close()
+
+    def run(self, node, command, stdin=None, timeout=None):
+        """
+        Ejecuta un comando en un nodo por su conexión persistente
+
+        Returns:
+            CommandResult con el código de salida y la salida del comando
+        """
+        try:
+            connection = self.acquire(node)
+        except Exception as e:
+            return CommandResult(255, "", f"No se pudo conectar a {node}: {e}")
+
+        try:
+            result = self._exec(connection, command, stdin, timeout)
+        except Exception as e:
+            self.discard(connection)
+            result = CommandResult(255, "", f"Error en la conexión con {node}: {e}")
+        finally:
+            self.release(connection)
+        return result
+
+    @staticmethod
+    def _exec(connection, command, stdin, timeout):
+        """Ejecuta un comando en un canal nuevo de la conexión"""
+        channel = connection.client.get_transport().open_session(timeout=CONNECT_TIMEOUT)
+        connection.commands += 1
+        try:
+            channel.exec_command(command)
+            if stdin is not None:
+                channel.sendall(stdin.encode() if isinstance(stdin, str) else stdin)
+            channel.shutdown_write()
+
+            # Leer stdout y stderr a la vez para que ninguno llene su ventana
+            deadline = time.monotonic() + timeout if timeout else None
+            stdout, stderr = [], []
+            while True:
+                while channel.recv_ready():
+                    stdout.append(channel.recv(BUFFER_SIZE))
+                while channel.recv_stderr_ready():
+                    stderr.append(channel.recv_stderr(BUFFER_SIZE))
+                if channel.exit_status_ready():
+                    break
+                wait = POLL_INTERVAL
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return CommandResult(124, b"".join(stdout).decode(errors="replace"),
+                                             f"Tiempo de espera agotado ({timeout}s)")
+                    wait = min(wait, remaining)
+                select.select([channel], [], [], wait)
+
+            # El nodo envía el fin de datos justo después del código de salida
+            for recv, chunks in ((channel.recv, stdout), (channel.recv_stderr, stderr)):
+                data = recv(BUFFER_SIZE)
+                while data:
+                    chunks.append(data)
+                    data = recv(BUFFER_SIZE)
+
+            return CommandResult(channel.recv_exit_status(),
+                                 b"".join(stdout).decode(errors="replace"),
+                                 b"".join(stderr).decode(errors="replace"))
+        finally:
+            channel.close()
+
+    def upload(self, node, local_path, remote_path):
+        """
+        Copia un archivo a un nodo una sola vez por sesión
+
+        Si el archivo local no ha cambiado desde la última copia por la
+        conexión actual, no se vuelve a copiar.
+
+        Returns:
+            CommandResult con el resultado de la copia
+        """
+        try:
+            info = os.stat(local_path)
+        except OSError as e:
+            return CommandResult(1, "", str(e))
+        signature = (os.path.abspath(local_path), info.st_mtime_ns, info.st_size)
+
+        try:
+            connection = self.acquire(node)
+        except Exception as e:
+            return CommandResult(255, "", f"No se pudo conectar a {node}: {e}")
+
+        try:
+            with connection._sftp_lock:
+                if connection.uploaded.get(remote_path) == signature:
+                    self.uploads_skipped += 1
+                    return CommandResult(0, "", "Archivo ya copiado en esta sesión")
+                sftp = connection.sftp()
+                sftp.put(local_path, remote_path)
+                sftp.chmod(remote_path, info.st_mode & 0o777)
+                connection.uploaded[remote_path] = signature
+            return CommandResult(0)
+        except Exception as e:
+            self.discard(connection)
+            return CommandResult(1, "", f"Error al copiar {local_path} a {node}: {e}")
+        finally:
+            self.release(connection)
+
+    def evict_idle(self):
+        """
+        Cierra las conexiones que llevan más de idle_timeout segundos sin usarse
+
+        Returns:
+            Número de conexiones cerradas
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = [connection for connection in self._connections.values()
+                    if connection.active == 0 and now - connection.last_used > self.idle_timeout]
+            for connection in idle:
+                del self._connections[connection.node]
+        for connection in idle:
+            connection.close()
+        return len(idle)
+
+    def health_check(self):
+        """
+        Comprueba todas las conexiones abiertas y cierra las que no responden
+
+        Returns:
+            Diccionario nodo -> True/False según si la conexión sigue activa
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+        status = {}
+        for connection in connections:
+            status[connection.node] = connection.is_alive(probe=True)
+            if not status[connection.node] and connection.active == 0:
+                self.discard(connection)
+        return status
+
+    def stats(self):
+        """Estado del pool: conexiones abiertas y comandos por nodo"""
+        with self._lock:
+            return {
+                "opened": self.opened,
+                "uploads_skipped": self.uploads_skipped,
+                "connections": {node: connection.commands
+                                for node, connection in self._connections.items()}
+            }
+
+    def close(self):
+        """Cierra todas las conexiones del pool"""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+
+class PooledSSHTransport(Transport):
+    """
+    Transporte que envía los comandos por un SSHConnectionPool
+
+    Los comandos del nodo LOCAL_NODE se ejecutan localmente.
+    """
+
+    def __init__(self, pool=None, **pool_options):
+        self.pool = pool or SSHConnectionPool(**pool_options)
+        self._local = SubprocessTransport()
+
+    def run(self, node, command, stdin=None, timeout=None):
+        if node == LOCAL_NODE:
+            return self._local.run(node, command, stdin, timeout)
+        return self.pool.run(node, command, stdin, timeout)
+
+    def upload(self, node, local_path, remote_path):
+        if node == LOCAL_NODE:
+            return self._local.upload(node, local_path, remote_path)
+        return self.pool.upload(node, local_path, remote_path)
+
+    def close(self):
+        self.pool.close()
+
+
+def create_transport(**pool_options):
+    """
+    Crea el transporte por defecto para los nodos
+
+    Returns:
+        PooledSSHTransport si paramiko está instalado; si no, SubprocessTransport
+    """
+    if paramiko is None:
+        return SubprocessTransport()
+    return PooledSSHTransport(**pool_options)
@@ -0,0 +1,77 @@
+"""
+Entrada y salida intercambiables para la interfaz de texto
+
+La interfaz usa print() e input() en todos sus módulos. Para poder servirla
+en varias sesiones dentro de un mismo proceso (por ejemplo, una por conexión
+del servidor CLI), sys.stdin y sys.stdout se sustituyen por objetos que
+delegan en los flujos asignados al hilo actual con bind_streams(). Los hilos
+sin flujos asignados siguen usando la entrada y salida estándar del proceso.
+
+Un flujo de entrada solo necesita readline() (devuelve "" al terminar) y uno
+de salida write() y flush().
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+
+class ThreadStream:
+    """Sustituto de sys.stdin o sys.stdout que usa el flujo asignado al hilo actual"""
+
+    def __init__(self, name, default):
+        self._name = name
+        self._default = default
+
+    def _target(self):
+        return getattr(_local, self._name, None) or self._default
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+    def readline(self, *args):
+        return self._target().readline(*args)
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+
+def install():
+    """Sustituye sys.stdin y sys.stdout (una sola vez)"""
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadStream):
+            sys.stdout = ThreadStream("stdout", sys.stdout)
+        if not isinstance(sys.stdin, ThreadStream):
+            sys.stdin = ThreadStream("stdin", sys.stdin)
+
+
+def is_bound():
+    """Indica si el hilo actual tiene flujos propios"""
+    return getattr(_local, "stdout", None) is not None or getattr(_local, "stdin", None) is not None
+
+
+@contextmanager
+def bind_streams(input_stream=None, output_stream=None):
+    """
+    Asigna flujos de entrada y salida al hilo actual mientras dura el bloque
+
+    Args:
+        input_stream: Flujo del que lee input() (None: entrada estándar)
+        output_stream: Flujo en el que escribe print() (None: salida estándar)
+    """
+    if input_stream is None and output_stream is None:
+        yield
+        return
+    install()
+    previous = (getattr(_local, "stdin", None), getattr(_local, "stdout", None))
+    _local.stdin, _local.stdout = input_stream, output_stream
+    try:
+        yield
+    finally:
+        _local.stdin, _local.stdout = previous
@@ -0,0 +1,150 @@
+"""
+Transportes para ejecutar comandos en los nodos
+
+Este módulo define la interfaz que usa el motor de aprovisionamiento para
+ejecutar comandos y subir archivos a los nodos (head node, nodo OFS y workers),
+junto con una implementación basada en los comandos ssh/scp del sistema y otra
+falsa para pruebas que no ejecuta nada.
+"""
+
+import subprocess
+import threading
+import time
+
+LOCAL_NODE = "local"    # Nombre del nodo que representa al head node (ejecución local)
+SSH_USER = "ubuntu"
+
+
+class CommandResult:
+    """Resultado de un comando ejecutado en un nodo"""
+
+    __slots__ = ("returncode", "stdout", "stderr")
+
+    def __init__(self, returncode, stdout="", stderr=""):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def ok(self):
+        """Indica si el comando terminó con éxito"""
+        return self.returncode == 0
+
+    def __repr__(self):
+        return f"CommandResult(returncode={self.returncode!r})"
+
+
+class Transport:
+    """
+    Interfaz de transporte
+
+    Las subclases implementan run() y upload(); el nodo LOCAL_NODE representa
+    la máquina en la que se ejecuta el orquestador.
+    """
+
+    def run(self, node, command, stdin=None, timeout=None):
+        """
+        Ejecuta un comando en un nodo
+
+        Args:
+            node: Dirección del nodo o LOCAL_NODE
+            command: Comando a ejecutar (cadena de shell)
+            stdin: Texto que se envía por la entrada estándar (opcional)
+            timeout: Tiempo máximo en segundos (opcional)
+
+        Returns:
+            CommandResult con el código de salida y la salida del comando
+        """
+        raise NotImplementedError
+
+    def check(self, node, command, timeout=None):
+        """
+        Ejecuta el comando que comprueba si un paso ya está hecho
+
+        Returns:
+            CommandResult con éxito si el paso ya está hecho
+        """
+        return self.run(node, command, timeout=timeout)
+
+    def upload(self, node, local_path, remote_path):
+        """
+        Copia un archivo local a un nodo
+
+        Returns:
+            CommandResult con el resultado de la copia
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Libera los recursos del transporte (conexiones abiertas, etc.)"""
+
+
+class SubprocessTransport(Transport):
+    """Transporte que usa los comandos ssh y scp del sistema"""
+
+    def __init__(self, user=SSH_USER, ssh_options=("-o", "BatchMode=yes")):
+        self.user = user
+        self.ssh_options = list(ssh_options)
+
+    def _exec(self, args, stdin=None, timeout=None, shell=False):
+        try:
+            process = subprocess.run(
+                args, input=stdin, capture_output=True, text=True,
+                timeout=timeout, shell=shell
+            )
+        except subprocess.TimeoutExpired:
+            return CommandResult(124, "", f"Tiempo de espera agotado ({timeout}s)")
+        except OSError as e:
+            return CommandResult(127, "", str(e))
+        return CommandResult(process.returncode, process.stdout, process.stderr)
+
+    def run(self, node, command, stdin=None, timeout=None):
+        if node == LOCAL_NODE:
+            return self._exec(command, stdin, timeout, shell=True)
+        return self._exec(["ssh", *self.ssh_options, f"{self.user}@{node}", command], stdin, timeout)
+
+    def upload(self, node, local_path, remote_path):
+        if node == LOCAL_NODE:
+            return self._exec(["cp", local_path, remote_path])
+        return self._exec(["scp", "-q", *self.ssh_options, local_path, f"{self.user}@{node}:{remote_path}"])
+
+
+class FakeTransport(Transport):
+    """
+    Transporte falso para pruebas
+
+    No ejecuta nada: registra cada llamada en self.calls como tuplas
+    (operación, nodo, comando o ruta) y devuelve éxito, salvo para los comandos
+    que contengan alguno de los textos de fail_on. Las comprobaciones de los
+    pasos fallan (el paso no está hecho) salvo las que contengan alguno de los
+    textos de done.
+    """
+
+    def __init__(self, delay=0.0, fail_on=(), done=()):
+        self.delay = delay
+        self.fail_on = tuple(fail_on)
+        self.done = tuple(done)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, call):
+        with self._lock:
+            self.calls.append(call)
+        if self.delay:
+            time.sleep(self.delay)
+
+    def run(self, node, command, stdin=None, timeout=None):
+        self._record(("run", node, command))
+        if any(text in command for text in self.fail_on):
+            return CommandResult(1, "", f"Fallo simulado: {command}")
+        return CommandResult(0)
+
+    def check(self, node, command, timeout=None):
+        self._record(("check", node, command))
+        if any(text in command for text in self.done):
+            return CommandResult(0)
+        return CommandResult(1, "", "No realizado")
+
+    def upload(self, node, local_path, remote_path):
+        self._record(("upload", node, remote_path))
+        return CommandResult(0)
@@ -7,15 +7,24 @@ Este módulo implementa la interfaz de usuario para interactuar con el sistema.
 import sys
 import os
 import subprocess
-from .utils import clear_screen, print_header, print_vms, print_connections
+from .utils import clear_screen, print_header, print_vms, print_connections, print_worker_headroom
 from .connections import manage_connections  # Importar el módulo de conexiones
 from .flavor_manager import manage_flavors, verify_flavor_exists, select_flavor  # Importar funciones de flavor
+from .shapes import SHAPE_NAMES, SHAPE_SIZES
 
 class TopologyUI:
     """Clase que implementa la interfaz de usuario para la gestión de topologías"""
     
-    def __init__(self, manager):
+    def __init__(self, manager, input_stream=None, output_stream=None):
+        """
+        Args:
+            manager: TopologyManager
+            input_stream: Flujo del que se leen las respuestas (None: entrada estándar)
+            output_stream: Flujo en el que se escribe (None: salida estándar)
+        """
         self.manager = manager
+        self.input_stream = input_stream
+        self.output_stream = output_stream
     
     def main_menu(self):
         """Muestra el menú principal de la aplicación"""
@@ -44,7 +53,10 @@ class TopologyUI:
                 
                 elif option == 4:
                     # Eliminar topología existente
-                    self.manager.remove_topology()
+                    if self.manager.remover.tasks:
+                        self.manager.remover.print_tasks()
+                    background = input("¿Eliminar en segundo plano? (s/n): ").lower() == 's'
+                    self.manager.remove_topology(background=background)
                     input("\nPresione Enter para continuar...")
                 
                 elif option == 5:
@@ -53,8 +65,7 @@ class TopologyUI:
                     input("\nPresione Enter para continuar...")
                 
                 elif option == 6:
-                    print("\n¡Hasta luego!")
-                    sys.exit(0)
+                    self.exit()
                 
                 else:
                     print("Opción inválida.")
@@ -63,9 +74,27 @@ class TopologyUI:
             except ValueError:
                 print("Entrada inválida. Se espera un número entero.")
                 input("\nPresione Enter para continuar...")
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n\nOperación cancelada por el usuario.")
-                sys.exit(0)
+                self.exit()
+    
+    def exit(self):
+        """
+        Sale de la aplicación
+        
+        Si quedan eliminaciones en segundo plano en curso, espera a que
+        terminen: sus hilos se detendrían a mitad al salir y la topología
+        quedaría eliminada solo en parte.
+        """
+        remover = self.manager.remover
+        running = remover.running_tasks()
+        if running:
+            print(f"\nHay {len(running)} eliminación(es) en segundo plano en curso. "
+                  "Esperando a que terminen antes de salir...")
+            remover.wait_tasks()
+            remover.print_tasks()
+        print("\n¡Hasta luego!")
+        sys.exit(0)
     
     def visualize_topology(self, topology_file):
         """Visualiza la topología usando visualize_vlan_topology.py"""
@@ -105,15 +134,52 @@ class TopologyUI:
             # Visualizar la topología
             self.visualize_topology(file_name)
             
+            # Mostrar el plan de ejecución sin ejecutarlo
+            if input("\n¿Desea ver el plan de ejecución y su tiempo estimado? (s/n): ").lower() == 's':
+                output = input("Archivo JSON donde exportar el plan (Enter para no exportar): ").strip()
+                self.manager.plan_topology(output or None)
+            
             # Preguntar si se quiere ejecutar la topología
             execute = input("\n¿Desea ejecutar la topología ahora? (s/n): ").lower() == 's'
             if execute:
                 self.manager.execute_topology()
     
+    def _ask_flavor_spec(self, vm_names):
+        """
+        Solicita el flavor de las VMs y lo agrega a una especificación
+        
+        Returns:
+            Diccionario con "flavor" o "flavors", o None si se canceló
+        """
+        # Preguntar si se usará el mismo flavor para todas las VMs
+        same_flavor = input("\n¿Usar el mismo flavor para todas las VMs? (s/n): ").lower() == 's'
+        
+        if same_flavor:
+            print("\nSeleccione el flavor para todas las VMs:")
+            selected_flavor = select_flavor()
+            if not selected_flavor:
+                return None
+            return {"flavor": selected_flavor}
+        
+        flavors = ask_vm_flavors(vm_names)
+        if flavors is None:
+            return None
+        return {"flavors": flavors}
+    
+    def _ask_strategy(self):
+        """Pregunta si se deben agrupar en el mismo worker las VMs conectadas"""
+        locality = input("\n¿Agrupar las VMs conectadas en el mismo worker para reducir el tráfico por el nodo OFS? (s/n): ").lower() == 's'
+        return "locality" if locality else "spread"
+    
+    def _print_placement(self):
+        """Muestra el resultado de la ubicación de las VMs en los workers"""
+        report = self.manager.builder.last_placement
+        print_worker_headroom(report["headroom"])
+        if "cross_links" in report:
+            print(f"Enlaces entre workers distintos (atraviesan el nodo OFS): {report['cross_links']}")
+    
     def create_new_predefined_topology(self):
         """Crea una nueva topología predefinida desde cero"""
-        from .utils import print_header, print_vms, print_connections, validate_vlan_id
-        
         print_header("Crear nueva topología predefinida")
         
         # Verificar que exista al menos un flavor
@@ -123,95 +189,59 @@ class TopologyUI:
             input("\nPresione Enter para continuar...")
             return
         
-        # Inicializar una nueva topología
-        self.manager.topology = self.manager.topology.__class__()
-        self.manager.io.current_topology_file = None
-        
         # Solicitar nombre para la topología
-        self.manager.topology.name = input("Ingrese un nombre para la topología: ") or "nueva_topologia"
+        spec = {"name": input("Ingrese un nombre para la topología: ") or "nueva_topologia"}
         
         print("\nSeleccione el tipo de topología a crear:")
         print("1. Anillo")
         print("2. Estrella")
         print("3. Lineal")
+        print("4. Malla completa")
+        print("5. Árbol")
+        print("6. Toro 2D/3D")
+        print("7. Fat-tree")
+        print("8. Aleatoria (Erdős–Rényi)")
         
         try:
-            topology_type = int(input("\nIngrese su elección (1-3): "))
-            if topology_type < 1 or topology_type > 3:
+            topology_type = int(input("\nIngrese su elección (1-8): "))
+            if topology_type < 1 or topology_type > 8:
                 print("Opción inválida.")
                 input("\nPresione Enter para continuar...")
                 return
+            spec["shape"] = ("ring", "star", "linear", "mesh", "tree", "torus", "fat_tree", "random")[topology_type - 1]
+            spec["shape_args"] = ask_shape_args(spec["shape"])
             
-            num_vms = int(input("\n¿Cuántas VMs tendrá la topología? "))
-            if num_vms <= 0:
+            if spec["shape"] in SHAPE_SIZES:
+                spec["num_vms"] = SHAPE_SIZES[spec["shape"]](**spec["shape_args"])
+                print(f"\nLa topología tendrá {spec['num_vms']} VMs.")
+            else:
+                spec["num_vms"] = int(input("\n¿Cuántas VMs tendrá la topología? "))
+            if spec["num_vms"] <= 0:
                 print("Debe crear al menos una VM.")
                 input("\nPresione Enter para continuar...")
                 return
             
-            # Preguntar si se usará el mismo flavor para todas las VMs
-            same_flavor = input("\n¿Usar el mismo flavor para todas las VMs? (s/n): ").lower() == 's'
-            selected_flavor = None
+            # La topología es nueva, por lo que las VMs se numeran desde vm1
+            vm_names = [f"vm{i + 1}" for i in range(spec["num_vms"])]
             
-            if same_flavor:
-                print("\nSeleccione el flavor para todas las VMs:")
-                selected_flavor = select_flavor()
-                if not selected_flavor:
-                    print("Operación cancelada.")
-                    input("\nPresione Enter para continuar...")
-                    return
+            flavor_spec = self._ask_flavor_spec(vm_names)
+            if flavor_spec is None:
+                print("Operación cancelada.")
+                input("\nPresione Enter para continuar...")
+                return
+            spec.update(flavor_spec)
+            spec["strategy"] = self._ask_strategy()
             
-            # Crear la topología seleccionada
-            if topology_type == 1:
-                # Anillo
-                self.manager.create_ring_topology(num_vms, start_vm_id=None, default_flavor=selected_flavor)
-                topology_name = "anillo"
-            elif topology_type == 2:
-                # Estrella
-                self.manager.create_star_topology(num_vms, start_vm_id=None, default_flavor=selected_flavor)
-                topology_name = "estrella"
-            elif topology_type == 3:
-                # Lineal
-                self.manager.create_linear_topology(num_vms, start_vm_id=None, default_flavor=selected_flavor)
-                topology_name = "lineal"
-            
-            print(f"\nTopología de {topology_name} con {num_vms} VMs creada con éxito.")
-
             # Configurar opciones de red
-            enable_internet = input("\n¿Habilitar acceso a Internet para alguna vm? (s/n): ").lower() == 's'
-            self.manager.topology.settings["enable_internet"] = enable_internet
+            spec["internet"] = ask_internet_access(vm_names, "\n¿Habilitar acceso a Internet para alguna vm? (s/n): ")
             
-            # Configurar acceso a Internet para VMs específicas (solo si el acceso a Internet está habilitado)
-            if enable_internet:
-                internet_access = input("\n¿Configurar acceso a Internet para todas las VMs? (s/n): ").lower()
-                if internet_access == 's':
-                    self.manager.topology.vm_internet_access = [vm["name"] for vm in self.manager.topology.vms]
-                    print("Todas las VMs tienen acceso a Internet.")
-                else:
-                    print("\nSeleccione las VMs que tendrán acceso a Internet:")
-                    for i, vm in enumerate(self.manager.topology.vms):
-                        print(f"{i+1}. {vm['name']}")
-                    
-                    vm_indices = input("\nIngrese los números de las VMs (separados por coma) o dejar vacío para ninguna: ")
-                    if vm_indices.strip():
-                        try:
-                            selected_indices = [int(idx.strip()) - 1 for idx in vm_indices.split(',') if idx.strip()]
-                            self.manager.topology.vm_internet_access = [
-                                self.manager.topology.vms[idx]["name"] 
-                                for idx in selected_indices 
-                                if 0 <= idx < len(self.manager.topology.vms)
-                            ]
-                            print("\nVMs con acceso a Internet:")
-                            for vm in self.manager.topology.vm_internet_access:
-                                print(f"- {vm}")
-                        except ValueError:
-                            print("Entrada inválida. Ninguna VM tendrá acceso a Internet.")
-                            self.manager.topology.vm_internet_access = []
-                    else:
-                        print("Ninguna VM tendrá acceso a Internet.")
-                        self.manager.topology.vm_internet_access = []
-            else:
-                print("El acceso a Internet está deshabilitado para esta topología.")
-                self.manager.topology.vm_internet_access = []
+            # Crear la topología seleccionada
+            if self.manager.build_topology(spec) is None:
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print(f"\nTopología de {SHAPE_NAMES[spec['shape']]} con {spec['num_vms']} VMs creada con éxito.")
+            self._print_placement()
             
             # Guardar y ofrecer ejecutar
             self.save_and_post_actions(self.manager.topology.name)
@@ -228,8 +258,6 @@ class TopologyUI:
 
     def create_new_custom_topology(self):
         """Crea una nueva topología personalizada desde cero"""
-        from .utils import print_header, print_vms, print_connections, validate_vlan_id
-        
         print_header("Crear nueva topología personalizada")
         
         # Verificar que exista al menos un flavor
@@ -239,71 +267,41 @@ class TopologyUI:
             input("\nPresione Enter para continuar...")
             return
         
-        # Inicializar una nueva topología
-        self.manager.topology = self.manager.topology.__class__()
-        self.manager.io.current_topology_file = None
-        
         # Solicitar nombre para la topología
-        self.manager.topology.name = input("Ingrese un nombre para la topología: ") or "topologia_personalizada"
+        spec = {
+            "name": input("Ingrese un nombre para la topología: ") or "topologia_personalizada",
+            "shape": "custom"
+        }
         
         try:
-            num_vms = int(input("\n¿Cuántas VMs tendrá la topología? "))
-            if num_vms <= 0:
+            spec["num_vms"] = int(input("\n¿Cuántas VMs tendrá la topología? "))
+            if spec["num_vms"] <= 0:
                 print("Debe crear al menos una VM.")
                 input("\nPresione Enter para continuar...")
                 return
             
-            # Preguntar si se usará el mismo flavor para todas las VMs
-            same_flavor = input("\n¿Usar el mismo flavor para todas las VMs? (s/n): ").lower() == 's'
-            selected_flavor = None
+            # La topología es nueva, por lo que las VMs se numeran desde vm1
+            vm_names = [f"vm{i + 1}" for i in range(spec["num_vms"])]
             
-            if same_flavor:
-                print("\nSeleccione el flavor para todas las VMs:")
-                selected_flavor = select_flavor()
-                if not selected_flavor:
-                    print("Operación cancelada.")
-                    input("\nPresione Enter para continuar...")
-                    return
+            flavor_spec = self._ask_flavor_spec(vm_names)
+            if flavor_spec is None:
+                print("Operación cancelada.")
+                input("\nPresione Enter para continuar...")
+                return
+            spec.update(flavor_spec)
+            
+            # Solicitar conexiones para cada VM
+            spec["links"] = ask_custom_links(vm_names, vm_names)
+            spec["strategy"] = self._ask_strategy()
             
-            # Crear topología personalizada
-            self.manager.create_custom_topology(num_vms, default_flavor=selected_flavor)
-
             # Configurar opciones de red
-            enable_internet = input("\n¿Habilitar acceso a Internet para la topología? (s/n): ").lower() == 's'
-            self.manager.topology.settings["enable_internet"] = enable_internet
+            spec["internet"] = ask_internet_access(vm_names, "\n¿Habilitar acceso a Internet para la topología? (s/n): ")
             
-            # Configurar acceso a Internet para VMs específicas (solo si el acceso a Internet está habilitado)
-            if enable_internet:
-                internet_access = input("\n¿Configurar acceso a Internet para todas las VMs? (s/n): ").lower()
-                if internet_access == 's':
-                    self.manager.topology.vm_internet_access = [vm["name"] for vm in self.manager.topology.vms]
-                    print("Todas las VMs tienen acceso a Internet.")
-                else:
-                    print("\nSeleccione las VMs que tendrán acceso a Internet:")
-                    for i, vm in enumerate(self.manager.topology.vms):
-                        print(f"{i+1}. {vm['name']}")
-                    
-                    vm_indices = input("\nIngrese los números de las VMs (separados por coma) o dejar vacío para ninguna: ")
-                    if vm_indices.strip():
-                        try:
-                            selected_indices = [int(idx.strip()) - 1 for idx in vm_indices.split(',') if idx.strip()]
-                            self.manager.topology.vm_internet_access = [
-                                self.manager.topology.vms[idx]["name"] 
-                                for idx in selected_indices 
-                                if 0 <= idx < len(self.manager.topology.vms)
-                            ]
-                            print("\nVMs con acceso a Internet:")
-                            for vm in self.manager.topology.vm_internet_access:
-                                print(f"- {vm}")
-                        except ValueError:
-                            print("Entrada inválida. Ninguna VM tendrá acceso a Internet.")
-                            self.manager.topology.vm_internet_access = []
-                    else:
-                        print("Ninguna VM tendrá acceso a Internet.")
-                        self.manager.topology.vm_internet_access = []
-            else:
-                print("El acceso a Internet está deshabilitado para esta topología.")
-                self.manager.topology.vm_internet_access = []
+            # Crear topología personalizada
+            if self.manager.build_topology(spec) is None:
+                input("\nPresione Enter para continuar...")
+                return
+            self._print_placement()
             
             # Guardar y ofrecer ejecutar
             self.save_and_post_actions(self.manager.topology.name)
@@ -632,4 +630,142 @@ class TopologyUI:
         else:
             print("\nComunicación entre VLANs deshabilitada.")
             # Eliminar cualquier configuración específica de conexiones entre VLANs
-            self.manager.topology.settings.pop("vlan_connections", None)
\ No newline at end of file
+            self.manager.topology.settings.pop("vlan_connections", None)
+
+
+def ask_vm_flavors(vm_names):
+    """
+    Solicita un flavor para cada VM
+    
+    Returns:
+        Diccionario nombre de VM -> flavor o None si se canceló
+    """
+    flavors = {}
+    for vm_name in vm_names:
+        print(f"\nSeleccionar flavor para {vm_name}:")
+        flavor = select_flavor()
+        if not flavor:
+            return None
+        flavors[vm_name] = flavor
+    return flavors
+
+
+def ask_custom_links(vm_names, available_names):
+    """
+    Solicita las conexiones de cada VM nueva
+    
+    Args:
+        vm_names: VMs para las que se definen conexiones
+        available_names: VMs con las que se pueden conectar (incluye vm_names)
+    
+    Returns:
+        Lista de enlaces (pares de nombres de VM) sin duplicados
+    """
+    links = []
+    connection_pairs = set()
+    
+    for vm in vm_names:
+        print(f"\nDefinir conexiones para {vm}:")
+        
+        # Mostrar VMs disponibles para conectar
+        print("\nVMs disponibles para conectar:")
+        available_vms = [name for name in available_names if name != vm]
+        for i, available_vm in enumerate(available_vms):
+            print(f"{i+1}. {available_vm}")
+        
+        # Solicitar conexiones
+        connections_input = input("\nIngrese los números de las VMs a conectar (separados por coma) o 'todos' para conectar con todas: ")
+        
+        if connections_input.lower() == 'todos':
+            targets = available_vms
+        else:
+            try:
+                selected_indices = [int(idx.strip()) - 1 for idx in connections_input.split(',') if idx.strip()]
+            except ValueError:
+                print("Entrada inválida. Se esperaban números separados por comas.")
+                continue
+            
+            targets = []
+            for idx in selected_indices:
+                if 0 <= idx < len(available_vms):
+                    targets.append(available_vms[idx])
+                else:
+                    print(f"Índice fuera de rango: {idx+1}")
+        
+        for target_vm in targets:
+            # Omitir conexiones ya definidas (en cualquier dirección)
+            conn_pair = tuple(sorted([vm, target_vm]))
+            if conn_pair in connection_pairs:
+                continue
+            connection_pairs.add(conn_pair)
+            links.append((vm, target_vm))
+            print(f"Conexión definida: {vm} <-> {target_vm}")
+    
+    return links
+
+
+def ask_internet_access(vm_names, question):
+    """
+    Solicita qué VMs tendrán acceso a Internet
+    
+    Returns:
+        "all", una lista de nombres de VM o False si el acceso está deshabilitado
+    """
+    enable_internet = input(question).lower() == 's'
+    if not enable_internet:
+        print("El acceso a Internet está deshabilitado para esta topología.")
+        return False
+    
+    internet_access = input("\n¿Configurar acceso a Internet para todas las VMs? (s/n): ").lower()
+    if internet_access == 's':
+        print("Todas las VMs tienen acceso a Internet.")
+        return "all"
+    
+    print("\nSeleccione las VMs que tendrán acceso a Internet:")
+    for i, vm_name in enumerate(vm_names):
+        print(f"{i+1}. {vm_name}")
+    
+    vm_indices = input("\nIngrese los números de las VMs (separados por coma) o dejar vacío para ninguna: ")
+    if not vm_indices.strip():
+        print("Ninguna VM tendrá acceso a Internet.")
+        return False
+    
+    try:
+        selected_indices = [int(idx.strip()) - 1 for idx in vm_indices.split(',') if idx.strip()]
+    except ValueError:
+        print("Entrada inválida. Ninguna VM tendrá acceso a Internet.")
+        return False
+    
+    selected = [vm_names[idx] for idx in selected_indices if 0 <= idx < len(vm_names)]
+    print("\nVMs con acceso a Internet:")
+    for vm_name in selected:
+        print(f"- {vm_name}")
+    return selected
+
+
+def ask_shape_args(shape):
+    """
+    Solicita los parámetros propios de una forma de topología
+    
+    Returns:
+        Diccionario con los parámetros (vacío si la forma no tiene)
+    
+    Raises:
+        ValueError: Si algún valor introducido no es válido
+    """
+    if shape == "tree":
+        return {"arity": int(input("\n¿Cuántos hijos tendrá cada nodo del árbol? ") or 2)}
+    
+    if shape == "torus":
+        dims = input("\nIngrese las dimensiones del toro (ej. 4x4 o 3x3x3): ")
+        return {"dims": tuple(int(size) for size in dims.lower().split("x"))}
+    
+    if shape == "fat_tree":
+        return {"k": int(input("\nIngrese el número de puertos k de cada switch (par): ") or 4)}
+    
+    if shape == "random":
+        probability = float(input("\nIngrese la probabilidad de cada enlace (0-1): "))
+        seed = input("Ingrese una semilla (vacío para aleatoria): ").strip()
+        return {"probability": probability, "seed": int(seed) if seed else None}
+    
+    return {}
@@ -6,16 +6,27 @@ formateo de pantalla, etc.
 """
 
 import os
-import random
+from .streams import is_bound
 
 def clear_screen():
     """Limpia la pantalla de la terminal"""
+    if is_bound():
+        # Sesión con flujos propios: secuencia ANSI en lugar del comando clear
+        print("\033[2J\033[H", end="")
+        return
     os.system('cls' if os.name == 'nt' else 'clear')
 
-def generate_mac(worker_id, vm_num):
-    """Genera una dirección MAC única"""
-    mac_prefix = "52:54:00"
-    return f"{mac_prefix}:{worker_id:02x}:{vm_num:02x}:{random.randint(0, 255):02x}"
+def generate_mac(topology, vm_name):
+    """
+    Genera una dirección MAC única para una VM de la topología
+    
+    Usa el asignador de MACs de la topología, que es determinista y evita
+    colisiones en todo el espacio de 24 bits del sufijo.
+    """
+    mac = topology.allocate_mac(vm_name)
+    if mac is None:
+        raise ValueError("No quedan direcciones MAC disponibles")
+    return mac
 
 def print_header(title):
     """Imprime un encabezado formateado"""
@@ -58,6 +69,22 @@ def print_connections(topology):
     
     print("-" * 40)
 
+def print_worker_headroom(headroom):
+    """Imprime los recursos libres de cada worker tras ubicar las VMs"""
+    if not headroom:
+        return
+    
+    print("\nRecursos libres por worker:")
+    print("-" * 50)
+    print(f"{'Worker':<10} {'CPU':<10} {'RAM (MB)':<15} {'Disco (GB)':<15}")
+    print("-" * 50)
+    
+    for worker, free in headroom.items():
+        values = ["ilimitado" if free[r] is None else str(free[r]) for r in ("cpu", "ram", "disk")]
+        print(f"{worker:<10} {values[0]:<10} {values[1]:<15} {values[2]:<15}")
+    
+    print("-" * 50)
+
 def get_user_input(prompt, default=None, validator=None):
     """
     Solicita entrada al usuario con validación opcional
@@ -173,10 +200,7 @@ def find_vm_by_name(topology, vm_name):
     Returns:
         Diccionario con la información de la VM o None si no se encuentra
     """
-    for vm in topology.vms:
-        if vm["name"] == vm_name:
-            return vm
-    return None
+    return topology.get_vm_by_name(vm_name)
 
 def format_connection_summary(topology):
     """
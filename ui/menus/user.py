@@ -1,5 +1,6 @@
 import subprocess
 import mysql.connector
+from topology_manager.allocators import MacAllocator
 
 
 # Conexión a la base de datos
@@ -139,8 +140,9 @@ def crear_topologia_vms(topologia_nombre, topologia_opcion, cantidad_nodos, sist
         
         # --- 6. Levantar VMs ---
         print("[5/8] Iniciando máquinas virtuales...")
+        mac_allocator = MacAllocator("00:16:3e")
         for i in range(1, cantidad_nodos + 1):
-            mac = f"00:16:3e:{i:02x}:{i+1:02x}:{i+2:02x}"
+            mac = mac_allocator.allocate(key=i, hint=i)
             cmd = f"""
             qemu-system-x86_64 \
                 -enable-kvm \
@@ -2,7 +2,7 @@ import jwt
 from functools import wraps
 import os
 import sys
-from config.conexion import Conexion
+from utils.TokenCache import load_user
 
 JWT_SECRET_KEY = 'jwt-grupo1-cloud-secret-key'
 
@@ -14,13 +14,7 @@ def auth_required(func):
             return False
         try:
             data = jwt.decode(self.auth_token, JWT_SECRET_KEY, algorithms=["HS256"])
-            db = Conexion()
-            user = db.select(
-                'id_usuario',
-                'usuario',
-                'id_usuario = %s',
-                (data['user_id'],)
-            )
+            user = load_user(data['user_id'])
             if not user:
                 print("\n❌ Usuario no encontrado o token inválido.")
                 self.auth_token = None
@@ -47,14 +41,9 @@ def admin_required(func):
     def wrapper(self, *args, **kwargs):
         try:
             data = jwt.decode(self.auth_token, JWT_SECRET_KEY, algorithms=["HS256"])
-            db = Conexion()
-            role = db.select(
-                'r.nombre',
-                'rol r JOIN usuario u ON r.id_rol = u.rol_id',
-                'u.id_usuario = %s',
-                (data['user_id'],)
-            )
-            if not role or role[0][0].lower() != 'administrador':
+            # Sin caché: otro proceso puede haber cambiado el rol
+            user = load_user(data['user_id'], use_cache=False)
+            if not user or user['role'].lower() != 'administrador':
                 print("\n❌ Se requieren privilegios de administrador para esta función.")
                 return False
             return func(self, *args, **kwargs)
@@ -66,33 +55,21 @@ def admin_required(func):
 def is_admin(token):
     try:
         data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
-        db = Conexion()
-        role = db.select(
-            'r.nombre',
-            'rol r JOIN usuario u ON r.id_rol = u.rol_id',
-            'u.id_usuario = %s',
-            (data['user_id'],)
-        )
-        return role and role[0][0].lower() == 'administrador'
+        user = load_user(data['user_id'], use_cache=False)
+        return bool(user) and user['role'].lower() == 'administrador'
     except Exception:
         return False
 
 def get_user_from_token(token):
     try:
         data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
-        db = Conexion()
-        user = db.select(
-            'u.id_usuario, u.username, r.nombre as role',
-            'usuario u JOIN rol r ON u.rol_id = r.id_rol',
-            'u.id_usuario = %s',
-            (data['user_id'],)
-        )
+        user = load_user(data['user_id'])
         if not user:
             return None
         return {
-            "id": user[0][0],
-            "username": user[0][1],
-            "role": user[0][2]
+            "id": user["id"],
+            "username": user["username"],
+            "role": user["role"]
         }
     except Exception:
         return None
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Pool acotado para calcular y verificar hashes bcrypt
+
+bcrypt ocupa la CPU cientos de milisegundos por contraseña. En lugar de
+hacerlo en el hilo que atiende la sesión, el trabajo se envía a un pool de
+hilos dedicado (bcrypt libera el GIL mientras calcula) con un número fijo de
+hilos y una cola limitada: si la cola está llena se lanza PasswordHasherBusy
+de inmediato en vez de acumular trabajo. Así una ráfaga de inicios de sesión
+no deja sin CPU al resto de sesiones.
+
+El coste de bcrypt se configura con la variable de entorno BCRYPT_ROUNDS. Los
+hashes con un coste menor se pueden actualizar al iniciar sesión
+(needs_rehash).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))       # Coste de los hashes nuevos
+HASH_WORKERS = max(1, (os.cpu_count() or 2) // 2)                 # Hilos que calculan hashes
+HASH_QUEUE_LIMIT = int(os.environ.get("BCRYPT_QUEUE_LIMIT", "32"))  # Peticiones en espera como máximo
+
+
+class PasswordHasherBusy(Exception):
+    """La cola del pool de bcrypt está llena"""
+
+
+def hash_rounds(hashed):
+    """Coste de un hash bcrypt ($2b$12$...) o None si no se reconoce"""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """Pool de hilos con cola acotada para bcrypt"""
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT):
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0        # En cola o en ejecución
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        """
+        Encola un cálculo en el pool
+
+        Returns:
+            Future con el resultado
+
+        Raises:
+            PasswordHasherBusy: si ya hay workers + queue_limit peticiones pendientes
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy("Demasiadas verificaciones de contraseña en curso")
+            self.pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def hash_async(self, password):
+        """Future con el hash (texto) de la contraseña con el coste configurado"""
+        return self.submit(self._hash, password, self.rounds)
+
+    def verify_async(self, password, hashed):
+        """Future que indica si la contraseña corresponde al hash"""
+        return self.submit(self._verify, password, hashed)
+
+    def hash(self, password):
+        """Hash de la contraseña (espera al pool)"""
+        return self.hash_async(password).result()
+
+    def verify(self, password, hashed):
+        """Indica si la contraseña corresponde al hash (espera al pool)"""
+        return self.verify_async(password, hashed).result()
+
+    def hash_many(self, passwords):
+        """
+        Hashes de varias contraseñas, en el mismo orden
+
+        Se encolan de `workers` en `workers` para no ocupar la cola que usan
+        los inicios de sesión.
+
+        Raises:
+            PasswordHasherBusy: si la cola se llena a mitad del lote; los
+            cálculos del lote que aún no empezaron se cancelan
+        """
+        hashes = []
+        for i in range(0, len(passwords), self.workers):
+            futures = []
+            try:
+                for password in passwords[i:i + self.workers]:
+                    futures.append(self.hash_async(password))
+            except PasswordHasherBusy:
+                for future in futures:
+                    future.cancel()
+                raise
+            hashes.extend(future.result() for future in futures)
+        return hashes
+
+    def needs_rehash(self, hashed):
+        """Indica si el hash se calculó con un coste menor que el configurado"""
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds < self.rounds
+
+    def stats(self):
+        """Contadores del pool"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "rounds": self.rounds,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _hash(password, rounds):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(password, hashed):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+password_hasher = PasswordHasher()
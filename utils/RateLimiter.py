@@ -0,0 +1,101 @@
+"""
+Límite de intentos de inicio de sesión por usuario y por IP (token bucket)
+
+Cada clave (usuario o IP) tiene un cubo con `capacity` fichas que se rellena a
+`refill_rate` fichas por segundo; cada intento gasta una. Cuando el cubo está
+vacío el intento se rechaza sin consultar la base de datos ni calcular
+bcrypt. El límite por IP es más holgado porque un laboratorio entero puede
+salir por la misma dirección.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+LOGIN_USER_BURST = 5             # Intentos seguidos por usuario
+LOGIN_USER_REFILL = 1 / 20       # Fichas por segundo (3 intentos por minuto)
+LOGIN_IP_BURST = 30              # Intentos seguidos por IP
+LOGIN_IP_REFILL = 1.0            # Fichas por segundo
+RATE_LIMIT_MAX_KEYS = 10000      # Claves recordadas como máximo
+
+
+class RateLimiter:
+    """Cubos de fichas por clave (seguro entre hilos)"""
+
+    def __init__(self, capacity, refill_rate, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # clave -> (fichas, instante de la última actualización)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def allow(self, key):
+        """Gasta una ficha de la clave; devuelve False si no queda ninguna"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Las claves más antiguas ya habrán recuperado casi todas sus fichas
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def retry_after(self, key):
+        """Segundos hasta que la clave tenga una ficha"""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_rate
+
+    def reset(self, key):
+        """Devuelve todas las fichas a la clave"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class LoginRateLimiter:
+    """Límite de intentos de inicio de sesión por IP y por usuario"""
+
+    def __init__(self):
+        self.by_user = RateLimiter(LOGIN_USER_BURST, LOGIN_USER_REFILL)
+        self.by_ip = RateLimiter(LOGIN_IP_BURST, LOGIN_IP_REFILL)
+
+    def check(self, username, client_ip=None):
+        """
+        Registra un intento de inicio de sesión
+
+        Returns:
+            Segundos que hay que esperar si se supera algún límite, o None
+        """
+        if client_ip and not self.by_ip.allow(client_ip):
+            return self.by_ip.retry_after(client_ip)
+        key = username.strip().lower()
+        if not self.by_user.allow(key):
+            return self.by_user.retry_after(key)
+        return None
+
+    def succeeded(self, username):
+        """Un inicio de sesión correcto no cuenta contra el usuario"""
+        self.by_user.reset(username.strip().lower())
+
+    def stats(self):
+        """Intentos aceptados y rechazados por cada límite"""
+        return {
+            "user": {"allowed": self.by_user.allowed, "rejected": self.by_user.rejected},
+            "ip": {"allowed": self.by_ip.allowed, "rejected": self.by_ip.rejected}
+        }
+
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,118 @@
+"""
+Caché de usuarios de tokens verificados
+
+Cada verificación de un token (decoradores de AuthUtils y
+AuthenticationModule.verify_token) necesita el nombre y el rol del usuario.
+Esta caché, común a todo el proceso, guarda esos datos por id de usuario
+durante TOKEN_CACHE_TTL segundos para no consultar la base de datos en cada
+acción del menú. La firma y la expiración del token se siguen comprobando en
+cada llamada con jwt.decode.
+
+La caché tiene un máximo de entradas (se descarta la usada hace más tiempo) y
+se invalida al eliminar o modificar un usuario. Otros procesos pueden ver los
+datos anteriores hasta que venza su TTL, por lo que las comprobaciones de
+privilegios de administrador no usan la caché (use_cache=False).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from modules.UserRepository import UserRepository
+
+TOKEN_CACHE_TTL = 60          # Segundos que se confía en los datos de un usuario
+TOKEN_CACHE_MAX_SIZE = 1024   # Usuarios guardados como máximo
+
+
+class TokenCache:
+    """Caché TTL + LRU de id de usuario -> datos del usuario (segura entre hilos)"""
+
+    def __init__(self, ttl=TOKEN_CACHE_TTL, max_size=TOKEN_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()   # user_id -> (vence, usuario)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        """Datos del usuario si están en la caché y no vencieron, o None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, user):
+        """Guarda los datos de un usuario"""
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        """Descarta los datos de un usuario (o de todos si no se indica)"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                # Los ids pueden llegar como texto desde los menús
+                for key in (user_id, str(user_id)):
+                    self._entries.pop(key, None)
+                if isinstance(user_id, str) and user_id.isdigit():
+                    self._entries.pop(int(user_id), None)
+            self.invalidations += 1
+
+    def stats(self):
+        """Contadores de uso de la caché"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+token_cache = TokenCache()
+
+
+def load_user(user_id, db=None, use_cache=True):
+    """
+    Datos del usuario de un token (id, username, role, rol_id)
+
+    Usa la caché y, si no están, los obtiene con una sola consulta.
+
+    Args:
+        use_cache: Si es falso se consulta siempre la base de datos (y se
+                   actualiza la caché con el resultado)
+
+    Returns:
+        Diccionario con los datos del usuario o None si no existe
+    """
+    if use_cache:
+        user = token_cache.get(user_id)
+        if user is not None:
+            return user
+
+    user = UserRepository(db).find_by_id(user_id)
+    if user is None:
+        token_cache.invalidate(user_id)
+        return None
+
+    token_cache.put(user_id, user)
+    return dict(user)